@@ -69,6 +69,7 @@ urlpatterns = [
     path('students/status/', student_status, name='admin_student_status'),
     path('export/students/excel/', export_students_excel, name='export_students_excel'),
     path('export/students/pdf/', export_students_pdf, name='export_students_pdf'),
+    path('export/students/data/', export_students_data, name='export_students_data'),
     path('students/<int:student_id>/edit/', student_edit, name='admin_student_edit'),
     path('students/<int:id>/delete/', student_delete, name='admin_student_delete'),
     path('students/<int:id>/detail/', student_detail, name='admin_student_detail'),
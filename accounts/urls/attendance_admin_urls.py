@@ -36,6 +36,7 @@ urlpatterns = [
     path('reports/daily/', DailyAttendanceReportView.as_view(), name='attendance_report_daily'),
     path('reports/daily/export-pdf/', ExportDailyAttendancePDFView.as_view(), name='export_daily_attendance_pdf'),
     path('reports/monthly/', MonthlyAttendanceReportView.as_view(), name='attendance_report_monthly'),
+    path('reports/export/data/', ExportAttendanceDataView.as_view(), name='attendance_export_data'),
     path('reports/monthly/export/pdf/', ExportMonthlyAttendancePDFView.as_view(), name='attendance_report_monthly_pdf'),
      # API endpoints
     path('api/week-details/', GetWeekAttendanceDetailsAPI.as_view(), name='api_week_details'),
@@ -46,6 +47,7 @@ urlpatterns = [
     path('attendance-report/class-monthly-pdf/', ClassMonthlyAttendancePDFView.as_view(), name='attendance_report_class_monthly_pdf'),
     path('reports/student/<int:student_id>/', StudentAttendanceReportView.as_view(), name='attendance_report_student'),
     path('reports/class/<int:class_id>/', ClassAttendanceReportView.as_view(), name='attendance_report_class'),
+    path('reports/class/<int:class_id>/excel/', ClassAttendanceRegisterExcelView.as_view(), name='attendance_report_class_excel'),
     
 
 ]
\ No newline at end of file
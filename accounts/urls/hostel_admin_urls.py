@@ -91,6 +91,7 @@ urlpatterns = [
         # Hostel Payments Export URLs
     path('hostel/payments/export/excel/', hostel_payments_export_excel, name='admin_hostel_payments_export_excel'),
     path('hostel/payments/export/pdf/', hostel_payments_export_pdf,  name='admin_hostel_payments_export_pdf'),
+    path('hostel/payments/export/data/', hostel_payments_export_data, name='admin_hostel_payments_export_data'),
     path('hostel/payment/<int:pk>/receipt/pdf/', hostel_payment_receipt_pdf,  name='admin_hostel_payment_receipt_pdf'),
     path('allocations/<int:allocation_id>/payments/export/pdf/', allocation_payments_export_pdf, name='admin_allocation_payments_export_pdf'),
     path('payment/<int:transaction_id>/receipt/pdf/', single_transaction_payment_export_pdf, name='admin_single_allocation_transaction_payments_export_pdf'),
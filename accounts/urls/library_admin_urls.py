@@ -28,6 +28,7 @@ urlpatterns = [
     path('book-borrows/get/', get_borrow_data, name='admin_get_borrow_data'),
     path('book-borrows/fine-payment/<int:borrow_id>/', fine_payment_view, name='admin_fine_payment'),
     path('book-borrows/export/', export_book_borrows, name='admin_export_book_borrows'),
+    path('book-borrows/export/data/', export_book_borrows_data, name='admin_export_book_borrows_data'),
     path('book-borrows/get-copies/', get_book_copies, name='admin_get_book_copies'),
     path('book-borrows/get-borrower-info/', get_borrower_info, name='admin_get_borrower_info'),
     path('reports/returned-books/', returned_books_report_view, name='admin_returned_books_report'),    
@@ -31,18 +31,21 @@ urlpatterns = [
     # AJAX endpoints
     path('save-results/', save_student_results, name='save_student_results'),
     path('save-multiple-results/',  save_multiple_results, name='save_multiple_results'),
+    path('exam-sessions/<int:exam_session_id>/recalculation-status/', results_recalculation_status, name='results_recalculation_status'),
     path('exam-sessions/<int:exam_session_id>/subject/<int:subject_id>/entry/', subject_results_entry,   name='admin_subject_results_entry' ),
 
     path('exam-sessions/<int:exam_session_id>/download-excel-template/', download_session_excel_template, name='download_session_excel_template'),
     path('exam-sessions/upload-session-excel/', upload_session_excel, name='upload_session_excel'),
     # In your urls.py
     path('exam-sessions/<int:exam_session_id>/download-excel-report/', download_session_excel_report, name='download_session_excel_report'),
+    path('results/export/data/', export_results_data, name='admin_export_results_data'),
     path('exam-sessions/<int:exam_session_id>/download-summary/', download_session_summary, name='download_session_summary'),
 
     # Student-specific result URLs
     path('student/<int:student_id>/sessions/', student_sessions_list, name='student_sessions_list'),
     path('exam-sessions/', exam_sessions_list_view, name='admin_exam_sessions_list_view'),
      path('student/<int:student_id>/session/<int:exam_session_id>/download-pdf/', download_student_pdf_report, name='download_student_pdf_report'),
+    path('exam-sessions/<int:exam_session_id>/report-cards/', session_report_cards, name='session_report_cards'),
     path('student/<int:student_id>/session/<int:exam_session_id>/results/', student_session_results, name='student_session_results'),
       # Note: You need to create these report views or update the URLs in the template
     path('exam-sessions/<int:exam_session_id>/report/', exam_session_report_view, name='exam_session_report_view'),
@@ -63,6 +66,10 @@ urlpatterns = [
     # AJAX endpoint to get subject list
     path('ajax/subject-list/<int:exam_session_id>/', ajax_subject_list, name='ajax_subject_list'),
 
+    # Performance trends across published exam sessions
+    path('ajax/class-level-trends/<int:class_level_id>/', ajax_class_level_trends, name='ajax_class_level_trends'),
+    path('ajax/student-trends/<int:student_id>/', ajax_student_trends, name='ajax_student_trends'),
+
       # Subject Matrix Analysis URLs
     path('exam-session/<int:exam_session_id>/subject-matrix-analysis/',  session_subject_matrix_analysis, name='session_subject_matrix_analysis'),
     
@@ -6,13 +6,11 @@ from django.urls import reverse
 from django.contrib.auth.decorators import login_required, permission_required
 from django.contrib import messages
 from django.http import JsonResponse, HttpResponse
-from django.db.models import Q, Count, F, Prefetch
+from django.db.models import Q, Count, F, OuterRef, Prefetch, Subquery
 from django.utils import timezone
 from django.contrib.auth.forms import PasswordChangeForm
 from django.contrib.auth import update_session_auth_hash
 from django.core.paginator import Paginator, PageNotAnInteger, EmptyPage
-import openpyxl
-from weasyprint import HTML
 from accounts.forms.admin_forms import AdminPreferencesForm, AdminProfileUpdateForm
 from accounts.forms.student_forms import ParentForm, ParentStudentForm, PreviousSchoolForm, StudentEditForm, StudentForm,StudentFilterForm
 from accounts.models import GENDER_CHOICES, ROLE_CHOICES, CustomUser, Department, Notification, Staffs, AdminHOD, SystemLog, TeachingAssignment
@@ -20,8 +18,8 @@ from core.models import (
     Combination, CombinationSubject, EducationalLevel, AcademicYear, Term, Subject, 
     ClassLevel, StreamClass
 )
-from weasyprint.text.fonts import FontConfiguration
 from students.models import RELATIONSHIP_CHOICES, STATUS_CHOICES, Parent, PreviousSchool, Student
+from students.attendance_alerts import at_risk_students
 from django.core.exceptions import ValidationError
 from django.utils.dateparse import parse_date
 from django.db import IntegrityError
@@ -36,8 +34,12 @@ from django.core.files.storage import default_storage
 import os
 from django.views.decorators.http import require_http_methods
 from django.template.loader import render_to_string
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
+from openpyxl.styles import Font
+from core.data_export import streaming_export_response
+from core.reports import pdf_job_response
+from core.excel_export import (
+    EXPORT_CHUNK_SIZE, StreamingExcelExport, box_border, centered, left_aligned, solid_fill
+)
 
 # ============================================================================
 # DASHBOARD VIEWS
@@ -109,6 +111,13 @@ def dashboard(request):
         .values('name', 'student_count')
     )
 
+    # ==============================
+    # AT-RISK STUDENTS (ATTENDANCE ALERTS)
+    # ==============================
+    at_risk_alerts = at_risk_students()
+    at_risk_count = at_risk_alerts.count()
+    at_risk_alerts = at_risk_alerts[:10]
+
     # ==============================
     # ACTIVE SESSIONS (PLACEHOLDER)
     # ==============================
@@ -136,6 +145,10 @@ def dashboard(request):
         # Activities
         "activities": activities,
 
+        # Attendance alerts
+        "at_risk_students": at_risk_alerts,
+        "at_risk_count": at_risk_count,
+
         # Analytics
         "class_distribution": list(class_distribution),
         "active_sessions": active_sessions,
@@ -3580,6 +3593,49 @@ def students_by_class(request):
     return render(request, 'admin/students/students_by_class.html', context)
 
 
+def filter_students(students, params, search_value=''):
+    """
+    Apply the student list filters in ``params`` (class_level, stream,
+    academic_year, status, gender) and the search text to ``students``.
+    """
+    class_level_id = params.get('class_level', '')
+    stream_id = params.get('stream', '')
+    academic_year_id = params.get('academic_year', '')
+    status_filter = params.get('status', '')
+    gender_filter = params.get('gender', '')
+    
+    if class_level_id:
+        students = students.filter(class_level_id=class_level_id)
+    
+    if stream_id:
+        students = students.filter(stream_class_id=stream_id)
+    
+    if academic_year_id:
+        students = students.filter(academic_year_id=academic_year_id)
+    
+    if status_filter:
+        students = students.filter(status=status_filter)
+    
+    if gender_filter:
+        students = students.filter(gender=gender_filter)
+    
+    if search_value:
+        students = students.annotate(
+            full_name_search=Concat(
+                'first_name', Value(' '), 'middle_name', Value(' '), 'last_name',
+                output_field=CharField()
+            )
+        ).filter(
+            Q(full_name_search__icontains=search_value) |
+            Q(registration_number__icontains=search_value) |
+            Q(examination_number__icontains=search_value) |
+            Q(parents__full_name__icontains=search_value) |
+            Q(parents__first_phone_number__icontains=search_value)
+        ).distinct()
+    
+    return students
+
+
 @login_required
 @require_GET
 def students_api(request):
@@ -3594,13 +3650,6 @@ def students_api(request):
         length = int(request.GET.get('length', 25))
         search_value = request.GET.get('search[value]', '')
         
-        # Get filter values from custom parameters
-        class_level_id = request.GET.get('class_level', '')
-        stream_id = request.GET.get('stream', '')
-        academic_year_id = request.GET.get('academic_year', '')
-        status_filter = request.GET.get('status', '')
-        gender_filter = request.GET.get('gender', '')
-        
         # Base queryset with optimized selects
         students = Student.objects.filter(is_active=True).select_related(
             'class_level',
@@ -3609,36 +3658,8 @@ def students_api(request):
             'combination'
         ).prefetch_related('parents').order_by('-created_at')
         
-        # Apply filters
-        if class_level_id:
-            students = students.filter(class_level_id=class_level_id)
-        
-        if stream_id:
-            students = students.filter(stream_class_id=stream_id)
-        
-        if academic_year_id:
-            students = students.filter(academic_year_id=academic_year_id)
-        
-        if status_filter:
-            students = students.filter(status=status_filter)
-        
-        if gender_filter:
-            students = students.filter(gender=gender_filter)
-        
-        # Apply search filter
-        if search_value:
-            students = students.annotate(
-                full_name_search=Concat(
-                    'first_name', Value(' '), 'middle_name', Value(' '), 'last_name',
-                    output_field=CharField()
-                )
-            ).filter(
-                Q(full_name_search__icontains=search_value) |
-                Q(registration_number__icontains=search_value) |
-                Q(examination_number__icontains=search_value) |
-                Q(parents__full_name__icontains=search_value) |
-                Q(parents__first_phone_number__icontains=search_value)
-            ).distinct()
+        # Apply filters and search
+        students = filter_students(students, request.GET, search_value)
         
         # Get total count before filtering
         total_records = Student.objects.filter(is_active=True).count()
@@ -3799,12 +3820,162 @@ def statistics_api(request):
             'error': str(e)
         })
 
+@login_required
+@require_GET
+def export_students_data(request):
+    """
+    Stream the students matching the students list filters as CSV or
+    NDJSON (?format=csv|ndjson), for use in other tools
+    """
+    students = filter_students(Student.objects.filter(is_active=True), request.GET, request.GET.get('search', ''))
+    
+    # First parent by name, as shown on the students list
+    parents = Parent.objects.filter(students=OuterRef('pk')).order_by('full_name')
+    students = students.annotate(
+        parent_name=Subquery(parents.values('full_name')[:1]),
+        parent_phone=Subquery(parents.values('first_phone_number')[:1]),
+    )
+    
+    columns = [
+        ('id', 'id'),
+        ('registration_number', 'registration_number'),
+        ('examination_number', 'examination_number'),
+        ('first_name', 'first_name'),
+        ('middle_name', 'middle_name'),
+        ('last_name', 'last_name'),
+        ('gender', 'gender'),
+        ('date_of_birth', 'date_of_birth'),
+        ('class_level', 'class_level__name'),
+        ('stream', 'stream_class__stream_letter'),
+        ('combination', 'combination__code'),
+        ('academic_year', 'academic_year__name'),
+        ('admission_year', 'admission_year'),
+        ('status', 'status'),
+        ('address', 'address'),
+        ('parent_name', 'parent_name'),
+        ('parent_phone', 'parent_phone'),
+    ]
+    return streaming_export_response(
+        request, students, columns, f'students_{timezone.now().strftime("%Y%m%d_%H%M%S")}'
+    )
+
+
+# Fill colour of the status cell in student exports
+STUDENT_STATUS_COLORS = {
+    'active': 'C6EFCE',
+    'completed': 'BDD7EE',
+    'suspended': 'FFEB9C',
+    'withdrawn': 'FFC7CE',
+    'transferred': 'E0E7FF',
+}
+
+
+def student_export_styles(export):
+    """Named styles shared by the student list exports."""
+    header_border = box_border('medium', '4F81BD')
+    cell_border = box_border('thin', 'B8CCE4')
+
+    export.add_style('report_title', Font(name='Calibri', size=16, bold=True, color='1F4E79'),
+                     border=header_border, alignment=centered())
+    export.add_style('report_school', Font(name='Calibri', size=14, bold=True, color='2E75B5'),
+                     border=header_border, alignment=centered())
+    export.add_style('report_address', Font(name='Calibri', size=11, italic=True),
+                     border=header_border, alignment=centered())
+    export.add_style('report_name', Font(name='Calibri', size=14, bold=True, color='C00000'),
+                     border=header_border, alignment=centered())
+    export.add_style('report_filter_title', Font(name='Calibri', size=12, bold=True, color='44546A'),
+                     solid_fill('F2F2F2'), header_border, centered())
+    export.add_style('report_filters', Font(name='Calibri', size=11, italic=True),
+                     solid_fill('FCE4D6'), header_border, centered())
+    export.add_style('report_generated', Font(name='Calibri', size=10, bold=True),
+                     border=header_border, alignment=centered())
+    export.add_style('report_stats_title', Font(name='Calibri', size=12, bold=True, color='1F4E79'),
+                     solid_fill('DEEAF6'), alignment=centered())
+    export.add_style('report_stats_label', Font(bold=True), solid_fill('F2F2F2'), cell_border)
+    export.add_style('report_stats_value', border=cell_border)
+    export.add_style('report_header', Font(name='Calibri', size=12, bold=True, color='FFFFFF'),
+                     solid_fill('4F81BD'), cell_border, centered())
+    export.add_style('report_total', Font(name='Calibri', size=12, bold=True),
+                     solid_fill('DEEAF6'), cell_border, left_aligned())
+    export.add_style('report_note', Font(name='Calibri', size=9, italic=True), alignment=centered())
+    export.add_style('report_copyright', Font(name='Calibri', size=8, italic=True), alignment=centered())
+
+    # Data cells: left or centred, on plain or alternate rows
+    cell_font = Font(name='Calibri', size=10)
+    for suffix, fill in (('', None), ('_alt', solid_fill('F9F9F9'))):
+        export.add_style(f'student_cell{suffix}', cell_font, fill, cell_border, left_aligned())
+        export.add_style(f'student_cell_center{suffix}', cell_font, fill, cell_border, centered())
+
+    for status, color in STUDENT_STATUS_COLORS.items():
+        export.add_style(f'student_status_{status}', cell_font, solid_fill(color), cell_border, left_aligned())
+    export.add_style('student_active_yes', cell_font, solid_fill('C6EFCE'), cell_border, centered())
+    export.add_style('student_active_no', cell_font, solid_fill('F2F2F2'), cell_border, centered())
+
+
+def student_export_sheet(export, sheet_title, report_title, filter_details, stats, headers,
+                         column_widths, user):
+    """
+    Add a student list sheet and write its header block: school details,
+    applied filters, statistics and the table headings (rows 1-11).
+    """
+    columns = len(headers)
+    header_row = 11
+    sheet = export.add_sheet(sheet_title, column_widths=column_widths, freeze_row=header_row + 1)
+
+    filter_text = [f"{key}: {value}" for key, value in filter_details.items()]
+    if not filter_text:
+        filter_text.append("No filters applied - Showing all students")
+
+    sheet.append_merged("SCHOOL MANAGEMENT SYSTEM", 'report_title', columns)
+    sheet.append_merged("Excellence in Education | Quality Learning for All", 'report_school', columns)
+    sheet.append_merged(
+        "P.O. Box 12345, Dar es Salaam, Tanzania | Tel: +255 123 456 789 | Email: info@school.ac.tz",
+        'report_address', columns
+    )
+    sheet.append_merged(report_title, 'report_name', columns)
+    sheet.append_merged("FILTER INFORMATION", 'report_filter_title', columns)
+    sheet.append_merged(" | ".join(filter_text), 'report_filters', columns)
+    sheet.append_merged(
+        f"Generated on: {timezone.now().strftime('%d-%m-%Y %H:%M:%S')} | "
+        f"Generated by: {user.get_full_name() or user.username}",
+        'report_generated', columns
+    )
+    sheet.append_merged("STATISTICS SUMMARY", 'report_stats_title', columns)
+
+    # Label/value pairs three columns apart: A-B, D-E, G-H, J-K
+    stats_values = []
+    for label, value in stats:
+        stats_values.extend([label, value, None])
+    sheet.append(stats_values[:-1], style='report_stats_value', styles={
+        column: 'report_stats_label' for column in range(1, len(stats_values), 3)
+    })
+
+    sheet.append_blank()
+    sheet.append(headers, style='report_header')
+    return sheet
+
+
+def student_export_footer(sheet, total, columns):
+    last_data_row = sheet.row_count
+    sheet.append_blank()
+    total_row = sheet.append([f"TOTAL STUDENTS: {total}"], style='report_total')
+    sheet.merge(total_row, 1, total_row, 4)
+    sheet.append_blank()
+    sheet.append_merged("This is a computer-generated report. No signature is required.", 'report_note', columns)
+    sheet.append_merged(
+        f"© {timezone.now().year} School Management System. All rights reserved.",
+        'report_copyright', columns
+    )
+    sheet.auto_filter(11, last_data_row, columns)
+
+
 @login_required
 def export_students_excel(request):
     """
     Export students to Excel using openpyxl
     Supports filtering based on current filters
     Includes school header and filtering details section
+    Rows are streamed from the database into a write-only workbook
     """
     try:
         # Get filter parameters from request
@@ -3853,11 +4024,12 @@ def export_students_excel(request):
         
         # Get filter display names for header section
         filter_details = {}
+        class_level = None
         if class_level_id:
-            class_level = ClassLevel.objects.get(id=class_level_id)
+            class_level = ClassLevel.objects.select_related('educational_level').get(id=class_level_id)
             filter_details['Class Level'] = f"{class_level.name} ({class_level.educational_level.name})"
         if stream_id:
-            stream = StreamClass.objects.get(id=stream_id)
+            stream = StreamClass.objects.select_related('class_level').get(id=stream_id)
             filter_details['Stream'] = f"{stream.class_level.name}{stream.stream_letter}"
         if academic_year_id:
             year = AcademicYear.objects.get(id=academic_year_id)
@@ -3875,162 +4047,9 @@ def export_students_excel(request):
         female_count = students.filter(gender='female').count()
         active_count = students.filter(status='active').count()
         
-        # Create a new workbook
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Students List"
-        
-        # Define styles
-        title_font = Font(name='Calibri', size=16, bold=True, color='1F4E79')
-        school_font = Font(name='Calibri', size=14, bold=True, color='2E75B5')
-        subtitle_font = Font(name='Calibri', size=12, bold=True, color='44546A')
-        header_font = Font(name='Calibri', size=12, bold=True, color='FFFFFF')
-        
-        header_fill = PatternFill(start_color='4F81BD', end_color='4F81BD', fill_type='solid')
-        info_fill = PatternFill(start_color='DEEAF6', end_color='DEEAF6', fill_type='solid')
-        filter_fill = PatternFill(start_color='F2F2F2', end_color='F2F2F2', fill_type='solid')
-        
-        center_alignment = Alignment(horizontal='center', vertical='center')
-        left_alignment = Alignment(horizontal='left', vertical='center')
-        wrap_alignment = Alignment(horizontal='left', vertical='center', wrap_text=True)
-        
-        header_border = Border(
-            left=Side(style='medium', color='4F81BD'),
-            right=Side(style='medium', color='4F81BD'),
-            top=Side(style='medium', color='4F81BD'),
-            bottom=Side(style='medium', color='4F81BD')
-        )
-        
-        cell_border = Border(
-            left=Side(style='thin', color='B8CCE4'),
-            right=Side(style='thin', color='B8CCE4'),
-            top=Side(style='thin', color='B8CCE4'),
-            bottom=Side(style='thin', color='B8CCE4')
-        )
-        
-        # Merge cells for header sections
-        ws.merge_cells('A1:Q1')
-        ws.merge_cells('A2:Q2')
-        ws.merge_cells('A3:Q3')
-        ws.merge_cells('A4:Q4')
-        ws.merge_cells('A5:Q5')
-        ws.merge_cells('A6:Q6')
-        ws.merge_cells('A7:Q7')
-        
-        # ============================================
-        # SCHOOL HEADER SECTION
-        # ============================================
+        export = StreamingExcelExport()
+        student_export_styles(export)
         
-        # Row 1: School Name
-        school_cell = ws.cell(row=1, column=1)
-        school_cell.value = "SCHOOL MANAGEMENT SYSTEM"
-        school_cell.font = title_font
-        school_cell.alignment = center_alignment
-        school_cell.border = header_border
-        
-        # Row 2: School Details
-        school_details = ws.cell(row=2, column=1)
-        school_details.value = " Excellence in Education | Quality Learning for All"
-        school_details.font = school_font
-        school_details.alignment = center_alignment
-        school_details.border = header_border
-        
-        # Row 3: Address
-        address_cell = ws.cell(row=3, column=1)
-        address_cell.value = "P.O. Box 12345, Dar es Salaam, Tanzania | Tel: +255 123 456 789 | Email: info@school.ac.tz"
-        address_cell.font = Font(name='Calibri', size=11, italic=True)
-        address_cell.alignment = center_alignment
-        address_cell.border = header_border
-        
-        # Row 4: Report Title
-        title_cell = ws.cell(row=4, column=1)
-        title_cell.value = "STUDENTS LIST REPORT"
-        title_cell.font = Font(name='Calibri', size=14, bold=True, color='C00000')
-        title_cell.alignment = center_alignment
-        title_cell.border = header_border
-        
-        # ============================================
-        # FILTER INFORMATION SECTION
-        # ============================================
-        
-        # Row 5: Filter Section Title
-        filter_title = ws.cell(row=5, column=1)
-        filter_title.value = "FILTER INFORMATION"
-        filter_title.font = Font(name='Calibri', size=12, bold=True, color='44546A')
-        filter_title.alignment = center_alignment
-        filter_title.fill = PatternFill(start_color='F2F2F2', end_color='F2F2F2', fill_type='solid')
-        filter_title.border = header_border
-        
-        # Row 6: Applied Filters
-        filter_text = []
-        if filter_details:
-            for key, value in filter_details.items():
-                filter_text.append(f"{key}: {value}")
-        else:
-            filter_text.append("No filters applied - Showing all students")
-        
-        filter_cell = ws.cell(row=6, column=1)
-        filter_cell.value = " | ".join(filter_text)
-        filter_cell.font = Font(name='Calibri', size=11, italic=True)
-        filter_cell.alignment = center_alignment
-        filter_cell.fill = PatternFill(start_color='FCE4D6', end_color='FCE4D6', fill_type='solid')
-        filter_cell.border = header_border
-        
-        # Row 7: Generation Information
-        gen_info = f"Generated on: {timezone.now().strftime('%d-%m-%Y %H:%M:%S')} | Generated by: {request.user.get_full_name() or request.user.username}"
-        gen_cell = ws.cell(row=7, column=1)
-        gen_cell.value = gen_info
-        gen_cell.font = Font(name='Calibri', size=10, bold=True)
-        gen_cell.alignment = center_alignment
-        gen_cell.border = header_border
-        
-        # ============================================
-        # STATISTICS SECTION
-        # ============================================
-        
-        # Row 8: Statistics Title
-        stats_title_row = 8
-        ws.merge_cells(f'A{stats_title_row}:Q{stats_title_row}')
-        stats_title = ws.cell(row=stats_title_row, column=1)
-        stats_title.value = "STATISTICS SUMMARY"
-        stats_title.font = Font(name='Calibri', size=12, bold=True, color='1F4E79')
-        stats_title.alignment = center_alignment
-        stats_title.fill = PatternFill(start_color='DEEAF6', end_color='DEEAF6', fill_type='solid')
-        
-        # Row 9: Statistics Values
-        stats_row = 9
-        # Total Students
-        ws.cell(row=stats_row, column=1, value="Total Students:").font = Font(bold=True)
-        ws.cell(row=stats_row, column=2, value=total_students)
-        # Active Students
-        ws.cell(row=stats_row, column=4, value="Active:").font = Font(bold=True)
-        ws.cell(row=stats_row, column=5, value=active_count)
-        # Male Students
-        ws.cell(row=stats_row, column=7, value="Male:").font = Font(bold=True)
-        ws.cell(row=stats_row, column=8, value=male_count)
-        # Female Students
-        ws.cell(row=stats_row, column=10, value="Female:").font = Font(bold=True)
-        ws.cell(row=stats_row, column=11, value=female_count)
-        
-        # Apply borders to statistics row
-        for col in range(1, 12):
-            cell = ws.cell(row=stats_row, column=col)
-            cell.border = cell_border
-            if col in [1, 4, 7, 10]:
-                cell.fill = PatternFill(start_color='F2F2F2', end_color='F2F2F2', fill_type='solid')
-        
-        # ============================================
-        # EMPTY ROW BEFORE TABLE
-        # ============================================
-        empty_row = 10
-        ws.row_dimensions[empty_row].height = 10
-        
-        # ============================================
-        # TABLE HEADERS (Start from row 11)
-        # ============================================
-        header_row = 11
-        
-        # Define headers
         headers = [
             'S/N', 'Registration No.', 'Full Name', 'Gender', 'Date of Birth',
             'Class', 'Stream', 'Combination', 'Academic Year', 'Admission Year',
@@ -4038,24 +4057,22 @@ def export_students_excel(request):
             'Status', 'Address', 'Examination No.'
         ]
         
-        # Write headers
-        for col_num, header in enumerate(headers, 1):
-            cell = ws.cell(row=header_row, column=col_num)
-            cell.value = header
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = center_alignment
-            cell.border = cell_border
+        # Widths are fixed up front: a streamed sheet cannot be measured afterwards
+        ws = student_export_sheet(
+            export, "Students List", "STUDENTS LIST REPORT", filter_details,
+            [("Total Students:", total_students), ("Active:", active_count),
+             ("Male:", male_count), ("Female:", female_count)],
+            headers,
+            [22, 20, 32, 10, 15, 14, 12, 14, 16, 16, 30, 18, 30, 16, 14, 35, 20],
+            request.user
+        )
         
         # ============================================
         # DATA ROWS
         # ============================================
-        current_row = header_row + 1
-        
-        for row_num, student in enumerate(students, 1):
+        for row_num, student in enumerate(students.iterator(chunk_size=EXPORT_CHUNK_SIZE), 1):
             primary_parent = student.parents.first()
             
-            # Row data
             row_data = [
                 row_num,  # S/N
                 student.registration_number or 'N/A',
@@ -4076,127 +4093,24 @@ def export_students_excel(request):
                 student.examination_number or 'N/A',
             ]
             
-            # Write cells with alternating row colors
-            for col_num, value in enumerate(row_data, 1):
-                cell = ws.cell(row=current_row, column=col_num)
-                cell.value = value
-                cell.font = Font(name='Calibri', size=10)
-                cell.alignment = left_alignment if col_num not in [1, 4] else center_alignment
-                cell.border = cell_border
-                
-                # Alternate row colors
-                if row_num % 2 == 0:
-                    cell.fill = PatternFill(start_color='F9F9F9', end_color='F9F9F9', fill_type='solid')
-            
-            # Color code status cells
-            status_cell = ws.cell(row=current_row, column=15)  # Status column
-            if student.status == 'active':
-                status_cell.fill = PatternFill(start_color='C6EFCE', end_color='C6EFCE', fill_type='solid')
-            elif student.status == 'suspended':
-                status_cell.fill = PatternFill(start_color='FFEB9C', end_color='FFEB9C', fill_type='solid')
-            elif student.status == 'withdrawn':
-                status_cell.fill = PatternFill(start_color='FFC7CE', end_color='FFC7CE', fill_type='solid')
-            elif student.status == 'completed':
-                status_cell.fill = PatternFill(start_color='BDD7EE', end_color='BDD7EE', fill_type='solid')
-            
-            current_row += 1
-        
-        # ============================================
-        # FOOTER SECTION
-        # ============================================
-        footer_row = current_row + 1
-        
-        # Total row
-        ws.merge_cells(f'A{footer_row}:D{footer_row}')
-        total_cell = ws.cell(row=footer_row, column=1)
-        total_cell.value = f"TOTAL STUDENTS: {len(students)}"
-        total_cell.font = Font(name='Calibri', size=12, bold=True)
-        total_cell.fill = PatternFill(start_color='DEEAF6', end_color='DEEAF6', fill_type='solid')
-        total_cell.border = cell_border
-        total_cell.alignment = left_alignment
-        
-        # Generation footer
-        footer_row += 2
-        ws.merge_cells(f'A{footer_row}:Q{footer_row}')
-        footer_cell = ws.cell(row=footer_row, column=1)
-        footer_cell.value = "This is a computer-generated report. No signature is required."
-        footer_cell.font = Font(name='Calibri', size=9, italic=True)
-        footer_cell.alignment = center_alignment
-        
-        footer_row += 1
-        ws.merge_cells(f'A{footer_row}:Q{footer_row}')
-        copyright_cell = ws.cell(row=footer_row, column=1)
-        copyright_cell.value = f"© {timezone.now().year} School Management System. All rights reserved."
-        copyright_cell.font = Font(name='Calibri', size=8, italic=True)
-        copyright_cell.alignment = center_alignment
+            # Alternate row colors, centred S/N and gender, coloured status
+            alt = '_alt' if row_num % 2 == 0 else ''
+            styles = {1: f'student_cell_center{alt}', 4: f'student_cell_center{alt}'}
+            if student.status in STUDENT_STATUS_COLORS:
+                styles[15] = f'student_status_{student.status}'
+            ws.append(row_data, style=f'student_cell{alt}', styles=styles)
         
-        # ============================================
-        # AUTO-ADJUST COLUMN WIDTHS
-        # ============================================
-        for col_num in range(1, len(headers) + 1):
-            column_letter = get_column_letter(col_num)
-            max_length = 0
-            
-            # Check header length
-            if len(headers[col_num-1]) > max_length:
-                max_length = len(headers[col_num-1])
-            
-            # Check data length in this column (from header row to footer)
-            for row_num in range(header_row, current_row):
-                cell_value = ws.cell(row=row_num, column=col_num).value
-                if cell_value and len(str(cell_value)) > max_length:
-                    max_length = len(str(cell_value))
-            
-            # Check footer text
-            if col_num == 1:
-                footer_text = f"TOTAL STUDENTS: {len(students)}"
-                if len(footer_text) > max_length:
-                    max_length = len(footer_text)
-            
-            # Set column width (with some padding)
-            adjusted_width = min(max_length + 5, 60)  # Max width 60
-            ws.column_dimensions[column_letter].width = adjusted_width
-        
-        # Set row heights
-        ws.row_dimensions[1].height = 30
-        ws.row_dimensions[2].height = 25
-        ws.row_dimensions[3].height = 20
-        ws.row_dimensions[4].height = 25
-        ws.row_dimensions[5].height = 20
-        ws.row_dimensions[6].height = 25
-        ws.row_dimensions[7].height = 20
-        ws.row_dimensions[8].height = 20
-        ws.row_dimensions[9].height = 20
-        ws.row_dimensions[header_row].height = 30
-        
-        # Freeze panes to keep headers visible
-        ws.freeze_panes = f'A{header_row + 1}'
-        
-        # Add filter to headers
-        ws.auto_filter.ref = f'A{header_row}:Q{current_row - 1}'
-        
-        # ============================================
-        # CREATE RESPONSE
-        # ============================================
-        response = HttpResponse(
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
+        student_export_footer(ws, total_students, len(headers))
         
         # Generate filename with filters
         filename = 'students_report'
-        if class_level_id:
-            class_name = ClassLevel.objects.get(id=class_level_id).name
-            filename += f'_{class_name}'
+        if class_level:
+            filename += f'_{class_level.name}'
         if status_filter:
             filename += f'_{status_filter}'
         filename += f'_{timezone.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
         
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        
-        # Save workbook to response
-        wb.save(response)
-        
-        return response
+        return export.response(filename)
         
     except ClassLevel.DoesNotExist:
         return JsonResponse({
@@ -4310,19 +4224,6 @@ def export_students_pdf(request):
         # Render HTML template
         html_string = render_to_string('admin/students/students_pdf.html', context)
         
-        # Create PDF
-        font_config = FontConfiguration()
-        html = HTML(string=html_string, base_url=request.build_absolute_uri())
-        
-        # Generate PDF
-        pdf_file = html.write_pdf(
-            font_config=font_config,
-            presentational_hints=True  # Better CSS support
-        )
-        
-        # Create response
-        response = HttpResponse(pdf_file, content_type='application/pdf')
-        
         # Generate filename with filters
         filename = 'students_list'
         if class_level_id:
@@ -4332,10 +4233,12 @@ def export_students_pdf(request):
             filename += f'_{status_filter}'
         filename += f'_{timezone.now().strftime("%Y%m%d_%H%M%S")}.pdf'
         
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        response['Content-Length'] = len(pdf_file)
-        
-        return response
+        # Rendered to PDF by the report worker
+        return pdf_job_response(
+            request, html_string, filename, report_type='students_list',
+            base_url=request.build_absolute_uri(),
+            presentational_hints=True  # Better CSS support
+        )
         
     except Exception as e:
         return JsonResponse({
@@ -5125,6 +5028,7 @@ def export_students_status_excel(request):
     """
     Export filtered students to Excel based on status filters
     Includes school header and filtering details section
+    Rows are streamed from the database into a write-only workbook
     """
     try:
         # Get filter parameters
@@ -5182,184 +5086,28 @@ def export_students_status_excel(request):
         male_count = students.filter(gender='male').count()
         female_count = students.filter(gender='female').count()
         
-        # Create a new workbook
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Student Status Report"
-        
-        # Define styles
-        title_font = Font(name='Calibri', size=16, bold=True, color='1F4E79')
-        school_font = Font(name='Calibri', size=14, bold=True, color='2E75B5')
-        header_font = Font(name='Calibri', size=12, bold=True, color='FFFFFF')
-        
-        header_fill = PatternFill(start_color='4F81BD', end_color='4F81BD', fill_type='solid')
-        filter_fill = PatternFill(start_color='F2F2F2', end_color='F2F2F2', fill_type='solid')
-        stats_fill = PatternFill(start_color='DEEAF6', end_color='DEEAF6', fill_type='solid')
-        
-        center_alignment = Alignment(horizontal='center', vertical='center')
-        left_alignment = Alignment(horizontal='left', vertical='center')
-        
-        header_border = Border(
-            left=Side(style='medium', color='4F81BD'),
-            right=Side(style='medium', color='4F81BD'),
-            top=Side(style='medium', color='4F81BD'),
-            bottom=Side(style='medium', color='4F81BD')
-        )
-        
-        cell_border = Border(
-            left=Side(style='thin', color='B8CCE4'),
-            right=Side(style='thin', color='B8CCE4'),
-            top=Side(style='thin', color='B8CCE4'),
-            bottom=Side(style='thin', color='B8CCE4')
-        )
-        
-        # ============================================
-        # SCHOOL HEADER SECTION (Rows 1-7)
-        # ============================================
-        
-        # Merge cells for header sections (assuming up to column M - 13 columns)
-        for row in range(1, 8):
-            ws.merge_cells(start_row=row, start_column=1, end_row=row, end_column=13)
-        
-        # Row 1: School Name
-        school_cell = ws.cell(row=1, column=1)
-        school_cell.value = "SCHOOL MANAGEMENT SYSTEM"
-        school_cell.font = title_font
-        school_cell.alignment = center_alignment
-        school_cell.border = header_border
-        
-        # Row 2: School Details
-        school_details = ws.cell(row=2, column=1)
-        school_details.value = "Excellence in Education | Quality Learning for All"
-        school_details.font = school_font
-        school_details.alignment = center_alignment
-        school_details.border = header_border
-        
-        # Row 3: Address
-        address_cell = ws.cell(row=3, column=1)
-        address_cell.value = "P.O. Box 12345, Dar es Salaam, Tanzania | Tel: +255 123 456 789 | Email: info@school.ac.tz"
-        address_cell.font = Font(name='Calibri', size=11, italic=True)
-        address_cell.alignment = center_alignment
-        address_cell.border = header_border
-        
-        # Row 4: Report Title
-        title_cell = ws.cell(row=4, column=1)
-        title_cell.value = "STUDENT STATUS REPORT"
-        title_cell.font = Font(name='Calibri', size=14, bold=True, color='C00000')
-        title_cell.alignment = center_alignment
-        title_cell.border = header_border
-        
-        # ============================================
-        # FILTER INFORMATION SECTION
-        # ============================================
-        
-        # Row 5: Filter Section Title
-        filter_title = ws.cell(row=5, column=1)
-        filter_title.value = "FILTER INFORMATION"
-        filter_title.font = Font(name='Calibri', size=12, bold=True, color='44546A')
-        filter_title.alignment = center_alignment
-        filter_title.fill = PatternFill(start_color='F2F2F2', end_color='F2F2F2', fill_type='solid')
-        filter_title.border = header_border
-        
-        # Row 6: Applied Filters
-        filter_text = []
-        if filter_details:
-            for key, value in filter_details.items():
-                filter_text.append(f"{key}: {value}")
-        else:
-            filter_text.append("No filters applied - Showing all students")
-        
-        filter_cell = ws.cell(row=6, column=1)
-        filter_cell.value = " | ".join(filter_text)
-        filter_cell.font = Font(name='Calibri', size=11, italic=True)
-        filter_cell.alignment = center_alignment
-        filter_cell.fill = PatternFill(start_color='FCE4D6', end_color='FCE4D6', fill_type='solid')
-        filter_cell.border = header_border
-        
-        # Row 7: Generation Information
-        gen_info = f"Generated on: {timezone.now().strftime('%d-%m-%Y %H:%M:%S')} | Generated by: {request.user.get_full_name() or request.user.username}"
-        gen_cell = ws.cell(row=7, column=1)
-        gen_cell.value = gen_info
-        gen_cell.font = Font(name='Calibri', size=10, bold=True)
-        gen_cell.alignment = center_alignment
-        gen_cell.border = header_border
-        
-        # ============================================
-        # STATISTICS SECTION
-        # ============================================
+        export = StreamingExcelExport()
+        student_export_styles(export)
         
-        # Row 8: Statistics Title
-        stats_title_row = 8
-        ws.merge_cells(start_row=stats_title_row, start_column=1, end_row=stats_title_row, end_column=13)
-        stats_title = ws.cell(row=stats_title_row, column=1)
-        stats_title.value = "STATISTICS SUMMARY"
-        stats_title.font = Font(name='Calibri', size=12, bold=True, color='1F4E79')
-        stats_title.alignment = center_alignment
-        stats_title.fill = PatternFill(start_color='DEEAF6', end_color='DEEAF6', fill_type='solid')
-        
-        # Row 9: Statistics Values
-        stats_row = 9
-        
-        # Total Students
-        ws.cell(row=stats_row, column=1, value="Total Students:").font = Font(bold=True)
-        ws.cell(row=stats_row, column=2, value=total_students)
-        
-        # Active Students
-        ws.cell(row=stats_row, column=4, value="Active:").font = Font(bold=True)
-        ws.cell(row=stats_row, column=5, value=active_count)
-        
-        # Male Students
-        ws.cell(row=stats_row, column=7, value="Male:").font = Font(bold=True)
-        ws.cell(row=stats_row, column=8, value=male_count)
-        
-        # Female Students
-        ws.cell(row=stats_row, column=10, value="Female:").font = Font(bold=True)
-        ws.cell(row=stats_row, column=11, value=female_count)
-        
-        # Apply borders to statistics row
-        for col in range(1, 13):
-            cell = ws.cell(row=stats_row, column=col)
-            cell.border = cell_border
-            if col in [1, 4, 7, 10]:
-                cell.fill = PatternFill(start_color='F2F2F2', end_color='F2F2F2', fill_type='solid')
-        
-        # ============================================
-        # EMPTY ROW BEFORE TABLE
-        # ============================================
-        empty_row = 10
-        ws.row_dimensions[empty_row].height = 10
-        
-        # ============================================
-        # TABLE HEADERS (Start from row 11)
-        # ============================================
-        header_row = 11
-        
-        # Define headers (expanded for better detail)
         headers = [
             'S/N', 'Registration No.', 'Full Name', 'Gender', 'Age',
             'Class', 'Stream', 'Status', 'Active', 'Parents Count',
             'Admission Year', 'Date of Birth', 'Examination No.'
         ]
         
-        # Write headers
-        for col_num, header in enumerate(headers, 1):
-            cell = ws.cell(row=header_row, column=col_num)
-            cell.value = header
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = center_alignment
-            cell.border = cell_border
+        ws = student_export_sheet(
+            export, "Student Status Report", "STUDENT STATUS REPORT", filter_details,
+            [("Total Students:", total_students), ("Active:", active_count),
+             ("Male:", male_count), ("Female:", female_count)],
+            headers,
+            [22, 20, 32, 10, 8, 14, 12, 14, 10, 16, 16, 15, 20],
+            request.user
+        )
         
         # ============================================
         # DATA ROWS
         # ============================================
-        current_row = header_row + 1
-        
-        for row_num, student in enumerate(students, 1):
-            # Get primary parent for additional info
-            primary_parent = student.parents.first()
-            
-            # Row data
+        for row_num, student in enumerate(students.iterator(chunk_size=EXPORT_CHUNK_SIZE), 1):
             row_data = [
                 row_num,  # S/N
                 student.registration_number or 'N/A',
@@ -5376,121 +5124,17 @@ def export_students_status_excel(request):
                 student.examination_number or 'N/A',
             ]
             
-            # Write cells with alternating row colors
-            for col_num, value in enumerate(row_data, 1):
-                cell = ws.cell(row=current_row, column=col_num)
-                cell.value = value
-                cell.font = Font(name='Calibri', size=10)
-                cell.alignment = left_alignment if col_num not in [1, 9] else center_alignment
-                cell.border = cell_border
-                
-                # Alternate row colors for better readability
-                if row_num % 2 == 0:
-                    cell.fill = PatternFill(start_color='F9F9F9', end_color='F9F9F9', fill_type='solid')
-            
-            # Color code status cells (Status column is column 8)
-            status_cell = ws.cell(row=current_row, column=8)
-            if student.status == 'active':
-                status_cell.fill = PatternFill(start_color='C6EFCE', end_color='C6EFCE', fill_type='solid')
-            elif student.status == 'completed':
-                status_cell.fill = PatternFill(start_color='BDD7EE', end_color='BDD7EE', fill_type='solid')
-            elif student.status == 'suspended':
-                status_cell.fill = PatternFill(start_color='FFEB9C', end_color='FFEB9C', fill_type='solid')
-            elif student.status == 'withdrawn':
-                status_cell.fill = PatternFill(start_color='FFC7CE', end_color='FFC7CE', fill_type='solid')
-            elif student.status == 'transferred':
-                status_cell.fill = PatternFill(start_color='E0E7FF', end_color='E0E7FF', fill_type='solid')
-            
-            # Color code active status (Active column is column 9)
-            active_cell = ws.cell(row=current_row, column=9)
-            if student.is_active:
-                active_cell.fill = PatternFill(start_color='C6EFCE', end_color='C6EFCE', fill_type='solid')
-            else:
-                active_cell.fill = PatternFill(start_color='F2F2F2', end_color='F2F2F2', fill_type='solid')
-            
-            current_row += 1
-        
-        # ============================================
-        # FOOTER SECTION
-        # ============================================
-        footer_row = current_row + 1
-        
-        # Total row
-        ws.merge_cells(start_row=footer_row, start_column=1, end_row=footer_row, end_column=4)
-        total_cell = ws.cell(row=footer_row, column=1)
-        total_cell.value = f"TOTAL STUDENTS: {len(students)}"
-        total_cell.font = Font(name='Calibri', size=12, bold=True)
-        total_cell.fill = PatternFill(start_color='DEEAF6', end_color='DEEAF6', fill_type='solid')
-        total_cell.border = cell_border
-        total_cell.alignment = left_alignment
-        
-        # Generation footer
-        footer_row += 2
-        ws.merge_cells(start_row=footer_row, start_column=1, end_row=footer_row, end_column=13)
-        footer_cell = ws.cell(row=footer_row, column=1)
-        footer_cell.value = "This is a computer-generated report. No signature is required."
-        footer_cell.font = Font(name='Calibri', size=9, italic=True)
-        footer_cell.alignment = center_alignment
-        
-        footer_row += 1
-        ws.merge_cells(start_row=footer_row, start_column=1, end_row=footer_row, end_column=13)
-        copyright_cell = ws.cell(row=footer_row, column=1)
-        copyright_cell.value = f"© {timezone.now().year} School Management System. All rights reserved."
-        copyright_cell.font = Font(name='Calibri', size=8, italic=True)
-        copyright_cell.alignment = center_alignment
-        
-        # ============================================
-        # AUTO-ADJUST COLUMN WIDTHS
-        # ============================================
-        for col_num in range(1, len(headers) + 1):
-            column_letter = get_column_letter(col_num)
-            max_length = 0
-            
-            # Check header length
-            if len(headers[col_num-1]) > max_length:
-                max_length = len(headers[col_num-1])
-            
-            # Check data length in this column (from header row to footer)
-            for row_num in range(header_row, current_row):
-                cell_value = ws.cell(row=row_num, column=col_num).value
-                if cell_value and len(str(cell_value)) > max_length:
-                    max_length = len(str(cell_value))
-            
-            # Check statistics and filter text
-            if col_num == 1:
-                for check_row in [6, 7, 9]:
-                    cell_value = ws.cell(row=check_row, column=col_num).value
-                    if cell_value and len(str(cell_value)) > max_length:
-                        max_length = len(str(cell_value))
-            
-            # Set column width (with some padding)
-            adjusted_width = min(max_length + 5, 60)  # Max width 60
-            ws.column_dimensions[column_letter].width = adjusted_width
-        
-        # Set row heights
-        ws.row_dimensions[1].height = 30
-        ws.row_dimensions[2].height = 25
-        ws.row_dimensions[3].height = 20
-        ws.row_dimensions[4].height = 25
-        ws.row_dimensions[5].height = 20
-        ws.row_dimensions[6].height = 25
-        ws.row_dimensions[7].height = 20
-        ws.row_dimensions[8].height = 20
-        ws.row_dimensions[9].height = 20
-        ws.row_dimensions[header_row].height = 30
-        
-        # Freeze panes to keep headers visible
-        ws.freeze_panes = f'A{header_row + 1}'
-        
-        # Add filter to headers
-        ws.auto_filter.ref = f'A{header_row}:{get_column_letter(len(headers))}{current_row - 1}'
+            # Alternate row colors, coloured status (column 8) and active flag (column 9)
+            alt = '_alt' if row_num % 2 == 0 else ''
+            styles = {
+                1: f'student_cell_center{alt}',
+                9: 'student_active_yes' if student.is_active else 'student_active_no',
+            }
+            if student.status in STUDENT_STATUS_COLORS:
+                styles[8] = f'student_status_{student.status}'
+            ws.append(row_data, style=f'student_cell{alt}', styles=styles)
         
-        # ============================================
-        # CREATE RESPONSE
-        # ============================================
-        response = HttpResponse(
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
+        student_export_footer(ws, total_students, len(headers))
         
         # Generate filename with filters
         filename = 'student_status_report'
@@ -5502,12 +5146,7 @@ def export_students_status_excel(request):
             filename += f'_{class_filter.replace(" ", "_")}'
         filename += f'_{timezone.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
         
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        
-        # Save workbook to response
-        wb.save(response)
-        
-        return response
+        return export.response(filename)
         
     except Exception as e:
         return JsonResponse({
@@ -5592,17 +5231,12 @@ def export_students_status_pdf(request):
         # Render HTML template
         html_string = render_to_string('admin/students/student_status_pdf.html', context)
         
-        # Create PDF
-        font_config = FontConfiguration()
-        html = HTML(string=html_string, base_url=request.build_absolute_uri())
-        pdf_file = html.write_pdf(font_config=font_config)
-        
-        # Create response
-        response = HttpResponse(pdf_file, content_type='application/pdf')
+        # Rendered to PDF by the report worker
         filename = f'student_status_report_{timezone.now().strftime("%Y%m%d_%H%M%S")}.pdf'
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        
-        return response
+        return pdf_job_response(
+            request, html_string, filename, report_type='student_status',
+            base_url=request.build_absolute_uri()
+        )
         
     except Exception as e:
         return JsonResponse({
@@ -10573,19 +10207,12 @@ def combination_pdf_report(request, combination_id):
         # Render HTML template
         html_string = render_to_string('admin/academic/combination_pdf_report.html', context)
         
-        # Create PDF
-        font_config = FontConfiguration()
-        html = HTML(string=html_string, base_url=request.build_absolute_uri())
-        
-        # Generate PDF
-        pdf_file = html.write_pdf(font_config=font_config)
-        
-        # Create response
-        response = HttpResponse(pdf_file, content_type='application/pdf')
+        # Rendered to PDF by the report worker
         filename = f'combination_{combination.code}_report_{timezone.now().strftime("%Y%m%d_%H%M%S")}.pdf'
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        
-        return response
+        return pdf_job_response(
+            request, html_string, filename, report_type='combination_students',
+            base_url=request.build_absolute_uri()
+        )
         
     except Exception as e:
         messages.error(request, f'Error generating PDF report: {str(e)}')
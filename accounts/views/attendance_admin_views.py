@@ -1,8 +1,11 @@
 # attendance/views.py
 import json
 import csv
+import calendar
 from datetime import datetime, timedelta
+from django.db import transaction
 from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
 from django.http import JsonResponse, HttpResponse
 from django.views.generic import TemplateView, ListView, CreateView, UpdateView, DeleteView, View
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
@@ -12,13 +15,22 @@ from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.core.paginator import Paginator
 import pandas as pd
-from openpyxl import Workbook
+from openpyxl.styles import Alignment, Font
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
 from reportlab.lib.styles import getSampleStyleSheet
-from students.models import AttendanceSession, Student,StreamClass, StudentAttendance
+from students.models import AttendanceDailyRollup, AttendanceSession, Student,StreamClass, StudentAttendance
+from students.attendance_marks import new_summary, write_session_attendance
+from students.attendance_matrix import CHRONIC_ABSENCE_PERCENT, load_attendance_matrix
+from students.attendance_rollup import (
+    next_month, refresh_attendance, session_footprint, student_attendance_counts,
+    student_attendance_months, student_attendance_summary
+)
 from core.models import ClassLevel, Subject
+from core.data_export import streaming_export_response
+from core.excel_export import StreamingExcelExport, solid_fill
+from core.reports import pdf_job_response
 from accounts.models import Staffs
 from django.contrib import messages
 from django.utils import timezone
@@ -32,8 +44,6 @@ from reportlab.pdfgen import canvas
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from django.shortcuts import redirect
 from django.template.loader import render_to_string
-from weasyprint import HTML
-from weasyprint.text.fonts import FontConfiguration
 from django.conf import settings
 from django.urls import reverse
 
@@ -47,6 +57,64 @@ class AdminRequiredMixin(LoginRequiredMixin, UserPassesTestMixin):
 
 
 
+def report_month(month, year):
+    """
+    Month and year of a monthly report as integers (the current month when
+    they do not parse), with the first and last day of that month.
+    """
+    try:
+        month = int(month)
+        year = int(year)
+    except (ValueError, TypeError):
+        month = timezone.now().month
+        year = timezone.now().year
+    
+    start_date = datetime(year, month, 1).date()
+    if month == 12:
+        end_date = datetime(year + 1, 1, 1).date() - timedelta(days=1)
+    else:
+        end_date = datetime(year, month + 1, 1).date() - timedelta(days=1)
+    return month, year, start_date, end_date
+
+
+def filter_attendance_sessions(attendance_sessions, params):
+    """
+    Apply the report filters in ``params`` (class_level, stream,
+    attendance_type) to attendance sessions or daily rollup rows
+    """
+    class_filter = params.get('class_level', '')
+    stream_filter = params.get('stream', '')
+    attendance_type = params.get('attendance_type', 'ALL')
+    
+    if class_filter:
+        attendance_sessions = attendance_sessions.filter(class_level_id=class_filter)
+    if stream_filter:
+        attendance_sessions = attendance_sessions.filter(stream_id=stream_filter)
+    if attendance_type and attendance_type != 'ALL':
+        attendance_sessions = attendance_sessions.filter(attendance_type=attendance_type)
+    return attendance_sessions
+
+
+def report_rollup(start_date, end_date):
+    """Daily attendance rollup rows between two dates, in report order"""
+    return AttendanceDailyRollup.objects.filter(
+        date__gte=start_date,
+        date__lte=end_date
+    ).select_related(
+        'class_level', 'stream', 'subject'
+    ).order_by('date', 'class_level__name', 'stream__stream_letter', 'subject__name')
+
+
+def add_rollup_counts(counts, row):
+    """Add a rollup row to a report bucket (its 'students' count is the number of marks)"""
+    counts['sessions'] += row.sessions
+    counts['students'] += row.total
+    counts['present'] += row.present
+    counts['absent'] += row.absent
+    counts['late'] += row.late
+    counts['excused'] += row.excused
+
+
 class AttendanceSessionListView(AdminRequiredMixin, ListView):
     model = AttendanceSession
     template_name = 'admin/attendance/session_list.html'
@@ -237,6 +305,8 @@ class CreateAttendanceSessionAPI(AdminRequiredMixin, View):
                 if student_attendance_objects:
                     StudentAttendance.objects.bulk_create(student_attendance_objects)
                 
+                refresh_attendance(session_footprint(attendance_session))
+                
                 return JsonResponse({
                     'success': True,
                     'message': 'Attendance session created successfully',
@@ -253,37 +323,37 @@ class CreateAttendanceSessionAPI(AdminRequiredMixin, View):
                 
                 attendance_session = get_object_or_404(AttendanceSession, id=session_id)
                 
-                # Update attendance session (removed teacher field)
-                for field in ['date', 'attendance_type', 'period']:
-                    if field in data:
-                        setattr(attendance_session, field, data[field])
-                
-                if 'class_level' in data:
-                    attendance_session.class_level_id = data['class_level']
-                if 'stream' in data:
-                    attendance_session.stream_id = data['stream']
-                if 'subject' in data:
-                    attendance_session.subject_id = data['subject']
-                # Removed teacher field
-                
-                attendance_session.save()
-                
-                # Update student attendance if provided
-                if 'student_attendance' in data:
-                    student_attendance_data = data['student_attendance']
-                    for student_id, attendance_data in student_attendance_data.items():
-                        StudentAttendance.objects.update_or_create(
-                            attendance_session=attendance_session,
-                            student_id=student_id,
-                            defaults={
-                                'status': attendance_data.get('status', 'A'),
-                                'remark': attendance_data.get('remark', '')
-                            }
+                with transaction.atomic():
+                    before = session_footprint(attendance_session)
+                    
+                    # Update attendance session (removed teacher field)
+                    for field in ['date', 'attendance_type', 'period']:
+                        if field in data:
+                            setattr(attendance_session, field, data[field])
+                    
+                    if 'class_level' in data:
+                        attendance_session.class_level_id = data['class_level']
+                    if 'stream' in data:
+                        attendance_session.stream_id = data['stream']
+                    if 'subject' in data:
+                        attendance_session.subject_id = data['subject']
+                    # Removed teacher field
+                    
+                    attendance_session.save()
+                    
+                    # Update student attendance if provided
+                    summary = new_summary()
+                    if 'student_attendance' in data:
+                        summary = write_session_attendance(
+                            attendance_session, data['student_attendance']
                         )
+                    
+                    refresh_attendance(before, session_footprint(attendance_session))
                 
                 return JsonResponse({
                     'success': True,
-                    'message': 'Attendance session updated successfully'
+                    'message': 'Attendance session updated successfully',
+                    'summary': summary
                 })
             
             else:
@@ -444,7 +514,9 @@ class DeleteAttendanceSessionAPI(AdminRequiredMixin, View):
     def post(self, request, session_id):
         try:
             attendance_session = get_object_or_404(AttendanceSession, id=session_id)
+            footprint = session_footprint(attendance_session)
             attendance_session.delete()
+            refresh_attendance(footprint)
             
             return JsonResponse({
                 'success': True,
@@ -1035,16 +1107,6 @@ class ExportDailyAttendancePDFView(AdminRequiredMixin, View):
             # Render the HTML template
             html_string = render_to_string('admin/attendance/reports/daily_report_pdf.html', context)
             
-            # Configure fonts for PDF generation
-            font_config = FontConfiguration()
-            
-            # Generate PDF
-            html = HTML(string=html_string)
-            pdf_file = html.write_pdf(font_config=font_config)
-            
-            # Create HTTP response
-            response = HttpResponse(pdf_file, content_type='application/pdf')
-            
             # Generate filename
             filename = f"daily_attendance_{report_date}"
             if context['filter_class_name']:
@@ -1055,9 +1117,8 @@ class ExportDailyAttendancePDFView(AdminRequiredMixin, View):
                 filename += f"_{view_mode}_view"
             filename += ".pdf"
             
-            response['Content-Disposition'] = f'attachment; filename="{filename}"'
-            
-            return response
+            # Rendered to PDF by the report worker
+            return pdf_job_response(request, html_string, filename, report_type='daily_attendance')
             
         except Exception as e:
             import traceback
@@ -1086,36 +1147,23 @@ class MonthlyAttendanceReportView(AdminRequiredMixin, TemplateView):
         attendance_type = self.request.GET.get('attendance_type', 'ALL')
         view_mode = self.request.GET.get('view', 'summary')  # summary, detailed, both
         
-        # Convert month and year to integers
-        try:
-            month = int(month)
-            year = int(year)
-        except (ValueError, TypeError):
-            month = timezone.now().month
-            year = timezone.now().year
+        # Month and its date range
+        month, year, start_date, end_date = report_month(month, year)
         
-        # Calculate date range for the month
-        start_date = datetime(year, month, 1).date()
-        if month == 12:
-            end_date = datetime(year + 1, 1, 1).date() - timedelta(days=1)
-        else:
-            end_date = datetime(year, month + 1, 1).date() - timedelta(days=1)
-        
-        # Get attendance sessions for the month
-        attendance_sessions = AttendanceSession.objects.filter(
-            date__gte=start_date,
-            date__lte=end_date
-        ).select_related(
-            'class_level', 'stream', 'subject'
-        ).order_by('date', 'class_level__name', 'stream__stream_letter')
+        # Attendance sessions for the month (per-student detail)
+        attendance_sessions = filter_attendance_sessions(
+            AttendanceSession.objects.filter(
+                date__gte=start_date,
+                date__lte=end_date
+            ),
+            self.request.GET
+        )
         
-        # Apply additional filters
-        if class_filter:
-            attendance_sessions = attendance_sessions.filter(class_level_id=class_filter)
-        if stream_filter:
-            attendance_sessions = attendance_sessions.filter(stream_id=stream_filter)
-        if attendance_type and attendance_type != 'ALL':
-            attendance_sessions = attendance_sessions.filter(attendance_type=attendance_type)
+        # Daily counts per class, stream, type and subject
+        rollup_rows = filter_attendance_sessions(
+            report_rollup(start_date, end_date),
+            self.request.GET
+        )
         
         # Prepare data structures
         daily_data = {}
@@ -1133,16 +1181,16 @@ class MonthlyAttendanceReportView(AdminRequiredMixin, TemplateView):
             'attendance_rate': 0
         }
         
-        # Process each attendance session
-        for session in attendance_sessions:
-            date_str = session.date.strftime('%Y-%m-%d')
-            class_key = f"{session.class_level.name}_{session.stream.stream_letter if session.stream else 'ALL'}"
+        # Process each rollup row
+        for row in rollup_rows:
+            date_str = row.date.strftime('%Y-%m-%d')
+            class_key = f"{row.class_level.name}_{row.stream.stream_letter if row.stream else 'ALL'}"
             
             # Initialize daily data if not exists
             if date_str not in daily_data:
                 daily_data[date_str] = {
-                    'date': session.date,
-                    'day_name': session.date.strftime('%A'),
+                    'date': row.date,
+                    'day_name': row.date.strftime('%A'),
                     'sessions': 0,
                     'students': 0,
                     'present': 0,
@@ -1156,8 +1204,8 @@ class MonthlyAttendanceReportView(AdminRequiredMixin, TemplateView):
             # Initialize class data if not exists
             if class_key not in class_data:
                 class_data[class_key] = {
-                    'class_level': session.class_level,
-                    'stream': session.stream,
+                    'class_level': row.class_level,
+                    'stream': row.stream,
                     'days': set(),
                     'sessions': 0,
                     'students': 0,
@@ -1168,77 +1216,21 @@ class MonthlyAttendanceReportView(AdminRequiredMixin, TemplateView):
                     'attendance_rate': 0
                 }
             
-            # Get attendance records for this session
-            student_attendances = StudentAttendance.objects.filter(
-                attendance_session=session
-            )
-            
-            # Calculate session statistics
-            session_stats = student_attendances.aggregate(
-                total=Count('id'),
-                present=Count('id', filter=Q(status='P')),
-                absent=Count('id', filter=Q(status='A')),
-                late=Count('id', filter=Q(status='L')),
-                excused=Count('id', filter=Q(status='E'))
-            )
-            
-            # Ensure all values are integers
-            for key in ['total', 'present', 'absent', 'late', 'excused']:
-                session_stats[key] = session_stats[key] or 0
-            
-            # Update daily statistics
-            daily_data[date_str]['sessions'] += 1
-            daily_data[date_str]['students'] += session_stats['total']
-            daily_data[date_str]['present'] += session_stats['present']
-            daily_data[date_str]['absent'] += session_stats['absent']
-            daily_data[date_str]['late'] += session_stats['late']
-            daily_data[date_str]['excused'] += session_stats['excused']
-            
-            # Update class statistics
-            class_data[class_key]['days'].add(session.date)
-            class_data[class_key]['sessions'] += 1
-            class_data[class_key]['students'] += session_stats['total']
-            class_data[class_key]['present'] += session_stats['present']
-            class_data[class_key]['absent'] += session_stats['absent']
-            class_data[class_key]['late'] += session_stats['late']
-            class_data[class_key]['excused'] += session_stats['excused']
-            
-            # Update total statistics
-            total_stats['sessions'] += 1
-            total_stats['students'] += session_stats['total']
-            total_stats['present'] += session_stats['present']
-            total_stats['absent'] += session_stats['absent']
-            total_stats['late'] += session_stats['late']
-            total_stats['excused'] += session_stats['excused']
-            
-            # Track individual student attendance for detailed view
-            if view_mode in ['detailed', 'both']:
-                for attendance in student_attendances.select_related('student'):
-                    student_id = attendance.student_id
-                    if student_id not in student_data:
-                        student_data[student_id] = {
-                            'student': attendance.student,
-                            'days': set(),
-                            'sessions': 0,
-                            'present': 0,
-                            'absent': 0,
-                            'late': 0,
-                            'excused': 0,
-                            'attendance_rate': 0
-                        }
-                    
-                    student = student_data[student_id]
-                    student['days'].add(session.date)
-                    student['sessions'] += 1
-                    
-                    if attendance.status == 'P':
-                        student['present'] += 1
-                    elif attendance.status == 'A':
-                        student['absent'] += 1
-                    elif attendance.status == 'L':
-                        student['late'] += 1
-                    elif attendance.status == 'E':
-                        student['excused'] += 1
+            add_rollup_counts(daily_data[date_str], row)
+            class_data[class_key]['days'].add(row.date)
+            add_rollup_counts(class_data[class_key], row)
+            add_rollup_counts(total_stats, row)
+        
+        # Individual student attendance for the detailed view
+        if view_mode in ['detailed', 'both']:
+            student_counts = student_attendance_counts(attendance_sessions)
+            students = Student.objects.select_related('class_level').in_bulk(list(student_counts))
+            for student_id, counts in student_counts.items():
+                student_data[student_id] = {
+                    'student': students[student_id],
+                    'attendance_rate': 0,
+                    **counts
+                }
         
         # Calculate attendance rates
         total_stats['days'] = len(daily_data)
@@ -1264,7 +1256,6 @@ class MonthlyAttendanceReportView(AdminRequiredMixin, TemplateView):
         
         # Calculate student attendance rates
         for student_id, sdata in student_data.items():
-            sdata['days'] = len(sdata['days'])
             if sdata['sessions'] > 0:
                 sdata['attendance_rate'] = round(
                     (sdata['present'] / sdata['sessions']) * 100, 2
@@ -1330,7 +1321,7 @@ class MonthlyAttendanceReportView(AdminRequiredMixin, TemplateView):
                 ('detailed', 'Detailed View'),
                 ('both', 'Both Views')
             ],
-            'has_data': len(attendance_sessions) > 0,
+            'has_data': len(rollup_rows) > 0,
             'total_days_in_month': (end_date - start_date).days + 1,
             'days_with_data': len(daily_data),
         })
@@ -1416,36 +1407,19 @@ class ExportMonthlyAttendancePDFView(AdminRequiredMixin, View):
             attendance_type = request.GET.get('attendance_type', 'ALL')
             view_mode = request.GET.get('view', 'summary')
             
-            # Convert month and year to integers
-            try:
-                month = int(month)
-                year = int(year)
-            except (ValueError, TypeError):
-                month = timezone.now().month
-                year = timezone.now().year
-            
-            # Calculate date range for the month
-            start_date = datetime(year, month, 1).date()
-            if month == 12:
-                end_date = datetime(year + 1, 1, 1).date() - timedelta(days=1)
-            else:
-                end_date = datetime(year, month + 1, 1).date() - timedelta(days=1)
+            # Month and its date range
+            month, year, start_date, end_date = report_month(month, year)
             
             # Get attendance sessions for the month
-            attendance_sessions = AttendanceSession.objects.filter(
-                date__gte=start_date,
-                date__lte=end_date
-            ).select_related(
-                'class_level', 'stream', 'subject'
-            ).order_by('date', 'class_level__name', 'stream__stream_letter')
-            
-            # Apply additional filters
-            if class_filter:
-                attendance_sessions = attendance_sessions.filter(class_level_id=class_filter)
-            if stream_filter:
-                attendance_sessions = attendance_sessions.filter(stream_id=stream_filter)
-            if attendance_type and attendance_type != 'ALL':
-                attendance_sessions = attendance_sessions.filter(attendance_type=attendance_type)
+            attendance_sessions = filter_attendance_sessions(
+                AttendanceSession.objects.filter(
+                    date__gte=start_date,
+                    date__lte=end_date
+                ).select_related(
+                    'class_level', 'stream', 'subject'
+                ).order_by('date', 'class_level__name', 'stream__stream_letter'),
+                request.GET
+            )
             
             # Check if data exists
             if not attendance_sessions.exists():
@@ -1682,16 +1656,6 @@ class ExportMonthlyAttendancePDFView(AdminRequiredMixin, View):
             # Render the HTML template
             html_string = render_to_string('admin/attendance/reports/monthly_report_pdf.html', context)
             
-            # Configure fonts for PDF generation
-            font_config = FontConfiguration()
-            
-            # Generate PDF
-            html = HTML(string=html_string)
-            pdf_file = html.write_pdf(font_config=font_config)
-            
-            # Create HTTP response
-            response = HttpResponse(pdf_file, content_type='application/pdf')
-            
             # Generate filename
             filename = f"monthly_attendance_{start_date.strftime('%B_%Y')}"
             if context['filter_class_name']:
@@ -1702,9 +1666,8 @@ class ExportMonthlyAttendancePDFView(AdminRequiredMixin, View):
                 filename += f"_{view_mode}_view"
             filename += ".pdf"
             
-            response['Content-Disposition'] = f'attachment; filename="{filename}"'
-            
-            return response
+            # Rendered to PDF by the report worker
+            return pdf_job_response(request, html_string, filename, report_type='monthly_attendance')
             
         except Exception as e:
             import traceback
@@ -1746,6 +1709,56 @@ class ExportMonthlyAttendancePDFView(AdminRequiredMixin, View):
 
 # attendance/views.py - Add these views at the appropriate location
 
+class ExportAttendanceDataView(AdminRequiredMixin, View):
+    """
+    Stream student attendance records as CSV or NDJSON (?format=csv|ndjson).
+    Takes the report filters: a single ?date= like the daily report,
+    otherwise ?month=&year= like the monthly report (the current month by
+    default), plus class_level, stream and attendance_type.
+    """
+    
+    def get(self, request):
+        report_date = request.GET.get('date', '')
+        try:
+            date_obj = datetime.strptime(report_date, '%Y-%m-%d').date() if report_date else None
+        except ValueError:
+            return JsonResponse({'success': False, 'message': 'Invalid date. Use YYYY-MM-DD.'}, status=400)
+        
+        if date_obj:
+            start_date = end_date = date_obj
+        else:
+            month, year, start_date, end_date = report_month(
+                request.GET.get('month', timezone.now().month),
+                request.GET.get('year', timezone.now().year)
+            )
+        
+        attendance_sessions = filter_attendance_sessions(
+            AttendanceSession.objects.filter(date__gte=start_date, date__lte=end_date),
+            request.GET
+        )
+        records = StudentAttendance.objects.filter(attendance_session__in=attendance_sessions)
+        
+        columns = [
+            ('date', 'attendance_session__date'),
+            ('session_id', 'attendance_session_id'),
+            ('attendance_type', 'attendance_session__attendance_type'),
+            ('period', 'attendance_session__period'),
+            ('class_level', 'attendance_session__class_level__name'),
+            ('stream', 'attendance_session__stream__stream_letter'),
+            ('subject', 'attendance_session__subject__name'),
+            ('student_id', 'student_id'),
+            ('registration_number', 'student__registration_number'),
+            ('first_name', 'student__first_name'),
+            ('last_name', 'student__last_name'),
+            ('status', 'status'),
+            ('remark', 'remark'),
+        ]
+        return streaming_export_response(
+            request, records, columns,
+            f'attendance_{start_date.strftime("%Y%m%d")}_{end_date.strftime("%Y%m%d")}'
+        )
+
+
 class WeeklyAttendancePDFView(AdminRequiredMixin, View):
     """Generate PDF report for weekly attendance"""
     
@@ -1766,24 +1779,23 @@ class WeeklyAttendancePDFView(AdminRequiredMixin, View):
             start_date_obj = datetime.strptime(start_date, '%Y-%m-%d').date()
             end_date_obj = datetime.strptime(end_date, '%Y-%m-%d').date()
             
-            # Get attendance sessions for the week
-            attendance_sessions = AttendanceSession.objects.filter(
-                date__gte=start_date_obj,
-                date__lte=end_date_obj
-            ).select_related(
-                'class_level', 'stream', 'subject'
-            ).order_by('date', 'class_level__name', 'stream__stream_letter')
+            # Attendance sessions for the week (per-student breakdown)
+            attendance_sessions = filter_attendance_sessions(
+                AttendanceSession.objects.filter(
+                    date__gte=start_date_obj,
+                    date__lte=end_date_obj
+                ),
+                request.GET
+            )
             
-            # Apply additional filters
-            if class_filter:
-                attendance_sessions = attendance_sessions.filter(class_level_id=class_filter)
-            if stream_filter:
-                attendance_sessions = attendance_sessions.filter(stream_id=stream_filter)
-            if attendance_type and attendance_type != 'ALL':
-                attendance_sessions = attendance_sessions.filter(attendance_type=attendance_type)
+            # Daily counts per class, stream, type and subject
+            rollup_rows = filter_attendance_sessions(
+                report_rollup(start_date_obj, end_date_obj),
+                request.GET
+            )
             
             # Check if data exists
-            if not attendance_sessions.exists():
+            if not rollup_rows:
                 raise Exception(f"No attendance data found for period {start_date} to {end_date}")
             
             # Prepare data structures
@@ -1802,16 +1814,16 @@ class WeeklyAttendancePDFView(AdminRequiredMixin, View):
                 'attendance_rate': 0
             }
             
-            # Process each attendance session
-            for session in attendance_sessions:
-                date_str = session.date.strftime('%Y-%m-%d')
-                class_key = f"{session.class_level.name}_{session.stream.stream_letter if session.stream else 'ALL'}"
+            # Process each rollup row
+            for row in rollup_rows:
+                date_str = row.date.strftime('%Y-%m-%d')
+                class_key = f"{row.class_level.name}_{row.stream.stream_letter if row.stream else 'ALL'}"
                 
                 # Initialize daily data if not exists
                 if date_str not in daily_data:
                     daily_data[date_str] = {
-                        'date': session.date,
-                        'day_name': session.date.strftime('%A'),
+                        'date': row.date,
+                        'day_name': row.date.strftime('%A'),
                         'sessions': 0,
                         'students': 0,
                         'present': 0,
@@ -1824,8 +1836,8 @@ class WeeklyAttendancePDFView(AdminRequiredMixin, View):
                 # Initialize class data if not exists
                 if class_key not in class_data:
                     class_data[class_key] = {
-                        'class_level': session.class_level,
-                        'stream': session.stream,
+                        'class_level': row.class_level,
+                        'stream': row.stream,
                         'days': set(),
                         'sessions': 0,
                         'students': 0,
@@ -1836,75 +1848,20 @@ class WeeklyAttendancePDFView(AdminRequiredMixin, View):
                         'attendance_rate': 0
                     }
                 
-                # Get attendance records for this session
-                student_attendances = StudentAttendance.objects.filter(
-                    attendance_session=session
-                )
-                
-                # Calculate session statistics
-                session_stats = student_attendances.aggregate(
-                    total=Count('id'),
-                    present=Count('id', filter=Q(status='P')),
-                    absent=Count('id', filter=Q(status='A')),
-                    late=Count('id', filter=Q(status='L')),
-                    excused=Count('id', filter=Q(status='E'))
-                )
-                
-                for key in ['total', 'present', 'absent', 'late', 'excused']:
-                    session_stats[key] = session_stats[key] or 0
-                
-                # Update daily statistics
-                daily_data[date_str]['sessions'] += 1
-                daily_data[date_str]['students'] += session_stats['total']
-                daily_data[date_str]['present'] += session_stats['present']
-                daily_data[date_str]['absent'] += session_stats['absent']
-                daily_data[date_str]['late'] += session_stats['late']
-                daily_data[date_str]['excused'] += session_stats['excused']
-                
-                # Update class statistics
-                class_data[class_key]['days'].add(session.date)
-                class_data[class_key]['sessions'] += 1
-                class_data[class_key]['students'] += session_stats['total']
-                class_data[class_key]['present'] += session_stats['present']
-                class_data[class_key]['absent'] += session_stats['absent']
-                class_data[class_key]['late'] += session_stats['late']
-                class_data[class_key]['excused'] += session_stats['excused']
-                
-                # Update total statistics
-                total_stats['sessions'] += 1
-                total_stats['students'] += session_stats['total']
-                total_stats['present'] += session_stats['present']
-                total_stats['absent'] += session_stats['absent']
-                total_stats['late'] += session_stats['late']
-                total_stats['excused'] += session_stats['excused']
-                
-                # Track individual student attendance
-                for attendance in student_attendances.select_related('student'):
-                    student_id = attendance.student_id
-                    if student_id not in student_data:
-                        student_data[student_id] = {
-                            'student': attendance.student,
-                            'days': set(),
-                            'sessions': 0,
-                            'present': 0,
-                            'absent': 0,
-                            'late': 0,
-                            'excused': 0,
-                            'attendance_rate': 0
-                        }
-                    
-                    student = student_data[student_id]
-                    student['days'].add(session.date)
-                    student['sessions'] += 1
-                    
-                    if attendance.status == 'P':
-                        student['present'] += 1
-                    elif attendance.status == 'A':
-                        student['absent'] += 1
-                    elif attendance.status == 'L':
-                        student['late'] += 1
-                    elif attendance.status == 'E':
-                        student['excused'] += 1
+                add_rollup_counts(daily_data[date_str], row)
+                class_data[class_key]['days'].add(row.date)
+                add_rollup_counts(class_data[class_key], row)
+                add_rollup_counts(total_stats, row)
+            
+            # Track individual student attendance
+            student_counts = student_attendance_counts(attendance_sessions)
+            students = Student.objects.select_related('class_level').in_bulk(list(student_counts))
+            for student_id, counts in student_counts.items():
+                student_data[student_id] = {
+                    'student': students[student_id],
+                    'attendance_rate': 0,
+                    **counts
+                }
             
             # Calculate attendance rates
             total_stats['days'] = len(daily_data)
@@ -1930,7 +1887,6 @@ class WeeklyAttendancePDFView(AdminRequiredMixin, View):
             
             # Calculate student attendance rates
             for student_id, sdata in student_data.items():
-                sdata['days'] = len(sdata['days'])
                 if sdata['sessions'] > 0:
                     sdata['attendance_rate'] = round(
                         (sdata['present'] / sdata['sessions']) * 100, 2
@@ -2003,16 +1959,6 @@ class WeeklyAttendancePDFView(AdminRequiredMixin, View):
             # Render the HTML template
             html_string = render_to_string('admin/attendance/reports/weekly_report_pdf.html', context)
             
-            # Configure fonts for PDF generation
-            font_config = FontConfiguration()
-            
-            # Generate PDF
-            html = HTML(string=html_string)
-            pdf_file = html.write_pdf(font_config=font_config)
-            
-            # Create HTTP response
-            response = HttpResponse(pdf_file, content_type='application/pdf')
-            
             # Generate filename
             filename = f"weekly_attendance_{start_date}_to_{end_date}"
             if context['filter_class_name']:
@@ -2021,9 +1967,8 @@ class WeeklyAttendancePDFView(AdminRequiredMixin, View):
                 filename += f"_Stream_{context['filter_stream_name']}"
             filename += ".pdf"
             
-            response['Content-Disposition'] = f'attachment; filename="{filename}"'
-            
-            return response
+            # Rendered to PDF by the report worker
+            return pdf_job_response(request, html_string, filename, report_type='weekly_attendance')
             
         except Exception as e:
             import traceback
@@ -2074,59 +2019,42 @@ class ClassMonthlyAttendancePDFView(AdminRequiredMixin, View):
             if stream_filter:
                 stream = get_object_or_404(StreamClass, id=stream_filter)
             
-            # Get attendance sessions for the class and month
-            attendance_sessions = AttendanceSession.objects.filter(
-                class_level_id=class_filter,
-                date__gte=start_date,
-                date__lte=end_date
-            ).select_related('subject')
-            
-            if stream_filter:
-                attendance_sessions = attendance_sessions.filter(stream_id=stream_filter)
+            report_filters = {
+                'class_level': class_filter,
+                'stream': stream_filter,
+                'attendance_type': attendance_type
+            }
             
-            if attendance_type and attendance_type != 'ALL':
-                attendance_sessions = attendance_sessions.filter(attendance_type=attendance_type)
+            # Daily counts per stream, type and subject
+            rollup_rows = filter_attendance_sessions(
+                report_rollup(start_date, end_date),
+                report_filters
+            )
             
             # Check if data exists
-            if not attendance_sessions.exists():
+            if not rollup_rows:
                 raise Exception(f"No attendance data found for {class_level.name} in {start_date.strftime('%B %Y')}")
             
-            # Get students in this class/stream
-            students = Student.objects.filter(
-                class_level_id=class_filter,
-                is_active=True
+            # Register of the class/stream students (student data)
+            matrix = load_attendance_matrix(
+                class_filter, year, month,
+                stream_id=stream_filter,
+                attendance_type=attendance_type
             )
             
-            if stream_filter:
-                students = students.filter(stream_class_id=stream_filter)
-            
             # Prepare data structures
             daily_data = {}
-            student_attendance_data = {}
             subject_data = {}
             
-            # Initialize student data
-            for student in students:
-                student_attendance_data[student.id] = {
-                    'student': student,
-                    'days': set(),
-                    'sessions': 0,
-                    'present': 0,
-                    'absent': 0,
-                    'late': 0,
-                    'excused': 0,
-                    'attendance_rate': 0
-                }
-            
-            # Process each session
-            for session in attendance_sessions:
-                date_str = session.date.strftime('%Y-%m-%d')
+            # Process each rollup row
+            for row in rollup_rows:
+                date_str = row.date.strftime('%Y-%m-%d')
                 
                 # Initialize daily data
                 if date_str not in daily_data:
                     daily_data[date_str] = {
-                        'date': session.date,
-                        'day_name': session.date.strftime('%A'),
+                        'date': row.date,
+                        'day_name': row.date.strftime('%A'),
                         'sessions': 0,
                         'students': 0,
                         'present': 0,
@@ -2137,7 +2065,7 @@ class ClassMonthlyAttendancePDFView(AdminRequiredMixin, View):
                     }
                 
                 # Initialize subject data
-                subject_name = session.subject.name if session.subject else 'Class Attendance'
+                subject_name = row.subject.name if row.subject else 'Class Attendance'
                 if subject_name not in subject_data:
                     subject_data[subject_name] = {
                         'name': subject_name,
@@ -2150,54 +2078,8 @@ class ClassMonthlyAttendancePDFView(AdminRequiredMixin, View):
                         'attendance_rate': 0
                     }
                 
-                # Get attendance for this session
-                student_attendances = StudentAttendance.objects.filter(
-                    attendance_session=session
-                ).select_related('student')
-                
-                session_stats = student_attendances.aggregate(
-                    total=Count('id'),
-                    present=Count('id', filter=Q(status='P')),
-                    absent=Count('id', filter=Q(status='A')),
-                    late=Count('id', filter=Q(status='L')),
-                    excused=Count('id', filter=Q(status='E'))
-                )
-                
-                for key in ['total', 'present', 'absent', 'late', 'excused']:
-                    session_stats[key] = session_stats[key] or 0
-                
-                # Update daily data
-                daily_data[date_str]['sessions'] += 1
-                daily_data[date_str]['students'] += session_stats['total']
-                daily_data[date_str]['present'] += session_stats['present']
-                daily_data[date_str]['absent'] += session_stats['absent']
-                daily_data[date_str]['late'] += session_stats['late']
-                daily_data[date_str]['excused'] += session_stats['excused']
-                
-                # Update subject data
-                subject_data[subject_name]['sessions'] += 1
-                subject_data[subject_name]['students'] += session_stats['total']
-                subject_data[subject_name]['present'] += session_stats['present']
-                subject_data[subject_name]['absent'] += session_stats['absent']
-                subject_data[subject_name]['late'] += session_stats['late']
-                subject_data[subject_name]['excused'] += session_stats['excused']
-                
-                # Update student data
-                for attendance in student_attendances:
-                    student_id = attendance.student_id
-                    if student_id in student_attendance_data:
-                        student_data = student_attendance_data[student_id]
-                        student_data['days'].add(session.date)
-                        student_data['sessions'] += 1
-                        
-                        if attendance.status == 'P':
-                            student_data['present'] += 1
-                        elif attendance.status == 'A':
-                            student_data['absent'] += 1
-                        elif attendance.status == 'L':
-                            student_data['late'] += 1
-                        elif attendance.status == 'E':
-                            student_data['excused'] += 1
+                add_rollup_counts(daily_data[date_str], row)
+                add_rollup_counts(subject_data[subject_name], row)
             
             # Calculate rates
             for date_str, data in daily_data.items():
@@ -2208,11 +2090,6 @@ class ClassMonthlyAttendancePDFView(AdminRequiredMixin, View):
                 if data['students'] > 0:
                     data['attendance_rate'] = round((data['present'] / data['students']) * 100, 2)
             
-            for student_id, data in student_attendance_data.items():
-                data['days'] = len(data['days'])
-                if data['sessions'] > 0:
-                    data['attendance_rate'] = round((data['present'] / data['sessions']) * 100, 2)
-            
             # Calculate month totals
             month_totals = {
                 'days': len(daily_data),
@@ -2241,11 +2118,6 @@ class ClassMonthlyAttendancePDFView(AdminRequiredMixin, View):
                 key=lambda x: x['name']
             )
             
-            sorted_student_data = sorted(
-                student_attendance_data.values(),
-                key=lambda x: (x['student'].last_name, x['student'].first_name)
-            )
-            
             # Get school information
             from django.conf import settings
             school_name = getattr(settings, 'SCHOOL_NAME', 'Your School Name')
@@ -2262,15 +2134,18 @@ class ClassMonthlyAttendancePDFView(AdminRequiredMixin, View):
                 'month_name': start_date.strftime('%B %Y'),
                 'daily_data': sorted_daily_data,
                 'subject_data': sorted_subject_data,
-                'student_data': sorted_student_data,
+                'student_data': matrix.student_rows(),
+                'register_days': matrix.day_rows(),
+                'register_totals': matrix.totals(),
                 'month_totals': month_totals,
                 'school_name': school_name,
                 'school_address': school_address,
                 'generation_date': timezone.now().strftime('%B %d, %Y %I:%M %p'),
                 'generated_by': request.user.get_full_name() or request.user.username,
-                'total_students': students.count(),
+                'total_students': len(matrix.students),
                 'total_days': len(daily_data),
-                'total_sessions': attendance_sessions.count(),
+                'total_days_in_month': len(matrix.dates),
+                'total_sessions': month_totals['sessions'],
                 'has_data': True,
             }
             
@@ -2284,25 +2159,14 @@ class ClassMonthlyAttendancePDFView(AdminRequiredMixin, View):
             # Render the HTML template
             html_string = render_to_string('admin/attendance/reports/class_monthly_report_pdf.html', context)
             
-            # Configure fonts for PDF generation
-            font_config = FontConfiguration()
-            
-            # Generate PDF
-            html = HTML(string=html_string)
-            pdf_file = html.write_pdf(font_config=font_config)
-            
-            # Create HTTP response
-            response = HttpResponse(pdf_file, content_type='application/pdf')
-            
             # Generate filename
             filename = f"class_attendance_{class_level.name.replace(' ', '_')}"
             if stream:
                 filename += f"_Stream_{stream.stream_letter}"
             filename += f"_{start_date.strftime('%B_%Y')}.pdf"
             
-            response['Content-Disposition'] = f'attachment; filename="{filename}"'
-            
-            return response
+            # Rendered to PDF by the report worker
+            return pdf_job_response(request, html_string, filename, report_type='class_monthly_attendance')
             
         except Exception as e:
             import traceback
@@ -2324,9 +2188,6 @@ class GetWeekAttendanceDetailsAPI(AdminRequiredMixin, View):
         try:
             start_date_str = request.GET.get('start_date')
             end_date_str = request.GET.get('end_date')
-            class_filter = request.GET.get('class_level', '')
-            stream_filter = request.GET.get('stream', '')
-            attendance_type = request.GET.get('attendance_type', 'ALL')
             
             if not start_date_str or not end_date_str:
                 return JsonResponse({
@@ -2338,36 +2199,35 @@ class GetWeekAttendanceDetailsAPI(AdminRequiredMixin, View):
             start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
             end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
             
-            # Get attendance sessions for the week
-            attendance_sessions = AttendanceSession.objects.filter(
-                date__gte=start_date,
-                date__lte=end_date
-            ).select_related(
-                'class_level', 'stream', 'subject'
-            ).order_by('date', 'class_level__name')
+            # Attendance sessions for the week (per-student breakdown)
+            attendance_sessions = filter_attendance_sessions(
+                AttendanceSession.objects.filter(
+                    date__gte=start_date,
+                    date__lte=end_date
+                ),
+                request.GET
+            )
             
-            # Apply filters
-            if class_filter:
-                attendance_sessions = attendance_sessions.filter(class_level_id=class_filter)
-            if stream_filter:
-                attendance_sessions = attendance_sessions.filter(stream_id=stream_filter)
-            if attendance_type and attendance_type != 'ALL':
-                attendance_sessions = attendance_sessions.filter(attendance_type=attendance_type)
+            # Daily counts per class, stream, type and subject
+            rollup_rows = filter_attendance_sessions(
+                report_rollup(start_date, end_date),
+                request.GET
+            )
             
             # Prepare daily breakdown
             daily_data = {}
             class_data = {}
             student_data = {}
             
-            for session in attendance_sessions:
-                date_str = session.date.strftime('%Y-%m-%d')
-                class_key = f"{session.class_level.name}_{session.stream.stream_letter if session.stream else 'ALL'}"
+            for row in rollup_rows:
+                date_str = row.date.strftime('%Y-%m-%d')
+                class_key = f"{row.class_level.name}_{row.stream.stream_letter if row.stream else 'ALL'}"
                 
                 # Initialize daily data
                 if date_str not in daily_data:
                     daily_data[date_str] = {
-                        'date': session.date.strftime('%Y-%m-%d'),
-                        'day_name': session.date.strftime('%A'),
+                        'date': date_str,
+                        'day_name': row.date.strftime('%A'),
                         'sessions': 0,
                         'students': 0,
                         'present': 0,
@@ -2379,8 +2239,8 @@ class GetWeekAttendanceDetailsAPI(AdminRequiredMixin, View):
                 # Initialize class data
                 if class_key not in class_data:
                     class_data[class_key] = {
-                        'class_level': session.class_level.name,
-                        'stream': session.stream.stream_letter if session.stream else 'All',
+                        'class_level': row.class_level.name,
+                        'stream': row.stream.stream_letter if row.stream else 'All',
                         'sessions': 0,
                         'students': 0,
                         'present': 0,
@@ -2389,62 +2249,25 @@ class GetWeekAttendanceDetailsAPI(AdminRequiredMixin, View):
                         'excused': 0
                     }
                 
-                # Get attendance for this session
-                student_attendances = StudentAttendance.objects.filter(
-                    attendance_session=session
-                ).select_related('student')
-                
-                session_stats = student_attendances.aggregate(
-                    total=Count('id'),
-                    present=Count('id', filter=Q(status='P')),
-                    absent=Count('id', filter=Q(status='A')),
-                    late=Count('id', filter=Q(status='L')),
-                    excused=Count('id', filter=Q(status='E'))
-                )
-                
-                # Update daily data
-                daily_data[date_str]['sessions'] += 1
-                daily_data[date_str]['students'] += session_stats['total'] or 0
-                daily_data[date_str]['present'] += session_stats['present'] or 0
-                daily_data[date_str]['absent'] += session_stats['absent'] or 0
-                daily_data[date_str]['late'] += session_stats['late'] or 0
-                daily_data[date_str]['excused'] += session_stats['excused'] or 0
-                
-                # Update class data
-                class_data[class_key]['sessions'] += 1
-                class_data[class_key]['students'] += session_stats['total'] or 0
-                class_data[class_key]['present'] += session_stats['present'] or 0
-                class_data[class_key]['absent'] += session_stats['absent'] or 0
-                class_data[class_key]['late'] += session_stats['late'] or 0
-                class_data[class_key]['excused'] += session_stats['excused'] or 0
-                
-                # Collect student data
-                for attendance in student_attendances:
-                    student_id = attendance.student_id
-                    if student_id not in student_data:
-                        student_data[student_id] = {
-                            'student_id': student_id,
-                            'name': attendance.student.full_name,
-                            'admission_number': attendance.student.registration_number or '',
-                            'class': attendance.student.class_level.name if attendance.student.class_level else '',
-                            'sessions': 0,
-                            'present': 0,
-                            'absent': 0,
-                            'late': 0,
-                            'excused': 0
-                        }
-                    
-                    student = student_data[student_id]
-                    student['sessions'] += 1
-                    
-                    if attendance.status == 'P':
-                        student['present'] += 1
-                    elif attendance.status == 'A':
-                        student['absent'] += 1
-                    elif attendance.status == 'L':
-                        student['late'] += 1
-                    elif attendance.status == 'E':
-                        student['excused'] += 1
+                add_rollup_counts(daily_data[date_str], row)
+                add_rollup_counts(class_data[class_key], row)
+            
+            # Collect student data
+            student_counts = student_attendance_counts(attendance_sessions)
+            students = Student.objects.select_related('class_level').in_bulk(list(student_counts))
+            for student_id, counts in student_counts.items():
+                student = students[student_id]
+                student_data[student_id] = {
+                    'student_id': student_id,
+                    'name': student.full_name,
+                    'admission_number': student.registration_number or '',
+                    'class': student.class_level.name if student.class_level else '',
+                    'sessions': counts['sessions'],
+                    'present': counts['present'],
+                    'absent': counts['absent'],
+                    'late': counts['late'],
+                    'excused': counts['excused']
+                }
             
             # Calculate rates
             for date_str, data in daily_data.items():
@@ -2537,18 +2360,26 @@ class GetClassAttendanceDetailsAPI(AdminRequiredMixin, View):
             if stream_id:
                 stream = get_object_or_404(StreamClass, id=stream_id)
             
-            # Get attendance sessions for this class
-            attendance_sessions = AttendanceSession.objects.filter(
-                class_level_id=class_id,
-                date__gte=start_date,
-                date__lte=end_date
-            ).select_related('subject')
+            report_filters = {
+                'class_level': class_id,
+                'stream': stream_id,
+                'attendance_type': attendance_type
+            }
             
-            if stream_id:
-                attendance_sessions = attendance_sessions.filter(stream_id=stream_id)
+            # Attendance sessions for this class (per-student counts)
+            attendance_sessions = filter_attendance_sessions(
+                AttendanceSession.objects.filter(
+                    date__gte=start_date,
+                    date__lte=end_date
+                ),
+                report_filters
+            )
             
-            if attendance_type and attendance_type != 'ALL':
-                attendance_sessions = attendance_sessions.filter(attendance_type=attendance_type)
+            # Daily counts per stream, type and subject
+            rollup_rows = filter_attendance_sessions(
+                report_rollup(start_date, end_date),
+                report_filters
+            )
             
             # Get students in this class/stream
             students = Student.objects.filter(
@@ -2564,13 +2395,14 @@ class GetClassAttendanceDetailsAPI(AdminRequiredMixin, View):
             student_attendance_data = {}
             subject_data = {}
             
-            # Initialize student data
+            # Student data
+            student_counts = student_attendance_counts(attendance_sessions)
             for student in students:
                 student_attendance_data[student.id] = {
                     'student_id': student.id,
                     'name': student.full_name,
                     'admission_number': student.registration_number or '',
-                    'days': set(),
+                    'days': 0,
                     'sessions': 0,
                     'present': 0,
                     'absent': 0,
@@ -2578,16 +2410,17 @@ class GetClassAttendanceDetailsAPI(AdminRequiredMixin, View):
                     'excused': 0,
                     'attendance_rate': 0
                 }
+                student_attendance_data[student.id].update(student_counts.get(student.id, {}))
             
-            # Process each session
-            for session in attendance_sessions:
-                date_str = session.date.strftime('%Y-%m-%d')
+            # Process each rollup row
+            for row in rollup_rows:
+                date_str = row.date.strftime('%Y-%m-%d')
                 
                 # Initialize daily data
                 if date_str not in daily_data:
                     daily_data[date_str] = {
-                        'date': session.date.strftime('%Y-%m-%d'),
-                        'day_name': session.date.strftime('%A'),
+                        'date': date_str,
+                        'day_name': row.date.strftime('%A'),
                         'sessions': 0,
                         'students': 0,
                         'present': 0,
@@ -2597,7 +2430,7 @@ class GetClassAttendanceDetailsAPI(AdminRequiredMixin, View):
                     }
                 
                 # Initialize subject data
-                subject_name = session.subject.name if session.subject else 'Class Attendance'
+                subject_name = row.subject.name if row.subject else 'Class Attendance'
                 if subject_name not in subject_data:
                     subject_data[subject_name] = {
                         'name': subject_name,
@@ -2609,51 +2442,8 @@ class GetClassAttendanceDetailsAPI(AdminRequiredMixin, View):
                         'excused': 0
                     }
                 
-                # Get attendance for this session
-                student_attendances = StudentAttendance.objects.filter(
-                    attendance_session=session
-                ).select_related('student')
-                
-                session_stats = student_attendances.aggregate(
-                    total=Count('id'),
-                    present=Count('id', filter=Q(status='P')),
-                    absent=Count('id', filter=Q(status='A')),
-                    late=Count('id', filter=Q(status='L')),
-                    excused=Count('id', filter=Q(status='E'))
-                )
-                
-                # Update daily data
-                daily_data[date_str]['sessions'] += 1
-                daily_data[date_str]['students'] += session_stats['total'] or 0
-                daily_data[date_str]['present'] += session_stats['present'] or 0
-                daily_data[date_str]['absent'] += session_stats['absent'] or 0
-                daily_data[date_str]['late'] += session_stats['late'] or 0
-                daily_data[date_str]['excused'] += session_stats['excused'] or 0
-                
-                # Update subject data
-                subject_data[subject_name]['sessions'] += 1
-                subject_data[subject_name]['students'] += session_stats['total'] or 0
-                subject_data[subject_name]['present'] += session_stats['present'] or 0
-                subject_data[subject_name]['absent'] += session_stats['absent'] or 0
-                subject_data[subject_name]['late'] += session_stats['late'] or 0
-                subject_data[subject_name]['excused'] += session_stats['excused'] or 0
-                
-                # Update student data
-                for attendance in student_attendances:
-                    student_id = attendance.student_id
-                    if student_id in student_attendance_data:
-                        student_data = student_attendance_data[student_id]
-                        student_data['days'].add(session.date)
-                        student_data['sessions'] += 1
-                        
-                        if attendance.status == 'P':
-                            student_data['present'] += 1
-                        elif attendance.status == 'A':
-                            student_data['absent'] += 1
-                        elif attendance.status == 'L':
-                            student_data['late'] += 1
-                        elif attendance.status == 'E':
-                            student_data['excused'] += 1
+                add_rollup_counts(daily_data[date_str], row)
+                add_rollup_counts(subject_data[subject_name], row)
             
             # Calculate rates
             for date_str, data in daily_data.items():
@@ -2669,7 +2459,6 @@ class GetClassAttendanceDetailsAPI(AdminRequiredMixin, View):
                     data['attendance_rate'] = 0
             
             for student_id, data in student_attendance_data.items():
-                data['days'] = len(data['days'])
                 if data['sessions'] > 0:
                     data['attendance_rate'] = round((data['present'] / data['sessions']) * 100, 2)
             
@@ -2688,11 +2477,6 @@ class GetClassAttendanceDetailsAPI(AdminRequiredMixin, View):
             if month_totals['students'] > 0:
                 month_totals['attendance_rate'] = round((month_totals['present'] / month_totals['students']) * 100, 2)
             
-            # Convert sets to lists for JSON
-            for student_id, data in student_attendance_data.items():
-                if 'days' in data and isinstance(data['days'], set):
-                    data['days'] = list(data['days'])
-            
             return JsonResponse({
                 'success': True,
                 'class_info': {
@@ -2705,7 +2489,7 @@ class GetClassAttendanceDetailsAPI(AdminRequiredMixin, View):
                 'daily_breakdown': list(daily_data.values()),
                 'subject_breakdown': list(subject_data.values()),
                 'student_breakdown': list(student_attendance_data.values()),
-                'total_sessions': attendance_sessions.count()
+                'total_sessions': month_totals['sessions']
             })
             
         except Exception as e:
@@ -2720,72 +2504,153 @@ class GetClassAttendanceDetailsAPI(AdminRequiredMixin, View):
 
 
 
+def class_register_filters(request, class_level):
+    """
+    Register filters from the query string: (stream, year, month,
+    attendance_type), defaulting to the whole class, the current month and
+    every attendance type
+    """
+    today = timezone.now().date()
+    try:
+        month = int(request.GET.get('month', today.month))
+        year = int(request.GET.get('year', today.year))
+        datetime(year, month, 1)
+    except (ValueError, TypeError):
+        month, year = today.month, today.year
+    
+    stream = None
+    stream_filter = request.GET.get('stream')
+    if stream_filter:
+        stream = get_object_or_404(StreamClass, id=stream_filter, class_level=class_level)
+    
+    attendance_type = request.GET.get('attendance_type', 'ALL')
+    if attendance_type not in dict(AttendanceSession.ATTENDANCE_TYPE_CHOICES):
+        attendance_type = 'ALL'
+    
+    return stream, year, month, attendance_type
+
+
 class ClassAttendanceReportView(AdminRequiredMixin, TemplateView):
-    template_name = 'attendance/reports/class.html'
+    """Monthly register (students x days) of a class or stream"""
+    template_name = 'admin/attendance/reports/class_register.html'
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         class_id = self.kwargs.get('class_id')
         
         class_level = get_object_or_404(ClassLevel, id=class_id)
+        stream, year, month, attendance_type = class_register_filters(self.request, class_level)
         
-        # Get date range from query params
-        start_date = self.request.GET.get('start_date')
-        end_date = self.request.GET.get('end_date')
+        matrix = load_attendance_matrix(
+            class_level.id, year, month,
+            stream_id=stream.id if stream else None,
+            attendance_type=attendance_type
+        )
+        student_rows = matrix.student_rows()
         
-        if not start_date:
-            start_date = (datetime.now() - timedelta(days=30)).date()
-        if not end_date:
-            end_date = datetime.now().date()
+        context['class_level'] = class_level
+        context['stream'] = stream
+        context['streams'] = StreamClass.objects.filter(class_level=class_level).order_by('stream_letter')
+        context['month'] = month
+        context['year'] = year
+        context['month_name'] = matrix.dates[0].strftime('%B %Y')
+        context['start_date'] = matrix.dates[0]
+        context['end_date'] = matrix.dates[-1]
+        context['attendance_type'] = attendance_type
+        context['attendance_types'] = AttendanceSession.ATTENDANCE_TYPE_CHOICES
+        context['months'] = [(number, calendar.month_name[number]) for number in range(1, 13)]
+        context['student_attendance'] = student_rows
+        context['register_days'] = matrix.day_rows()
+        context['totals'] = matrix.totals()
+        context['chronic_count'] = sum(row['chronic_absence'] for row in student_rows)
+        context['chronic_absence_percent'] = CHRONIC_ABSENCE_PERCENT
+        context['total_sessions'] = context['totals']['sessions']
         
-        # Get attendance sessions for this class
-        attendance_sessions = AttendanceSession.objects.filter(
-            class_level=class_level,
-            date__gte=start_date,
-            date__lte=end_date
-        )
+        return context
+
+
+class ClassAttendanceRegisterExcelView(AdminRequiredMixin, View):
+    """Excel export of the monthly register of a class or stream"""
+    
+    def get(self, request, class_id):
+        class_level = get_object_or_404(ClassLevel, id=class_id)
+        stream, year, month, attendance_type = class_register_filters(request, class_level)
         
-        # Get students in this class
-        students = Student.objects.filter(
-            current_class=class_level,
-            is_active=True
+        matrix = load_attendance_matrix(
+            class_level.id, year, month,
+            stream_id=stream.id if stream else None,
+            attendance_type=attendance_type
+        )
+        student_rows = matrix.student_rows()
+        register_days = matrix.day_rows()
+        
+        export = StreamingExcelExport()
+        export.add_style('title', Font(bold=True, size=14))
+        export.add_style('header', Font(bold=True, color='FFFFFF'), solid_fill('4e73df'),
+                         alignment=Alignment(horizontal='center'))
+        export.add_style('mark', alignment=Alignment(horizontal='center'))
+        export.add_style('no_school', fill=solid_fill('e9ecef'), alignment=Alignment(horizontal='center'))
+        export.add_style('absent', fill=solid_fill('f8d7da'), alignment=Alignment(horizontal='center'))
+        export.add_style('total_label', Font(bold=True))
+        
+        # Name columns, one narrow column per day, then the student totals
+        first_day_col = 4
+        totals_col = first_day_col + len(register_days)
+        ws = export.add_sheet(
+            matrix.dates[0].strftime('%b %Y'),
+            column_widths=[5, 30, 16] + [4] * len(register_days) + [12] * 9,
+            freeze_row=4,
+            freeze_column=first_day_col
         )
         
-        # Calculate attendance for each student
-        student_attendance = []
-        for student in students:
-            student_records = StudentAttendance.objects.filter(
-                student=student,
-                attendance_session__in=attendance_sessions
-            )
-            
-            student_stats = student_records.aggregate(
-                total=Count('id'),
-                present=Count('id', filter=Q(status='P')),
-                absent=Count('id', filter=Q(status='A')),
-                late=Count('id', filter=Q(status='L')),
-                excused=Count('id', filter=Q(status='E'))
-            )
-            
-            attendance_rate = 0
-            if student_stats['total'] > 0:
-                attendance_rate = round(
-                    (student_stats['present'] / student_stats['total']) * 100, 2
-                )
-            
-            student_attendance.append({
-                'student': student,
-                'stats': student_stats,
-                'attendance_rate': attendance_rate
-            })
+        title = f"{class_level.name}"
+        if stream:
+            title += f" - Stream {stream.stream_letter}"
+        title += f" Attendance Register - {matrix.dates[0].strftime('%B %Y')}"
+        ws.append([title], style='title')
+        ws.append_blank()
+        
+        # Headers
+        headers = ['#', 'Student Name', 'Registration #']
+        headers += [day['date'].day for day in register_days]
+        headers += ['Days', 'Sessions', 'Present', 'Absent', 'Late', 'Excused',
+                    'Attendance Rate (%)', 'Longest Absence Streak', 'Chronic Absence']
+        ws.append(headers, style='header')
+        
+        # Day cells are shaded on days without sessions and where absent
+        day_styles = [
+            'mark' if day['is_school_day'] else 'no_school' for day in register_days
+        ]
         
-        context['class_level'] = class_level
-        context['start_date'] = start_date
-        context['end_date'] = end_date
-        context['student_attendance'] = student_attendance
-        context['total_sessions'] = attendance_sessions.count()
+        # Register rows
+        for number, data in enumerate(student_rows, 1):
+            styles = {
+                first_day_col + offset: 'absent' if style == 'mark' and mark == 'A' else style
+                for offset, (style, mark) in enumerate(zip(day_styles, data['register']))
+            }
+            ws.append([
+                number,
+                data['student'].full_name,
+                data['student'].registration_number or 'N/A',
+                *[mark or None for mark in data['register']],
+                data['days'], data['sessions'], data['present'], data['absent'],
+                data['late'], data['excused'], data['attendance_rate'],
+                data['longest_absence_streak'], 'Yes' if data['chronic_absence'] else 'No',
+            ], styles=styles)
+        
+        # Daily totals
+        for label, field in (('Present', 'present'), ('Absent', 'absent')):
+            ws.append(
+                [None, label] + [None] * (first_day_col - 3)
+                + [day[field] if day['is_school_day'] else None for day in register_days],
+                styles={2: 'total_label'}
+            )
         
-        return context
+        filename = f"attendance_register_{class_level.name.replace(' ', '_')}"
+        if stream:
+            filename += f"_Stream_{stream.stream_letter}"
+        filename += f"_{matrix.dates[0].strftime('%B_%Y')}.xlsx"
+        return export.response(filename)
 
 
 
@@ -2837,75 +2702,37 @@ class UpdateAttendanceSessionAPI(AdminRequiredMixin, View):
         try:
             data = json.loads(request.body)
             session = get_object_or_404(AttendanceSession, id=session_id)
-            
-            # Update session details
-            session.date = data.get('date', session.date)
-            session.attendance_type = data.get('attendance_type', session.attendance_type)
-            session.period = data.get('period', session.period)
-            
-            if 'class_level' in data:
-                session.class_level_id = data['class_level']
-            if 'stream' in data:
-                session.stream_id = data['stream']
-            if 'subject' in data:
-                session.subject_id = data['subject']
-            
-            session.save()
-            
-            # Update student attendance
-            if 'student_attendance' in data:
-                student_attendance_data = data['student_attendance']
-                current_attendance = StudentAttendance.objects.filter(
-                    attendance_session=session
-                )
+            with transaction.atomic():
+                before = session_footprint(session)
                 
-                # Create list of student IDs from request
-                request_student_ids = set(map(str, student_attendance_data.keys()))
+                # Update session details
+                session.date = data.get('date', session.date)
+                session.attendance_type = data.get('attendance_type', session.attendance_type)
+                session.period = data.get('period', session.period)
                 
-                # Get existing attendance records
-                existing_attendance = {
-                    str(att.student_id): att 
-                    for att in current_attendance
-                }
+                if 'class_level' in data:
+                    session.class_level_id = data['class_level']
+                if 'stream' in data:
+                    session.stream_id = data['stream']
+                if 'subject' in data:
+                    session.subject_id = data['subject']
                 
-                # Update or create attendance records
-                attendance_objects = []
-                for student_id_str, attendance_data in student_attendance_data.items():
-                    student_id = int(student_id_str)
-                    
-                    if student_id_str in existing_attendance:
-                        # Update existing record
-                        att = existing_attendance[student_id_str]
-                        att.status = attendance_data.get('status', 'A')
-                        att.remark = attendance_data.get('remark', '')
-                        att.save()
-                    else:
-                        # Create new record
-                        attendance_objects.append(
-                            StudentAttendance(
-                                attendance_session=session,
-                                student_id=student_id,
-                                status=attendance_data.get('status', 'A'),
-                                remark=attendance_data.get('remark', '')
-                            )
-                        )
+                session.save()
                 
-                # Bulk create new records
-                if attendance_objects:
-                    StudentAttendance.objects.bulk_create(attendance_objects)
+                # Update student attendance, deleting records for students
+                # no longer in the list
+                summary = new_summary()
+                if 'student_attendance' in data:
+                    summary = write_session_attendance(
+                        session, data['student_attendance'], replace=True
+                    )
                 
-                # Delete records for students no longer in the list
-                existing_student_ids = set(existing_attendance.keys())
-                students_to_delete = existing_student_ids - request_student_ids
-                if students_to_delete:
-                    StudentAttendance.objects.filter(
-                        attendance_session=session,
-                        student_id__in=[int(id) for id in students_to_delete]
-                    ).delete()
+                refresh_attendance(before, session_footprint(session))
             
             return JsonResponse({
                 'success': True,
-                'message': 'Attendance session updated successfully'
+                'message': 'Attendance session updated successfully',
+                'summary': summary
             })
             
         except Exception as e:
@@ -3027,74 +2854,37 @@ class EditAttendanceSessionAPI(AdminRequiredMixin, View):
             if action == 'duplicate_session':
                 return self.duplicate_session(data)
             
-            # Update session details
-            session.date = data.get('date', session.date)
-            session.attendance_type = data.get('attendance_type', session.attendance_type)
-            session.period = data.get('period', session.period)
-            
-            if 'class_level' in data:
-                session.class_level_id = data['class_level']
-            if 'stream' in data:
-                session.stream_id = data['stream']
-            if 'subject' in data:
-                session.subject_id = data['subject']
-            
-            session.save()
-            
-            # Update student attendance
-            if 'student_attendance' in data:
-                student_attendance_data = data['student_attendance']
-                current_attendance = StudentAttendance.objects.filter(
-                    attendance_session=session
-                )
+            with transaction.atomic():
+                before = session_footprint(session)
                 
-                # Create list of student IDs from request
-                request_student_ids = set(map(str, student_attendance_data.keys()))
+                # Update session details
+                session.date = data.get('date', session.date)
+                session.attendance_type = data.get('attendance_type', session.attendance_type)
+                session.period = data.get('period', session.period)
                 
-                # Get existing attendance records
-                existing_attendance = {
-                    str(att.student_id): att 
-                    for att in current_attendance
-                }
+                if 'class_level' in data:
+                    session.class_level_id = data['class_level']
+                if 'stream' in data:
+                    session.stream_id = data['stream']
+                if 'subject' in data:
+                    session.subject_id = data['subject']
                 
-                # Update or create attendance records
-                attendance_objects = []
-                for student_id_str, attendance_data in student_attendance_data.items():
-                    student_id = int(student_id_str)
-                    
-                    if student_id_str in existing_attendance:
-                        # Update existing record
-                        att = existing_attendance[student_id_str]
-                        att.status = attendance_data.get('status', 'A')
-                        att.remark = attendance_data.get('remark', '')
-                        att.save()
-                    else:
-                        # Create new record
-                        attendance_objects.append(
-                            StudentAttendance(
-                                attendance_session=session,
-                                student_id=student_id,
-                                status=attendance_data.get('status', 'A'),
-                                remark=attendance_data.get('remark', '')
-                            )
-                        )
+                session.save()
                 
-                # Bulk create new records
-                if attendance_objects:
-                    StudentAttendance.objects.bulk_create(attendance_objects)
+                # Update student attendance, deleting records for students
+                # no longer in the list
+                summary = new_summary()
+                if 'student_attendance' in data:
+                    summary = write_session_attendance(
+                        session, data['student_attendance'], replace=True
+                    )
                 
-                # Delete records for students no longer in the list
-                existing_student_ids = set(existing_attendance.keys())
-                students_to_delete = existing_student_ids - request_student_ids
-                if students_to_delete:
-                    StudentAttendance.objects.filter(
-                        attendance_session=session,
-                        student_id__in=[int(id) for id in students_to_delete]
-                    ).delete()
+                refresh_attendance(before, session_footprint(session))
             
             return JsonResponse({
                 'success': True,
-                'message': 'Attendance session updated successfully'
+                'message': 'Attendance session updated successfully',
+                'summary': summary
             })
             
         except Exception as e:
@@ -3136,6 +2926,8 @@ class EditAttendanceSessionAPI(AdminRequiredMixin, View):
             if student_attendance_objects:
                 StudentAttendance.objects.bulk_create(student_attendance_objects)
             
+            refresh_attendance(session_footprint(new_session))
+            
             return JsonResponse({
                 'success': True,
                 'message': 'Attendance session duplicated successfully',
@@ -3198,36 +2990,34 @@ class EditAttendanceSessionAPI(AdminRequiredMixin, View):
             data = json.loads(request.body)
             session = get_object_or_404(AttendanceSession, id=session_id)
             
-            # Update session details
-            for field in ['date', 'attendance_type', 'period']:
-                if field in data:
-                    setattr(session, field, data[field])
-            
-            if 'class_level' in data:
-                session.class_level_id = data['class_level']
-            if 'stream' in data:
-                session.stream_id = data['stream']
-            if 'subject' in data:
-                session.subject_id = data['subject']
-          
-            
-            session.save()
-            
-            # Update student attendance
-            if 'student_attendance' in data:
-                for student_id, attendance_data in data['student_attendance'].items():
-                    StudentAttendance.objects.update_or_create(
-                        attendance_session=session,
-                        student_id=student_id,
-                        defaults={
-                            'status': attendance_data.get('status', 'A'),
-                            'remark': attendance_data.get('remark', '')
-                        }
-                    )
+            with transaction.atomic():
+                before = session_footprint(session)
+                
+                # Update session details
+                for field in ['date', 'attendance_type', 'period']:
+                    if field in data:
+                        setattr(session, field, data[field])
+                
+                if 'class_level' in data:
+                    session.class_level_id = data['class_level']
+                if 'stream' in data:
+                    session.stream_id = data['stream']
+                if 'subject' in data:
+                    session.subject_id = data['subject']
+                
+                session.save()
+                
+                # Update student attendance
+                summary = new_summary()
+                if 'student_attendance' in data:
+                    summary = write_session_attendance(session, data['student_attendance'])
+                
+                refresh_attendance(before, session_footprint(session))
             
             return JsonResponse({
                 'success': True,
-                'message': 'Attendance session updated successfully'
+                'message': 'Attendance session updated successfully',
+                'summary': summary
             })
             
         except Exception as e:
@@ -3273,9 +3063,9 @@ class StudentAttendanceListView(AdminRequiredMixin, TemplateView):
                 Q(email__icontains=search_filter)
             )
         
-        # Add attendance count annotation
+        # Attendance marks per student, summed from the monthly summaries
         students = students.annotate(
-            attendance_count=Count('studentattendance', distinct=True)
+            attendance_count=Coalesce(Sum('attendance_months__total'), 0)
         )
         
         # Prepare context
@@ -3361,14 +3151,29 @@ class StudentAttendanceReportView(AdminRequiredMixin, TemplateView):
         if status_filter and status_filter != 'ALL':
             attendance_records = attendance_records.filter(status=status_filter)
         
-        # Calculate statistics
-        stats = attendance_records.aggregate(
-            total=Count('id'),
-            present=Count('id', filter=Q(status='P')),
-            absent=Count('id', filter=Q(status='A')),
-            late=Count('id', filter=Q(status='L')),
-            excused=Count('id', filter=Q(status='E'))
-        )
+        # Calculate statistics (from the monthly summaries when the
+        # range covers whole months)
+        whole_months = start_date_obj.day == 1 and (end_date_obj + timedelta(days=1)).day == 1
+        if whole_months and status_filter == 'ALL':
+            summary = student_attendance_summary(
+                student, start_date_obj, end_date_obj,
+                attendance_type if attendance_type != 'ALL' else None
+            )
+            stats = {
+                'total': summary['total'],
+                'present': summary['present'],
+                'absent': summary['absent'],
+                'late': summary['late'],
+                'excused': summary['excused']
+            }
+        else:
+            stats = attendance_records.aggregate(
+                total=Count('id'),
+                present=Count('id', filter=Q(status='P')),
+                absent=Count('id', filter=Q(status='A')),
+                late=Count('id', filter=Q(status='L')),
+                excused=Count('id', filter=Q(status='E'))
+            )
         
         # Calculate attendance rate
         attendance_rate = 0
@@ -3447,48 +3252,34 @@ class StudentAttendanceReportView(AdminRequiredMixin, TemplateView):
     def calculate_monthly_trends(self, student, start_date, end_date):
         """Calculate monthly attendance trends"""
         monthly_data = []
+        months = student_attendance_months(student, start_date, end_date)
         
         # Generate months between start and end date
         current_date = start_date.replace(day=1)
         while current_date <= end_date:
-            month_start = current_date
-            if current_date.month == 12:
-                month_end = current_date.replace(year=current_date.year + 1, month=1, day=1) - timedelta(days=1)
-            else:
-                month_end = current_date.replace(month=current_date.month + 1, day=1) - timedelta(days=1)
-            
-            # Get attendance for this month
-            month_records = StudentAttendance.objects.filter(
-                student=student,
-                attendance_session__date__gte=month_start,
-                attendance_session__date__lte=month_end
-            )
-            
-            month_stats = month_records.aggregate(
-                total=Count('id'),
-                present=Count('id', filter=Q(status='P')),
-                absent=Count('id', filter=Q(status='A')),
-                late=Count('id', filter=Q(status='L')),
-                excused=Count('id', filter=Q(status='E'))
-            )
+            month = months.get(current_date)
+            month_stats = {
+                'total': month['total'] if month else 0,
+                'present': month['present'] if month else 0,
+                'absent': month['absent'] if month else 0,
+                'late': month['late'] if month else 0,
+                'excused': month['excused'] if month else 0
+            }
             
             attendance_rate = 0
-            if month_stats['total'] and month_stats['total'] > 0:
+            if month_stats['total'] > 0:
                 attendance_rate = round((month_stats['present'] / month_stats['total']) * 100, 2)
             
             monthly_data.append({
-                'month': month_start.strftime('%B %Y'),
-                'start_date': month_start,
+                'month': current_date.strftime('%B %Y'),
+                'start_date': current_date,
                 'stats': month_stats,
                 'attendance_rate': attendance_rate,
-                'total_days': month_records.values('attendance_session__date').distinct().count()
+                'total_days': month['days'] if month else 0
             })
             
             # Move to next month
-            if current_date.month == 12:
-                current_date = current_date.replace(year=current_date.year + 1, month=1, day=1)
-            else:
-                current_date = current_date.replace(month=current_date.month + 1, day=1)
+            current_date = next_month(current_date)
         
         return monthly_data
 
@@ -3654,21 +3445,10 @@ class DownloadAttendancePDFView(AdminRequiredMixin, View):
             # Render HTML template
             html_string = render_to_string('admin/attendance/pdf_report.html', context)
             
-            # Configure fonts
-            font_config = FontConfiguration()
-            
-            # Generate PDF
-            html = HTML(string=html_string)
-            pdf_file = html.write_pdf(font_config=font_config)
-            
-            # Create HTTP response with PDF
-            response = HttpResponse(pdf_file, content_type='application/pdf')
-            
             # Create filename
             filename = f"attendance_report_{student.registration_number or student.id}_{start_date}_to_{end_date}.pdf"
-            response['Content-Disposition'] = f'attachment; filename="{filename}"'
-            
-            return response
+            # Rendered to PDF by the report worker
+            return pdf_job_response(request, html_string, filename, report_type='student_attendance')
             
         except Exception as e:
             import traceback
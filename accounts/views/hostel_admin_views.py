@@ -16,14 +16,17 @@ from django.db import models
 from django.db.models.functions import Coalesce, ExtractMonth, ExtractYear
 from django.urls import reverse
 from django.utils import timezone
-from django.db.models import Q, Sum, Count, F, Value, CharField, Case, When, DecimalField
+from django.db.models import Q, Sum, Count, F, Value, CharField, Case, When, DecimalField, ExpressionWrapper, OuterRef, Subquery
 from datetime import datetime
 from accounts.models import GENDER_CHOICES
 from core.models import AcademicYear, ClassLevel
+from core.reports import pdf_job_response
 from students.models import Bed, Hostel, HostelInstallmentPlan, HostelPayment, HostelPaymentTransaction, HostelRoom, Student, StudentHostelAllocation
-import openpyxl
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
+from openpyxl.styles import Font, Alignment
+from core.data_export import streaming_export_response
+from core.excel_export import (
+    EXPORT_CHUNK_SIZE, StreamingExcelExport, box_border, centered, left_aligned, solid_fill
+)
 from django.http import HttpResponse
 from django.template.loader import render_to_string
 from weasyprint import HTML
@@ -5001,18 +5004,9 @@ def allocation_payments_export_pdf(request, allocation_id):
     # Render HTML template
     html_string = render_to_string('admin/hostels/allocation_payments_pdf.html', context)
     
-    # Generate PDF
-    html = HTML(string=html_string, base_url=request.build_absolute_uri('/'))
-    
-    # Create response
-    response = HttpResponse(content_type='application/pdf')
+    # Rendered to PDF by the report worker
     filename = f"payments_{allocation.student.registration_number}_{timezone.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-    response['Content-Disposition'] = f'attachment; filename={filename}'
-    
-    # Write PDF to response
-    html.write_pdf(response)
-    
-    return response
+    return pdf_job_response(request, html_string, filename, report_type='allocation_payments')
 
 
 # ============================================================================
@@ -5711,16 +5705,85 @@ def student_balance_info(request, student_id):
 
 
 
+def annotate_allocation_balance(transactions):
+    """
+    Annotate payment transactions with their allocation's paid total
+    (allocation_paid) and remaining balance (allocation_balance), read in
+    the same query instead of one aggregate per row.
+    """
+    amount_field = DecimalField(max_digits=12, decimal_places=2)
+    paid = HostelPaymentTransaction.objects.filter(
+        allocation=OuterRef('allocation')
+    ).order_by().values('allocation').annotate(
+        total=Sum('amount')
+    ).values('total')[:1]
+    
+    return transactions.annotate(
+        allocation_paid=Coalesce(Subquery(paid, output_field=amount_field), Value(Decimal('0')),
+                                 output_field=amount_field)
+    ).annotate(
+        allocation_balance=ExpressionWrapper(
+            F('allocation__hostel__total_fee') - F('allocation_paid'), output_field=amount_field
+        )
+    )
+
+
+@login_required
+def hostel_payments_export_data(request):
+    """
+    Stream the filtered hostel payment transactions as CSV or NDJSON
+    (?format=csv|ndjson), using the same filters as the payments exports
+    """
+    filters = get_payment_filters_from_request(request)
+    transactions = annotate_allocation_balance(get_filtered_payment_transactions(filters))
+    
+    columns = [
+        ('id', 'id'),
+        ('receipt_number', 'receipt_number'),
+        ('student_id', 'allocation__student_id'),
+        ('registration_number', 'allocation__student__registration_number'),
+        ('first_name', 'allocation__student__first_name'),
+        ('last_name', 'allocation__student__last_name'),
+        ('class_level', 'allocation__student__class_level__name'),
+        ('stream', 'allocation__student__stream_class__stream_letter'),
+        ('hostel', 'allocation__hostel__name'),
+        ('hostel_code', 'allocation__hostel__code'),
+        ('amount', 'amount'),
+        ('allocation_paid', 'allocation_paid'),
+        ('allocation_balance', 'allocation_balance'),
+        ('payment_type', 'payment_type'),
+        ('payment_method', 'payment_method'),
+        ('transaction_number', 'transaction_number'),
+        ('month', 'month'),
+        ('year', 'year'),
+        ('payment_date', 'payment_date'),
+        ('created_at', 'created_at'),
+    ]
+    return streaming_export_response(
+        request, transactions, columns, f'hostel_payments_{timezone.now().strftime("%Y%m%d_%H%M%S")}'
+    )
+
+
+# Font colour of the status column in the payments export
+PAYMENT_STATUS_COLORS = {
+    'FULLY PAID': '1cc88a',
+    'PARTIAL': 'e74a3b',
+    'UNPAID': '6c757d',
+}
+
+
 @login_required
 def hostel_payments_export_excel(request):
     """
     Export hostel payments to Excel using OpenPyXL with enhanced styling
+    Rows are streamed from the database into a write-only workbook
     """
     # Get filter parameters
     filters = get_payment_filters_from_request(request)
     
-    # Get filtered transactions
-    transactions = get_filtered_payment_transactions(filters)
+    # Get filtered transactions, with each allocation's balance so the
+    # remaining amount does not need a query per row
+    transactions = annotate_allocation_balance(get_filtered_payment_transactions(filters))
     
     # Calculate totals for summary
     total_amount = transactions.aggregate(total=Sum('amount'))['total'] or 0
@@ -5728,127 +5791,93 @@ def hostel_payments_export_excel(request):
     hostels_count = transactions.values('allocation__hostel').distinct().count()
     average_payment = total_amount / total_transactions if total_transactions > 0 else 0
     
-    # Create workbook
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Hostel Payments"
+    export = StreamingExcelExport()
     
     # ============================================
     # Define Styles
     # ============================================
-    
-    # School Header Styles
-    school_title_font = Font(name='Arial', size=18, bold=True, color='4e73df')
-    school_subtitle_font = Font(name='Arial', size=11, bold=False, color='666666')
-    school_info_font = Font(name='Arial', size=10, bold=False, color='333333')
-    
-    # Section Header Styles
-    section_header_font = Font(name='Arial', size=12, bold=True, color='FFFFFF')
-    section_header_fill = PatternFill(start_color='4e73df', end_color='4e73df', fill_type='solid')
-    section_header_alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
-    section_header_border = Border(
-        left=Side(style='medium', color='4e73df'),
-        right=Side(style='medium', color='4e73df'),
-        top=Side(style='medium', color='4e73df'),
-        bottom=Side(style='medium', color='4e73df')
-    )
-    
-    # Summary Section Styles
-    summary_label_font = Font(name='Arial', size=10, bold=True, color='4e73df')
-    summary_value_font = Font(name='Arial', size=12, bold=True, color='333333')
-    summary_cell_border = Border(
-        left=Side(style='thin', color='4e73df'),
-        right=Side(style='thin', color='4e73df'),
-        top=Side(style='thin', color='4e73df'),
-        bottom=Side(style='thin', color='4e73df')
-    )
-    
-    # Filter Section Styles
-    filter_header_font = Font(name='Arial', size=10, bold=True, color='856404')
-    filter_text_font = Font(name='Arial', size=9, color='856404')
-    filter_fill = PatternFill(start_color='fff3cd', end_color='fff3cd', fill_type='solid')
-    filter_border = Border(
-        left=Side(style='thin', color='ffeeba'),
-        right=Side(style='thin', color='ffeeba'),
-        top=Side(style='thin', color='ffeeba'),
-        bottom=Side(style='thin', color='ffeeba')
-    )
-    
-    # Table Header Styles
-    table_header_font = Font(name='Arial', size=10, bold=True, color='FFFFFF')
-    table_header_fill = PatternFill(start_color='4e73df', end_color='4e73df', fill_type='solid')
-    table_header_alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
-    table_header_border = Border(
-        left=Side(style='medium', color='224abe'),
-        right=Side(style='medium', color='224abe'),
-        top=Side(style='medium', color='224abe'),
-        bottom=Side(style='medium', color='224abe')
-    )
-    
-    # Cell Styles
+    centre = centered()
     cell_font = Font(name='Arial', size=9)
-    cell_border = Border(
-        left=Side(style='thin', color='d1d3e2'),
-        right=Side(style='thin', color='d1d3e2'),
-        top=Side(style='thin', color='d1d3e2'),
-        bottom=Side(style='thin', color='d1d3e2')
-    )
-    
-    # Amount Cell Styles
-    amount_font = Font(name='Arial', size=9, bold=True)
+    cell_border = box_border('thin', 'd1d3e2')
+    filter_fill = solid_fill('fff3cd')
+    filter_border = box_border('thin', 'ffeeba')
+    summary_border = box_border('thin', '4e73df')
     amount_alignment = Alignment(horizontal='right', vertical='center')
-    positive_font = Font(name='Arial', size=9, bold=True, color='e74a3b')
-    zero_font = Font(name='Arial', size=9, bold=True, color='1cc88a')
-    
-    # Footer Styles
     footer_font = Font(name='Arial', size=8, italic=True, color='666666')
     
+    # School header
+    export.add_style('school_title', Font(name='Arial', size=18, bold=True, color='4e73df'), alignment=centre)
+    export.add_style('school_subtitle', Font(name='Arial', size=11, bold=False, color='666666'), alignment=centre)
+    export.add_style('school_info', Font(name='Arial', size=10, bold=False, color='333333'), alignment=centre)
+    
+    # Summary section
+    export.add_style('section_header', Font(name='Arial', size=12, bold=True, color='FFFFFF'),
+                     solid_fill('4e73df'), box_border('medium', '4e73df'), centered(wrap_text=True))
+    export.add_style('summary_label', Font(name='Arial', size=10, bold=True, color='4e73df'), border=summary_border)
+    export.add_style('summary_value', Font(name='Arial', size=12, bold=True, color='333333'), border=summary_border)
+    export.add_style('summary_blank', border=summary_border)
+    
+    # Filter section
+    export.add_style('filter_header', Font(name='Arial', size=10, bold=True, color='856404'),
+                     filter_fill, filter_border, centre)
+    export.add_style('filter_text', Font(name='Arial', size=9, color='856404'),
+                     filter_fill, filter_border, left_aligned())
+    export.add_style('filter_none', Font(name='Arial', size=9, color='856404'),
+                     filter_fill, filter_border, centre)
+    
+    # Table
+    export.add_style('table_header', Font(name='Arial', size=10, bold=True, color='FFFFFF'),
+                     solid_fill('4e73df'), box_border('medium', '224abe'), centered(wrap_text=True))
+    export.add_style('cell_text', cell_font, border=cell_border, alignment=left_aligned())
+    export.add_style('cell_date', cell_font, border=cell_border, alignment=centre)
+    export.add_style('cell_amount', Font(name='Arial', size=9, bold=True), border=cell_border,
+                     alignment=amount_alignment, number_format='#,##0.00')
+    export.add_style('cell_remaining_due', Font(name='Arial', size=9, bold=True, color='e74a3b'),
+                     border=cell_border, alignment=amount_alignment, number_format='#,##0.00')
+    export.add_style('cell_remaining_clear', Font(name='Arial', size=9, bold=True, color='1cc88a'),
+                     border=cell_border, alignment=amount_alignment, number_format='#,##0.00')
+    for status, color in PAYMENT_STATUS_COLORS.items():
+        export.add_style(f'status_{status}', Font(name='Arial', size=9, bold=True, color=color),
+                         border=cell_border, alignment=centre)
+    
+    # Totals and footer
+    export.add_style('total_label', Font(bold=True), border=cell_border, alignment=amount_alignment)
+    export.add_style('total_amount', Font(bold=True, size=10), border=cell_border,
+                     alignment=amount_alignment, number_format='#,##0.00')
+    export.add_style('total_count', Font(bold=True, size=10), border=cell_border, alignment=centre)
+    export.add_style('no_data', Font(italic=True, color='666666'), border=cell_border, alignment=centre)
+    export.add_style('footer', footer_font, alignment=centre)
+    
+    # The table starts after the header (5 rows), the summary (5 rows)
+    # and the filters section (3 rows with filters, 2 without)
+    header_row = 14 if filters else 13
+    ws = export.add_sheet(
+        "Hostel Payments",
+        column_widths=[16, 34, 16, 12, 10, 28, 10, 16, 17, 16, 18, 20, 16, 18, 14],
+        freeze_row=header_row + 1
+    )
+    
     # ============================================
     # Build School Header (Rows 1-5)
     # ============================================
-    
-    # School Logo/Name
-    ws.merge_cells('A1:O1')
-    school_title = ws.cell(row=1, column=1, value="MOUNT KILIMANJARO UNIVERSITY")
-    school_title.font = school_title_font
-    school_title.alignment = Alignment(horizontal='center', vertical='center')
-    
-    # School Subtitle
-    ws.merge_cells('A2:O2')
-    school_subtitle = ws.cell(row=2, column=1, value="Hostel Management System - Payment Report")
-    school_subtitle.font = school_subtitle_font
-    school_subtitle.alignment = Alignment(horizontal='center', vertical='center')
-    
-    # School Contact Info
-    ws.merge_cells('A3:O3')
-    contact_info = ws.cell(row=3, column=1, value="P.O. Box 1234, Moshi, Tanzania | Tel: +255 123 456 789 | Email: finance@mkuniversity.ac.tz")
-    contact_info.font = school_info_font
-    contact_info.alignment = Alignment(horizontal='center', vertical='center')
-    
-    # Generation Info
-    ws.merge_cells('A4:O4')
     user_name = request.user.get_full_name() if request.user.get_full_name() else request.user.username
-    gen_info = ws.cell(row=4, column=1, value=f"Generated on: {timezone.now().strftime('%d/%m/%Y %H:%M:%S')} | Generated by: {user_name}")
-    gen_info.font = school_info_font
-    gen_info.alignment = Alignment(horizontal='center', vertical='center')
-    
-    # Empty row for spacing
-    ws.merge_cells('A5:O5')
-    ws.cell(row=5, column=1, value="")
+    ws.append_merged("MOUNT KILIMANJARO UNIVERSITY", 'school_title', 15)
+    ws.append_merged("Hostel Management System - Payment Report", 'school_subtitle', 15)
+    ws.append_merged(
+        "P.O. Box 1234, Moshi, Tanzania | Tel: +255 123 456 789 | Email: finance@mkuniversity.ac.tz",
+        'school_info', 15
+    )
+    ws.append_merged(
+        f"Generated on: {timezone.now().strftime('%d/%m/%Y %H:%M:%S')} | Generated by: {user_name}",
+        'school_info', 15
+    )
+    ws.append_merged("", columns=15)
     
     # ============================================
-    # Summary Statistics Section (Rows 6-11)
+    # Summary Statistics Section (Rows 6-10)
     # ============================================
+    ws.append_merged("SUMMARY STATISTICS", 'section_header', 15)
     
-    # Summary Header
-    ws.merge_cells('A6:O6')
-    summary_header = ws.cell(row=6, column=1, value="SUMMARY STATISTICS")
-    summary_header.font = section_header_font
-    summary_header.fill = section_header_fill
-    summary_header.alignment = section_header_alignment
-    summary_header.border = section_header_border
-    
-    # Statistics Grid
     stats = [
         ('Total Transactions', total_transactions),
         ('Total Amount', f'TSh {total_amount:,.2f}'),
@@ -5858,43 +5887,22 @@ def hostel_payments_export_excel(request):
         ('Payment Types', ', '.join(transactions.values_list('payment_type', flat=True).distinct()) or 'All'),
     ]
     
-    stat_row = 7
-    for i, (label, value) in enumerate(stats):
-        col = (i % 3) * 5 + 1  # Distribute across 3 columns (1, 6, 11)
-        
-        # Label
-        label_cell = ws.cell(row=stat_row + (i//3)*2, column=col, value=f"{label}:")
-        label_cell.font = summary_label_font
-        label_cell.border = summary_cell_border
-        
-        # Value
-        value_cell = ws.cell(row=stat_row + (i//3)*2 + 1, column=col, value=value)
-        value_cell.font = summary_value_font
-        value_cell.border = summary_cell_border
-        
-        # Add empty cells to maintain grid structure (prevents merging issues)
-        for c in range(col + 1, min(col + 5, 16)):
-            if c <= 15:  # Ensure we don't go beyond column O
-                empty_cell = ws.cell(row=stat_row + (i//3)*2, column=c, value="")
-                empty_cell.border = summary_cell_border
-                empty_cell = ws.cell(row=stat_row + (i//3)*2 + 1, column=c, value="")
-                empty_cell.border = summary_cell_border
-    
-    # Empty row after summary
-    current_row = stat_row + 4
+    # Three statistics per row pair, five columns each: label row, then value row
+    for i in range(0, len(stats), 3):
+        labels, values = [], []
+        for label, value in stats[i:i + 3]:
+            labels.extend([f"{label}:", "", "", "", ""])
+            values.extend([value, "", "", "", ""])
+        blanks = {col: 'summary_blank' for col in range(1, 16) if col % 5 != 1}
+        ws.append(labels, style='summary_label', styles=blanks)
+        ws.append(values, style='summary_value', styles=blanks)
     
     # ============================================
     # Applied Filters Section (if any)
     # ============================================
     
     if filters:
-        ws.merge_cells(f'A{current_row}:O{current_row}')
-        filter_header = ws.cell(row=current_row, column=1, value="APPLIED FILTERS")
-        filter_header.font = filter_header_font
-        filter_header.fill = filter_fill
-        filter_header.alignment = Alignment(horizontal='center', vertical='center')
-        filter_header.border = filter_border
-        current_row += 1
+        ws.append_merged("APPLIED FILTERS", 'filter_header', 15)
         
         filter_text = []
         if filters.get('hostel_id'): 
@@ -5914,51 +5922,26 @@ def hostel_payments_export_excel(request):
         if filters.get('min_amount'): filter_text.append(f"Min Amount: TSh {float(filters['min_amount']):,.2f}")
         if filters.get('max_amount'): filter_text.append(f"Max Amount: TSh {float(filters['max_amount']):,.2f}")
         
-        ws.merge_cells(f'A{current_row}:O{current_row}')
-        filter_cell = ws.cell(row=current_row, column=1, value=" | ".join(filter_text))
-        filter_cell.font = filter_text_font
-        filter_cell.fill = filter_fill
-        filter_cell.alignment = Alignment(horizontal='left', vertical='center')
-        filter_cell.border = filter_border
-        current_row += 1
-        
-        # Empty row after filters
-        ws.merge_cells(f'A{current_row}:O{current_row}')
-        ws.cell(row=current_row, column=1, value="")
-        current_row += 1
+        ws.append_merged(" | ".join(filter_text), 'filter_text', 15)
+        ws.append_merged("", columns=15)
     else:
         # Show no filters message
-        ws.merge_cells(f'A{current_row}:O{current_row}')
-        no_filter = ws.cell(row=current_row, column=1, value="NO FILTERS APPLIED - Showing all transactions")
-        no_filter.font = filter_text_font
-        no_filter.fill = filter_fill
-        no_filter.alignment = Alignment(horizontal='center', vertical='center')
-        no_filter.border = filter_border
-        current_row += 2
+        ws.append_merged("NO FILTERS APPLIED - Showing all transactions", 'filter_none', 15)
+        ws.append_blank()
     
     # ============================================
     # Payment Data Table
     # ============================================
     
-    # Table Header
     headers = [
         'Receipt #', 'Student Name', 'Reg No', 'Class', 'Stream',
         'Hostel', 'Code', 'Amount (TSh)', 'Remaining (TSh)',
         'Payment Type', 'Method', 'Reference',
         'Payment Date', 'Created At', 'Status'
     ]
+    ws.append(headers, style='table_header')
     
-    header_row = current_row
-    for col_num, header in enumerate(headers, 1):
-        cell = ws.cell(row=header_row, column=col_num)
-        cell.value = header
-        cell.font = table_header_font
-        cell.fill = table_header_fill
-        cell.alignment = table_header_alignment
-        cell.border = table_header_border
-    
-    # Data rows
-    for row_num, transaction in enumerate(transactions, header_row + 1):
+    for transaction in transactions.iterator(chunk_size=EXPORT_CHUNK_SIZE):
         allocation = transaction.allocation
         student = allocation.student
         hostel = allocation.hostel
@@ -5967,18 +5950,15 @@ def hostel_payments_export_excel(request):
         if transaction.payment_type == 'installments' and transaction.installment_payment:
             remaining = transaction.installment_payment.remaining_amount
         else:
-            remaining = allocation.balance
+            remaining = transaction.allocation_balance
         
         # Determine status
         if remaining <= 0:
             status = 'FULLY PAID'
-            status_color = '1cc88a'
         elif transaction.amount > 0:
             status = 'PARTIAL'
-            status_color = 'e74a3b'
         else:
             status = 'UNPAID'
-            status_color = '6c757d'
         
         row_data = [
             transaction.receipt_number,
@@ -5998,140 +5978,45 @@ def hostel_payments_export_excel(request):
             status
         ]
         
-        for col_num, value in enumerate(row_data, 1):
-            cell = ws.cell(row=row_num, column=col_num)
-            cell.value = value
-            cell.font = cell_font
-            cell.border = cell_border
-            
-            # Apply specific styling
-            if col_num in [8, 9]:  # Amount columns
-                cell.font = amount_font
-                cell.alignment = amount_alignment
-                cell.number_format = '#,##0.00'
-                
-                # Color code remaining amount
-                if col_num == 9:
-                    if remaining <= 0:
-                        cell.font = zero_font
-                    else:
-                        cell.font = positive_font
-            elif col_num in [13, 14]:  # Date columns
-                cell.alignment = Alignment(horizontal='center', vertical='center')
-            elif col_num == 15:  # Status column
-                cell.font = Font(name='Arial', size=9, bold=True, color=status_color)
-                cell.alignment = Alignment(horizontal='center', vertical='center')
-            else:
-                cell.alignment = Alignment(horizontal='left', vertical='center')
+        ws.append(row_data, style='cell_text', styles={
+            8: 'cell_amount',
+            9: 'cell_remaining_clear' if remaining <= 0 else 'cell_remaining_due',
+            13: 'cell_date',
+            14: 'cell_date',
+            15: f'status_{status}',
+        })
     
     # ============================================
     # Totals Row
     # ============================================
     
-    if transactions.exists():
-        total_row = header_row + len(transactions) + 1
-        
-        # Total label
-        total_label_cell = ws.cell(row=total_row, column=6, value="GRAND TOTAL:")
-        total_label_cell.font = Font(bold=True)
-        total_label_cell.alignment = Alignment(horizontal='right', vertical='center')
-        total_label_cell.border = cell_border
-        
-        # Total amount
-        total_amount_cell = ws.cell(row=total_row, column=8, value=float(total_amount))
-        total_amount_cell.font = Font(bold=True, size=10)
-        total_amount_cell.alignment = amount_alignment
-        total_amount_cell.number_format = '#,##0.00'
-        total_amount_cell.border = cell_border
-        
-        # Total transactions count
-        total_count_cell = ws.cell(row=total_row, column=15, value=f"Count: {total_transactions}")
-        total_count_cell.font = Font(bold=True, size=10)
-        total_count_cell.alignment = Alignment(horizontal='center', vertical='center')
-        total_count_cell.border = cell_border
-        
-        footer_row = total_row + 2
+    last_data_row = ws.row_count
+    if total_transactions:
+        ws.append(
+            [None] * 5 + ["GRAND TOTAL:", None, float(total_amount)] + [None] * 6 + [f"Count: {total_transactions}"],
+            styles={6: 'total_label', 8: 'total_amount', 15: 'total_count'}
+        )
     else:
         # No transactions - show message
-        no_data_row = header_row + 1
-        ws.merge_cells(f'A{no_data_row}:O{no_data_row}')
-        no_data_cell = ws.cell(row=no_data_row, column=1, value="No payment transactions found matching the criteria.")
-        no_data_cell.font = Font(italic=True, color='666666')
-        no_data_cell.alignment = Alignment(horizontal='center', vertical='center')
-        no_data_cell.border = cell_border
-        
-        footer_row = no_data_row + 2
+        ws.append_merged("No payment transactions found matching the criteria.", 'no_data', 15)
+    ws.append_blank()
     
     # ============================================
     # Footer Section
     # ============================================
     
-    # Report generation note
-    ws.merge_cells(f'A{footer_row}:O{footer_row}')
-    footer_note = ws.cell(row=footer_row, column=1, 
-                          value="This is a computer-generated report. No signature is required.")
-    footer_note.font = footer_font
-    footer_note.alignment = Alignment(horizontal='center', vertical='center')
-    
-    # Confidentiality notice
-    ws.merge_cells(f'A{footer_row + 1}:O{footer_row + 1}')
-    confidential = ws.cell(row=footer_row + 1, column=1, 
-                          value="CONFIDENTIAL: This report contains financial information and is intended for authorized personnel only.")
-    confidential.font = footer_font
-    confidential.alignment = Alignment(horizontal='center', vertical='center')
-    
-    # ============================================
-    # Auto-adjust Column Widths
-    # ============================================
-    
-    # Fix for MergedCell issue - iterate through columns properly
-    for col_idx in range(1, ws.max_column + 1):
-        max_length = 0
-        column_letter = get_column_letter(col_idx)
-        
-        # Iterate through rows in this column
-        for row_idx in range(1, ws.max_row + 1):
-            cell = ws.cell(row=row_idx, column=col_idx)
-            if cell.value and not isinstance(cell, openpyxl.cell.cell.MergedCell):
-                try:
-                    cell_length = len(str(cell.value))
-                    if cell_length > max_length:
-                        max_length = cell_length
-                except:
-                    pass
-        
-        # Set width with limits
-        adjusted_width = min(max_length + 4, 60)  # Max 60 characters
-        if column_letter in ['B', 'F']:  # Student Name and Hostel columns get more space
-            adjusted_width = min(max_length + 8, 70)
-        ws.column_dimensions[column_letter].width = adjusted_width
-    
-    # ============================================
-    # Freeze Panes
-    # ============================================
-    
-    ws.freeze_panes = ws.cell(row=header_row + 1, column=1)
-    
-    # ============================================
-    # Add Data Validation and Filters
-    # ============================================
+    ws.append_merged("This is a computer-generated report. No signature is required.", 'footer', 15)
+    ws.append_merged(
+        "CONFIDENTIAL: This report contains financial information and is intended for authorized personnel only.",
+        'footer', 15
+    )
     
-    if transactions.exists():
+    if total_transactions:
         # Add autofilter to table headers
-        ws.auto_filter.ref = f"A{header_row}:O{header_row + len(transactions)}"
+        ws.auto_filter(header_row, last_data_row, 15)
     
-    # ============================================
-    # Create Response
-    # ============================================
-    
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
     filename = f"hostel_payments_report_{timezone.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    response['Content-Disposition'] = f'attachment; filename={filename}'
-    
-    wb.save(response)
-    return response
+    return export.response(filename)
 
 
 @login_required
@@ -6193,15 +6078,9 @@ def hostel_payments_export_pdf(request):
         'request': request,
     })
     
-    # Generate PDF
-    html = HTML(string=html_string, base_url=request.build_absolute_uri('/'))
-    
-    # Create response
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename=hostel_payments_{timezone.now().strftime("%Y%m%d_%H%M%S")}.pdf'
-    
-    html.write_pdf(response)
-    return response
+    # Rendered to PDF by the report worker
+    filename = f'hostel_payments_{timezone.now().strftime("%Y%m%d_%H%M%S")}.pdf'
+    return pdf_job_response(request, html_string, filename, report_type='hostel_payments')
 
 
 def get_payment_filters_from_request(request):
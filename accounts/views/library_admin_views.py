@@ -3,11 +3,16 @@ from datetime import date
 import json
 from django.shortcuts import render, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponse, JsonResponse
+from django.http import JsonResponse
 from django.db import IntegrityError
 from django.core.exceptions import ValidationError
 from django.db.models import ProtectedError
-from weasyprint import HTML
+from openpyxl.styles import Alignment, Font
+from core.data_export import streaming_export_response
+from core.excel_export import (
+    EXPORT_CHUNK_SIZE, StreamingExcelExport, box_border, centered, left_aligned, solid_fill
+)
+from core.reports import pdf_job_response
 from library.models import BookCategory, Book, BookBorrow, BookCopy, BookReturn, BorrowingRules
 from accounts.models import Staffs
 from students.models import Student
@@ -2261,100 +2266,8 @@ def book_borrows_list(request):
     date_from = request.GET.get('date_from', '')
     date_to = request.GET.get('date_to', '')
     
-    # Apply filters
-    if status_filter:
-        borrows = borrows.filter(status=status_filter)
-    
-    if borrower_type_filter:
-        if borrower_type_filter == 'staff':
-            borrows = borrows.filter(borrower_type='staff')
-        elif borrower_type_filter == 'student':
-            borrows = borrows.filter(borrower_type='student')
-    
-    if borrower_filter:
-        # Search in both staff and student borrowers
-        borrows = borrows.filter(
-            Q(staff_borrower__admin__username__icontains=borrower_filter) |
-            Q(staff_borrower__admin__first_name__icontains=borrower_filter) |
-            Q(staff_borrower__admin__last_name__icontains=borrower_filter) |
-            Q(student_borrower__first_name__icontains=borrower_filter) |
-            Q(student_borrower__last_name__icontains=borrower_filter) |
-            Q(student_borrower__registration_number__icontains=borrower_filter)
-        )
-    
-    if book_filter:
-        borrows = borrows.filter(
-            Q(book__title__icontains=book_filter) |
-            Q(book__author__icontains=book_filter) |
-            Q(book__isbn__icontains=book_filter) |
-            Q(book__accession_number__icontains=book_filter)
-        )
-    
-    if issued_by_filter:
-        borrows = borrows.filter(issued_by__username__icontains=issued_by_filter)
-    
-    # Apply date range filter
-    if date_range_filter:
-        today = timezone.now().date()
-        
-        if date_range_filter == 'today':
-            borrows = borrows.filter(borrow_date=today)
-        elif date_range_filter == 'yesterday':
-            yesterday = today - timedelta(days=1)
-            borrows = borrows.filter(borrow_date=yesterday)
-        elif date_range_filter == 'this_week':
-            start_of_week = today - timedelta(days=today.weekday())
-            borrows = borrows.filter(borrow_date__gte=start_of_week)
-        elif date_range_filter == 'last_week':
-            start_of_last_week = today - timedelta(days=today.weekday() + 7)
-            end_of_last_week = start_of_last_week + timedelta(days=6)
-            borrows = borrows.filter(borrow_date__range=[start_of_last_week, end_of_last_week])
-        elif date_range_filter == 'this_month':
-            start_of_month = today.replace(day=1)
-            borrows = borrows.filter(borrow_date__gte=start_of_month)
-        elif date_range_filter == 'last_month':
-            first_day_of_last_month = (today.replace(day=1) - timedelta(days=1)).replace(day=1)
-            last_day_of_last_month = today.replace(day=1) - timedelta(days=1)
-            borrows = borrows.filter(borrow_date__range=[first_day_of_last_month, last_day_of_last_month])
-        elif date_range_filter == 'last_30_days':
-            thirty_days_ago = today - timedelta(days=30)
-            borrows = borrows.filter(borrow_date__gte=thirty_days_ago)
-        elif date_range_filter == 'last_90_days':
-            ninety_days_ago = today - timedelta(days=90)
-            borrows = borrows.filter(borrow_date__gte=ninety_days_ago)
-        elif date_range_filter == 'this_year':
-            start_of_year = today.replace(month=1, day=1)
-            borrows = borrows.filter(borrow_date__gte=start_of_year)
-    
-    # Apply custom date range
-    if date_from and date_to:
-        try:
-            from_date = timezone.datetime.strptime(date_from, '%Y-%m-%d').date()
-            to_date = timezone.datetime.strptime(date_to, '%Y-%m-%d').date()
-            borrows = borrows.filter(borrow_date__range=[from_date, to_date])
-        except ValueError:
-            pass
-    
-    # Apply fine status filter
-    if fine_status_filter:
-        if fine_status_filter == 'with_fine':
-            borrows = borrows.filter(fine_amount__gt=0)
-        elif fine_status_filter == 'no_fine':
-            borrows = borrows.filter(fine_amount=0)
-        elif fine_status_filter == 'paid':
-            borrows = borrows.filter(fine_balance=0, fine_amount__gt=0)
-        elif fine_status_filter == 'partial':
-            borrows = borrows.filter(fine_balance__gt=0, fine_balance__lt=F('fine_amount'))
-    
-    # Apply renewal status filter
-    if renewal_status_filter:
-        if renewal_status_filter == 'renewed':
-            borrows = borrows.filter(renewed_count__gt=0)
-        elif renewal_status_filter == 'not_renewed':
-            borrows = borrows.filter(renewed_count=0)
-        elif renewal_status_filter == 'can_renew':
-            # Borrows that are active and have renewals left (assuming max 2 renewals)
-            borrows = borrows.filter(status='active', renewed_count__lt=2)
+    # Apply filters (shared with the borrows exports)
+    borrows, _ = filter_book_borrows(request, borrows)
     
     # Calculate comprehensive statistics
     total_borrows = borrows.count()
@@ -3663,16 +3576,9 @@ def export_borrow_details_pdf(request, borrow_id):
         # Render HTML template
         html_string = render_to_string('admin/library/reports/borrow_details_pdf.html', context)
         
-        # Create PDF using WeasyPrint
-        html = HTML(string=html_string)
-        pdf_file = html.write_pdf()
-
-        # Create HTTP response with PDF
-        response = HttpResponse(pdf_file, content_type='application/pdf')
+        # Rendered to PDF by the report worker
         filename = f'borrow_details_{borrow.book.title.replace(" ", "_")}_{borrow.id}_{timezone.now().strftime("%Y%m%d_%H%M%S")}.pdf'
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        
-        return response
+        return pdf_job_response(request, html_string, filename, report_type='borrow_details')
 
     except BookBorrow.DoesNotExist:
         messages.error(request, 'Borrow record not found.')
@@ -3992,9 +3898,262 @@ def update_book_borrow(request, borrow):
         })
 
     
+def filter_book_borrows(request, borrows):
+    """
+    Apply the report filters in request.GET to ``borrows``.
+    Returns the filtered queryset and the applied filters for display.
+    """
+    filters = {}
+    
+    # Get filter parameters from request
+    status_filter = request.GET.get('status', '')
+    borrower_type_filter = request.GET.get('borrower_type', '')
+    borrower_filter = request.GET.get('borrower', '')
+    book_filter = request.GET.get('book', '')
+    date_from = request.GET.get('date_from', '')
+    date_to = request.GET.get('date_to', '')
+    date_range = request.GET.get('date_range', '')
+    fine_status_filter = request.GET.get('fine_status', '')
+    renewal_status_filter = request.GET.get('renewal_status', '')
+    issued_by_filter = request.GET.get('issued_by', '')
+    
+    # Apply status filter
+    if status_filter:
+        borrows = borrows.filter(status=status_filter)
+        filters['status'] = dict(BookBorrow.BORROW_STATUS_CHOICES).get(status_filter, status_filter)
+    
+    # Apply borrower type filter
+    if borrower_type_filter:
+        borrows = borrows.filter(borrower_type=borrower_type_filter)
+        filters['borrower_type'] = borrower_type_filter
+    
+    # Apply borrower search filter
+    if borrower_filter:
+        borrows = borrows.filter(
+            Q(staff_borrower__admin__username__icontains=borrower_filter) |
+            Q(staff_borrower__admin__first_name__icontains=borrower_filter) |
+            Q(staff_borrower__admin__last_name__icontains=borrower_filter) |
+            Q(student_borrower__first_name__icontains=borrower_filter) |
+            Q(student_borrower__last_name__icontains=borrower_filter) |
+            Q(student_borrower__registration_number__icontains=borrower_filter)
+        )
+        filters['borrower'] = borrower_filter
+    
+    # Apply book search filter
+    if book_filter:
+        borrows = borrows.filter(
+            Q(book__title__icontains=book_filter) |
+            Q(book__author__icontains=book_filter) |
+            Q(book__isbn__icontains=book_filter) |
+            Q(book__accession_number__icontains=book_filter)
+        )
+        filters['book'] = book_filter
+    
+    # Apply date range filter
+    if date_range:
+        today = timezone.now().date()
+        
+        if date_range == 'today':
+            borrows = borrows.filter(borrow_date=today)
+            filters['date_range'] = 'Today'
+        elif date_range == 'yesterday':
+            yesterday = today - timedelta(days=1)
+            borrows = borrows.filter(borrow_date=yesterday)
+            filters['date_range'] = 'Yesterday'
+        elif date_range == 'this_week':
+            start_of_week = today - timedelta(days=today.weekday())
+            borrows = borrows.filter(borrow_date__gte=start_of_week)
+            filters['date_range'] = 'This Week'
+        elif date_range == 'last_week':
+            start_of_last_week = today - timedelta(days=today.weekday() + 7)
+            end_of_last_week = start_of_last_week + timedelta(days=6)
+            borrows = borrows.filter(borrow_date__range=[start_of_last_week, end_of_last_week])
+            filters['date_range'] = 'Last Week'
+        elif date_range == 'this_month':
+            start_of_month = today.replace(day=1)
+            borrows = borrows.filter(borrow_date__gte=start_of_month)
+            filters['date_range'] = 'This Month'
+        elif date_range == 'last_month':
+            first_day_of_last_month = (today.replace(day=1) - timedelta(days=1)).replace(day=1)
+            last_day_of_last_month = today.replace(day=1) - timedelta(days=1)
+            borrows = borrows.filter(borrow_date__range=[first_day_of_last_month, last_day_of_last_month])
+            filters['date_range'] = 'Last Month'
+        elif date_range == 'last_30_days':
+            thirty_days_ago = today - timedelta(days=30)
+            borrows = borrows.filter(borrow_date__gte=thirty_days_ago)
+            filters['date_range'] = 'Last 30 Days'
+        elif date_range == 'last_90_days':
+            ninety_days_ago = today - timedelta(days=90)
+            borrows = borrows.filter(borrow_date__gte=ninety_days_ago)
+            filters['date_range'] = 'Last 90 Days'
+        elif date_range == 'this_year':
+            start_of_year = today.replace(month=1, day=1)
+            borrows = borrows.filter(borrow_date__gte=start_of_year)
+            filters['date_range'] = 'This Year'
+    
+    # Apply custom date range
+    if date_from and date_to:
+        try:
+            from_date = timezone.datetime.strptime(date_from, '%Y-%m-%d').date()
+            to_date = timezone.datetime.strptime(date_to, '%Y-%m-%d').date()
+            borrows = borrows.filter(borrow_date__range=[from_date, to_date])
+            filters['date_from'] = date_from
+            filters['date_to'] = date_to
+        except ValueError:
+            pass
+    
+    # Apply issuer filter
+    if issued_by_filter:
+        borrows = borrows.filter(issued_by__admin__username__icontains=issued_by_filter)
+        filters['issued_by'] = issued_by_filter
+    
+    # Apply fine status filter
+    if fine_status_filter == 'with_fine':
+        borrows = borrows.filter(fine_amount__gt=0)
+    elif fine_status_filter == 'no_fine':
+        borrows = borrows.filter(fine_amount=0)
+    elif fine_status_filter == 'paid':
+        borrows = borrows.filter(fine_balance=0, fine_amount__gt=0)
+    elif fine_status_filter == 'partial':
+        borrows = borrows.filter(fine_balance__gt=0, fine_balance__lt=F('fine_amount'))
+    if fine_status_filter:
+        filters['fine_status'] = fine_status_filter.replace('_', ' ').title()
+    
+    # Apply renewal status filter
+    if renewal_status_filter == 'renewed':
+        borrows = borrows.filter(renewed_count__gt=0)
+    elif renewal_status_filter == 'not_renewed':
+        borrows = borrows.filter(renewed_count=0)
+    elif renewal_status_filter == 'can_renew':
+        # Borrows that are active and have renewals left (assuming max 2 renewals)
+        borrows = borrows.filter(status='active', renewed_count__lt=2)
+    if renewal_status_filter:
+        filters['renewal_status'] = renewal_status_filter.replace('_', ' ').title()
+    
+    return borrows, filters
+
+
+def export_book_borrows_excel(request, borrows, filters):
+    """Stream the filtered borrows into a write-only Excel workbook"""
+    export = StreamingExcelExport()
+    cell_border = box_border('thin', 'd1d3e2')
+    cell_font = Font(name='Calibri', size=10)
+    
+    export.add_style('title', Font(name='Calibri', size=14, bold=True, color='1F4E79'), alignment=centered())
+    export.add_style('info', Font(name='Calibri', size=10, italic=True), alignment=centered())
+    export.add_style('header', Font(name='Calibri', size=11, bold=True, color='FFFFFF'),
+                     solid_fill('4e73df'), cell_border, centered(wrap_text=True))
+    export.add_style('cell', cell_font, border=cell_border, alignment=left_aligned())
+    export.add_style('cell_center', cell_font, border=cell_border, alignment=centered())
+    export.add_style('cell_amount', cell_font, border=cell_border,
+                     alignment=Alignment(horizontal='right', vertical='center'), number_format='#,##0.00')
+    export.add_style('cell_overdue', Font(name='Calibri', size=10, bold=True, color='C00000'),
+                     solid_fill('FFC7CE'), cell_border, centered())
+    
+    headers = [
+        '#', 'Borrower', 'Borrower Type', 'Registration No.', 'Book Title', 'Author',
+        'Copy #', 'Borrow Date', 'Due Date', 'Return Date', 'Status', 'Overdue Days',
+        'Fine (TZS)', 'Fine Paid', 'Balance', 'Renewals', 'Issued By'
+    ]
+    ws = export.add_sheet(
+        'Book Borrows',
+        column_widths=[6, 28, 14, 18, 34, 24, 8, 13, 13, 13, 12, 13, 13, 13, 13, 10, 22],
+        freeze_row=5
+    )
+    
+    filter_text = " | ".join(
+        f"{key.replace('_', ' ').title()}: {value}" for key, value in filters.items()
+    ) or "No filters applied"
+    user_name = request.user.get_full_name() or request.user.username
+    ws.append_merged("BOOK BORROWS REPORT", 'title', len(headers))
+    ws.append_merged(filter_text, 'info', len(headers))
+    ws.append_merged(
+        f"Generated on: {timezone.now().strftime('%d/%m/%Y %H:%M:%S')} | Generated by: {user_name}",
+        'info', len(headers)
+    )
+    ws.append(headers, style='header')
+    
+    center_columns = {col: 'cell_center' for col in (1, 3, 7, 8, 9, 10, 11, 12, 16)}
+    amount_columns = {col: 'cell_amount' for col in (13, 14, 15)}
+    
+    for row_num, borrow in enumerate(borrows.iterator(chunk_size=EXPORT_CHUNK_SIZE), 1):
+        student = borrow.student_borrower if borrow.borrower_type == 'student' else None
+        issued_by = borrow.issued_by.admin if borrow.issued_by and borrow.issued_by.admin else None
+        overdue_days = borrow.calculate_overdue_days()
+        
+        styles = {**center_columns, **amount_columns}
+        if borrow.status == 'overdue':
+            styles[11] = 'cell_overdue'
+        
+        ws.append([
+            row_num,
+            borrow.get_borrower_name(),
+            borrow.get_borrower_type_display(),
+            student.registration_number if student and student.registration_number else 'N/A',
+            borrow.book.title,
+            borrow.book.author,
+            borrow.book_copy.copy_number if borrow.book_copy else 'N/A',
+            borrow.borrow_date.strftime('%d/%m/%Y') if borrow.borrow_date else 'N/A',
+            borrow.due_date.strftime('%d/%m/%Y') if borrow.due_date else 'N/A',
+            borrow.actual_return_date.strftime('%d/%m/%Y') if borrow.actual_return_date else '-',
+            borrow.get_status_display().upper(),
+            overdue_days,
+            float(borrow.fine_amount),
+            float(borrow.fine_paid),
+            float(borrow.fine_balance),
+            borrow.renewed_count,
+            (issued_by.get_full_name() or issued_by.username) if issued_by else 'N/A',
+        ], style='cell', styles=styles)
+    
+    ws.auto_filter(4, ws.row_count, len(headers))
+    
+    filename = f'book_borrows_report_{timezone.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
+    return export.response(filename)
+
+
+@login_required
+def export_book_borrows_data(request):
+    """
+    Stream the filtered book borrows as CSV or NDJSON (?format=csv|ndjson),
+    using the same filters as the borrows list
+    """
+    borrows, _ = filter_book_borrows(request, BookBorrow.objects.all())
+    
+    columns = [
+        ('id', 'id'),
+        ('borrower_type', 'borrower_type'),
+        ('student_id', 'student_borrower_id'),
+        ('student_registration_number', 'student_borrower__registration_number'),
+        ('student_first_name', 'student_borrower__first_name'),
+        ('student_last_name', 'student_borrower__last_name'),
+        ('staff_id', 'staff_borrower_id'),
+        ('staff_username', 'staff_borrower__admin__username'),
+        ('book_id', 'book_id'),
+        ('book_title', 'book__title'),
+        ('book_author', 'book__author'),
+        ('accession_number', 'book__accession_number'),
+        ('copy_number', 'book_copy__copy_number'),
+        ('borrow_date', 'borrow_date'),
+        ('due_date', 'due_date'),
+        ('actual_return_date', 'actual_return_date'),
+        ('status', 'status'),
+        ('renewed_count', 'renewed_count'),
+        ('fine_amount', 'fine_amount'),
+        ('fine_paid', 'fine_paid'),
+        ('fine_balance', 'fine_balance'),
+        ('issued_by', 'issued_by__admin__username'),
+    ]
+    return streaming_export_response(
+        request, borrows, columns, f'book_borrows_{timezone.now().strftime("%Y%m%d_%H%M%S")}'
+    )
+
+
 @login_required
 def export_book_borrows(request):
-    """Export book borrows to PDF using WeasyPrint with comprehensive filtering"""
+    """
+    Export book borrows to PDF using WeasyPrint with comprehensive filtering
+    ?format=excel streams the same rows into an Excel workbook instead
+    """
     try:
         # Get all borrows with related data
         borrows = BookBorrow.objects.select_related(
@@ -4008,102 +4167,10 @@ def export_book_borrows(request):
             'fine_payments'
         ).order_by('-borrow_date', '-created_at')
         
-        # Initialize filters dictionary
-        filters = {}
-        
-        # Get filter parameters from request
-        status_filter = request.GET.get('status', '')
-        borrower_type_filter = request.GET.get('borrower_type', '')
-        borrower_filter = request.GET.get('borrower', '')
-        book_filter = request.GET.get('book', '')
-        date_from = request.GET.get('date_from', '')
-        date_to = request.GET.get('date_to', '')
-        date_range = request.GET.get('date_range', '')
-        
-        # Apply status filter
-        if status_filter:
-            borrows = borrows.filter(status=status_filter)
-            filters['status'] = dict(BookBorrow.BORROW_STATUS_CHOICES).get(status_filter, status_filter)
-        
-        # Apply borrower type filter
-        if borrower_type_filter:
-            borrows = borrows.filter(borrower_type=borrower_type_filter)
-            filters['borrower_type'] = borrower_type_filter
-        
-        # Apply borrower search filter
-        if borrower_filter:
-            borrows = borrows.filter(
-                Q(staff_borrower__admin__username__icontains=borrower_filter) |
-                Q(staff_borrower__admin__first_name__icontains=borrower_filter) |
-                Q(staff_borrower__admin__last_name__icontains=borrower_filter) |
-                Q(student_borrower__first_name__icontains=borrower_filter) |
-                Q(student_borrower__last_name__icontains=borrower_filter) |
-                Q(student_borrower__registration_number__icontains=borrower_filter)
-            )
-            filters['borrower'] = borrower_filter
-        
-        # Apply book search filter
-        if book_filter:
-            borrows = borrows.filter(
-                Q(book__title__icontains=book_filter) |
-                Q(book__author__icontains=book_filter) |
-                Q(book__isbn__icontains=book_filter) |
-                Q(book__accession_number__icontains=book_filter)
-            )
-            filters['book'] = book_filter
+        borrows, filters = filter_book_borrows(request, borrows)
         
-        # Apply date range filter
-        if date_range:
-            today = timezone.now().date()
-            
-            if date_range == 'today':
-                borrows = borrows.filter(borrow_date=today)
-                filters['date_range'] = 'Today'
-            elif date_range == 'yesterday':
-                yesterday = today - timedelta(days=1)
-                borrows = borrows.filter(borrow_date=yesterday)
-                filters['date_range'] = 'Yesterday'
-            elif date_range == 'this_week':
-                start_of_week = today - timedelta(days=today.weekday())
-                borrows = borrows.filter(borrow_date__gte=start_of_week)
-                filters['date_range'] = 'This Week'
-            elif date_range == 'last_week':
-                start_of_last_week = today - timedelta(days=today.weekday() + 7)
-                end_of_last_week = start_of_last_week + timedelta(days=6)
-                borrows = borrows.filter(borrow_date__range=[start_of_last_week, end_of_last_week])
-                filters['date_range'] = 'Last Week'
-            elif date_range == 'this_month':
-                start_of_month = today.replace(day=1)
-                borrows = borrows.filter(borrow_date__gte=start_of_month)
-                filters['date_range'] = 'This Month'
-            elif date_range == 'last_month':
-                first_day_of_last_month = (today.replace(day=1) - timedelta(days=1)).replace(day=1)
-                last_day_of_last_month = today.replace(day=1) - timedelta(days=1)
-                borrows = borrows.filter(borrow_date__range=[first_day_of_last_month, last_day_of_last_month])
-                filters['date_range'] = 'Last Month'
-            elif date_range == 'last_30_days':
-                thirty_days_ago = today - timedelta(days=30)
-                borrows = borrows.filter(borrow_date__gte=thirty_days_ago)
-                filters['date_range'] = 'Last 30 Days'
-            elif date_range == 'last_90_days':
-                ninety_days_ago = today - timedelta(days=90)
-                borrows = borrows.filter(borrow_date__gte=ninety_days_ago)
-                filters['date_range'] = 'Last 90 Days'
-            elif date_range == 'this_year':
-                start_of_year = today.replace(month=1, day=1)
-                borrows = borrows.filter(borrow_date__gte=start_of_year)
-                filters['date_range'] = 'This Year'
-        
-        # Apply custom date range
-        if date_from and date_to:
-            try:
-                from_date = timezone.datetime.strptime(date_from, '%Y-%m-%d').date()
-                to_date = timezone.datetime.strptime(date_to, '%Y-%m-%d').date()
-                borrows = borrows.filter(borrow_date__range=[from_date, to_date])
-                filters['date_from'] = date_from
-                filters['date_to'] = date_to
-            except ValueError:
-                pass
+        if request.GET.get('format') == 'excel':
+            return export_book_borrows_excel(request, borrows, filters)
         
         # Calculate comprehensive statistics
         total_borrows = borrows.count()
@@ -4172,18 +4239,9 @@ def export_book_borrows(request):
         # Render HTML template
         html_string = render_to_string('admin/library/reports/book_borrows_pdf.html', context)
         
-        # Create PDF with WeasyPrint
-        html = HTML(string=html_string)
-        pdf_file = html.write_pdf()
-        
-        # Create HTTP response with PDF
-        response = HttpResponse(pdf_file, content_type='application/pdf')
-        
-        # Generate filename
+        # Rendered to PDF by the report worker
         filename = f'book_borrows_report_{timezone.now().strftime("%Y%m%d_%H%M%S")}.pdf'
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        
-        return response
+        return pdf_job_response(request, html_string, filename, report_type='book_borrows')
         
     except Exception as e:
         messages.error(request, f'Error generating PDF report: {str(e)}')
@@ -4443,16 +4501,9 @@ def export_issued_books_pdf(request):
     # Render HTML template
     html_string = render_to_string('admin/library/reports/issued_books_pdf.html', context)
     
-    # Create PDF
-    html = HTML(string=html_string)
-    pdf_file = html.write_pdf()
-    
-    # Create HTTP response with PDF
-    response = HttpResponse(pdf_file, content_type='application/pdf')
+    # Rendered to PDF by the report worker
     filename = f'issued_books_report_{timezone.now().strftime("%Y%m%d_%H%M%S")}.pdf'
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    
-    return response
+    return pdf_job_response(request, html_string, filename, report_type='issued_books')
 
 
 @login_required
@@ -4768,16 +4819,9 @@ def export_returned_books_pdf(request):
     # Render HTML template
     html_string = render_to_string('admin/library/reports/returned_books_pdf.html', context)
     
-    # Create PDF using WeasyPrint
-    html = HTML(string=html_string)
-    pdf_file = html.write_pdf()
-    
-    # Create HTTP response with PDF
-    response = HttpResponse(pdf_file, content_type='application/pdf')
+    # Rendered to PDF by the report worker
     filename = f'returned_books_report_{timezone.now().strftime("%Y%m%d_%H%M%S")}.pdf'
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    
-    return response
+    return pdf_job_response(request, html_string, filename, report_type='returned_books')
 
 
 @login_required
@@ -5219,13 +5263,6 @@ def export_overdue_books_pdf(request):
     # Render HTML template
     html_string = render_to_string('admin/library/reports/overdue_books_pdf.html', context)
     
-    # Create PDF using WeasyPrint
-    html = HTML(string=html_string)
-    pdf_file = html.write_pdf()
-    
-    # Create HTTP response with PDF
-    response = HttpResponse(pdf_file, content_type='application/pdf')
+    # Rendered to PDF by the report worker
     filename = f'overdue_books_report_{timezone.now().strftime("%Y%m%d_%H%M%S")}.pdf'
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    
-    return response
\ No newline at end of file
+    return pdf_job_response(request, html_string, filename, report_type='overdue_books')
\ No newline at end of file
@@ -3,9 +3,8 @@ import csv
 import json
 import math
 from datetime import date, datetime
-from decimal import Decimal, InvalidOperation
-from io import BytesIO
-import os
+from decimal import Decimal
+from io import StringIO
 from django.conf import settings
 from openpyxl.styles import PatternFill, Font, Border, Side, Alignment
 import openpyxl
@@ -16,9 +15,10 @@ from django.contrib.auth.decorators import login_required
 from django.core.exceptions import ValidationError
 from django.core.paginator import EmptyPage, Paginator
 from django.db import IntegrityError, transaction
-from django.db.models import Avg, Count, Max, Min, Q, Sum
+from django.db.models import Avg, Count, Max, Min, Q
 from django.http import HttpResponse, HttpResponseRedirect, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
 from django.utils import timezone
 from django.utils.timesince import timesince
 from django.views.decorators.http import (require_GET, require_http_methods,
@@ -27,11 +27,28 @@ from django.views.decorators.http import (require_GET, require_http_methods,
 from openpyxl.utils import get_column_letter
 from weasyprint import HTML
 
+from core.data_export import streaming_export_response
+from core.excel_export import XLSX_CONTENT_TYPE, StreamingExcelExport, box_border, centered, solid_fill
 from core.models import (AcademicYear, ClassLevel, EducationalLevel,
                          StreamClass, Subject, Term)
+from core.report_cache import get_cached_report, report_file_response, store_report
+from core.reports import enqueue_report, pdf_job_response, report_job_response
 from results.models import (DivisionScale, ExamSession, ExamType, GradingScale,
-                            StudentExamMetrics, StudentExamPosition,
-                            StudentResult)
+                            StudentResult, SubjectExamStatistics)
+from results.excel_import import MarksImport, SheetFormatError, iter_sheet_rows, rows_after_header
+from results.ingest import ingest_marks
+from results.history import student_exam_history
+from results.queue import recalculation_status
+from results.report_cache import session_report_key
+from results.snapshots import get_snapshot
+from results.scales import division_for_points, grade_for_mark
+from results import statistics as subject_statistics
+from results.analytics import exam_session_breakdown, grade_labels, is_primary_level, subject_breakdown
+from results.matrix import (build_results_matrix, session_students, session_subjects,
+                            student_results_in_session)
+from results.report_cards import report_card_context, report_card_filename, report_card_header
+from results.subject_ranks import get_subject_rank_index, get_subject_rank_indexes
+from results.trends import DEFAULT_WINDOW, get_class_trends, student_trends
 from results.utils import export_student_sessions_to_excel
 from students.models import Student
 
@@ -797,12 +814,8 @@ def calculate_division(request):
             total_points = float(total_points)
             education_level = EducationalLevel.objects.get(id=education_level_id)
             
-            # Get division scales for this education level
-            division_scale = DivisionScale.objects.filter(
-                education_level=education_level,
-                min_points__lte=total_points,
-                max_points__gte=total_points
-            ).first()
+            # Look up the division in the cached scale table
+            division_scale = division_for_points(education_level, total_points)
             
             if division_scale:
                 return JsonResponse({
@@ -1340,6 +1353,35 @@ def bulk_delete_exam_types(request):
 
 
 
+def filter_exam_sessions(exam_sessions, params):
+    """
+    Apply the exam session list filters in ``params`` (academic_year,
+    term, class_level, stream, status) to ``exam_sessions``.
+    """
+    academic_year_filter = params.get('academic_year', '')
+    term_filter = params.get('term', '')
+    class_level_filter = params.get('class_level', '')
+    stream_filter = params.get('stream', '')
+    status_filter = params.get('status', '')
+    
+    if academic_year_filter:
+        exam_sessions = exam_sessions.filter(academic_year_id=academic_year_filter)
+    
+    if term_filter:
+        exam_sessions = exam_sessions.filter(term_id=term_filter)
+    
+    if class_level_filter:
+        exam_sessions = exam_sessions.filter(class_level_id=class_level_filter)
+    
+    if stream_filter:
+        exam_sessions = exam_sessions.filter(stream_class_id=stream_filter)
+    
+    if status_filter:
+        exam_sessions = exam_sessions.filter(status=status_filter)
+    
+    return exam_sessions
+
+
 @login_required
 def exam_sessions_list(request):
     """Display exam sessions management page"""
@@ -1363,20 +1405,7 @@ def exam_sessions_list(request):
     status_filter = request.GET.get('status', '')
     
     # Apply filters
-    if academic_year_filter:
-        exam_sessions = exam_sessions.filter(academic_year_id=academic_year_filter)
-    
-    if term_filter:
-        exam_sessions = exam_sessions.filter(term_id=term_filter)
-    
-    if class_level_filter:
-        exam_sessions = exam_sessions.filter(class_level_id=class_level_filter)
-    
-    if stream_filter:
-        exam_sessions = exam_sessions.filter(stream_class_id=stream_filter)
-    
-    if status_filter:
-        exam_sessions = exam_sessions.filter(status=status_filter)
+    exam_sessions = filter_exam_sessions(exam_sessions, request.GET)
     
     # Count statistics
     total_sessions = exam_sessions.count()
@@ -1855,7 +1884,7 @@ def toggle_exam_session_status(request):
         'draft': ['submitted', 'draft'],
         'submitted': ['verified', 'draft'],
         'verified': ['published', 'submitted'],
-        'published': ['published']  # Once published, cannot change
+        'published': ['published', 'verified']  # Reopening unfreezes the results
     }
     
     if new_status not in allowed_transitions.get(current_status, []):
@@ -1888,7 +1917,7 @@ def toggle_exam_session_status(request):
         action_text = {
             'draft': 'returned to draft',
             'submitted': 'submitted for review',
-            'verified': 'verified',
+            'verified': 'reopened' if current_status == 'published' else 'verified',
             'published': 'published'
         }.get(new_status, 'updated')
         
@@ -2324,100 +2353,14 @@ def manage_results(request, exam_session_id):
         id=exam_session_id
     )
 
-    subjects = Subject.objects.filter(
-        educational_level=exam_session.class_level.educational_level,
-        is_active=True
-    ).order_by('code')
-
-    if exam_session.stream_class:
-        students = Student.objects.filter(
-            class_level=exam_session.class_level,
-            stream_class=exam_session.stream_class,
-            is_active=True
-        )
-    else:
-        students = Student.objects.filter(
-            class_level=exam_session.class_level,
-            is_active=True
-        )
-
-    students = students.order_by('first_name')
-
-    results = StudentResult.objects.filter(
-        exam_session=exam_session
-    ).select_related('student', 'subject')
-
-    student_results_data = []
-
-    for student in students:
-        student_results = results.filter(student=student)
-
-        subject_results = {}
-        total_subjects = 0
-
-        for subject in subjects:
-            result = student_results.filter(subject=subject).first()
-
-            if result:
-                subject_results[subject.id] = {
-                    'marks': result.marks_obtained,
-                    'grade': result.grade,
-                    'grade_point': result.grade_point,
-                    'position': result.position_in_paper,
-                    'result_id': result.id
-                }
-                if result.marks_obtained is not None:
-                    total_subjects += 1
-            else:
-                subject_results[subject.id] = {
-                    'marks': None,
-                    'grade': '',
-                    'grade_point': None,
-                    'position': None,
-                    'result_id': None
-                }
-
-        # 🔹 Pull pre-calculated exam metrics
-        try:
-            metrics = StudentExamMetrics.objects.get(
-                student=student,
-                exam_session=exam_session
-            )
-        except StudentExamMetrics.DoesNotExist:
-            metrics = None
-
-        # 🔹 Pull pre-calculated positions
-        try:
-            position = StudentExamPosition.objects.get(
-                student=student,
-                exam_session=exam_session
-            )
-        except StudentExamPosition.DoesNotExist:
-            position = None
-
-        student_results_data.append({
-            'student': student,
-            'student_id': student.id,
-            'registration_number': student.registration_number or f"S{student.id:04d}",
-            'full_name': student.full_name,
-            'gender': student.get_gender_display(),
-
-            # Metrics (already computed elsewhere)
-            'total_marks': metrics.total_marks if metrics else None,
-            'average_marks': metrics.average_marks if metrics else None,
-            'average_percentage': metrics.average_percentage if metrics else None,
-            'average_grade': metrics.average_grade if metrics else '',
-            'average_remark': metrics.average_remark if metrics else '',
-            'total_grade_points': metrics.total_grade_points if metrics else None,
-            'division': metrics.division if metrics else '',
-
-            # Positions
-            'class_position': position.class_position if position else None,
-            'stream_position': position.stream_position if position else None,
-
-            'subject_results': subject_results,
-            'has_results': total_subjects > 0
-        })
+    # Results, metrics and positions: one query each
+    matrix = build_results_matrix(
+        exam_session,
+        students=session_students(exam_session, order_by=('first_name',))
+    )
+    subjects = matrix.subjects
+    students = matrix.students
+    student_results_data = matrix.rows()
 
     context = {
         'exam_session': exam_session,
@@ -2441,7 +2384,6 @@ def save_student_results(request):
 
         exam_session_id = data.get('exam_session_id')
         results_data = data.get('results', [])
-        is_auto_save = data.get('is_auto_save', False)
 
         if not exam_session_id or not isinstance(results_data, list):
             return JsonResponse({
@@ -2449,95 +2391,38 @@ def save_student_results(request):
                 'message': 'Invalid data provided.'
             }, status=400)
 
-        exam_session = get_object_or_404(ExamSession, id=exam_session_id)
-
-        saved_results = []
-        saved_count = 0
-        skipped_count = 0
-
-        with transaction.atomic():
-            for result_data in results_data:
-                student_id = result_data.get('student_id')
-                subject_id = result_data.get('subject_id')
-                marks_obtained = result_data.get('marks_obtained')
-
-                # Required IDs
-                if not student_id or not subject_id:
-                    skipped_count += 1
-                    continue
-
-                # Allow empty marks (skip save)
-                if marks_obtained in ("", None):
-                    skipped_count += 1
-                    continue
-
-                # Ensure numeric (use Decimal to match model DecimalFields)
-                try:
-                    marks_obtained = Decimal(str(marks_obtained))
-                except (TypeError, ValueError, InvalidOperation):
-                    skipped_count += 1
-                    continue
-
-                # Enforce range 0–100
-                if marks_obtained < 0 or marks_obtained > 100:
-                    skipped_count += 1
-                    continue
-
-                # Save or update result
-                result, created = StudentResult.objects.get_or_create(
-                    exam_session=exam_session,
-                    student_id=student_id,
-                    subject_id=subject_id,
-                    defaults={'marks_obtained': marks_obtained}
-                )
-
-                if not created:
-                    result.marks_obtained = marks_obtained
-
-                # Percentage (use Decimal arithmetic)
-                max_score = exam_session.exam_type.max_score
-                if max_score and max_score > 0:
-                    try:
-                        max_score_decimal = Decimal(str(max_score))
-                        result.percentage = (marks_obtained / max_score_decimal) * Decimal('100')
-                    except (InvalidOperation, TypeError):
-                        result.percentage = None
-
-                # Grade calculation
-                education_level = exam_session.class_level.educational_level
-                grade_scale = GradingScale.objects.filter(
-                    education_level=education_level,
-                    min_mark__lte=marks_obtained,
-                    max_mark__gte=marks_obtained
-                ).first()
-
-                if grade_scale:
-                    result.grade = grade_scale.grade
-                    result.grade_point = Decimal(str(grade_scale.points))
-                else:
-                    result.grade = None
-                    result.grade_point = None
-
-                result.save()
-
-                saved_results.append({
-                    'student_id': student_id,
-                    'subject_id': subject_id,
-                    'result_id': result.id
-                })
+        exam_session = get_object_or_404(
+            ExamSession.objects.select_related('exam_type', 'class_level'),
+            id=exam_session_id
+        )
 
-                saved_count += 1
+        # Validate the whole payload, then write it in one upsert
+        summary = ingest_marks(
+            exam_session,
+            [
+                {
+                    'student_id': result_data.get('student_id'),
+                    'subject_id': result_data.get('subject_id'),
+                    'marks': result_data.get('marks_obtained'),
+                }
+                for result_data in results_data
+                if isinstance(result_data, dict)
+            ],
+            max_marks=100
+        )
 
-        # Calculate positions only for manual save
-        if saved_count > 0 and not is_auto_save:
-            calculate_subject_positions(exam_session)
+        saved_results = summary['saved_results']
+        saved_count = len(saved_results)
+        skipped_count = summary['skipped'] + len(summary['errors'])
 
+        # Metrics and positions are recalculated by the results worker
         return JsonResponse({
             'success': True,
             'message': f'Saved {saved_count} results. Skipped {skipped_count}.',
             'saved_count': saved_count,
             'skipped_count': skipped_count,
-            'saved_results': saved_results
+            'saved_results': saved_results,
+            'recalculation': recalculation_status_payload(exam_session.id)
         })
 
     except json.JSONDecodeError:
@@ -2577,96 +2462,39 @@ def save_multiple_results(request):
                 'message': 'Invalid results JSON.'
             }, status=400)
 
-        exam_session = get_object_or_404(ExamSession, id=exam_session_id)
-
-        saved_count = 0
-        skipped_count = 0
-        errors = []
-
-        with transaction.atomic():
-            for result_data in results_data:
-                student_id = result_data.get('studentId')
-                subject_id = result_data.get('subjectId')
-                marks = result_data.get('marks')
-
-                # Validate IDs
-                if not student_id or not subject_id:
-                    skipped_count += 1
-                    continue
-
-                # Allow empty marks → skip
-                if marks in ("", None):
-                    skipped_count += 1
-                    continue
-
-                # Ensure numeric marks (use Decimal)
-                try:
-                    marks = Decimal(str(marks))
-                except (TypeError, ValueError, InvalidOperation):
-                    errors.append(
-                        f"Invalid marks for student {student_id}, subject {subject_id}"
-                    )
-                    continue
-
-                # Enforce range 0–100
-                if marks < 0 or marks > 100:
-                    errors.append(
-                        f"Marks out of range (0–100) for student {student_id}, subject {subject_id}"
-                    )
-                    continue
-
-                # Prevent duplicate result
-                if StudentResult.objects.filter(
-                    exam_session=exam_session,
-                    student_id=student_id,
-                    subject_id=subject_id
-                ).exists():
-                    errors.append(
-                        f"Result already exists for student {student_id}, subject {subject_id}"
-                    )
-                    continue
-
-                # Create result
-                result = StudentResult.objects.create(
-                    exam_session=exam_session,
-                    student_id=student_id,
-                    subject_id=subject_id,
-                    marks_obtained=marks
-                )
-
-                # Percentage (use Decimal arithmetic)
-                max_score = exam_session.exam_type.max_score
-                if max_score and max_score > 0:
-                    try:
-                        max_score_decimal = Decimal(str(max_score))
-                        result.percentage = (marks / max_score_decimal) * Decimal('100')
-                    except (InvalidOperation, TypeError):
-                        result.percentage = None
-
-                # Grade
-                education_level = exam_session.class_level.educational_level
-                grade_scale = GradingScale.objects.filter(
-                    education_level=education_level,
-                    min_mark__lte=marks,
-                    max_mark__gte=marks
-                ).first()
-
-                if grade_scale:
-                    result.grade = grade_scale.grade
-                    result.grade_point = grade_scale.points
+        exam_session = get_object_or_404(
+            ExamSession.objects.select_related('exam_type', 'class_level'),
+            id=exam_session_id
+        )
 
-                result.save()
-                saved_count += 1
+        # Validate the whole payload, then create the new results in one write
+        summary = ingest_marks(
+            exam_session,
+            [
+                {
+                    'student_id': result_data.get('studentId'),
+                    'subject_id': result_data.get('subjectId'),
+                    'marks': result_data.get('marks'),
+                    'label': f"Student {result_data.get('studentId')}, subject {result_data.get('subjectId')}",
+                }
+                for result_data in results_data
+                if isinstance(result_data, dict)
+            ],
+            max_marks=100,
+            create_only=True
+        )
 
-        # Calculate positions only if something was saved
-        if saved_count > 0:
-            calculate_subject_positions(exam_session)
+        saved_count = summary['created']
+        skipped_count = summary['skipped']
+        errors = summary['errors']
 
+        # Metrics and positions are recalculated by the results worker
         response_data = {
             'success': True,
             'message': f'Saved {saved_count} results. Skipped {skipped_count}.',
             'saved_count': saved_count,
-            'skipped_count': skipped_count
+            'skipped_count': skipped_count,
+            'recalculation': recalculation_status_payload(exam_session.id)
         }
 
         if errors:
@@ -2680,54 +2508,23 @@ def save_multiple_results(request):
             'message': f'Error saving results: {str(e)}'
         }, status=500)
 
-def calculate_subject_positions(exam_session):
-    """Calculate positions for all subjects in an exam session"""
-    try:
-        # Get all subjects in this exam session
-        subjects = Subject.objects.filter(
-            educational_level=exam_session.class_level.educational_level,
-            is_active=True
-        )
-        
-        for subject in subjects:
-            calculate_subject_position(exam_session, subject)
-            
-    except Exception as e:
-        print(f"Error calculating positions: {str(e)}")
+def recalculation_status_payload(exam_session_id):
+    """Recalculation status plus the URL the marks entry pages poll."""
+    payload = recalculation_status(exam_session_id)
+    payload['status_url'] = reverse('results_recalculation_status', args=[exam_session_id])
+    return payload
+
+
+@login_required
+@require_GET
+def results_recalculation_status(request, exam_session_id):
+    """AJAX: whether metrics/positions of a session reflect its latest marks"""
+    get_object_or_404(ExamSession, id=exam_session_id)
+    return JsonResponse({
+        'success': True,
+        **recalculation_status_payload(exam_session_id)
+    })
 
-def calculate_subject_position(exam_session, subject):
-    """Calculate positions for a specific subject"""
-    try:
-        # Get all results for this subject ordered by marks (descending)
-        results = StudentResult.objects.filter(
-            exam_session=exam_session,
-            subject=subject,
-            marks_obtained__isnull=False
-        ).select_related('student').order_by('-marks_obtained')
-        
-        position = 1
-        previous_marks = None
-        skip_position = 0
-        
-        for index, result in enumerate(results):
-            current_marks = result.marks_obtained
-            
-            # Handle equal marks (same position)
-            if previous_marks is not None and current_marks == previous_marks:
-                # Same position as previous student
-                result.position_in_paper = position - 1
-                skip_position += 1
-            else:
-                # New position
-                result.position_in_paper = position
-                position += 1 + skip_position
-                skip_position = 0
-            
-            result.save(update_fields=['position_in_paper'])
-            previous_marks = current_marks
-            
-    except Exception as e:
-        print(f"Error calculating position for subject {subject.id}: {str(e)}")
 
 @login_required
 def subject_results_entry(request, exam_session_id, subject_id):
@@ -2746,34 +2543,12 @@ def subject_results_entry(request, exam_session_id, subject_id):
     
     subject = get_object_or_404(Subject, id=subject_id)
     
-    # Get students based on stream
-    if exam_session.stream_class:
-        students = Student.objects.filter(
-            class_level=exam_session.class_level,
-            stream_class=exam_session.stream_class,
-            is_active=True
-        )
-    else:
-        students = Student.objects.filter(
-            class_level=exam_session.class_level,
-            is_active=True
-        )
-    
-    students = students.order_by('first_name', 'last_name')
-    
-    # Get existing results for this subject
-    existing_results = StudentResult.objects.filter(
-        exam_session=exam_session,
-        subject=subject
-    ).select_related('student')
-    
-    # Create a dictionary of existing results for quick lookup
-    results_dict = {result.student_id: result for result in existing_results}
-    
+    matrix = build_results_matrix(exam_session, subjects=[subject], with_metrics=False)
+
     # Prepare student data with existing marks
     students_data = []
-    for student in students:
-        result = results_dict.get(student.id)
+    for student in matrix.students:
+        result = matrix.result(student.id, subject.id)
         students_data.append({
             'id': student.id,
             'registration_number': student.registration_number or f"S{student.id:04d}",
@@ -2786,7 +2561,7 @@ def subject_results_entry(request, exam_session_id, subject_id):
         })
     
     # Get statistics
-    total_students = students.count()
+    total_students = len(matrix.students)
     with_marks = len([s for s in students_data if s['existing_marks'] is not None])
     without_marks = total_students - with_marks
     
@@ -3024,130 +2799,61 @@ def upload_excel_marks(request):
                 'message': 'Missing exam session or subject ID'
             })
         
-        exam_session = get_object_or_404(ExamSession, id=exam_session_id)
+        exam_session = get_object_or_404(
+            ExamSession.objects.select_related('exam_type', 'class_level'),
+            id=exam_session_id
+        )
         subject = get_object_or_404(Subject, id=subject_id)
         
-        # Read Excel file
-        wb = openpyxl.load_workbook(excel_file, data_only=True)
-        ws = wb.active
-        
-        # Parse data
-        data = []
-        errors = []
-        processed_count = 0
-        
-        # Find header row
-        header_row = None
-        for row in ws.iter_rows(min_row=1, max_row=20, values_only=True):
-            if row and row[0] and isinstance(row[0], str) and "Student ID" in str(row[0]):
-                header_row = row
-                break
-        
-        if not header_row:
+        # Stream the sheet once: header, then marks rows
+        rows = iter_sheet_rows(excel_file)
+        try:
+            rows_after_header(
+                rows,
+                lambda row: isinstance(row[0], str) and "Student ID" in row[0]
+            )
+        except SheetFormatError:
             return JsonResponse({
                 'success': False,
                 'message': 'Could not find header row in Excel file'
             })
         
-        # Find start of data
-        data_start_row = None
-        for i, row in enumerate(ws.iter_rows(min_row=1, max_row=100, values_only=True), start=1):
-            if row and isinstance(row[0], (int, float)):
-                data_start_row = i
-                break
-        
-        if not data_start_row:
-            return JsonResponse({
-                'success': False,
-                'message': 'No data found in Excel file'
-            })
+        marks_import = MarksImport(exam_session, [subject.id], allow_blank=True)
+        data_started = False
         
-        # Process each row
-        for i, row in enumerate(ws.iter_rows(min_row=data_start_row, max_row=ws.max_row, values_only=True), start=data_start_row):
+        for i, row in rows:
+            # Data starts at the first row with a numeric student ID
+            if not data_started:
+                if row and isinstance(row[0], (int, float)):
+                    data_started = True
+                else:
+                    continue
+            
             if not row or not row[0]:
                 continue
             
             try:
-                student_id = int(row[0])
-                marks = row[3] if len(row) > 3 else None
-                
-                # Validate student exists
-                try:
-                    student = Student.objects.get(id=student_id, is_active=True)
-                except Student.DoesNotExist:
-                    errors.append(f"Row {i}: Student ID {student_id} not found")
-                    continue
-                
-                # Validate marks
-                if marks is not None and marks != '':
-                    try:
-                        marks = Decimal(str(marks))
-                        max_score = exam_session.exam_type.max_score
-                        
-                        if marks < 0 or marks > max_score:
-                            errors.append(f"Row {i}: Marks {marks} out of range (0-{max_score})")
-                            continue
-                    except (ValueError, InvalidOperation):
-                        errors.append(f"Row {i}: Invalid marks format '{marks}'")
-                        continue
-                else:
-                    marks = None
-                
-                data.append({
-                    'student_id': student_id,
-                    'marks': marks
-                })
-                
-            except Exception as e:
-                errors.append(f"Row {i}: Error processing row - {str(e)}")
+                marks_import.add(int(row[0]), subject.id, row[3] if len(row) > 3 else None, f"Row {i}")
+            except (TypeError, ValueError) as e:
+                marks_import.error(f"Row {i}: Error processing row - {str(e)}")
         
-        # Save marks in transaction
-        with transaction.atomic():
-            for item in data:
-                try:
-                    # Get or create result
-                    result, created = StudentResult.objects.get_or_create(
-                        exam_session=exam_session,
-                        student_id=item['student_id'],
-                        subject=subject,
-                        defaults={'marks_obtained': item['marks']}
-                    )
-                    
-                    if not created:
-                        result.marks_obtained = item['marks']
-                    
-                    # Calculate percentage
-                    if item['marks'] is not None and exam_session.exam_type.max_score > 0:
-                        result.percentage = (Decimal(str(item['marks'])) / 
-                                           Decimal(str(exam_session.exam_type.max_score))) * Decimal('100')
-                    
-                    # Calculate grade
-                    if item['marks'] is not None:
-                        education_level = exam_session.class_level.educational_level
-                        grade_scale = GradingScale.objects.filter(
-                            education_level=education_level,
-                            min_mark__lte=item['marks'],
-                            max_mark__gte=item['marks']
-                        ).first()
-                        
-                        if grade_scale:
-                            result.grade = grade_scale.grade
-                            result.grade_point = grade_scale.points
-                    
-                    result.save()
-                    processed_count += 1
-                    
-                except Exception as e:
-                    errors.append(f"Student ID {item['student_id']}: Error saving - {str(e)}")
+        if not data_started:
+            return JsonResponse({
+                'success': False,
+                'message': 'No data found in Excel file'
+            })
         
-        # Calculate positions after upload
-        calculate_subject_positions(exam_session)
+        summary = marks_import.finish()
+        errors = summary['errors']
+        processed_count = len(summary['saved_results'])
         
+        # Metrics and positions are recalculated by the results worker
         response_data = {
             'success': True,
             'message': f'Successfully processed {processed_count} marks',
             'processed_count': processed_count,
-            'total_rows': len(data)
+            'total_rows': marks_import.rows,
+            'recalculation': recalculation_status_payload(exam_session.id)
         }
         
         if errors:
@@ -3186,29 +2892,10 @@ def download_pdf_report(request, exam_session_id, subject_id):
         subject = get_object_or_404(Subject, id=subject_id)
 
         # ==================================================
-        # 2. LOAD STUDENTS
-        # ==================================================
-        student_filters = {
-            'class_level': exam_session.class_level,
-            'is_active': True
-        }
-
-        if exam_session.stream_class:
-            student_filters['stream_class'] = exam_session.stream_class
-
-        students = Student.objects.filter(**student_filters).order_by(
-            'first_name', 'last_name'
-        )
-
-        # ==================================================
-        # 3. LOAD RESULTS (THIS SUBJECT)
+        # 2. LOAD STUDENTS + RESULTS (THIS SUBJECT)
         # ==================================================
-        results = StudentResult.objects.filter(
-            exam_session=exam_session,
-            subject=subject
-        ).select_related('student')
-
-        results_by_student = {r.student_id: r for r in results}
+        matrix = build_results_matrix(exam_session, subjects=[subject], with_metrics=False)
+        students = matrix.students
 
         # ==================================================
         # 4. PREPARE STUDENT DATA + GENDER STATS
@@ -3222,7 +2909,7 @@ def download_pdf_report(request, exam_session_id, subject_id):
         gender_with_marks = {}
 
         for student in students:
-            result = results_by_student.get(student.id)
+            result = matrix.result(student.id, subject.id)
             marks = result.marks_obtained if result else None
             grade = ''
 
@@ -3241,11 +2928,9 @@ def download_pdf_report(request, exam_session_id, subject_id):
                 gender_marks_sum[gender] += marks
                 gender_with_marks[gender] += 1
 
-                grade_scale = GradingScale.objects.filter(
-                    education_level=exam_session.class_level.educational_level,
-                    min_mark__lte=marks,
-                    max_mark__gte=marks
-                ).first()
+                grade_scale = grade_for_mark(
+                    exam_session.class_level.educational_level_id, marks
+                )
 
                 if grade_scale:
                     grade = grade_scale.grade
@@ -3263,12 +2948,12 @@ def download_pdf_report(request, exam_session_id, subject_id):
         # 5. OVERALL STATISTICS
         # ==================================================
         statistics = {
-            'total_students': students.count(),
+            'total_students': len(students),
             'students_with_marks': students_with_marks,
-            'students_without_marks': students.count() - students_with_marks,
+            'students_without_marks': len(students) - students_with_marks,
             'percentage_completed': (
-                (students_with_marks / students.count()) * 100
-                if students.exists() else 0
+                (students_with_marks / len(students)) * 100
+                if students else 0
             ),
             'average_marks': (
                 total_marks / students_with_marks
@@ -3316,11 +3001,14 @@ def download_pdf_report(request, exam_session_id, subject_id):
         # ==================================================
         # 8. SUBJECT PERFORMANCE (THIS SUBJECT)
         # ==================================================
-        subject_performance = results.aggregate(
-            average=Avg('marks_obtained'),
-            highest=Max('marks_obtained'),
-            lowest=Min('marks_obtained')
-        )
+        subject_marks = [
+            r.marks_obtained for r in matrix.subject_results(subject.id, marked_only=True)
+        ]
+        subject_performance = {
+            'average': sum(subject_marks) / len(subject_marks) if subject_marks else None,
+            'highest': max(subject_marks, default=None),
+            'lowest': min(subject_marks, default=None),
+        }
 
         # ==================================================
         # 9. SUBJECT POSITION IN EXAM SESSION
@@ -3363,26 +3051,20 @@ def download_pdf_report(request, exam_session_id, subject_id):
         }
 
         # ==================================================
-        # 11. RENDER PDF
+        # 11. QUEUE PDF
         # ==================================================
         html_string = render_to_string(
             'admin/results/pdf_subject_report.html',
             context
         )
 
-        pdf = HTML(
-            string=html_string,
+        return pdf_job_response(
+            request, html_string,
+            f"Marks_Report_{subject.code}_{exam_session.name}.pdf",
+            report_type='subject_marks_report',
             base_url=request.build_absolute_uri()
-        ).write_pdf()
-
-        response = HttpResponse(pdf, content_type='application/pdf')
-        response['Content-Disposition'] = (
-            f'attachment; filename='
-            f'"Marks_Report_{subject.code}_{exam_session.name}.pdf"'
         )
 
-        return response
-
     except Exception as e:
         messages.error(request, f"Error generating PDF: {e}")
         return redirect('manage_results', exam_session_id=exam_session_id)
@@ -3600,14 +3282,14 @@ def upload_session_excel(request):
     if not excel_file or not exam_session_id:
         return JsonResponse({'success': False, 'message': 'Missing file or exam session ID'})
 
-    exam_session = get_object_or_404(ExamSession, id=exam_session_id)
+    exam_session = get_object_or_404(
+        ExamSession.objects.select_related('exam_type', 'class_level'),
+        id=exam_session_id
+    )
 
     if exam_session.status == 'published':
         return JsonResponse({'success': False, 'message': 'Cannot modify a published exam session'})
 
-    wb = openpyxl.load_workbook(excel_file, data_only=True)
-    ws = wb.active
-
     subjects = Subject.objects.filter(
         educational_level=exam_session.class_level.educational_level,
         is_active=True
@@ -3619,20 +3301,18 @@ def upload_session_excel(request):
     }
 
     # ----------------------------
-    # FIND HEADER ROW
+    # FIND HEADER ROW (single streamed pass over the sheet)
     # ----------------------------
-    header_row_idx = None
-    header_values = []
-
-    for i, row in enumerate(ws.iter_rows(min_row=1, max_row=20, values_only=True), start=1):
-        if row and "Student ID" in [str(c) for c in row if c]:
-            header_row_idx = i
-            header_values = [normalize(str(c)) for c in row]
-            break
-
-    if not header_row_idx:
+    rows = iter_sheet_rows(excel_file)
+    try:
+        header, rows = rows_after_header(
+            rows, lambda row: "Student ID" in [str(c) for c in row if c]
+        )
+    except SheetFormatError:
         return JsonResponse({'success': False, 'message': 'Header row not found'})
 
+    header_values = [normalize(str(c)) for c in header]
+
     # ----------------------------
     # MAP SUBJECT COLUMNS
     # ----------------------------
@@ -3645,75 +3325,82 @@ def upload_session_excel(request):
     if not subject_columns:
         return JsonResponse({'success': False, 'message': 'No valid subject columns found'})
 
-    processed = 0
-    errors = []
-
-    with transaction.atomic():
-        for row_idx, row in enumerate(
-            ws.iter_rows(min_row=header_row_idx + 1, values_only=True),
-            start=header_row_idx + 1
-        ):
-            if not row or not row[0]:
-                continue
-
-            try:
-                student = Student.objects.get(id=int(row[0]), is_active=True)
-            except Student.DoesNotExist:
-                errors.append(f"Row {row_idx}: Invalid student ID")
-                continue
-
-            for col_idx, subject in subject_columns.items():
-                if col_idx >= len(row):
-                    continue
-
-                marks = row[col_idx]
-
-                if marks is None or marks == "":
-                    continue
-
-                try:
-                    marks = Decimal(str(marks))
-                except:
-                    errors.append(f"Row {row_idx}, {subject.name}: Invalid mark")
-                    continue
-
-                max_score = exam_session.exam_type.max_score
-                if marks < 0 or marks > max_score:
-                    errors.append(f"Row {row_idx}, {subject.name}: Out of range")
-                    continue
+    # Validate and save the marks in fixed-size batches
+    marks_import = MarksImport(
+        exam_session, [subject.id for subject in subject_columns.values()]
+    )
 
-                result, _ = StudentResult.objects.get_or_create(
-                    exam_session=exam_session,
-                    student=student,
-                    subject=subject
-                )
+    for row_idx, row in rows:
+        if not row or not row[0]:
+            continue
 
-                result.marks_obtained = marks
-                result.percentage = (marks / Decimal(max_score)) * 100
+        try:
+            student_id = int(row[0])
+        except (TypeError, ValueError):
+            marks_import.error(f"Row {row_idx}: Invalid student ID")
+            continue
 
-                grade_scale = GradingScale.objects.filter(
-                    education_level=exam_session.class_level.educational_level,
-                    min_mark__lte=marks,
-                    max_mark__gte=marks
-                ).first()
+        for col_idx, subject in subject_columns.items():
+            if col_idx >= len(row):
+                continue
 
-                if grade_scale:
-                    result.grade = grade_scale.grade
-                    result.grade_point = grade_scale.points
+            marks_import.add(student_id, subject.id, row[col_idx], f"Row {row_idx}, {subject.name}")
 
-                result.save()
-                processed += 1
+    summary = marks_import.finish()
+    errors = summary['errors']
+    processed = len(summary['saved_results'])
 
     return JsonResponse({
         'success': True,
         'message': f'Processed {processed} marks successfully',
-        'errors': errors[:10]
+        'processed_count': processed,
+        'subjects_processed': len(subject_columns),
+        'errors': errors[:10],
+        'recalculation': recalculation_status_payload(exam_session.id)
     })
 
 def normalize(text):
     return text.strip().lower() if text else ""
 
 
+@login_required
+def export_results_data(request):
+    """
+    Stream student results as CSV or NDJSON (?format=csv|ndjson). Sessions
+    are picked with the exam session list filters, or one exam_session;
+    subject narrows to one paper.
+    """
+    exam_sessions = filter_exam_sessions(ExamSession.objects.all(), request.GET)
+    if request.GET.get('exam_session'):
+        exam_sessions = exam_sessions.filter(id=request.GET['exam_session'])
+    
+    results = StudentResult.objects.filter(exam_session__in=exam_sessions)
+    if request.GET.get('subject'):
+        results = results.filter(subject_id=request.GET['subject'])
+    
+    columns = [
+        ('exam_session_id', 'exam_session_id'),
+        ('exam_session', 'exam_session__name'),
+        ('academic_year', 'exam_session__academic_year__name'),
+        ('term', 'exam_session__term__term_number'),
+        ('class_level', 'exam_session__class_level__name'),
+        ('student_id', 'student_id'),
+        ('registration_number', 'student__registration_number'),
+        ('first_name', 'student__first_name'),
+        ('last_name', 'student__last_name'),
+        ('subject_code', 'subject__code'),
+        ('subject', 'subject__name'),
+        ('marks_obtained', 'marks_obtained'),
+        ('percentage', 'percentage'),
+        ('grade', 'grade'),
+        ('grade_point', 'grade_point'),
+        ('position_in_paper', 'position_in_paper'),
+    ]
+    return streaming_export_response(
+        request, results, columns, f'results_{timezone.now().strftime("%Y%m%d_%H%M%S")}'
+    )
+
+
 @login_required
 def download_session_excel_report(request, exam_session_id):
     """Generate comprehensive Excel report for entire exam session with subject-wise performance"""
@@ -3729,109 +3416,71 @@ def download_session_excel_report(request, exam_session_id):
             ),
             id=exam_session_id
         )
+        filename = f"Session_Report_{exam_session.name.replace(' ', '_')}_{timezone.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
 
-        subjects = list(
-            Subject.objects.filter(
-                educational_level=exam_session.class_level.educational_level,
-                is_active=True
-            ).order_by('code')
-        )
-
-        # Get students
-        student_qs = Student.objects.filter(
-            class_level=exam_session.class_level,
-            is_active=True
-        )
-        if exam_session.stream_class:
-            student_qs = student_qs.filter(stream_class=exam_session.stream_class)
-        
-        students = list(student_qs.order_by('first_name', 'last_name'))
-
-        # Get all results
-        results = StudentResult.objects.filter(
-            exam_session=exam_session
-        ).select_related('student', 'subject')
-
-        # Get metrics and positions
-        metrics = StudentExamMetrics.objects.filter(
-            exam_session=exam_session
-        ).select_related('student', 'division')
-
-        positions = StudentExamPosition.objects.filter(
-            exam_session=exam_session
-        ).select_related('student')
-
-        # Create lookup dictionaries
-        results_map = {}
-        for r in results:
-            results_map.setdefault(r.student_id, {})[r.subject_id] = r
-
-        metrics_map = {m.student_id: m for m in metrics}
-        position_map = {p.student_id: p for p in positions}
+        # Served from disk until the session's results change
+        cache_key = session_report_key(exam_session, 'session_excel_report')
+        content = get_cached_report(cache_key)
+        if content is not None:
+            return report_file_response(content, filename, XLSX_CONTENT_TYPE)
+
+        # Results, metrics and positions: one query each
+        matrix = build_results_matrix(exam_session)
+        subjects = matrix.subjects
+        students = matrix.students
+        results_map = matrix.results
+        metrics_map = matrix.metrics
+        position_map = matrix.positions
+        students_by_id = {student.id: student for student in students}
 
         # ============================================
         # CREATE EXCEL WORKBOOK
         # ============================================
-        wb = openpyxl.Workbook()
-        
-        # ============================================
-        # SHEET 1: COMPREHENSIVE RESULTS
-        # ============================================
-        ws_main = wb.active
-        ws_main.title = "Comprehensive Results"
+        export = StreamingExcelExport()
         
         # Define styles
-        header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-        header_font = Font(name="Arial", size=11, bold=True, color="FFFFFF")
+        cell_border = box_border('thin')
         title_font = Font(name="Arial", size=14, bold=True)
-        info_font = Font(name="Arial", size=10, bold=True)
-        normal_font = Font(name="Arial", size=10)
         bold_font = Font(name="Arial", size=10, bold=True)
         
-        header_border = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'),
-            top=Side(style='thin'),
-            bottom=Side(style='thin')
-        )
+        export.add_style('header', Font(name="Arial", size=11, bold=True, color="FFFFFF"),
+                         solid_fill("366092"), cell_border, centered())
+        export.add_style('title', title_font, alignment=centered())
+        export.add_style('section_title', title_font)
+        export.add_style('info', Font(name="Arial", size=10, bold=True))
+        export.add_style('label', bold_font)
+        export.add_style('value', Font(name="Arial", size=10))
+        export.add_style('cell', border=cell_border)
+        export.add_style('cell_center', border=cell_border, alignment=centered())
+        export.add_style('total', bold_font, border=cell_border)
+        export.add_style('total_center', bold_font, border=cell_border, alignment=centered())
         
-        cell_border = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'),
-            top=Side(style='thin'),
-            bottom=Side(style='thin')
+        # ============================================
+        # SHEET 1: COMPREHENSIVE RESULTS
+        # ============================================
+        # S.No, Reg No, Name, Gender, one column per subject, then the summary columns
+        ws_main = export.add_sheet(
+            "Comprehensive Results",
+            column_widths=[8, 15, 25, 10] + [12] * len(subjects) + [15] * 5
         )
-        
-        center_alignment = Alignment(horizontal="center", vertical="center")
-        left_alignment = Alignment(horizontal="left", vertical="center")
+        last_column = 7 + len(subjects)
         
         # Add header information
-        ws_main['A1'] = "EXAM SESSION COMPREHENSIVE REPORT"
-        ws_main['A1'].font = title_font
-        ws_main['A1'].alignment = center_alignment
-        ws_main.merge_cells(f'A1:{get_column_letter(7 + len(subjects))}1')
-        
-        ws_main['A2'] = f"Exam Session: {exam_session.name}"
-        ws_main['A2'].font = info_font
-        ws_main.merge_cells(f'A2:{get_column_letter(7 + len(subjects))}2')
+        ws_main.append_merged("EXAM SESSION COMPREHENSIVE REPORT", 'title', last_column)
+        ws_main.append_merged(f"Exam Session: {exam_session.name}", 'info', last_column)
         
         class_text = f"Class: {exam_session.class_level.name}"
         if exam_session.stream_class:
             class_text += f" {exam_session.stream_class.stream_letter}"
-        ws_main['A3'] = class_text
-        ws_main['A3'].font = info_font
-        ws_main.merge_cells(f'A3:{get_column_letter(7 + len(subjects))}3')
-        
-        ws_main['A4'] = f"Academic Year: {exam_session.academic_year.name} | Term: {exam_session.term.get_term_number_display()}"
-        ws_main['A4'].font = info_font
-        ws_main.merge_cells(f'A4:{get_column_letter(7 + len(subjects))}4')
-        
-        ws_main['A5'] = f"Exam Date: {exam_session.exam_date.strftime('%B %d, %Y')}"
-        ws_main['A5'].font = info_font
-        ws_main.merge_cells(f'A5:{get_column_letter(7 + len(subjects))}5')
+        ws_main.append_merged(class_text, 'info', last_column)
+        ws_main.append_merged(
+            f"Academic Year: {exam_session.academic_year.name} | Term: {exam_session.term.get_term_number_display()}",
+            'info', last_column
+        )
+        ws_main.append_merged(f"Exam Date: {exam_session.exam_date.strftime('%B %d, %Y')}", 'info', last_column)
+        ws_main.append_blank()
         
         # Column headers
-        header_row = 7
         headers = ["S.No", "Registration No.", "Student Name", "Gender"]
         
         # Add subject headers
@@ -3839,104 +3488,60 @@ def download_session_excel_report(request, exam_session_id):
             headers.append(f"{subject.name}")
         
         headers.extend(["Total Marks", "Average", "Grade Points", "Division", "Position"])
+        ws_main.append(headers, style='header')
         
-        # Write headers
-        for col_num, header in enumerate(headers, start=1):
-            cell = ws_main.cell(row=header_row, column=col_num, value=header)
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.border = header_border
-            cell.alignment = center_alignment
-            
-            # Set column widths
-            if col_num == 1:  # S.No
-                ws_main.column_dimensions[get_column_letter(col_num)].width = 8
-            elif col_num == 2:  # Reg No
-                ws_main.column_dimensions[get_column_letter(col_num)].width = 15
-            elif col_num == 3:  # Name
-                ws_main.column_dimensions[get_column_letter(col_num)].width = 25
-            elif col_num == 4:  # Gender
-                ws_main.column_dimensions[get_column_letter(col_num)].width = 10
-            elif col_num <= 4 + len(subjects):  # Subject columns
-                ws_main.column_dimensions[get_column_letter(col_num)].width = 12
-            else:  # Summary columns
-                ws_main.column_dimensions[get_column_letter(col_num)].width = 15
-        
-        # Add student data
-        data_start_row = header_row + 1
+        # Add student data: the first four columns are plain, the rest centred
+        centred_columns = {col: 'cell_center' for col in range(5, len(headers) + 1)}
         
-        for i, student in enumerate(students, start=data_start_row):
-            # Basic info
-            ws_main.cell(row=i, column=1, value=i - header_row).border = cell_border
-            ws_main.cell(row=i, column=2, value=student.registration_number or f"S{student.id:04d}").border = cell_border
-            ws_main.cell(row=i, column=3, value=student.full_name).border = cell_border
-            ws_main.cell(row=i, column=4, value=student.get_gender_display()).border = cell_border
+        for row_num, student in enumerate(students, start=1):
+            row = [
+                row_num,
+                student.registration_number or f"S{student.id:04d}",
+                student.full_name,
+                student.get_gender_display(),
+            ]
             
             # Subject marks
             total_marks = 0
             subjects_with_marks = 0
             
-            for col_num, subject in enumerate(subjects, start=5):
+            for subject in subjects:
                 result = results_map.get(student.id, {}).get(subject.id)
                 if result and result.marks_obtained is not None:
                     marks = result.marks_obtained
                     grade = result.grade or ""
-                    
-                    # FIXED: Create string value first, then assign to cell
-                    if grade:
-                        cell_value = f"{marks:.1f} ({grade})"
-                    else:
-                        cell_value = f"{marks:.1f}"
-                    
-                    ws_main.cell(row=i, column=col_num, value=cell_value)
+                    row.append(f"{marks:.1f} ({grade})" if grade else f"{marks:.1f}")
                     
                     total_marks += float(marks)
                     subjects_with_marks += 1
                 else:
-                    ws_main.cell(row=i, column=col_num, value="-")
-                
-                ws_main.cell(row=i, column=col_num).border = cell_border
-                ws_main.cell(row=i, column=col_num).alignment = center_alignment
-            
-            # Summary columns
-            summary_col = 5 + len(subjects)
+                    row.append("-")
             
             # Total Marks
-            ws_main.cell(row=i, column=summary_col, value=total_marks if subjects_with_marks > 0 else "-")
-            ws_main.cell(row=i, column=summary_col).border = cell_border
-            ws_main.cell(row=i, column=summary_col).alignment = center_alignment
+            row.append(total_marks if subjects_with_marks > 0 else "-")
             
             # Average
             average = total_marks / subjects_with_marks if subjects_with_marks > 0 else None
-            ws_main.cell(row=i, column=summary_col + 1, value=f"{average:.2f}" if average else "-")
-            ws_main.cell(row=i, column=summary_col + 1).border = cell_border
-            ws_main.cell(row=i, column=summary_col + 1).alignment = center_alignment
+            row.append(f"{average:.2f}" if average else "-")
             
             # Grade Points (from metrics)
             metrics = metrics_map.get(student.id)
-            ws_main.cell(row=i, column=summary_col + 2, 
-                        value=f"{metrics.total_grade_points:.1f}" if metrics and metrics.total_grade_points else "-")
-            ws_main.cell(row=i, column=summary_col + 2).border = cell_border
-            ws_main.cell(row=i, column=summary_col + 2).alignment = center_alignment
+            row.append(f"{metrics.total_grade_points:.1f}" if metrics and metrics.total_grade_points else "-")
             
             # Division
-            division = metrics.division.division if metrics and metrics.division else "-"
-            ws_main.cell(row=i, column=summary_col + 3, value=division)
-            ws_main.cell(row=i, column=summary_col + 3).border = cell_border
-            ws_main.cell(row=i, column=summary_col + 3).alignment = center_alignment
+            row.append(metrics.division.division if metrics and metrics.division else "-")
             
             # Position
             position = position_map.get(student.id)
-            ws_main.cell(row=i, column=summary_col + 4, 
-                        value=position.class_position if position and position.class_position else "-")
-            ws_main.cell(row=i, column=summary_col + 4).border = cell_border
-            ws_main.cell(row=i, column=summary_col + 4).alignment = center_alignment
+            row.append(position.class_position if position and position.class_position else "-")
+            
+            ws_main.append(row, style='cell', styles=centred_columns)
         
         # Add summary statistics at the bottom
-        summary_start = data_start_row + len(students) + 2
-        
-        ws_main.cell(row=summary_start, column=1, value="SUMMARY STATISTICS").font = title_font
-        ws_main.merge_cells(f'A{summary_start}:C{summary_start}')
+        ws_main.append_blank()
+        ws_main.append_blank()
+        summary_start = ws_main.append(["SUMMARY STATISTICS"], style='section_title')
+        ws_main.merge(summary_start, 1, summary_start, 3)
         
         summary_rows = [
             ("Total Students", len(students)),
@@ -3947,83 +3552,39 @@ def download_session_excel_report(request, exam_session_id):
             ("Generated By", request.user.get_full_name() or request.user.username),
         ]
         
-        for idx, (label, value) in enumerate(summary_rows, start=1):
-            ws_main.cell(row=summary_start + idx, column=1, value=label).font = bold_font
-            ws_main.cell(row=summary_start + idx, column=2, value=value).font = normal_font
+        for label, value in summary_rows:
+            ws_main.append([label, value], styles={1: 'label', 2: 'value'})
         
         # ============================================
         # SHEET 2: SUBJECT-WISE PERFORMANCE
         # ============================================
-        ws_performance = wb.create_sheet(title="Subject Performance")
+        ws_performance = export.add_sheet(
+            "Subject Performance",
+            column_widths=[12, 30, 18, 15, 15, 15, 18, 25]
+        )
         
         # Title
-        ws_performance['A1'] = "SUBJECT-WISE PERFORMANCE ANALYSIS"
-        ws_performance['A1'].font = title_font
-        ws_performance.merge_cells('A1:G1')
-        ws_performance['A1'].alignment = center_alignment
+        ws_performance.append_merged("SUBJECT-WISE PERFORMANCE ANALYSIS", 'title', 7)
+        ws_performance.append_blank()
         
         # Headers for subject performance
         perf_headers = ["Subject Code", "Subject Name", "Students with Marks", 
                         "Average Marks", "Highest Marks", "Lowest Marks", 
                         "Pass Rate (%)", "Grade Distribution"]
-        
-        for col_num, header in enumerate(perf_headers, start=1):
-            cell = ws_performance.cell(row=3, column=col_num, value=header)
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.border = header_border
-            cell.alignment = center_alignment
-            
-            # Set column widths
-            if col_num == 1:  # Code
-                ws_performance.column_dimensions[get_column_letter(col_num)].width = 12
-            elif col_num == 2:  # Name
-                ws_performance.column_dimensions[get_column_letter(col_num)].width = 30
-            elif col_num in [3, 7]:  # Count and Pass Rate
-                ws_performance.column_dimensions[get_column_letter(col_num)].width = 18
-            elif col_num == 8:  # Grade Distribution
-                ws_performance.column_dimensions[get_column_letter(col_num)].width = 25
-            else:  # Marks columns
-                ws_performance.column_dimensions[get_column_letter(col_num)].width = 15
+        ws_performance.append(perf_headers, style='header')
         
         # Calculate subject performance
-        perf_start_row = 4
-        
-        for idx, subject in enumerate(subjects, start=perf_start_row):
-            subject_results = results.filter(subject=subject, marks_obtained__isnull=False)
-            marks_list = [float(r.marks_obtained) for r in subject_results if r.marks_obtained is not None]
-            
-            # Basic info
-            ws_performance.cell(row=idx, column=1, value=subject.code).border = cell_border
-            ws_performance.cell(row=idx, column=2, value=subject.name).border = cell_border
+        for subject in subjects:
+            subject_results = matrix.subject_results(subject.id, marked_only=True)
+            marks_list = [float(r.marks_obtained) for r in subject_results]
             
-            # Students with marks
-            students_with_marks = len(marks_list)
-            ws_performance.cell(row=idx, column=3, value=students_with_marks).border = cell_border
-            ws_performance.cell(row=idx, column=3).alignment = center_alignment
+            row = [subject.code, subject.name, len(marks_list)]
             
             if marks_list:
-                # Average marks
-                avg_marks = sum(marks_list) / len(marks_list)
-                ws_performance.cell(row=idx, column=4, value=f"{avg_marks:.2f}").border = cell_border
-                ws_performance.cell(row=idx, column=4).alignment = center_alignment
-                
-                # Highest marks
-                highest = max(marks_list)
-                ws_performance.cell(row=idx, column=5, value=f"{highest:.1f}").border = cell_border
-                ws_performance.cell(row=idx, column=5).alignment = center_alignment
-                
-                # Lowest marks
-                lowest = min(marks_list)
-                ws_performance.cell(row=idx, column=6, value=f"{lowest:.1f}").border = cell_border
-                ws_performance.cell(row=idx, column=6).alignment = center_alignment
-                
                 # Pass rate (assuming pass mark is 40)
                 pass_mark = 40
                 passed = sum(1 for m in marks_list if m >= pass_mark)
-                pass_rate = (passed / len(marks_list)) * 100 if marks_list else 0
-                ws_performance.cell(row=idx, column=7, value=f"{pass_rate:.1f}%").border = cell_border
-                ws_performance.cell(row=idx, column=7).alignment = center_alignment
+                pass_rate = (passed / len(marks_list)) * 100
                 
                 # Grade distribution
                 grades = {}
@@ -4031,45 +3592,39 @@ def download_session_excel_report(request, exam_session_id):
                     if r.grade:
                         grades[r.grade] = grades.get(r.grade, 0) + 1
                 
-                grade_dist = ", ".join([f"{grade}:{count}" for grade, count in grades.items()])
-                ws_performance.cell(row=idx, column=8, value=grade_dist).border = cell_border
+                row.extend([
+                    f"{sum(marks_list) / len(marks_list):.2f}",
+                    f"{max(marks_list):.1f}",
+                    f"{min(marks_list):.1f}",
+                    f"{pass_rate:.1f}%",
+                    ", ".join([f"{grade}:{count}" for grade, count in grades.items()]),
+                ])
+                styles = {col: 'cell_center' for col in range(3, 8)}
             else:
                 # No marks for this subject
-                for col in range(4, 9):
-                    ws_performance.cell(row=idx, column=col, value="-").border = cell_border
-                    ws_performance.cell(row=idx, column=col).alignment = center_alignment
+                row.extend(["-"] * 5)
+                styles = {col: 'cell_center' for col in range(3, 9)}
+            
+            ws_performance.append(row, style='cell', styles=styles)
         
         # Add subject performance summary
-        perf_summary_row = perf_start_row + len(subjects) + 2
-        ws_performance.cell(row=perf_summary_row, column=1, value="PERFORMANCE SUMMARY").font = title_font
-        ws_performance.merge_cells(f'A{perf_summary_row}:B{perf_summary_row}')
+        ws_performance.append_blank()
+        ws_performance.append_blank()
+        perf_summary_row = ws_performance.append(["PERFORMANCE SUMMARY"], style='section_title')
+        ws_performance.merge(perf_summary_row, 1, perf_summary_row, 2)
         
         # ============================================
         # SHEET 3: GRADE DISTRIBUTION
         # ============================================
-        ws_grades = wb.create_sheet(title="Grade Distribution")
+        ws_grades = export.add_sheet("Grade Distribution", column_widths=[15, 20, 15, 15, 15])
         
         # Title
-        ws_grades['A1'] = "GRADE DISTRIBUTION ACROSS ALL SUBJECTS"
-        ws_grades['A1'].font = title_font
-        ws_grades.merge_cells('A1:D1')
-        ws_grades['A1'].alignment = center_alignment
+        ws_grades.append_merged("GRADE DISTRIBUTION ACROSS ALL SUBJECTS", 'title', 4)
+        ws_grades.append_blank()
         
         # Grade headers
         grade_headers = ["Grade", "Description", "Marks Range", "Count", "Percentage (%)"]
-        
-        for col_num, header in enumerate(grade_headers, start=1):
-            cell = ws_grades.cell(row=3, column=col_num, value=header)
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.border = header_border
-            cell.alignment = center_alignment
-            
-            # Set column widths
-            if col_num == 2:  # Description
-                ws_grades.column_dimensions[get_column_letter(col_num)].width = 20
-            else:
-                ws_grades.column_dimensions[get_column_letter(col_num)].width = 15
+        ws_grades.append(grade_headers, style='header')
         
         # Grade definitions and counts
         grade_definitions = [
@@ -4086,118 +3641,65 @@ def download_session_excel_report(request, exam_session_id):
         grade_counts = {}
         total_grades = 0
         
-        for result in results:
+        for result in matrix.all_results():
             if result.grade:
                 grade_counts[result.grade] = grade_counts.get(result.grade, 0) + 1
                 total_grades += 1
         
         # Write grade data
-        grade_start_row = 4
-        
-        for idx, (grade, description, range_text) in enumerate(grade_definitions, start=grade_start_row):
-            ws_grades.cell(row=idx, column=1, value=grade).border = cell_border
-            ws_grades.cell(row=idx, column=2, value=description).border = cell_border
-            ws_grades.cell(row=idx, column=3, value=range_text).border = cell_border
-            
+        for grade, description, range_text in grade_definitions:
             count = grade_counts.get(grade, 0)
-            ws_grades.cell(row=idx, column=4, value=count).border = cell_border
-            ws_grades.cell(row=idx, column=4).alignment = center_alignment
-            
             percentage = (count / total_grades * 100) if total_grades > 0 else 0
-            ws_grades.cell(row=idx, column=5, value=f"{percentage:.1f}%").border = cell_border
-            ws_grades.cell(row=idx, column=5).alignment = center_alignment
+            ws_grades.append(
+                [grade, description, range_text, count, f"{percentage:.1f}%"],
+                style='cell', styles={4: 'cell_center', 5: 'cell_center'}
+            )
         
         # Add total row
-        total_row = grade_start_row + len(grade_definitions)
-        ws_grades.cell(row=total_row, column=3, value="TOTAL").font = bold_font
-        ws_grades.cell(row=total_row, column=3).border = cell_border
-        
-        ws_grades.cell(row=total_row, column=4, value=total_grades).font = bold_font
-        ws_grades.cell(row=total_row, column=4).border = cell_border
-        ws_grades.cell(row=total_row, column=4).alignment = center_alignment
-        
-        ws_grades.cell(row=total_row, column=5, value="100.0%").font = bold_font
-        ws_grades.cell(row=total_row, column=5).border = cell_border
-        ws_grades.cell(row=total_row, column=5).alignment = center_alignment
+        ws_grades.append(
+            [None, None, "TOTAL", total_grades, "100.0%"],
+            styles={3: 'total', 4: 'total_center', 5: 'total_center'}
+        )
         
         # ============================================
         # SHEET 4: TOP PERFORMERS
         # ============================================
-        ws_top = wb.create_sheet(title="Top Performers")
+        ws_top = export.add_sheet("Top Performers", column_widths=[15, 15, 25, 15, 15, 15])
         
         # Title
-        ws_top['A1'] = "TOP PERFORMERS - CLASS RANKING"
-        ws_top['A1'].font = title_font
-        ws_top.merge_cells('A1:F1')
-        ws_top['A1'].alignment = center_alignment
+        ws_top.append_merged("TOP PERFORMERS - CLASS RANKING", 'title', 6)
+        ws_top.append_blank()
         
         # Headers
         top_headers = ["Position", "Registration No.", "Student Name", 
                       "Total Marks", "Average", "Division"]
+        ws_top.append(top_headers, style='header')
         
-        for col_num, header in enumerate(top_headers, start=1):
-            cell = ws_top.cell(row=3, column=col_num, value=header)
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.border = header_border
-            cell.alignment = center_alignment
-            
-            # Set column widths
-            if col_num == 3:  # Name
-                ws_top.column_dimensions[get_column_letter(col_num)].width = 25
-            else:
-                ws_top.column_dimensions[get_column_letter(col_num)].width = 15
-        
-        # Get top 10 performers based on position
-        top_students = []
-        for position in positions.order_by('class_position')[:20]:  # Top 20
+        # Get top performers based on position
+        for position in matrix.ranked_positions(limit=20):  # Top 20
             metrics = metrics_map.get(position.student_id)
-            if metrics and position.class_position:
-                student = next((s for s in students if s.id == position.student_id), None)
-                if student:
-                    top_students.append({
-                        'position': position.class_position,
-                        'reg_no': student.registration_number or f"S{student.id:04d}",
-                        'name': student.full_name,
-                        'total_marks': metrics.total_marks,
-                        'average': metrics.average_marks,
-                        'division': metrics.division.division if metrics.division else "-"
-                    })
-        
-        # Write top performers
-        top_start_row = 4
-        
-        for idx, student_data in enumerate(top_students, start=top_start_row):
-            ws_top.cell(row=idx, column=1, value=student_data['position']).border = cell_border
-            ws_top.cell(row=idx, column=1).alignment = center_alignment
-            
-            ws_top.cell(row=idx, column=2, value=student_data['reg_no']).border = cell_border
-            
-            ws_top.cell(row=idx, column=3, value=student_data['name']).border = cell_border
-            
-            ws_top.cell(row=idx, column=4, 
-                       value=f"{student_data['total_marks']:.1f}" if student_data['total_marks'] else "-").border = cell_border
-            ws_top.cell(row=idx, column=4).alignment = center_alignment
-            
-            ws_top.cell(row=idx, column=5, 
-                       value=f"{student_data['average']:.2f}" if student_data['average'] else "-").border = cell_border
-            ws_top.cell(row=idx, column=5).alignment = center_alignment
-            
-            ws_top.cell(row=idx, column=6, value=student_data['division']).border = cell_border
-            ws_top.cell(row=idx, column=6).alignment = center_alignment
+            if not (metrics and position.class_position):
+                continue
+            student = students_by_id.get(position.student_id)
+            if not student:
+                continue
+            ws_top.append([
+                position.class_position,
+                student.registration_number or f"S{student.id:04d}",
+                student.full_name,
+                f"{metrics.total_marks:.1f}" if metrics.total_marks else "-",
+                f"{metrics.average_marks:.2f}" if metrics.average_marks else "-",
+                metrics.division.division if metrics.division else "-",
+            ], style='cell_center', styles={2: 'cell', 3: 'cell'})
         
         # ============================================
         # CREATE RESPONSE
         # ============================================
-        response = HttpResponse(
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        filename = f"Session_Report_{exam_session.name.replace(' ', '_')}_{timezone.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        
-        # Save workbook to response
-        wb.save(response)
-        return response
+        output = export.save()
+        store_report(cache_key, output)
+        output.seek(0)
+
+        return export.response(filename, output)
         
     except Exception as e:
         import traceback
@@ -4210,31 +3712,73 @@ def download_session_summary(request, exam_session_id):
     """Download session summary as CSV"""
     try:
         exam_session = get_object_or_404(ExamSession, id=exam_session_id)
-        
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="Session_Summary_{exam_session.name}.csv"'
-        
-        writer = csv.writer(response)
-        
-        # Write headers
-        writer.writerow(['Exam Session Summary', exam_session.name])
-        writer.writerow(['Academic Year', exam_session.academic_year.name])
-        writer.writerow(['Term', exam_session.term.get_term_number_display()])
-        writer.writerow(['Class', exam_session.class_level.name])
-        writer.writerow(['Stream', exam_session.stream_class.stream_letter if exam_session.stream_class else 'All'])
-        writer.writerow(['Exam Date', exam_session.exam_date])
-        writer.writerow([])
-        
-        # Add summary statistics
-        writer.writerow(['Summary Statistics'])
-        # You can add more statistics here
-        
-        return response
+        filename = f"Session_Summary_{exam_session.name}.csv"
+
+        cache_key = session_report_key(exam_session, 'session_summary')
+        content = get_cached_report(cache_key)
+        if content is None:
+            buffer = StringIO()
+            writer = csv.writer(buffer)
+
+            # Write headers
+            writer.writerow(['Exam Session Summary', exam_session.name])
+            writer.writerow(['Academic Year', exam_session.academic_year.name])
+            writer.writerow(['Term', exam_session.term.get_term_number_display()])
+            writer.writerow(['Class', exam_session.class_level.name])
+            writer.writerow(['Stream', exam_session.stream_class.stream_letter if exam_session.stream_class else 'All'])
+            writer.writerow(['Exam Date', exam_session.exam_date])
+            writer.writerow([])
+
+            # Add summary statistics
+            writer.writerow(['Summary Statistics'])
+            # You can add more statistics here
+
+            content = buffer.getvalue().encode('utf-8')
+            store_report(cache_key, content)
+
+        return report_file_response(content, filename, 'text/csv')
         
     except Exception as e:
         return HttpResponse(f"Error generating summary: {str(e)}", status=500)
 
 
+def history_sessions(history):
+    """
+    Turn StudentExamHistory rows into the sessions list and
+    {session_id: {'metrics': ..., 'positions': ...}} mapping used by the
+    student history page and its Excel export. Each session carries the
+    student's totals as attributes; the history row stands in for both
+    the metrics and the positions.
+    """
+    exam_sessions = []
+    session_metrics = {}
+    for row in history:
+        session = row.exam_session
+        session.total_subjects = row.total_subjects
+        session.total_marks = row.total_marks
+        session.average_marks = row.average_marks
+        session.average_percentage = row.average_percentage
+        session.total_students_in_session = row.class_size
+        exam_sessions.append(session)
+        session_metrics[session.id] = {
+            'metrics': row,
+            'positions': row
+        }
+    return exam_sessions, session_metrics
+
+
+def history_filter_options(exam_sessions):
+    """Distinct class levels, academic years and terms of the listed sessions."""
+    class_levels = {s.class_level.id: s.class_level.name for s in exam_sessions}
+    academic_years = {s.academic_year.id: s.academic_year.name for s in exam_sessions}
+    terms = {s.term.id: s.term.term_number for s in exam_sessions}
+    return {
+        'class_levels': sorted(class_levels.items(), key=lambda item: item[1]),
+        'academic_years': sorted(academic_years.items(), key=lambda item: item[1], reverse=True),
+        'terms': sorted(terms.items(), key=lambda item: item[1]),
+    }
+
+
 @login_required
 def student_sessions_list(request, student_id):
     """Display all exam sessions for a specific student where they have results"""
@@ -4250,51 +3794,11 @@ def student_sessions_list(request, student_id):
             id=student_id
         )
 
-        # Get all exam sessions where this student has results
-        sessions_with_results = ExamSession.objects.filter(
-            results__student=student
-        ).distinct()
-
-        # Annotate sessions with student's data and total students count
-        exam_sessions = sessions_with_results.select_related(
-            'exam_type',
-            'academic_year',
-            'term',
-            'class_level',
-            'class_level__educational_level',
-            'stream_class'
-        ).annotate(
-            total_subjects=Count('results', filter=Q(results__student=student)),
-            average_marks=Avg('results__marks_obtained', filter=Q(results__student=student)),
-            average_percentage=Avg('results__percentage', filter=Q(results__student=student)),
-            total_marks=Sum('results__marks_obtained', filter=Q(results__student=student)),
-            total_students_in_session=Count('results__student', distinct=True)
-        ).order_by('-exam_date', '-created_at')
-
-        # Get metrics and positions for each session
-        session_metrics = {}
-        for session in exam_sessions:
-            metrics = StudentExamMetrics.objects.filter(
-                student=student,
-                exam_session=session
-            ).select_related('division').first()
-
-            positions = StudentExamPosition.objects.filter(
-                student=student,
-                exam_session=session
-            ).first()
-
-            session_metrics[session.id] = {
-                'metrics': metrics,
-                'positions': positions
-            }
+        # The student's exam history, one row per session, in one query
+        exam_sessions, session_metrics = history_sessions(student_exam_history(student))
 
         # Get filter options for export modal
-        filter_options = {
-            'class_levels': exam_sessions.values_list('class_level__id', 'class_level__name').distinct().order_by('class_level__name'),
-            'academic_years': exam_sessions.values_list('academic_year__id', 'academic_year__name').distinct().order_by('-academic_year__name'),
-            'terms': exam_sessions.values_list('term__id', 'term__term_number').distinct().order_by('term__term_number'),
-        }
+        filter_options = history_filter_options(exam_sessions)
 
         # Get current class information
         current_class_info = {
@@ -4310,7 +3814,7 @@ def student_sessions_list(request, student_id):
             'session_metrics': session_metrics,
             'current_class_info': current_class_info,
             'filter_options': filter_options,
-            'total_sessions': exam_sessions.count(),
+            'total_sessions': len(exam_sessions),
             'page_title': f'{student.full_name} - Exam Sessions',
             'breadcrumb_title': 'Student Exam History',
         }
@@ -4347,86 +3851,44 @@ def student_sessions_export_excel(request, student_id):
         print(f"[EXPORT_EXCEL] Filters - DateFrom: {date_from}, DateTo: {date_to}")
         print(f"[EXPORT_EXCEL] Session IDs: {session_ids}")
         
-        # Base queryset
-        sessions_query = ExamSession.objects.filter(
-            results__student=student
-        ).distinct()
-        print(f"[EXPORT_EXCEL] Base sessions count: {sessions_query.count()}")
-        
-        # Apply filters
+        # Apply filters to the student's history rows
+        history_filters = {}
         filters_applied = {}
         
         if class_level_id:
-            sessions_query = sessions_query.filter(class_level_id=class_level_id)
+            history_filters['exam_session__class_level_id'] = class_level_id
             filters_applied['class_level'] = class_level_id
             print(f"[EXPORT_EXCEL] Applied class_level filter: {class_level_id}")
             
         if academic_year_id:
-            sessions_query = sessions_query.filter(academic_year_id=academic_year_id)
+            history_filters['exam_session__academic_year_id'] = academic_year_id
             filters_applied['academic_year'] = academic_year_id
             print(f"[EXPORT_EXCEL] Applied academic_year filter: {academic_year_id}")
             
         if term_id:
-            sessions_query = sessions_query.filter(term_id=term_id)
+            history_filters['exam_session__term_id'] = term_id
             filters_applied['term'] = term_id
             print(f"[EXPORT_EXCEL] Applied term filter: {term_id}")
             
         if date_from:
-            sessions_query = sessions_query.filter(exam_date__gte=date_from)
+            history_filters['exam_date__gte'] = date_from
             filters_applied['date_from'] = date_from
             print(f"[EXPORT_EXCEL] Applied date_from filter: {date_from}")
             
         if date_to:
-            sessions_query = sessions_query.filter(exam_date__lte=date_to)
+            history_filters['exam_date__lte'] = date_to
             filters_applied['date_to'] = date_to
             print(f"[EXPORT_EXCEL] Applied date_to filter: {date_to}")
             
         if session_ids:
-            sessions_query = sessions_query.filter(id__in=session_ids)
+            history_filters['exam_session_id__in'] = session_ids
             filters_applied['sessions'] = session_ids
             print(f"[EXPORT_EXCEL] Applied session_ids filter, count: {len(session_ids)}")
         
-        print(f"[EXPORT_EXCEL] Sessions after filters: {sessions_query.count()}")
-        
-        # Get annotated sessions
-        exam_sessions = sessions_query.select_related(
-            'exam_type',
-            'academic_year',
-            'term',
-            'class_level',
-            'class_level__educational_level',
-            'stream_class'
-        ).annotate(
-            total_subjects=Count('results', filter=Q(results__student=student)),
-            average_marks=Avg('results__marks_obtained', filter=Q(results__student=student)),
-            average_percentage=Avg('results__percentage', filter=Q(results__student=student)),
-            total_marks=Sum('results__marks_obtained', filter=Q(results__student=student)),
-            total_students_in_session=Count('results__student', distinct=True)
-        ).order_by('-exam_date', '-created_at')
-        
-        print(f"[EXPORT_EXCEL] Annotated sessions count: {exam_sessions.count()}")
-        
-        # Get metrics and positions
-        session_metrics = {}
-        for session in exam_sessions:
-            print(f"[EXPORT_EXCEL] Processing session: {session.id} - {session.name}")
-            
-            metrics = StudentExamMetrics.objects.filter(
-                student=student,
-                exam_session=session
-            ).select_related('division').first()
-            
-            positions = StudentExamPosition.objects.filter(
-                student=student,
-                exam_session=session
-            ).first()
-            
-            session_metrics[session.id] = {
-                'metrics': metrics,
-                'positions': positions
-            }
-            
-            print(f"[EXPORT_EXCEL]   Metrics found: {metrics is not None}, Positions found: {positions is not None}")
+        # Sessions with the student's totals, metrics and positions in one query
+        exam_sessions, session_metrics = history_sessions(
+            student_exam_history(student, **history_filters)
+        )
 
         print(f"[EXPORT_EXCEL] Calling export_student_sessions_to_excel...")
         wb = export_student_sessions_to_excel(student, exam_sessions, session_metrics, filters_applied)
@@ -4491,24 +3953,25 @@ def student_session_results(request, student_id, exam_session_id):
             id=exam_session_id
         )
 
-        if not StudentResult.objects.filter(
-            exam_session=exam_session,
-            student=student
-        ).exists():
-            messages.warning(request, "No results found for this student in the selected exam session.")
-            return redirect('student_sessions_list', student_id=student_id)
-
-        subjects = Subject.objects.filter(
+        subjects = list(Subject.objects.filter(
             educational_level=exam_session.class_level.educational_level,
             is_active=True
-        ).order_by('code')
+        ).order_by('code'))
 
-        results = StudentResult.objects.filter(
-            exam_session=exam_session,
-            student=student
-        ).select_related('subject')
+        # Results, metrics and positions (from the snapshot once published)
+        results_dict, metrics, positions = student_results_in_session(
+            exam_session, student.id, subjects
+        )
 
-        results_dict = {result.subject_id: result for result in results}
+        if not results_dict:
+            messages.warning(request, "No results found for this student in the selected exam session.")
+            return redirect('student_sessions_list', student_id=student_id)
+
+        # One cache read for the positions of every subject the student sat
+        rank_indexes = get_subject_rank_indexes(exam_session, [
+            subject_id for subject_id, result in results_dict.items()
+            if result.marks_obtained is not None
+        ])
 
         # Get all students in the same class/stream for position calculation
         student_filters = {
@@ -4539,17 +4002,10 @@ def student_session_results(request, student_id, exam_session_id):
                 total_grade_points += grade_point
                 subjects_with_marks += 1
 
-                # Calculate subject position on the fly
-                subject_position = get_student_subject_position(
-                    student_id, subject.id, exam_session_id, exam_session
-                )
-                
-                # Get total students with marks in this subject
-                students_with_marks_in_subject = StudentResult.objects.filter(
-                    exam_session=exam_session,
-                    subject=subject,
-                    marks_obtained__isnull=False
-                ).count()
+                # Subject position from the cached rank index
+                rank_index = rank_indexes[subject.id]
+                subject_position = rank_index.position(student.id)
+                students_with_marks_in_subject = rank_index.total
 
                 subject_results.append({
                     'subject': subject,
@@ -4575,16 +4031,6 @@ def student_session_results(request, student_id, exam_session_id):
                     'has_result': False
                 })
 
-        metrics = StudentExamMetrics.objects.filter(
-            student=student,
-            exam_session=exam_session
-        ).select_related('division').first()
-
-        positions = StudentExamPosition.objects.filter(
-            student=student,
-            exam_session=exam_session
-        ).first()
-
         overall_stats = {
             'total_subjects': len(subjects),
             'subjects_with_marks': subjects_with_marks,
@@ -4636,64 +4082,11 @@ def student_session_results(request, student_id, exam_session_id):
 
 def get_student_subject_position(student_id, subject_id, exam_session_id, exam_session=None):
     """
-    Helper function to calculate a student's position in a specific subject
+    Helper function to get a student's position in a specific subject
     based on marks, with tie-breaking by registration number and name.
     Returns the position as an integer or None if not found.
     """
-    try:
-        if not exam_session:
-            exam_session = ExamSession.objects.get(id=exam_session_id)
-        
-        # Get all students in the same class/stream
-        student_filters = {
-            'class_level': exam_session.class_level,
-            'is_active': True
-        }
-        
-        if exam_session.stream_class:
-            student_filters['stream_class'] = exam_session.stream_class
-        
-        students = Student.objects.filter(**student_filters)
-        
-        # Get results for this subject
-        results = StudentResult.objects.filter(
-            exam_session_id=exam_session_id,
-            subject_id=subject_id,
-            marks_obtained__isnull=False
-        ).select_related('student')
-        
-        # Build list of students with marks
-        students_with_marks = []
-        for result in results:
-            if result.marks_obtained is not None:
-                try:
-                    marks_float = float(result.marks_obtained)
-                    students_with_marks.append({
-                        'student_id': result.student_id,
-                        'marks': marks_float,
-                        'registration_number': result.student.registration_number or f"S{result.student_id:04d}",
-                        'full_name': result.student.full_name
-                    })
-                except (TypeError, ValueError):
-                    continue
-        
-        # Sort by marks (descending) and then by tie-breakers
-        students_with_marks.sort(key=lambda x: (
-            -x['marks'],  # Primary: Higher marks first
-            x['registration_number'],  # Secondary: Registration number (alphabetical)
-            x['full_name']  # Tertiary: Full name (alphabetical)
-        ))
-        
-        # Find the target student's position
-        for position, item in enumerate(students_with_marks, start=1):
-            if item['student_id'] == student_id:
-                return position
-        
-        return None
-        
-    except Exception as e:
-        print(f"Error calculating subject position: {str(e)}")
-        return None
+    return get_subject_rank_index(exam_session or exam_session_id, subject_id).position(student_id)
 
 
 @login_required
@@ -4724,142 +4117,28 @@ def download_student_pdf_report(request, student_id, exam_session_id):
             id=exam_session_id
         )
 
-        # Get all students count for ranking context
-        student_filters = {
-            'class_level': exam_session.class_level,
-            'is_active': True
-        }
-        
-        if exam_session.stream_class:
-            student_filters['stream_class'] = exam_session.stream_class
-        
-        all_students = Student.objects.filter(**student_filters)
-        total_students_count = all_students.count()
+        # Students in the class (and stream) for ranking context
+        total_students_count = session_students(exam_session).count()
 
         # Subjects
-        subjects = Subject.objects.filter(
-            educational_level=exam_session.class_level.educational_level,
-            is_active=True
-        ).order_by('code')
+        subjects = list(session_subjects(exam_session))
 
-        # Results
-        results = StudentResult.objects.filter(
-            exam_session=exam_session,
-            student=student
-        ).select_related('subject')
+        # Results, metrics and positions (from the snapshot once published)
+        results_dict, metrics, positions = student_results_in_session(
+            exam_session, student.id, subjects
+        )
 
-        results_dict = {result.subject_id: result for result in results}
+        # One cache read for the positions of every subject the student sat
+        rank_indexes = get_subject_rank_indexes(exam_session, [
+            subject_id for subject_id, result in results_dict.items()
+            if result.marks_obtained is not None
+        ])
 
-        subject_results = []
-        total_marks = 0
-        total_grade_points = 0
-        subjects_with_marks = 0
-
-        for subject in subjects:
-            result = results_dict.get(subject.id)
-
-            if result and result.marks_obtained is not None:
-                marks = float(result.marks_obtained)
-                percentage = float(result.percentage) if result.percentage else 0
-                grade_point = float(result.grade_point) if result.grade_point else 0
-
-                total_marks += marks
-                total_grade_points += grade_point
-                subjects_with_marks += 1
-
-                # Calculate subject position on the fly
-                subject_position = get_student_subject_position(
-                    student_id, subject.id, exam_session_id, exam_session
-                )
-                
-                # Get total students with marks in this subject
-                students_with_marks_in_subject = StudentResult.objects.filter(
-                    exam_session=exam_session,
-                    subject=subject,
-                    marks_obtained__isnull=False
-                ).count()
-
-                subject_results.append({
-                    'subject': subject,
-                    'result': result,
-                    'marks': marks,
-                    'percentage': percentage,
-                    'grade': result.grade,
-                    'grade_point': grade_point,
-                    'position': subject_position,
-                    'total_students_in_subject': students_with_marks_in_subject,
-                    'has_result': True
-                })
-            else:
-                subject_results.append({
-                    'subject': subject,
-                    'result': None,
-                    'marks': None,
-                    'percentage': None,
-                    'grade': '-',
-                    'grade_point': None,
-                    'position': None,
-                    'total_students_in_subject': 0,
-                    'has_result': False
-                })
-
-        # Metrics
-        metrics = StudentExamMetrics.objects.filter(
-            student=student,
-            exam_session=exam_session
-        ).select_related('division').first()
-
-        # Positions
-        positions = StudentExamPosition.objects.filter(
-            student=student,
-            exam_session=exam_session
-        ).first()
-
-        overall_stats = {
-            'total_subjects': len(subjects),
-            'subjects_with_marks': subjects_with_marks,
-            'completion_rate': (subjects_with_marks / len(subjects) * 100) if subjects else 0,
-            'total_marks': total_marks,
-            'total_grade_points': total_grade_points,
-            'average_marks': total_marks / subjects_with_marks if subjects_with_marks else 0,
-            'average_grade_points': total_grade_points / subjects_with_marks if subjects_with_marks else 0,
-        }
-
-        # Class count
-        if exam_session.stream_class:
-            class_students_count = Student.objects.filter(
-                class_level=exam_session.class_level,
-                stream_class=exam_session.stream_class,
-                is_active=True
-            ).count()
-        else:
-            class_students_count = Student.objects.filter(
-                class_level=exam_session.class_level,
-                is_active=True
-            ).count()
-
-        class_ranking = (
-            f"{positions.class_position} of {class_students_count}"
-            if positions and positions.class_position
-            else "Not ranked"
+        context = report_card_context(
+            exam_session, student, subjects, results_dict, rank_indexes,
+            metrics, positions, total_students_count
         )
-
-        context = {
-            'student': student,
-            'exam_session': exam_session,
-            'subject_results': subject_results,
-            'metrics': metrics,
-            'positions': positions,
-            'overall_stats': overall_stats,
-            'class_ranking': class_ranking,
-            'class_students_count': class_students_count,
-            'total_students_count': total_students_count,
-            'generated_date': timezone.now(),
-            'generated_by': request.user.get_full_name() or request.user.username,
-            'school_name': getattr(settings, 'SCHOOL_NAME', 'Your School Name'),
-            'school_address': getattr(settings, 'SCHOOL_ADDRESS', ''),
-            'school_logo': os.path.join(settings.MEDIA_ROOT, 'school_logo.png') if os.path.exists(os.path.join(settings.MEDIA_ROOT, 'school_logo.png')) else None,
-        }
+        context.update(report_card_header(request.user.get_full_name() or request.user.username))
 
         html_string = render_to_string(
             'admin/results/student_pdf_report.html',
@@ -4873,10 +4152,7 @@ def download_student_pdf_report(request, student_id, exam_session_id):
 
         pdf_file = html.write_pdf()
 
-        filename = (
-            f"Results_{student.registration_number or student.id}_"
-            f"{exam_session.name.replace(' ', '_')}_{timezone.now().strftime('%Y%m%d')}.pdf"
-        )
+        filename = report_card_filename(student, exam_session)
 
         response = HttpResponse(pdf_file, content_type='application/pdf')
         response['Content-Disposition'] = f'attachment; filename="{filename}"'
@@ -4892,6 +4168,42 @@ def download_student_pdf_report(request, student_id, exam_session_id):
         )
 
 
+@login_required
+@require_GET
+def session_report_cards(request, exam_session_id):
+    """
+    Queue every report card of an exam session for printing, as one merged
+    PDF (``?output=pdf``, the default) or a ZIP of one PDF per student
+    (``?output=zip``).
+    """
+    exam_session = get_object_or_404(ExamSession, id=exam_session_id)
+
+    output = request.GET.get('output', 'pdf')
+    if output not in ('pdf', 'zip'):
+        output = 'pdf'
+
+    if not StudentResult.objects.filter(exam_session=exam_session).exists():
+        messages.warning(request, "No results found for this exam session.")
+        return redirect('manage_results', exam_session_id=exam_session_id)
+
+    filename = (
+        f"Report_Cards_{exam_session.name.replace(' ', '_')}_"
+        f"{timezone.now().strftime('%Y%m%d')}.{output}"
+    ).replace('/', '_')
+
+    job = enqueue_report(
+        request, 'session_report_cards', filename,
+        job_type='report_cards',
+        base_url=request.build_absolute_uri('/'),
+        params={
+            'exam_session_id': exam_session.id,
+            'output': output,
+            'generated_by': request.user.get_full_name() or request.user.username,
+        }
+    )
+    return report_job_response(request, job)
+
+
 @login_required
 def exam_sessions_list_view(request):
     """Display exam sessions management page with DataTable"""
@@ -5006,89 +4318,6 @@ def exam_session_analysis_view(request, exam_session_id):
         id=exam_session_id
     )
     
-    # Check if education level is Primary or Nursery
-    is_primary_nursery = exam_session.class_level.educational_level.code in ['PRIMARY', 'NURSERY']
-    
-    # Get all metrics for this exam session
-    metrics = StudentExamMetrics.objects.filter(
-        exam_session=exam_session
-    ).select_related('student', 'division').order_by('-average_marks')
-    
-    # Get positions
-    positions = StudentExamPosition.objects.filter(
-        exam_session=exam_session
-    ).select_related('student')
-    
-    # Get all possible divisions from DivisionScale for this education level (only for non-primary/nursery)
-    all_possible_divisions = []
-    division_code_to_display = {}
-    division_display_to_code = {}
-    
-    if not is_primary_nursery:
-        if exam_session.class_level and exam_session.class_level.educational_level:
-            division_scales = DivisionScale.objects.filter(
-                education_level=exam_session.class_level.educational_level
-            ).order_by('min_points')
-            
-            for scale in division_scales:
-                display_name = scale.get_division_display()
-                code = scale.division
-                all_possible_divisions.append(display_name)
-                division_code_to_display[code] = display_name
-                division_display_to_code[display_name] = code
-    
-    # Get all possible genders
-    all_possible_genders = ['Male', 'Female']
-    other_genders = set()
-    for metric in metrics:
-        gender = metric.student.get_gender_display()
-        if gender not in all_possible_genders:
-            other_genders.add(gender)
-    all_possible_genders.extend(sorted(list(other_genders)))
-    
-    # Get all possible grades for Primary/Nursery
-    all_possible_grades = []
-    grade_distribution_all = {}
-    if is_primary_nursery:
-        # Get all grades from GradingScale for this education level
-        grading_scales = GradingScale.objects.filter(
-            education_level=exam_session.class_level.educational_level
-        ).order_by('min_mark')
-        all_possible_grades = [scale.grade for scale in grading_scales]
-        
-        # Count grade distribution for all students
-        for metric in metrics:
-            if metric.average_grade:
-                grade_distribution_all[metric.average_grade] = grade_distribution_all.get(metric.average_grade, 0) + 1
-    
-    # Combine data
-    all_student_data = []
-    for metric in metrics:
-        position = positions.filter(student=metric.student).first()
-        
-        # Get division display name (only for non-primary/nursery)
-        division_code = metric.division.division if metric.division else None
-        division_display = metric.division.get_division_display() if metric.division else 'Not Assigned'
-        
-        student_info = {
-            'id': metric.student.id,
-            'registration_number': metric.student.registration_number or f"S{metric.student.id:04d}",
-            'full_name': metric.student.full_name,
-            'gender': metric.student.get_gender_display(),
-            'total_marks': metric.total_marks,
-            'average_marks': metric.average_marks,
-            'average_percentage': metric.average_percentage,
-            'average_grade': metric.average_grade,
-            'total_grade_points': metric.total_grade_points,
-            'division_code': division_code,
-            'division_display': division_display,
-            'division': division_code,
-            'class_position': position.class_position if position else None,
-            'stream_position': position.stream_position if position else None,
-            'rank': position.class_position if position else None,
-        }
-        all_student_data.append(student_info)
-    
     # Get filter parameters
     division_filter = request.GET.get('division', '')
     grade_filter = request.GET.get('grade', '')
@@ -5097,224 +4326,30 @@ def exam_session_analysis_view(request, exam_session_id):
     top_n = request.GET.get('top_n', '10')
     bottom_n = request.GET.get('bottom_n', '10')
     
-    # Apply filters to get filtered student_data
-    student_data = all_student_data.copy()
-    
-    # Apply division filter (only for non-primary/nursery)
-    if division_filter and not is_primary_nursery:
-        filtered_students = []
-        for student in student_data:
-            if division_filter == 'Not Assigned':
-                if not student['division']:
-                    filtered_students.append(student)
-            elif student['division_display'] == division_filter or student['division_code'] == division_filter:
-                filtered_students.append(student)
-        student_data = filtered_students
-    
-    # Apply grade filter (only for primary/nursery)
-    if grade_filter and is_primary_nursery:
-        filtered_students = []
-        for student in student_data:
-            if grade_filter == 'No Grade':
-                if not student['average_grade']:
-                    filtered_students.append(student)
-            elif student['average_grade'] == grade_filter:
-                filtered_students.append(student)
-        student_data = filtered_students
-    
-    if gender_filter:
-        student_data = [s for s in student_data if s['gender'].lower() == gender_filter.lower()]
-    
-    if rank_filter == 'top':
-        try:
-            n = int(top_n)
-            student_data = sorted(
-                [s for s in student_data if s['rank']], 
-                key=lambda x: x['rank']
-            )[:n]
-        except ValueError:
-            pass
-    elif rank_filter == 'bottom':
-        try:
-            n = int(bottom_n)
-            sorted_data = sorted(
-                [s for s in student_data if s['rank']], 
-                key=lambda x: x['rank'],
-                reverse=True
-            )
-            student_data = sorted_data[:n]
-        except ValueError:
-            pass
-    
-    # Calculate statistics for filtered data
-    total_students = len(student_data)
-    students_with_division = len([s for s in student_data if s['division']]) if not is_primary_nursery else 0
-    students_without_division = total_students - students_with_division if not is_primary_nursery else 0
-    
-    # Division distribution (only divisions with students) - for non-primary/nursery
-    division_distribution = {}
-    if not is_primary_nursery:
-        for student in student_data:
-            if student['division_display'] and student['division_display'] != 'Not Assigned':
-                division_distribution[student['division_display']] = division_distribution.get(
-                    student['division_display'], 0) + 1
-    
-    # Grade distribution (only grades with students) - for primary/nursery
-    grade_distribution = {}
-    if is_primary_nursery:
-        for student in student_data:
-            if student['average_grade']:
-                grade_distribution[student['average_grade']] = grade_distribution.get(student['average_grade'], 0) + 1
-    
-    # Gender distribution
-    gender_distribution = {}
-    for student in student_data:
-        gender = student['gender']
-        gender_distribution[gender] = gender_distribution.get(gender, 0) + 1
-    
-    # Average marks by gender
-    gender_averages = {}
-    gender_counts = {}
-    for student in student_data:
-        gender = student['gender']
-        if student['average_marks']:
-            gender_averages[gender] = gender_averages.get(gender, 0) + float(student['average_marks'])
-            gender_counts[gender] = gender_counts.get(gender, 0) + 1
-    
-    for gender in gender_averages:
-        if gender_counts[gender] > 0:
-            gender_averages[gender] = round(gender_averages[gender] / gender_counts[gender], 2)
-    
-    # Average marks by division (for non-primary/nursery)
-    division_averages = {}
-    division_counts = {}
-    if not is_primary_nursery:
-        for student in student_data:
-            division = student['division_display']
-            if division and division != 'Not Assigned' and student['average_marks']:
-                division_averages[division] = division_averages.get(division, 0) + float(student['average_marks'])
-                division_counts[division] = division_counts.get(division, 0) + 1
-        
-        for division in division_averages:
-            if division_counts[division] > 0:
-                division_averages[division] = round(division_averages[division] / division_counts[division], 2)
-    
-    # ---------------------------------------------------------
-    # CROSS-ANALYSIS MATRIX - CONDITIONAL BASED ON EDUCATION LEVEL
-    # ---------------------------------------------------------
-    
-    if is_primary_nursery:
-        # ---------------------------------------------------------
-        # GRADE × GENDER CROSS-ANALYSIS MATRIX - FOR PRIMARY/NURSERY
-        # ---------------------------------------------------------
-        
-        # Use all possible grades from GradingScale
-        matrix_grades = all_possible_grades.copy()
-        matrix_genders = all_possible_genders.copy()
-        
-        # Initialize matrix with zeros
-        grade_gender_matrix = {gender: {grade: 0 for grade in matrix_grades} for gender in matrix_genders}
-        grade_totals = {grade: 0 for grade in matrix_grades}
-        gender_totals = {gender: 0 for gender in matrix_genders}
-        grand_total = 0
-        
-        # Populate matrix with actual data from ALL students (not filtered)
-        for student in all_student_data:
-            gen = student['gender']
-            grade = student['average_grade']
-            
-            if grade and grade in matrix_grades:
-                grade_gender_matrix[gen][grade] += 1
-                grade_totals[grade] += 1
-                gender_totals[gen] += 1
-                grand_total += 1
-        
-        # Add 'No Grade' category if needed
-        students_without_grade_all = len([s for s in all_student_data if not s['average_grade']])
-        if students_without_grade_all > 0:
-            matrix_grades_with_na = matrix_grades + ['No Grade']
-            
-            for gender in matrix_genders:
-                grade_gender_matrix[gender]['No Grade'] = 0
-            grade_totals['No Grade'] = 0
-            
-            for student in all_student_data:
-                gen = student['gender']
-                grade = student['average_grade']
-                if not grade:
-                    grade_gender_matrix[gen]['No Grade'] += 1
-                    grade_totals['No Grade'] += 1
-                    gender_totals[gen] += 1
-                    grand_total += 1
-            
-            matrix_grades = matrix_grades_with_na
-        
-        matrix_columns = matrix_grades
-        matrix_data = grade_gender_matrix
-        column_totals = grade_totals
-        
-    else:
-        # ---------------------------------------------------------
-        # DIVISION × GENDER CROSS-ANALYSIS MATRIX - FOR SECONDARY
-        # ---------------------------------------------------------
-        
-        # Use all possible divisions from DivisionScale
-        matrix_divisions = all_possible_divisions.copy()
-        matrix_genders = all_possible_genders.copy()
-        
-        # Initialize matrix with zeros
-        division_gender_matrix = {gender: {div: 0 for div in matrix_divisions} for gender in matrix_genders}
-        division_totals = {div: 0 for div in matrix_divisions}
-        gender_totals = {gender: 0 for gender in matrix_genders}
-        grand_total = 0
-        
-        # Populate matrix with actual data from ALL students (not filtered)
-        for student in all_student_data:
-            gen = student['gender']
-            div = student['division_display']
-            
-            if div and div != 'Not Assigned' and div in matrix_divisions:
-                division_gender_matrix[gen][div] += 1
-                division_totals[div] += 1
-                gender_totals[gen] += 1
-                grand_total += 1
-        
-        # Add 'Not Assigned' category if needed
-        students_without_division_all = len([s for s in all_student_data if not s['division']])
-        if students_without_division_all > 0:
-            matrix_divisions_with_na = matrix_divisions + ['Not Assigned']
-            
-            for gender in matrix_genders:
-                division_gender_matrix[gender]['Not Assigned'] = 0
-            division_totals['Not Assigned'] = 0
-            
-            for student in all_student_data:
-                gen = student['gender']
-                div = student['division_display']
-                if not div or div == 'Not Assigned':
-                    division_gender_matrix[gen]['Not Assigned'] += 1
-                    division_totals['Not Assigned'] += 1
-                    gender_totals[gen] += 1
-                    grand_total += 1
-            
-            matrix_divisions = matrix_divisions_with_na
-        
-        matrix_columns = matrix_divisions
-        matrix_data = division_gender_matrix
-        column_totals = division_totals
-    
-    # Top performers (from all students, not filtered)
-    top_performers = sorted(
-        [s for s in all_student_data if s['rank']],
-        key=lambda x: x['rank']
-    )[:10]
-    
-    # Bottom performers (from all students, not filtered)
-    bottom_performers = sorted(
-        [s for s in all_student_data if s['rank']],
-        key=lambda x: x['rank'],
-        reverse=True
-    )[:10]
+    # Load the session once and compute every breakdown on arrays
+    breakdown = exam_session_breakdown(
+        exam_session,
+        division_filter=division_filter,
+        grade_filter=grade_filter,
+        gender_filter=gender_filter,
+        rank_filter=rank_filter,
+        top_n=top_n,
+        bottom_n=bottom_n,
+    )
+    is_primary_nursery = breakdown['is_primary_nursery']
+    all_student_data = breakdown['all_student_data']
+    student_data = breakdown['student_data']
+    all_possible_grades = breakdown['all_possible_grades']
+    division_code_to_display = breakdown['division_code_to_display']
+    division_display_to_code = breakdown['division_display_to_code']
+    
+    # Cross-analysis matrix: grade × gender (primary/nursery) or division × gender
+    matrix = breakdown['matrix']
+    matrix_columns = matrix['columns']
+    matrix_data = matrix['matrix']
+    column_totals = matrix['column_totals']
+    gender_totals = matrix['gender_totals']
+    grand_total = matrix['grand_total']
     
     # Filter options
     if is_primary_nursery:
@@ -5323,12 +4358,9 @@ def exam_session_analysis_view(request, exam_session_id):
         unique_grades_for_filter = all_possible_grades + ['No Grade'] if all_possible_grades else []
     else:
         unique_divisions_for_filter = ['Division I', 'Division II', 'Division III', 'Division IV', 'Division 0', 'Not Assigned']
-        unique_divisions_display = matrix_divisions
+        unique_divisions_display = matrix_columns
         unique_grades_for_filter = []
     
-    # Get unique genders for filter dropdowns
-    unique_genders = sorted(set([s['gender'] for s in all_student_data if s['gender']]))
-    
     context = {
         'exam_session': exam_session,
         'is_primary_nursery': is_primary_nursery,
@@ -5340,23 +4372,23 @@ def exam_session_analysis_view(request, exam_session_id):
         'total_students_all': len(all_student_data),
         
         # Division/Grade stats
-        'students_with_division': students_with_division if not is_primary_nursery else 0,
-        'students_with_division_all': len([s for s in all_student_data if s['division']]) if not is_primary_nursery else 0,
-        'students_without_division': students_without_division if not is_primary_nursery else 0,
-        'students_without_division_all': len([s for s in all_student_data if not s['division']]) if not is_primary_nursery else 0,
+        'students_with_division': breakdown['students_with_division'],
+        'students_with_division_all': breakdown['students_with_division_all'],
+        'students_without_division': breakdown['students_without_division'],
+        'students_without_division_all': breakdown['students_without_division_all'],
         
         # Distributions
-        'division_distribution': division_distribution if not is_primary_nursery else {},
-        'grade_distribution': grade_distribution if is_primary_nursery else {},
-        'gender_distribution': gender_distribution,
+        'division_distribution': breakdown['division_distribution'],
+        'grade_distribution': breakdown['grade_distribution'],
+        'gender_distribution': breakdown['gender_distribution'],
         
         # Averages
-        'gender_averages': gender_averages,
-        'division_averages': division_averages if not is_primary_nursery else {},
+        'gender_averages': breakdown['gender_averages'],
+        'division_averages': breakdown['division_averages'],
         
         # Top/Bottom performers
-        'top_performers': top_performers,
-        'bottom_performers': bottom_performers,
+        'top_performers': breakdown['top_performers'],
+        'bottom_performers': breakdown['bottom_performers'],
         
         # Cross-analysis matrix data
         'matrix_data': matrix_data,
@@ -5367,23 +4399,23 @@ def exam_session_analysis_view(request, exam_session_id):
         
         # Education level specific data
         'all_possible_grades': all_possible_grades if is_primary_nursery else [],
-        'grade_distribution_all': grade_distribution_all if is_primary_nursery else {},
+        'grade_distribution_all': breakdown['grade_distribution_all'],
         
         # Division specific data (for secondary)
-        'division_gender_matrix': division_gender_matrix if not is_primary_nursery else {},
-        'division_columns': matrix_divisions if not is_primary_nursery else [],
-        'division_totals': division_totals if not is_primary_nursery else {},
+        'division_gender_matrix': matrix_data if not is_primary_nursery else {},
+        'division_columns': matrix_columns if not is_primary_nursery else [],
+        'division_totals': column_totals if not is_primary_nursery else {},
         
         # Grade specific data (for primary/nursery)
-        'grade_gender_matrix': grade_gender_matrix if is_primary_nursery else {},
-        'grade_columns': matrix_grades if is_primary_nursery else [],
-        'grade_totals': grade_totals if is_primary_nursery else {},
+        'grade_gender_matrix': matrix_data if is_primary_nursery else {},
+        'grade_columns': matrix_columns if is_primary_nursery else [],
+        'grade_totals': column_totals if is_primary_nursery else {},
         
         # Filter options
         'unique_divisions': unique_divisions_for_filter,
         'unique_divisions_display': unique_divisions_display,
         'unique_grades': unique_grades_for_filter,
-        'unique_genders': unique_genders,
+        'unique_genders': breakdown['unique_genders'],
         
         # Current filter values
         'division_filter': division_filter if not is_primary_nursery else '',
@@ -5430,10 +4462,6 @@ def exam_session_analysis_pdf(request, exam_session_id):
         )
         print(f"[ANALYSIS_PDF] Loaded session: {exam_session.name}")
 
-        # Check if education level is Primary or Nursery
-        is_primary_nursery = exam_session.class_level.educational_level.code in ['PRIMARY', 'NURSERY']
-        print(f"[ANALYSIS_PDF] Is Primary/Nursery: {is_primary_nursery}")
-
         # Section parameter
         section = request.GET.get('section', 'full')
         print(f"[ANALYSIS_PDF] Section requested: {section}")
@@ -5448,328 +4476,68 @@ def exam_session_analysis_pdf(request, exam_session_id):
         
         print(f"[ANALYSIS_PDF] Filters - Division: '{division_filter}', Grade: '{grade_filter}', Gender: '{gender_filter}', Rank: '{rank_filter}', TopN: {top_n}, BottomN: {bottom_n}")
 
-        # Metrics
-        metrics = StudentExamMetrics.objects.filter(
-            exam_session=exam_session
-        ).select_related('student', 'division').order_by('-average_marks')
-        print(f"[ANALYSIS_PDF] Metrics count: {metrics.count()}")
-
-        # Positions
-        positions = StudentExamPosition.objects.filter(
-            exam_session=exam_session
-        ).select_related('student')
-        print(f"[ANALYSIS_PDF] Positions count: {positions.count()}")
-
-        # Get all possible divisions from DivisionScale for this education level (only for non-primary/nursery)
-        all_possible_divisions = []
-        division_code_to_display = {}
-        division_display_to_code = {}
-        
-        if not is_primary_nursery:
-            if exam_session.class_level and exam_session.class_level.educational_level:
-                division_scales = DivisionScale.objects.filter(
-                    education_level=exam_session.class_level.educational_level
-                ).order_by('min_points')
-                
-                for scale in division_scales:
-                    display_name = scale.get_division_display()
-                    code = scale.division
-                    all_possible_divisions.append(display_name)
-                    division_code_to_display[code] = display_name
-                    division_display_to_code[display_name] = code
-            
-            print(f"[ANALYSIS_PDF] All possible divisions: {all_possible_divisions}")
-        
-        # Get all possible grades from GradingScale for this education level (only for primary/nursery)
-        all_possible_grades = []
-        grade_distribution_all = {}
-        if is_primary_nursery:
-            grading_scales = GradingScale.objects.filter(
-                education_level=exam_session.class_level.educational_level
-            ).order_by('min_mark')
-            all_possible_grades = [scale.grade for scale in grading_scales]
-            print(f"[ANALYSIS_PDF] All possible grades: {all_possible_grades}")
-
-        # Get all possible genders from the Student model
-        all_possible_genders = ['Male', 'Female']
-        other_genders = set()
-        for metric in metrics:
-            gender = metric.student.get_gender_display()
-            if gender not in all_possible_genders:
-                other_genders.add(gender)
-        all_possible_genders.extend(sorted(list(other_genders)))
-        print(f"[ANALYSIS_PDF] All possible genders: {all_possible_genders}")
-
-        # ============= BUILD ALL STUDENT DATA =============
-        all_student_data = []
-        
-        for metric in metrics:
-            position = positions.filter(student=metric.student).first()
-            
-            # Get division information (only for non-primary/nursery)
-            division_code = metric.division.division if metric.division else None
-            division_display = metric.division.get_division_display() if metric.division else 'Not Assigned'
-            
-            student_info = {
-                'id': metric.student.id,
-                'registration_number': metric.student.registration_number or f"S{metric.student.id:04d}",
-                'full_name': metric.student.full_name,
-                'gender': metric.student.get_gender_display(),
-                'total_marks': metric.total_marks,
-                'average_marks': metric.average_marks,
-                'average_percentage': metric.average_percentage,
-                'average_grade': metric.average_grade,
-                'total_grade_points': metric.total_grade_points,
-                'division_code': division_code,
-                'division_display': division_display,
-                'division': division_code,
-                'class_position': position.class_position if position else None,
-                'stream_position': position.stream_position if position else None,
-                'rank': position.class_position if position else None,
-            }
-            all_student_data.append(student_info)
-
-        print(f"[ANALYSIS_PDF] Total students processed: {len(all_student_data)}")
-
-        # ============= APPLY FILTERS =============
-        filtered_student_data = all_student_data.copy()
-        
-        # Apply Division Filter (only for non-primary/nursery)
-        if division_filter and not is_primary_nursery:
-            division_filtered = []
-            for student in filtered_student_data:
-                if division_filter == 'Not Assigned':
-                    if not student['division_code']:
-                        division_filtered.append(student)
-                elif student['division_display'] == division_filter or student['division_code'] == division_filter:
-                    division_filtered.append(student)
-            
-            filtered_student_data = division_filtered
-            print(f"[ANALYSIS_PDF] After division filter '{division_filter}': {len(filtered_student_data)} students")
-        
-        # Apply Grade Filter (only for primary/nursery)
-        if grade_filter and is_primary_nursery:
-            grade_filtered = []
-            for student in filtered_student_data:
-                if grade_filter == 'No Grade':
-                    if not student['average_grade']:
-                        grade_filtered.append(student)
-                elif student['average_grade'] == grade_filter:
-                    grade_filtered.append(student)
-            
-            filtered_student_data = grade_filtered
-            print(f"[ANALYSIS_PDF] After grade filter '{grade_filter}': {len(filtered_student_data)} students")
+        # Create filename with filter information
+        is_primary_nursery = is_primary_level(exam_session)
+        filename_parts = [f"Analysis_{exam_session.name.replace(' ', '_')}"]
         
-        # Apply Gender Filter
+        if not is_primary_nursery and division_filter:
+            filename_parts.append(f"div_{division_filter.replace(' ', '_')}")
+        if is_primary_nursery and grade_filter:
+            filename_parts.append(f"grade_{grade_filter}")
         if gender_filter:
-            filtered_student_data = [
-                s for s in filtered_student_data 
-                if s['gender'].lower() == gender_filter.lower()
-            ]
-            print(f"[ANALYSIS_PDF] After gender filter '{gender_filter}': {len(filtered_student_data)} students")
+            filename_parts.append(f"gender_{gender_filter}")
+        if rank_filter:
+            filename_parts.append(f"{rank_filter}_{top_n if rank_filter == 'top' else bottom_n}")
         
-        # Apply Rank Filter
-        if rank_filter == 'top':
-            try:
-                n = int(top_n)
-                ranked_students = [s for s in filtered_student_data if s['rank']]
-                filtered_student_data = sorted(
-                    ranked_students,
-                    key=lambda x: x['rank']
-                )[:n]
-                print(f"[ANALYSIS_PDF] After top {n} filter: {len(filtered_student_data)} students")
-            except ValueError:
-                pass
-        elif rank_filter == 'bottom':
-            try:
-                n = int(bottom_n)
-                ranked_students = [s for s in filtered_student_data if s['rank']]
-                filtered_student_data = sorted(
-                    ranked_students,
-                    key=lambda x: x['rank'],
-                    reverse=True
-                )[:n]
-                print(f"[ANALYSIS_PDF] After bottom {n} filter: {len(filtered_student_data)} students")
-            except ValueError:
-                pass
-
-        # Statistics for filtered data
-        total_students_filtered = len(filtered_student_data)
-        
-        if not is_primary_nursery:
-            students_with_division_filtered = len([s for s in filtered_student_data if s['division_code']])
-            students_without_division_filtered = total_students_filtered - students_with_division_filtered
-        else:
-            students_with_division_filtered = 0
-            students_without_division_filtered = 0
-        
-        # Division distribution (filtered) - for non-primary/nursery
-        division_distribution_filtered = {}
-        if not is_primary_nursery:
-            for student in filtered_student_data:
-                if student['division_display'] and student['division_display'] != 'Not Assigned':
-                    division_distribution_filtered[student['division_display']] = division_distribution_filtered.get(
-                        student['division_display'], 0) + 1
-        
-        # Grade distribution (filtered) - for primary/nursery
-        grade_distribution_filtered = {}
-        if is_primary_nursery:
-            for student in filtered_student_data:
-                if student['average_grade']:
-                    grade_distribution_filtered[student['average_grade']] = grade_distribution_filtered.get(
-                        student['average_grade'], 0) + 1
-        
-        # Gender distribution (filtered)
-        gender_distribution_filtered = {}
-        for student in filtered_student_data:
-            gender = student['gender']
-            gender_distribution_filtered[gender] = gender_distribution_filtered.get(gender, 0) + 1
-        
-        # Gender averages (filtered)
-        gender_averages_filtered = {}
-        gender_counts_filtered = {}
-        for student in filtered_student_data:
-            gender = student['gender']
-            if student['average_marks']:
-                gender_averages_filtered[gender] = gender_averages_filtered.get(gender, 0) + float(student['average_marks'])
-                gender_counts_filtered[gender] = gender_counts_filtered.get(gender, 0) + 1
-        
-        for gender in gender_averages_filtered:
-            if gender_counts_filtered[gender] > 0:
-                gender_averages_filtered[gender] = round(gender_averages_filtered[gender] / gender_counts_filtered[gender], 2)
-        
-        # Division averages (filtered) - for non-primary/nursery
-        division_averages_filtered = {}
-        division_counts_filtered = {}
-        if not is_primary_nursery:
-            for student in filtered_student_data:
-                division = student['division_display']
-                if division and division != 'Not Assigned' and student['average_marks']:
-                    division_averages_filtered[division] = division_averages_filtered.get(division, 0) + float(student['average_marks'])
-                    division_counts_filtered[division] = division_counts_filtered.get(division, 0) + 1
-            
-            for division in division_averages_filtered:
-                if division_counts_filtered[division] > 0:
-                    division_averages_filtered[division] = round(
-                        division_averages_filtered[division] / division_counts_filtered[division], 2
-                    )
+        filename_parts.append(timezone.now().strftime('%Y%m%d'))
+        filename = "_".join(filename_parts) + ".pdf"
+        filename = filename.replace('/', '_')
+
+        # ============= SERVE FROM THE REPORT CACHE =============
+        cache_key = session_report_key(exam_session, 'exam_session_analysis', {
+            'section': section,
+            'division': division_filter,
+            'grade': grade_filter,
+            'gender': gender_filter,
+            'rank_filter': rank_filter,
+            'top_n': top_n,
+            'bottom_n': bottom_n,
+        })
+        content = get_cached_report(cache_key)
+        if content is not None:
+            return report_file_response(content, filename, 'application/pdf')
+
+        # ============= BUILD STUDENT DATA AND BREAKDOWNS =============
+        breakdown = exam_session_breakdown(
+            exam_session,
+            division_filter=division_filter,
+            grade_filter=grade_filter,
+            gender_filter=gender_filter,
+            rank_filter=rank_filter,
+            top_n=top_n,
+            bottom_n=bottom_n,
+        )
+        is_primary_nursery = breakdown['is_primary_nursery']
+        all_student_data = breakdown['all_student_data']
+        filtered_student_data = breakdown['student_data']
+        all_possible_grades = breakdown['all_possible_grades']
+        division_code_to_display = breakdown['division_code_to_display']
+        division_display_to_code = breakdown['division_display_to_code']
+        top_performers = breakdown['top_performers']
+        bottom_performers = breakdown['bottom_performers']
 
         # ============= CROSS-ANALYSIS MATRIX (ALL STUDENTS - UNFILTERED) =============
-        
+        matrix = breakdown['matrix']
+        unique_columns = matrix['columns']
+        matrix_data = matrix['matrix']
+        column_totals = matrix['column_totals']
+        gender_totals = matrix['gender_totals']
+        grand_total = matrix['grand_total']
         if is_primary_nursery:
-            # ---------------------------------------------------------
-            # GRADE × GENDER CROSS-ANALYSIS MATRIX - FOR PRIMARY/NURSERY
-            # ---------------------------------------------------------
-            
-            matrix_grades = all_possible_grades.copy()
-            matrix_genders = all_possible_genders.copy()
-            
-            # Initialize matrix with zeros
-            grade_gender_matrix = {gender: {grade: 0 for grade in matrix_grades} for gender in matrix_genders}
-            grade_totals = {grade: 0 for grade in matrix_grades}
-            gender_totals = {gender: 0 for gender in matrix_genders}
-            grand_total = 0
-            
-            # Populate matrix with ALL students (unfiltered)
-            for student in all_student_data:
-                gen = student['gender']
-                grade = student['average_grade']
-                
-                if grade and grade in matrix_grades:
-                    grade_gender_matrix[gen][grade] += 1
-                    grade_totals[grade] += 1
-                    gender_totals[gen] += 1
-                    grand_total += 1
-            
-            # Add 'No Grade' category
-            students_without_grade_all = len([s for s in all_student_data if not s['average_grade']])
-            if students_without_grade_all > 0:
-                matrix_grades_with_na = matrix_grades + ['No Grade']
-                
-                for gender in matrix_genders:
-                    grade_gender_matrix[gender]['No Grade'] = 0
-                grade_totals['No Grade'] = 0
-                
-                for student in all_student_data:
-                    gen = student['gender']
-                    grade = student['average_grade']
-                    if not grade:
-                        grade_gender_matrix[gen]['No Grade'] += 1
-                        grade_totals['No Grade'] += 1
-                        gender_totals[gen] += 1
-                        grand_total += 1
-                
-                matrix_grades = matrix_grades_with_na
-            
-            unique_columns = matrix_grades
-            matrix_data = grade_gender_matrix
-            column_totals = grade_totals
             matrix_name = "Grade × Gender Cross-Analysis"
-            
         else:
-            # ---------------------------------------------------------
-            # DIVISION × GENDER CROSS-ANALYSIS MATRIX - FOR SECONDARY
-            # ---------------------------------------------------------
-            
-            unique_columns = all_possible_divisions.copy()
-            matrix_genders = all_possible_genders.copy()
-            
-            # Initialize matrix with zeros
-            division_gender_matrix = {gender: {div: 0 for div in unique_columns} for gender in matrix_genders}
-            division_totals = {div: 0 for div in unique_columns}
-            gender_totals = {gender: 0 for gender in matrix_genders}
-            grand_total = 0
-            
-            # Populate matrix with ALL students (unfiltered)
-            for student in all_student_data:
-                gen = student['gender']
-                div = student['division_display']
-                
-                if div and div != 'Not Assigned' and div in unique_columns:
-                    division_gender_matrix[gen][div] += 1
-                    division_totals[div] += 1
-                    gender_totals[gen] += 1
-                    grand_total += 1
-            
-            # Add 'Not Assigned' category
-            students_without_division_all = len([s for s in all_student_data if not s['division_code']])
-            if students_without_division_all > 0:
-                unique_columns_with_na = unique_columns + ['Not Assigned']
-                
-                for gender in matrix_genders:
-                    division_gender_matrix[gender]['Not Assigned'] = 0
-                division_totals['Not Assigned'] = 0
-                
-                for student in all_student_data:
-                    gen = student['gender']
-                    div = student['division_display']
-                    if not div or div == 'Not Assigned':
-                        division_gender_matrix[gen]['Not Assigned'] += 1
-                        division_totals['Not Assigned'] += 1
-                        gender_totals[gen] += 1
-                        grand_total += 1
-                
-                unique_columns = unique_columns_with_na
-            
-            matrix_data = division_gender_matrix
-            column_totals = division_totals
             matrix_name = "Division × Gender Cross-Analysis"
 
-        # ============= TOP/BOTTOM PERFORMERS (ALL STUDENTS) =============
-        top_performers = sorted(
-            [s for s in all_student_data if s['rank']],
-            key=lambda x: x['rank']
-        )[:10]
-
-        bottom_performers = sorted(
-            [s for s in all_student_data if s['rank']],
-            key=lambda x: x['rank'],
-            reverse=True
-        )[:10]
-
-        print(f"[ANALYSIS_PDF] Top performers: {len(top_performers)}")
-        print(f"[ANALYSIS_PDF] Bottom performers: {len(bottom_performers)}")
-
         # ============= SECTION FILTERING =============
         # This is for PDF section selection, not the same as filter parameters
         if section == 'top_performers':
@@ -5821,19 +4589,19 @@ def exam_session_analysis_pdf(request, exam_session_id):
             'total_students_all': len(all_student_data),
             
             # Division/Grade stats
-            'students_with_division': students_with_division_filtered if not is_primary_nursery else 0,
-            'students_with_division_all': len([s for s in all_student_data if s['division_code']]) if not is_primary_nursery else 0,
-            'students_without_division': students_without_division_filtered if not is_primary_nursery else 0,
-            'students_without_division_all': len([s for s in all_student_data if not s['division_code']]) if not is_primary_nursery else 0,
+            'students_with_division': breakdown['students_with_division'],
+            'students_with_division_all': breakdown['students_with_division_all'],
+            'students_without_division': breakdown['students_without_division'],
+            'students_without_division_all': breakdown['students_without_division_all'],
             
             # Distributions (filtered)
-            'division_distribution': division_distribution_filtered if not is_primary_nursery else {},
-            'grade_distribution': grade_distribution_filtered if is_primary_nursery else {},
-            'gender_distribution': gender_distribution_filtered,
+            'division_distribution': breakdown['division_distribution'],
+            'grade_distribution': breakdown['grade_distribution'],
+            'gender_distribution': breakdown['gender_distribution'],
             
             # Averages (filtered)
-            'gender_averages': gender_averages_filtered,
-            'division_averages': division_averages_filtered if not is_primary_nursery else {},
+            'gender_averages': breakdown['gender_averages'],
+            'division_averages': breakdown['division_averages'],
             
             # ALL STUDENTS DATA - for cross-analysis and top/bottom performers
             'all_student_data': all_student_data,
@@ -5851,8 +4619,8 @@ def exam_session_analysis_pdf(request, exam_session_id):
             # Education level specific data
             'all_possible_grades': all_possible_grades if is_primary_nursery else [],
             'grade_columns': unique_columns if is_primary_nursery else [],
-            'grade_totals': grade_totals if is_primary_nursery else {},
-            'grade_gender_matrix': grade_gender_matrix if is_primary_nursery else {},
+            'grade_totals': column_totals if is_primary_nursery else {},
+            'grade_gender_matrix': matrix_data if is_primary_nursery else {},
             
             'division_columns': unique_columns if not is_primary_nursery else [],
             'division_totals': column_totals if not is_primary_nursery else {},
@@ -5893,32 +4661,13 @@ def exam_session_analysis_pdf(request, exam_session_id):
         # ============= GENERATE PDF =============
         html_string = render_to_string(template_name, context)
         
-        print("[ANALYSIS_PDF] Generating PDF...")
-        html = HTML(string=html_string, base_url=request.build_absolute_uri())
-        pdf_file = html.write_pdf()
-
-        # Create filename with filter information
-        filename_parts = [f"Analysis_{exam_session.name.replace(' ', '_')}"]
-        
-        if not is_primary_nursery and division_filter:
-            filename_parts.append(f"div_{division_filter.replace(' ', '_')}")
-        if is_primary_nursery and grade_filter:
-            filename_parts.append(f"grade_{grade_filter}")
-        if gender_filter:
-            filename_parts.append(f"gender_{gender_filter}")
-        if rank_filter:
-            filename_parts.append(f"{rank_filter}_{top_n if rank_filter == 'top' else bottom_n}")
-        
-        filename_parts.append(timezone.now().strftime('%Y%m%d'))
-        filename = "_".join(filename_parts) + ".pdf"
-        filename = filename.replace('/', '_')
 
-        print(f"[ANALYSIS_PDF] PDF generated successfully: {filename}")
-
-        response = HttpResponse(pdf_file, content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-
-        return response
+        return pdf_job_response(
+            request, html_string, filename,
+            report_type='exam_session_analysis',
+            base_url=request.build_absolute_uri(),
+            cache_key=cache_key
+        )
 
     except Exception as e:
         print(f"[ANALYSIS_PDF][ERROR] {str(e)}")
@@ -5997,287 +4746,56 @@ def session_subject_analysis_view(request, exam_session_id):
         }
         return render(request, 'admin/results/session_subject_analysis.html', context)
     
-    # Get students based on stream
-    student_filters = {
-        'class_level': exam_session.class_level,
-        'is_active': True
-    }
-    
-    if exam_session.stream_class:
-        student_filters['stream_class'] = exam_session.stream_class
-    
-    students = Student.objects.filter(**student_filters).order_by('first_name', 'last_name')
-    total_students = students.count()
-    
-    # Get results for the selected subject
-    results = StudentResult.objects.filter(
-        exam_session=exam_session,
-        subject=selected_subject
-    ).select_related('student')
-    
-    results_by_student = {r.student_id: r for r in results}
-    
-    # ============================================
-    # CALCULATE POSITIONS DYNAMICALLY USING HELPER FUNCTION
-    # ============================================
-    
-    # Get position map using helper function
-    position_map = calculate_subject_positions(students, results_by_student)
-    
     # ============================================
-    # DATA STRUCTURES INITIALIZATION
+    # LOAD THE SUBJECT ONCE - POSITIONS, FILTERS AND MATRIX ON ARRAYS
     # ============================================
     
     # Get all possible grades from GradingScale
-    grading_scales = GradingScale.objects.filter(
+    grading_scales = list(GradingScale.objects.filter(
         education_level=exam_session.class_level.educational_level
-    ).order_by('min_mark')
+    ).order_by('min_mark'))
     all_grades = [scale.grade for scale in grading_scales]
     
-    # Gender tracking
-    all_genders = ['Male', 'Female', 'Other']
-    
-    # Initialize ALL STUDENTS data structures (unfiltered)
-    all_student_data = []
-    all_students_with_marks = 0
-    all_total_marks_sum = 0
-    all_marks_list = []
-    all_gender_stats = {}
-    all_grade_gender_matrix = {}
-    all_grade_counts = {}
-    
-    # Initialize all gender stats
-    for gender in all_genders:
-        all_gender_stats[gender] = {
-            'total': 0,
-            'with_marks': 0,
-            'marks_sum': 0,
-            'average': 0
-        }
-    
-    # Initialize all grade-gender matrix
-    for gender in all_genders:
-        all_grade_gender_matrix[gender] = {}
-        for grade in all_grades:
-            all_grade_gender_matrix[gender][grade] = 0
-        all_grade_gender_matrix[gender]['No Grade'] = 0
+    breakdown = subject_breakdown(
+        exam_session,
+        selected_subject,
+        grade_filter=grade_filter,
+        gender_filter=gender_filter,
+        rank_filter=rank_filter,
+        top_n=top_n,
+        bottom_n=bottom_n,
+        grades=all_grades,
+    )
     
-    # Process each student for ALL DATA
-    for student in students:
-        gender = student.get_gender_display() or 'Other'
-        if gender not in all_gender_stats:
-            all_gender_stats[gender] = {'total': 0, 'with_marks': 0, 'marks_sum': 0, 'average': 0}
-        if gender not in all_grade_gender_matrix:
-            all_grade_gender_matrix[gender] = {}
-            for grade in all_grades:
-                all_grade_gender_matrix[gender][grade] = 0
-            all_grade_gender_matrix[gender]['No Grade'] = 0
-        
-        all_gender_stats[gender]['total'] += 1
-        
-        result = results_by_student.get(student.id)
-        marks = result.marks_obtained if result else None
-        percentage = result.percentage if result else None
-        grade = result.grade if result else None
-        grade_point = result.grade_point if result else None
-        # Get position from dynamically calculated map
-        position = position_map.get(student.id)
-        
-        # Convert marks to float for calculations
-        marks_float = None
-        if marks is not None:
-            try:
-                marks_float = float(marks)
-            except (TypeError, ValueError):
-                marks_float = None
-        
-        if marks_float is not None:
-            all_students_with_marks += 1
-            all_total_marks_sum += marks_float
-            all_marks_list.append(marks_float)
-            
-            all_gender_stats[gender]['with_marks'] += 1
-            all_gender_stats[gender]['marks_sum'] += marks_float
-            
-            if grade:
-                all_grade_counts[grade] = all_grade_counts.get(grade, 0) + 1
-                all_grade_gender_matrix[gender][grade] = all_grade_gender_matrix[gender].get(grade, 0) + 1
-            else:
-                all_grade_gender_matrix[gender]['No Grade'] += 1
-        
-        # Add to all_student_data regardless of marks
-        all_student_data.append({
-            'id': student.id,
-            'registration_number': student.registration_number or f"S{student.id:04d}",
-            'full_name': student.full_name,
-            'gender': gender,
-            'marks': marks_float,
-            'percentage': float(percentage) if percentage else None,
-            'grade': grade,
-            'grade_point': float(grade_point) if grade_point else None,
-            'position': position,
-            'has_marks': marks_float is not None
-        })
-    
-    # Calculate all gender averages
-    for gender in all_gender_stats:
-        if all_gender_stats[gender]['with_marks'] > 0:
-            all_gender_stats[gender]['average'] = round(
-                all_gender_stats[gender]['marks_sum'] / all_gender_stats[gender]['with_marks'], 2
-            )
+    all_student_data = breakdown['all_student_data']
+    filtered_student_data = breakdown['filtered_student_data']
+    filtered_statistics = breakdown['filtered_statistics']
+    total_students = breakdown['total_students']
+    all_students_with_marks = breakdown['students_with_marks']
+    all_grade_gender_matrix = breakdown['grade_gender_matrix']
+    all_grade_counts = breakdown['grade_counts']
     
     # ============================================
-    # FILTERED DATA PROCESSING
+    # OVERALL STATISTICS (ALL STUDENTS)
     # ============================================
     
-    # Start with a copy of all student data
-    filtered_student_data = []
-    for student in all_student_data:
-        # Only include students with marks in filtered data
-        if student['has_marks']:
-            filtered_student_data.append(student.copy())
-    
-    # Apply grade filter
-    if grade_filter:
-        if grade_filter == 'No Grade':
-            filtered_student_data = [s for s in filtered_student_data if not s['grade']]
-        else:
-            filtered_student_data = [s for s in filtered_student_data if s['grade'] == grade_filter]
-    
-    # Apply gender filter
-    if gender_filter:
-        filtered_student_data = [
-            s for s in filtered_student_data 
-            if s['gender'] and s['gender'].lower() == gender_filter.lower()
-        ]
-    
-    # Apply rank filter - this must be applied AFTER grade and gender filters
-    if rank_filter == 'top':
-        # Get students with position from already filtered data
-        students_with_position = [s for s in filtered_student_data if s['position']]
-        students_with_position.sort(key=lambda x: x['position'])
-        filtered_student_data = students_with_position[:min(top_n, len(students_with_position))]
-    elif rank_filter == 'bottom':
-        students_with_position = [s for s in filtered_student_data if s['position']]
-        students_with_position.sort(key=lambda x: x['position'], reverse=True)
-        filtered_student_data = students_with_position[:min(bottom_n, len(students_with_position))]
-    
-    # ============================================
-    # CALCULATE FILTERED STATISTICS
-    # ============================================
-    
-    filtered_students_with_marks = len(filtered_student_data)
-    filtered_total_marks_sum = 0
-    filtered_marks_list = []
-    filtered_gender_stats = {}
-    
-    # Initialize filtered gender stats
-    for gender in all_genders:
-        filtered_gender_stats[gender] = {
-            'total': 0,
-            'with_marks': 0,
-            'marks_sum': 0,
-            'average': 0
-        }
-    
-    # Process filtered data
-    for student in filtered_student_data:
-        gender = student['gender']
-        if gender not in filtered_gender_stats:
-            filtered_gender_stats[gender] = {'total': 0, 'with_marks': 0, 'marks_sum': 0, 'average': 0}
-        
-        filtered_gender_stats[gender]['total'] += 1
-        filtered_gender_stats[gender]['with_marks'] += 1
-        
-        if student['marks'] is not None:
-            filtered_total_marks_sum += student['marks']
-            filtered_marks_list.append(student['marks'])
-            filtered_gender_stats[gender]['marks_sum'] += student['marks']
-    
-    # Calculate filtered gender averages
-    for gender in filtered_gender_stats:
-        if filtered_gender_stats[gender]['with_marks'] > 0:
-            filtered_gender_stats[gender]['average'] = round(
-                filtered_gender_stats[gender]['marks_sum'] / filtered_gender_stats[gender]['with_marks'], 2
-            )
-    
-    # Calculate filtered statistics
-    filtered_statistics = {
-        'total_students': len(filtered_student_data),
-        'students_with_marks': filtered_students_with_marks,
-        'students_without_marks': 0,  # All students in filtered data have marks
-        'percentage_completed': 100.0 if filtered_students_with_marks > 0 else 0,
-        'average_marks': filtered_total_marks_sum / filtered_students_with_marks if filtered_students_with_marks > 0 else 0,
-        'highest_marks': max(filtered_marks_list) if filtered_marks_list else 0,
-        'lowest_marks': min(filtered_marks_list) if filtered_marks_list else 0,
-        'pass_rate': calculate_pass_rate(filtered_marks_list),
-        'median_marks': calculate_median(filtered_marks_list),
-        'std_deviation': calculate_std_deviation(filtered_marks_list),
-    }
-    
-    # ============================================
-    # OVERALL STATISTICS (ALL STUDENTS)
-    # ============================================
+    # Mark distribution comes from the stored subject statistics
+    statistics_by_subject = get_subject_statistics_map(exam_session)
     
     overall_statistics = {
         'total_students': total_students,
         'students_with_marks': all_students_with_marks,
         'students_without_marks': total_students - all_students_with_marks,
         'percentage_completed': (all_students_with_marks / total_students * 100) if total_students > 0 else 0,
-        'average_marks': all_total_marks_sum / all_students_with_marks if all_students_with_marks > 0 else 0,
-        'highest_marks': max(all_marks_list) if all_marks_list else 0,
-        'lowest_marks': min(all_marks_list) if all_marks_list else 0,
-        'pass_rate': calculate_pass_rate(all_marks_list),
-        'median_marks': calculate_median(all_marks_list),
-        'std_deviation': calculate_std_deviation(all_marks_list),
+        **subject_statistics_summary(statistics_by_subject.get(selected_subject.id)),
     }
     
-    # ============================================
-    # TOP/BOTTOM PERFORMERS FROM FILTERED DATA
-    # ============================================
-    
-    # Get top performers from filtered data
-    top_performers_filtered = []
-    students_with_pos_filtered = [s for s in filtered_student_data if s['position']]
-    students_with_pos_filtered.sort(key=lambda x: x['position'])
-    
-    # Limit to 10 or less
-    for student in students_with_pos_filtered[:10]:
-        top_performers_filtered.append(student)
-    
-    # Get bottom performers from filtered data
-    bottom_performers_filtered = []
-    students_with_pos_filtered.sort(key=lambda x: x['position'], reverse=True)
-    for student in students_with_pos_filtered[:10]:
-        bottom_performers_filtered.append(student)
-    
-    # ============================================
-    # MATRIX DATA (FROM ALL STUDENTS - UNFILTERED)
-    # ============================================
-    
-    # Calculate grade totals for matrix
-    grade_totals = {}
-    for grade in all_grades + ['No Grade']:
-        grade_totals[grade] = 0
-        for gender in all_grade_gender_matrix:
-            grade_totals[grade] += all_grade_gender_matrix[gender].get(grade, 0)
-    
-    # Calculate gender totals for matrix
-    gender_totals = {}
-    for gender in all_grade_gender_matrix:
-        gender_totals[gender] = sum(all_grade_gender_matrix[gender].values())
-    
-    grand_total = sum(gender_totals.values())
-    
     # ============================================
     # GRADE DISTRIBUTION DATA (FROM ALL STUDENTS)
     # ============================================
     
     # Get grade distribution for filter dropdown (from all data)
-    grade_distribution_all = {}
-    for student in all_student_data:
-        if student['grade'] and student['has_marks']:
-            grade_distribution_all[student['grade']] = grade_distribution_all.get(student['grade'], 0) + 1
+    grade_distribution_all = all_grade_counts
     
     # Prepare grade distribution list for summary table (from all data)
     grade_distribution_list = []
@@ -6303,30 +4821,18 @@ def session_subject_analysis_view(request, exam_session_id):
     
     # Get subject ranking
     subject_ranking = {
-        'position': get_subject_ranking(exam_session, selected_subject),
+        'position': get_subject_ranking(exam_session, selected_subject, subject_comparison),
         'total_subjects': len(subject_comparison)
     }
     
     # Get subject statistics for each subject (for subject cards)
     subject_stats = {}
     for subject in all_subjects:
-        subject_results = StudentResult.objects.filter(
-            exam_session=exam_session,
-            subject=subject,
-            marks_obtained__isnull=False
-        )
-        marks_list_subj = []
-        for r in subject_results:
-            if r.marks_obtained is not None:
-                try:
-                    marks_list_subj.append(float(r.marks_obtained))
-                except (TypeError, ValueError):
-                    continue
-        
+        stats = statistics_by_subject.get(subject.id)
         subject_stats[subject.id] = {
-            'students_with_marks': len(marks_list_subj),
-            'average_marks': sum(marks_list_subj) / len(marks_list_subj) if marks_list_subj else 0,
-            'pass_rate': calculate_pass_rate(marks_list_subj),
+            'students_with_marks': stats.students_count if stats else 0,
+            'average_marks': float(stats.mean_marks) if stats else 0,
+            'pass_rate': float(stats.pass_rate) if stats else 0,
         }
     
     # ============================================
@@ -6344,9 +4850,9 @@ def session_subject_analysis_view(request, exam_session_id):
         'student_data': filtered_student_data,  # This is for the detailed table
         'filtered_student_data': filtered_student_data,  # Alias for clarity
         'filtered_statistics': filtered_statistics,  # Statistics for filtered data
-        'filtered_gender_statistics': filtered_gender_stats,  # Gender stats for filtered data
-        'top_performers': top_performers_filtered,  # Top performers from filtered data
-        'bottom_performers': bottom_performers_filtered,  # Bottom performers from filtered data
+        'filtered_gender_statistics': breakdown['filtered_gender_statistics'],  # Gender stats for filtered data
+        'top_performers': breakdown['top_performers'],  # Top performers from filtered data
+        'bottom_performers': breakdown['bottom_performers'],  # Bottom performers from filtered data
         
         # ALL DATA - used for matrix and overall summaries
         'all_student_data': all_student_data,
@@ -6355,14 +4861,14 @@ def session_subject_analysis_view(request, exam_session_id):
         'students_without_marks': total_students - all_students_with_marks,
         'statistics': filtered_statistics if (grade_filter or gender_filter or rank_filter) else overall_statistics,  # Show filtered stats when filters applied
         'overall_statistics': overall_statistics,
-        'gender_statistics': all_gender_stats,  # Overall gender stats for filter dropdown
+        'gender_statistics': breakdown['gender_statistics'],  # Overall gender stats for filter dropdown
         
         # Grade-Gender Matrix (ALWAYS from all data - unfiltered)
         'grade_gender_matrix': all_grade_gender_matrix,
-        'matrix_grades': all_grades + (['No Grade'] if any(all_grade_gender_matrix[g]['No Grade'] > 0 for g in all_grade_gender_matrix) else []),
-        'grade_totals': grade_totals,
-        'gender_totals': gender_totals,
-        'grand_total': grand_total,
+        'matrix_grades': breakdown['matrix_grades'],
+        'grade_totals': breakdown['grade_totals'],
+        'gender_totals': breakdown['gender_totals'],
+        'grand_total': breakdown['grand_total'],
         
         # Grade distribution (ALWAYS from all data)
         'grade_distribution_all': grade_distribution_all,
@@ -6445,35 +4951,7 @@ def get_student_position_in_subject(student_id, subject_id, exam_session_id):
     Helper function to get a specific student's position in a subject.
     Useful for AJAX calls or detailed views.
     """
-    try:
-        # Get the student
-        student = Student.objects.get(id=student_id)
-        
-        # Get all students in the same class/stream
-        student_filters = {
-            'class_level_id': student.class_level_id,
-            'is_active': True
-        }
-        if student.stream_class:
-            student_filters['stream_class'] = student.stream_class
-        
-        students = Student.objects.filter(**student_filters)
-        
-        # Get results for the subject
-        results = StudentResult.objects.filter(
-            exam_session_id=exam_session_id,
-            subject_id=subject_id
-        ).select_related('student')
-        
-        results_by_student = {r.student_id: r for r in results}
-        
-        # Calculate positions
-        position_map = calculate_subject_positions(students, results_by_student)
-        
-        return position_map.get(student_id)
-        
-    except (Student.DoesNotExist, StudentResult.DoesNotExist):
-        return None
+    return get_subject_rank_index(exam_session_id, subject_id).position(student_id)
 
 
 def get_subject_rankings_list(exam_session_id, subject_id):
@@ -6483,52 +4961,12 @@ def get_subject_rankings_list(exam_session_id, subject_id):
     """
     try:
         exam_session = ExamSession.objects.get(id=exam_session_id)
-        
-        # Get students
-        student_filters = {
-            'class_level': exam_session.class_level,
-            'is_active': True
-        }
-        if exam_session.stream_class:
-            student_filters['stream_class'] = exam_session.stream_class
-        
-        students = Student.objects.filter(**student_filters)
-        
-        # Get results
-        results = StudentResult.objects.filter(
-            exam_session_id=exam_session_id,
-            subject_id=subject_id
-        ).select_related('student')
-        
-        results_by_student = {r.student_id: r for r in results}
-        
-        # Calculate positions
-        position_map = calculate_subject_positions(students, results_by_student)
-        
-        # Build ranking list
-        ranking_list = []
-        for student in students:
-            result = results_by_student.get(student.id)
-            position = position_map.get(student.id)
-            
-            if result and result.marks_obtained is not None:
-                ranking_list.append({
-                    'position': position,
-                    'student_id': student.id,
-                    'registration_number': student.registration_number or f"S{student.id:04d}",
-                    'full_name': student.full_name,
-                    'marks': float(result.marks_obtained),
-                    'grade': result.grade,
-                    'percentage': float(result.percentage) if result.percentage else None,
-                })
-        
-        # Sort by position
-        ranking_list.sort(key=lambda x: x['position'])
-        
-        return ranking_list
-        
     except ExamSession.DoesNotExist:
         return []
+
+    # Rank among the session's current students
+    student_ids = set(session_students(exam_session).values_list('id', flat=True))
+    return get_subject_rank_index(exam_session, subject_id).rankings(student_ids)
     
 
 @login_required
@@ -6586,219 +5024,65 @@ def session_subject_analysis_pdf(request, exam_session_id):
             messages.error(request, "No subjects available for this educational level.")
             return redirect('session_subject_analysis_view', exam_session_id=exam_session_id)
         
-        # Get students
-        student_filters = {
-            'class_level': exam_session.class_level,
-            'is_active': True
-        }
-        
-        if exam_session.stream_class:
-            student_filters['stream_class'] = exam_session.stream_class
-        
-        students = Student.objects.filter(**student_filters)
-        total_students = students.count()
-        
-        # Get results for selected subject
-        results = StudentResult.objects.filter(
-            exam_session=exam_session,
-            subject=selected_subject
-        ).select_related('student')
-        
-        results_by_student = {r.student_id: r for r in results}
-        
-        # ============================================
-        # CALCULATE POSITIONS DYNAMICALLY USING HELPER FUNCTION
-        # ============================================
-        position_map = calculate_subject_positions(students, results_by_student)
-        
         # ============================================
-        # DATA STRUCTURES INITIALIZATION
+        # LOAD THE SUBJECT ONCE - POSITIONS, FILTERS AND MATRIX ON ARRAYS
         # ============================================
         
-        # Prepare data structures
-        all_student_data = []
-        students_with_marks = 0
-        total_marks_sum = 0
-        marks_list = []
-        gender_stats = {}
-        grade_gender_matrix = {}
-        grade_counts = {}
-        
         # Get grading scales
-        grading_scales = GradingScale.objects.filter(
+        grading_scales = list(GradingScale.objects.filter(
             education_level=exam_session.class_level.educational_level
-        ).order_by('min_mark')
+        ).order_by('min_mark'))
         all_grades = [scale.grade for scale in grading_scales]
         
-        # Initialize
-        all_genders = ['Male', 'Female', 'Other']
-        for gender in all_genders:
-            gender_stats[gender] = {'total': 0, 'with_marks': 0, 'marks_sum': 0, 'average': 0}
-            grade_gender_matrix[gender] = {grade: 0 for grade in all_grades}
-            grade_gender_matrix[gender]['No Grade'] = 0
-        
-        # Process students
-        for student in students:
-            gender = student.get_gender_display() or 'Other'
-            if gender not in gender_stats:
-                gender_stats[gender] = {'total': 0, 'with_marks': 0, 'marks_sum': 0, 'average': 0}
-            if gender not in grade_gender_matrix:
-                grade_gender_matrix[gender] = {grade: 0 for grade in all_grades}
-                grade_gender_matrix[gender]['No Grade'] = 0
-            
-            gender_stats[gender]['total'] += 1
-            
-            result = results_by_student.get(student.id)
-            marks = result.marks_obtained if result else None
-            percentage = result.percentage if result else None
-            grade = result.grade if result else None
-            grade_point = result.grade_point if result else None
-            # Get position from dynamically calculated map
-            position = position_map.get(student.id)
-            
-            # Convert marks to float
-            marks_float = None
-            if marks is not None:
-                try:
-                    marks_float = float(marks)
-                except (TypeError, ValueError):
-                    marks_float = None
-            
-            if marks_float is not None:
-                students_with_marks += 1
-                total_marks_sum += marks_float
-                marks_list.append(marks_float)
-                
-                gender_stats[gender]['with_marks'] += 1
-                gender_stats[gender]['marks_sum'] += marks_float
-                
-                if grade:
-                    grade_counts[grade] = grade_counts.get(grade, 0) + 1
-                    grade_gender_matrix[gender][grade] += 1
-                else:
-                    grade_gender_matrix[gender]['No Grade'] += 1
-            
-            all_student_data.append({
-                'id': student.id,
-                'registration_number': student.registration_number or f"S{student.id:04d}",
-                'full_name': student.full_name,
-                'gender': gender,
-                'marks': marks_float,
-                'percentage': float(percentage) if percentage else None,
-                'grade': grade,
-                'grade_point': float(grade_point) if grade_point else None,
-                'position': position,
-                'has_marks': marks_float is not None
-            })
-        
-        # Calculate averages
-        for gender in gender_stats:
-            if gender_stats[gender]['with_marks'] > 0:
-                gender_stats[gender]['average'] = round(
-                    gender_stats[gender]['marks_sum'] / gender_stats[gender]['with_marks'], 2
-                )
-        
-        # ============================================
-        # FILTERED DATA PROCESSING
-        # ============================================
-        
-        # Start with a copy of all student data with marks
-        filtered_data = [s.copy() for s in all_student_data if s['has_marks']]
-        
-        # Apply grade filter
-        if grade_filter:
-            if grade_filter == 'No Grade':
-                filtered_data = [s for s in filtered_data if not s['grade']]
-            else:
-                filtered_data = [s for s in filtered_data if s['grade'] == grade_filter]
-        
-        # Apply gender filter
-        if gender_filter:
-            filtered_data = [
-                s for s in filtered_data 
-                if s['gender'] and s['gender'].lower() == gender_filter.lower()
-            ]
-        
-        # Apply rank filter
-        if rank_filter == 'top':
-            students_with_position = [s for s in filtered_data if s['position']]
-            students_with_position.sort(key=lambda x: x['position'])
-            filtered_data = students_with_position[:min(top_n, len(students_with_position))]
-        elif rank_filter == 'bottom':
-            students_with_position = [s for s in filtered_data if s['position']]
-            students_with_position.sort(key=lambda x: x['position'], reverse=True)
-            filtered_data = students_with_position[:min(bottom_n, len(students_with_position))]
+        breakdown = subject_breakdown(
+            exam_session,
+            selected_subject,
+            grade_filter=grade_filter,
+            gender_filter=gender_filter,
+            rank_filter=rank_filter,
+            top_n=top_n,
+            bottom_n=bottom_n,
+            grades=all_grades,
+        )
         
-        # ============================================
-        # TOP/BOTTOM PERFORMERS (FROM ALL DATA)
-        # ============================================
+        all_student_data = breakdown['all_student_data']
+        filtered_data = breakdown['filtered_student_data']
+        total_students = breakdown['total_students']
+        students_with_marks = breakdown['students_with_marks']
+        gender_stats = breakdown['gender_statistics']
+        grade_gender_matrix = breakdown['grade_gender_matrix']
+        grade_counts = breakdown['grade_counts']
         
-        # Get top performers from all data
-        top_performers = []
-        students_with_pos_all = [s for s in all_student_data if s['position']]
-        students_with_pos_all.sort(key=lambda x: x['position'])
-        for student in students_with_pos_all[:10]:
-            if student['has_marks']:
-                top_performers.append(student)
-        
-        # Get bottom performers from all data
-        bottom_performers = []
-        students_with_pos_all.sort(key=lambda x: x['position'], reverse=True)
-        for student in students_with_pos_all[:10]:
-            if student['has_marks']:
-                bottom_performers.append(student)
+        # Top/bottom performers from all data
+        top_performers = breakdown['top_performers_all']
+        bottom_performers = breakdown['bottom_performers_all']
         
         # ============================================
         # CALCULATE STATISTICS
         # ============================================
         
-        # Overall statistics
+        # Overall statistics (mark distribution from the stored subject statistics)
+        selected_stats = get_subject_statistics(exam_session, selected_subject)
         overall_statistics = {
             'total_students': total_students,
             'students_with_marks': students_with_marks,
             'students_without_marks': total_students - students_with_marks,
             'percentage_completed': (students_with_marks / total_students * 100) if total_students > 0 else 0,
-            'average_marks': total_marks_sum / students_with_marks if students_with_marks > 0 else 0,
-            'highest_marks': max(marks_list) if marks_list else 0,
-            'lowest_marks': min(marks_list) if marks_list else 0,
-            'pass_rate': calculate_pass_rate(marks_list),
-            'median_marks': calculate_median(marks_list),
-            'std_deviation': calculate_std_deviation(marks_list),
+            **subject_statistics_summary(selected_stats),
         }
         
         # Filtered statistics (if filters applied)
         filtered_statistics = None
         if grade_filter or gender_filter or rank_filter:
-            filtered_marks_list = [s['marks'] for s in filtered_data if s['marks'] is not None]
-            filtered_statistics = {
-                'total_students': len(filtered_data),
-                'students_with_marks': len([s for s in filtered_data if s['marks'] is not None]),
-                'students_without_marks': 0,
-                'percentage_completed': 100.0 if filtered_data else 0,
-                'average_marks': sum(filtered_marks_list) / len(filtered_marks_list) if filtered_marks_list else 0,
-                'highest_marks': max(filtered_marks_list) if filtered_marks_list else 0,
-                'lowest_marks': min(filtered_marks_list) if filtered_marks_list else 0,
-                'pass_rate': calculate_pass_rate(filtered_marks_list),
-                'median_marks': calculate_median(filtered_marks_list),
-                'std_deviation': calculate_std_deviation(filtered_marks_list),
-            }
+            filtered_statistics = breakdown['filtered_statistics']
         
         # ============================================
         # MATRIX DATA
         # ============================================
         
-        # Calculate matrix totals
-        grade_totals = {}
-        for grade in all_grades + ['No Grade']:
-            grade_totals[grade] = 0
-            for gender in grade_gender_matrix:
-                grade_totals[grade] += grade_gender_matrix[gender].get(grade, 0)
-        
-        gender_totals = {}
-        for gender in grade_gender_matrix:
-            gender_totals[gender] = sum(grade_gender_matrix[gender].values())
-        
-        grand_total = sum(gender_totals.values())
+        grade_totals = breakdown['grade_totals']
+        gender_totals = breakdown['gender_totals']
+        grand_total = breakdown['grand_total']
         
         # ============================================
         # GRADE DISTRIBUTION
@@ -6825,7 +5109,7 @@ def session_subject_analysis_pdf(request, exam_session_id):
         
         subject_comparison = get_subject_comparison_data(exam_session)
         subject_ranking = {
-            'position': get_subject_ranking(exam_session, selected_subject),
+            'position': get_subject_ranking(exam_session, selected_subject, subject_comparison),
             'total_subjects': len(subject_comparison)
         }
         
@@ -6855,7 +5139,7 @@ def session_subject_analysis_pdf(request, exam_session_id):
         # ============================================
         
         # Prepare matrix grades list
-        matrix_grades = all_grades + (['No Grade'] if any(grade_gender_matrix[g]['No Grade'] > 0 for g in grade_gender_matrix) else [])
+        matrix_grades = breakdown['matrix_grades']
         
         context = {
             # Core objects
@@ -6932,8 +5216,6 @@ def session_subject_analysis_pdf(request, exam_session_id):
         
         # Generate PDF
         html_string = render_to_string(template_name, context)
-        html = HTML(string=html_string, base_url=request.build_absolute_uri())
-        pdf_file = html.write_pdf()
         
         # Generate filename
         filename_parts = [
@@ -6952,10 +5234,11 @@ def session_subject_analysis_pdf(request, exam_session_id):
         filename_parts.append(timezone.now().strftime('%Y%m%d'))
         filename = "_".join(filename_parts) + ".pdf"
         
-        response = HttpResponse(pdf_file, content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        
-        return response
+        return pdf_job_response(
+            request, html_string, filename,
+            report_type='session_subject_analysis',
+            base_url=request.build_absolute_uri()
+        )
         
     except Exception as e:
         import logging
@@ -6978,42 +5261,18 @@ def ajax_subject_performance(request, exam_session_id, subject_id):
         exam_session = get_object_or_404(ExamSession, id=exam_session_id)
         subject = get_object_or_404(Subject, id=subject_id)
         
-        # Get results
-        results = StudentResult.objects.filter(
-            exam_session=exam_session,
-            subject=subject,
-            marks_obtained__isnull=False
-        )
-        
-        # Calculate performance metrics - convert Decimal to float
-        marks_list = []
-        for r in results:
-            if r.marks_obtained is not None:
-                try:
-                    marks_list.append(float(r.marks_obtained))
-                except (TypeError, ValueError):
-                    continue
+        stats = get_subject_statistics(exam_session, subject)
         
         performance_data = {
             'subject_id': subject.id,
             'subject_code': subject.code,
             'subject_name': subject.name,
-            'total_students': len(marks_list),
-            'average_marks': sum(marks_list) / len(marks_list) if marks_list else 0,
-            'highest_marks': max(marks_list) if marks_list else 0,
-            'lowest_marks': min(marks_list) if marks_list else 0,
-            'pass_rate': calculate_pass_rate(marks_list),
-            'median_marks': calculate_median(marks_list),
-            'std_deviation': calculate_std_deviation(marks_list),
+            'total_students': stats.students_count if stats else 0,
+            **subject_statistics_summary(stats),
         }
         
         # Grade distribution
-        grade_counts = {}
-        for result in results:
-            if result.grade:
-                grade_counts[result.grade] = grade_counts.get(result.grade, 0) + 1
-        
-        performance_data['grade_distribution'] = grade_counts
+        performance_data['grade_distribution'] = get_grade_histogram(stats)
         
         return JsonResponse({
             'success': True,
@@ -7033,58 +5292,99 @@ def ajax_subject_comparison(request, exam_session_id):
     AJAX endpoint to get comparison data for all subjects.
     """
     try:
-        exam_session = get_object_or_404(ExamSession, id=exam_session_id)
-        
-        subjects = Subject.objects.filter(
-            educational_level=exam_session.class_level.educational_level,
-            is_active=True
+        exam_session = get_object_or_404(
+            ExamSession.objects.select_related('exam_type', 'class_level'),
+            id=exam_session_id
         )
         
-        comparison_data = []
-        
-        for subject in subjects:
-            results = StudentResult.objects.filter(
-                exam_session=exam_session,
-                subject=subject,
-                marks_obtained__isnull=False
-            )
-            
-            marks_list = [float(r.marks_obtained) for r in results]
-            
-            if marks_list:
-                pass_count = sum(1 for m in marks_list if m >= 40)
-                pass_rate = (pass_count / len(marks_list)) * 100 if marks_list else 0
-                
-                grade_a_count = results.filter(grade='A').count()
-                grade_f_count = results.filter(grade='F').count()
-                
-                comparison_data.append({
-                    'subject_id': subject.id,
-                    'subject_code': subject.code,
-                    'subject_name': subject.name,
-                    'students_count': len(marks_list),
-                    'average_marks': sum(marks_list) / len(marks_list),
-                    'highest_marks': max(marks_list),
-                    'lowest_marks': min(marks_list),
-                    'pass_rate': pass_rate,
-                    'grade_a_count': grade_a_count,
-                    'grade_f_count': grade_f_count,
-                })
-        
-        # Sort by average marks descending
-        comparison_data.sort(key=lambda x: x['average_marks'], reverse=True)
+        comparison_data = get_subject_comparison_data(exam_session)
         
-        # Add ranking positions
-        for idx, subject in enumerate(comparison_data, start=1):
-            subject['ranking_position'] = idx
-            subject['average_percentage'] = (subject['average_marks'] / 
-                                           exam_session.exam_type.max_score * 100) if exam_session.exam_type.max_score else 0
+        return JsonResponse({
+            'success': True,
+            'data': comparison_data
+        })
         
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'message': str(e)
+        }, status=500)
+
+
+def trend_params(request):
+    """exam_type, window and limit query parameters of the trends endpoints."""
+    exam_type_id = request.GET.get('exam_type') or None
+    window = int(request.GET.get('window', DEFAULT_WINDOW))
+    limit = int(request.GET.get('limit', 10))
+    if exam_type_id is not None:
+        exam_type_id = int(exam_type_id)
+    if window < 1 or limit < 1:
+        raise ValueError('window and limit must be positive')
+    return exam_type_id, window, limit
+
+
+@login_required
+def ajax_class_level_trends(request, class_level_id):
+    """
+    AJAX endpoint with a class level's performance over its published
+    exam sessions: class and subject series, term-over-term deltas,
+    moving averages and the most improved/declined students.
+    """
+    class_level = get_object_or_404(ClassLevel, id=class_level_id)
+    try:
+        exam_type_id, window, limit = trend_params(request)
+    except ValueError:
+        return JsonResponse({
+            'success': False,
+            'message': 'exam_type, window and limit must be positive whole numbers.'
+        }, status=400)
+
+    try:
+        trends = get_class_trends(class_level.id, exam_type_id)
         return JsonResponse({
             'success': True,
-            'data': comparison_data
+            'class_level': {'id': class_level.id, 'name': class_level.name},
+            'sessions': trends.sessions,
+            'class_series': trends.class_series(window),
+            'subjects': trends.subject_series(window),
+            'most_improved': trends.movers(limit),
+            'most_declined': trends.movers(limit, declined=True),
         })
-        
+
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'message': str(e)
+        }, status=500)
+
+
+@login_required
+def ajax_student_trends(request, student_id):
+    """
+    AJAX endpoint with one student's average percentage and subject marks
+    over every published exam session they sat, with deltas and moving
+    averages.
+    """
+    student = get_object_or_404(Student, id=student_id)
+    try:
+        exam_type_id, window, _ = trend_params(request)
+    except ValueError:
+        return JsonResponse({
+            'success': False,
+            'message': 'exam_type and window must be positive whole numbers.'
+        }, status=400)
+
+    try:
+        return JsonResponse(dict(
+            student_trends(student, exam_type_id, window),
+            success=True,
+            student={
+                'id': student.id,
+                'name': student.full_name,
+                'registration_number': student.registration_number,
+            },
+        ))
+
     except Exception as e:
         return JsonResponse({
             'success': False,
@@ -7105,22 +5405,19 @@ def ajax_subject_list(request, exam_session_id):
             is_active=True
         ).order_by('name')
         
+        statistics_by_subject = get_subject_statistics_map(exam_session)
+        
         subject_list = []
         for subject in subjects:
-            # Get basic stats for each subject
-            results = StudentResult.objects.filter(
-                exam_session=exam_session,
-                subject=subject,
-                marks_obtained__isnull=False
-            )
-            marks_list = [float(r.marks_obtained) for r in results]
+            # Basic stats for each subject
+            stats = statistics_by_subject.get(subject.id)
             
             subject_list.append({
                 'id': subject.id,
                 'name': subject.name,
                 'code': subject.code,
-                'students_count': results.count(),
-                'average_marks': sum(marks_list) / len(marks_list) if marks_list else 0,
+                'students_count': stats.students_count if stats else 0,
+                'average_marks': float(stats.mean_marks) if stats else 0,
             })
         
         return JsonResponse({
@@ -7137,97 +5434,130 @@ def ajax_subject_list(request, exam_session_id):
 
 # ============= HELPER FUNCTIONS =============
 
+def get_subject_statistics_map(exam_session):
+    """
+    Stored SubjectExamStatistics of a session keyed by subject id.
+    The rows are maintained by the results recompute; a published
+    session's come from its snapshot.
+    """
+    snapshot = get_snapshot(exam_session)
+    if snapshot is not None:
+        return snapshot.statistics()
+    return {
+        stats.subject_id: stats
+        for stats in SubjectExamStatistics.objects.filter(exam_session=exam_session)
+    }
+
+
+def get_subject_statistics(exam_session, subject):
+    """Stored SubjectExamStatistics of one subject, or None."""
+    snapshot = get_snapshot(exam_session)
+    if snapshot is not None:
+        return snapshot.statistics().get(subject.id)
+    return SubjectExamStatistics.objects.filter(
+        exam_session=exam_session,
+        subject=subject
+    ).first()
+
+
+def subject_statistics_summary(stats):
+    """
+    Average, highest, lowest, pass rate, median and standard deviation
+    of a SubjectExamStatistics row as floats (zeros when there is none).
+    """
+    if stats is None:
+        return {
+            'average_marks': 0,
+            'highest_marks': 0,
+            'lowest_marks': 0,
+            'pass_rate': 0,
+            'median_marks': 0,
+            'std_deviation': 0,
+        }
+    return {
+        'average_marks': float(stats.mean_marks),
+        'highest_marks': float(stats.highest_marks),
+        'lowest_marks': float(stats.lowest_marks),
+        'pass_rate': float(stats.pass_rate),
+        'median_marks': float(stats.median_marks),
+        'std_deviation': float(stats.std_deviation),
+    }
+
+
+def get_grade_histogram(stats):
+    """Grade counts of a SubjectExamStatistics row, without ungraded marks."""
+    if stats is None:
+        return {}
+    return {
+        grade: count for grade, count in stats.grade_histogram.items()
+        if grade != subject_statistics.NO_GRADE
+    }
+
+
 def get_subject_comparison_data(exam_session):
     """
     Helper function to get comparison data for all subjects.
-    Handles Decimal/float conversion properly.
+    Reads the stored SubjectExamStatistics rows (the snapshot's, once
+    published), best average first.
     """
-    subjects = Subject.objects.filter(
-        educational_level=exam_session.class_level.educational_level,
-        is_active=True
-    )
-    
-    comparison_data = []
-    
-    for subject in subjects:
-        results = StudentResult.objects.filter(
+    snapshot = get_snapshot(exam_session)
+    if snapshot is not None:
+        subjects = {
+            subject.id: subject for subject in Subject.objects.filter(
+                educational_level=exam_session.class_level.educational_level_id,
+                is_active=True
+            )
+        }
+        statistics = []
+        for stats in snapshot.statistics().values():
+            if stats.subject_id in subjects and stats.students_count > 0:
+                stats.subject = subjects[stats.subject_id]
+                statistics.append(stats)
+        statistics.sort(key=lambda stats: (-stats.mean_marks, stats.subject.name))
+    else:
+        statistics = SubjectExamStatistics.objects.filter(
             exam_session=exam_session,
-            subject=subject,
-            marks_obtained__isnull=False
-        )
-        
-        # Convert Decimal marks to float
-        marks_list = []
-        for r in results:
-            if r.marks_obtained is not None:
-                try:
-                    marks_list.append(float(r.marks_obtained))
-                except (TypeError, ValueError):
-                    continue
-        
-        if marks_list:
-            pass_count = sum(1 for m in marks_list if m >= 40)
-            pass_rate = (pass_count / len(marks_list)) * 100 if marks_list else 0
-            
-            grade_a_count = results.filter(grade='A').count()
-            grade_f_count = results.filter(grade='F').count()
-            
-            # Convert max_score to float to avoid Decimal/float division issues
-            max_score = float(exam_session.exam_type.max_score) if exam_session.exam_type.max_score else 100.0
-            
-            comparison_data.append({
-                'subject_id': subject.id,
-                'subject_code': subject.code,
-                'subject_name': subject.name,
-                'students_count': len(marks_list),
-                'average_marks': sum(marks_list) / len(marks_list),
-                'highest_marks': max(marks_list),
-                'lowest_marks': min(marks_list),
-                'pass_rate': pass_rate,
-                'grade_a_count': grade_a_count,
-                'grade_f_count': grade_f_count,
-                'average_percentage': (sum(marks_list) / len(marks_list) / max_score * 100),
-            })
+            subject__educational_level=exam_session.class_level.educational_level_id,
+            subject__is_active=True,
+            students_count__gt=0
+        ).select_related('subject').order_by('-mean_marks', 'subject__name')
     
-    # Sort by average marks descending
-    comparison_data.sort(key=lambda x: x['average_marks'], reverse=True)
+    # Convert max_score to float to avoid Decimal/float division issues
+    max_score = float(exam_session.exam_type.max_score) if exam_session.exam_type.max_score else 100.0
     
-    # Add ranking positions
-    for idx, subject in enumerate(comparison_data, start=1):
-        subject['ranking_position'] = idx
+    comparison_data = []
+    for idx, stats in enumerate(statistics, start=1):
+        average_marks = float(stats.mean_marks)
+        grade_counts = stats.grade_histogram
+        comparison_data.append({
+            'subject_id': stats.subject_id,
+            'subject_code': stats.subject.code,
+            'subject_name': stats.subject.name,
+            'students_count': stats.students_count,
+            'average_marks': average_marks,
+            'highest_marks': float(stats.highest_marks),
+            'lowest_marks': float(stats.lowest_marks),
+            'pass_rate': float(stats.pass_rate),
+            'grade_a_count': grade_counts.get('A', 0),
+            'grade_f_count': grade_counts.get('F', 0),
+            'average_percentage': average_marks / max_score * 100,
+            'ranking_position': idx,
+        })
     
     return comparison_data
 
 
-def get_subject_ranking(exam_session, target_subject):
+def get_subject_ranking(exam_session, target_subject, comparison_data=None):
     """
     Helper function to get ranking position of a subject.
+    Pass ``comparison_data`` when it has already been loaded.
     """
-    subjects = Subject.objects.filter(
-        educational_level=exam_session.class_level.educational_level,
-        is_active=True
-    )
-    
-    subject_averages = []
-    
-    for subject in subjects:
-        avg = StudentResult.objects.filter(
-            exam_session=exam_session,
-            subject=subject,
-            marks_obtained__isnull=False
-        ).aggregate(avg_marks=Avg('marks_obtained'))['avg_marks']
-        
-        if avg:
-            subject_averages.append({
-                'subject_id': subject.id,
-                'average': avg
-            })
+    if comparison_data is None:
+        comparison_data = get_subject_comparison_data(exam_session)
     
-    subject_averages.sort(key=lambda x: x['average'], reverse=True)
-    
-    for idx, subject in enumerate(subject_averages, start=1):
+    for subject in comparison_data:
         if subject['subject_id'] == target_subject.id:
-            return idx
+            return subject['ranking_position']
     
     return None
 
@@ -7235,79 +5565,25 @@ def get_subject_ranking(exam_session, target_subject):
 def calculate_pass_rate(marks_list):
     """
     Calculate pass rate based on 40% pass mark.
-    Handles Decimal values by converting to float.
+    Same calculation as the stored subject statistics.
     """
-    if not marks_list:
-        return 0
-    
-    # Convert any Decimal values to float
-    float_marks = []
-    for m in marks_list:
-        try:
-            float_marks.append(float(m))
-        except (TypeError, ValueError):
-            continue
-    
-    if not float_marks:
-        return 0
-    
-    pass_mark = 40
-    passed = sum(1 for m in float_marks if m >= pass_mark)
-    return (passed / len(float_marks)) * 100
+    return subject_statistics.pass_rate(marks_list)
 
 
 def calculate_median(marks_list):
     """
     Calculate median of marks list.
-    Handles Decimal values by converting to float.
+    Same calculation as the stored subject statistics.
     """
-    if not marks_list:
-        return 0
-    
-    # Convert any Decimal values to float
-    float_marks = []
-    for m in marks_list:
-        try:
-            float_marks.append(float(m))
-        except (TypeError, ValueError):
-            continue
-    
-    if not float_marks:
-        return 0
-    
-    sorted_marks = sorted(float_marks)
-    n = len(sorted_marks)
-    
-    if n % 2 == 0:
-        return (sorted_marks[n//2 - 1] + sorted_marks[n//2]) / 2
-    else:
-        return sorted_marks[n//2]
+    return subject_statistics.median(marks_list)
 
 
 def calculate_std_deviation(marks_list):
     """
     Calculate standard deviation of marks list.
-    Handles Decimal values by converting to float.
+    Same calculation as the stored subject statistics.
     """
-    if not marks_list or len(marks_list) < 2:
-        return 0
-    
-    # Convert any Decimal values to float
-    float_marks = []
-    for m in marks_list:
-        try:
-            float_marks.append(float(m))
-        except (TypeError, ValueError):
-            continue
-    
-    if len(float_marks) < 2:
-        return 0
-    
-    n = len(float_marks)
-    mean = sum(float_marks) / n
-    variance = sum((x - mean) ** 2 for x in float_marks) / n
-    
-    return variance ** 0.5
+    return subject_statistics.std_deviation(marks_list)
 
 
 @login_required
@@ -7389,212 +5665,28 @@ def session_subject_matrix_analysis(request, exam_session_id):
             }
             return render(request, 'admin/results/session_subject_matrix_analysis.html', context)
 
-        # Get students based on stream
-        student_filters = {
-            'class_level': exam_session.class_level,
-            'is_active': True
-        }
-
-        if exam_session.stream_class:
-            student_filters['stream_class'] = exam_session.stream_class
-
-        students = Student.objects.filter(**student_filters)
-        total_students = students.count()
-
-        # Get results for the selected subject
-        results = StudentResult.objects.filter(
-            exam_session=exam_session,
-            subject=selected_subject
-        ).select_related('student')
-
-        results_by_student = {r.student_id: r for r in results}
-
         # ============================================
-        # CALCULATE POSITIONS DYNAMICALLY
-        # ============================================
-        position_map = calculate_subject_positions(students, results_by_student)
-
-        # ============================================
-        # DATA STRUCTURES INITIALIZATION
+        # LOAD THE SUBJECT ONCE - POSITIONS, FILTERS AND MATRIX ON ARRAYS
         # ============================================
 
         # Get all possible grades from GradingScale
-        grading_scales = GradingScale.objects.filter(
-            education_level=exam_session.class_level.educational_level
-        ).order_by('min_mark')
-        all_grades = [scale.grade for scale in grading_scales]
+        all_grades = grade_labels(exam_session)
 
         # Gender tracking
         all_genders = ['Male', 'Female', 'Other']
 
-        # Initialize ALL STUDENTS data structures (unfiltered)
-        all_student_data = []
-        students_with_marks = 0
-        total_marks_sum = 0
-        marks_list = []
-        gender_stats = {}
-        grade_gender_matrix = {}
-        grade_counts = {}
-
-        # Initialize gender stats
-        for gender in all_genders:
-            gender_stats[gender] = {
-                'total': 0,
-                'with_marks': 0,
-                'marks_sum': 0,
-                'average': 0
-            }
-
-        # Initialize grade-gender matrix
-        for gender in all_genders:
-            grade_gender_matrix[gender] = {}
-            for grade in all_grades:
-                grade_gender_matrix[gender][grade] = 0
-            grade_gender_matrix[gender]['No Grade'] = 0
-
-        # Process each student for ALL DATA
-        for student in students:
-            gender = student.get_gender_display() or 'Other'
-            if gender not in gender_stats:
-                gender_stats[gender] = {'total': 0, 'with_marks': 0, 'marks_sum': 0, 'average': 0}
-            if gender not in grade_gender_matrix:
-                grade_gender_matrix[gender] = {}
-                for grade in all_grades:
-                    grade_gender_matrix[gender][grade] = 0
-                grade_gender_matrix[gender]['No Grade'] = 0
-
-            gender_stats[gender]['total'] += 1
-
-            result = results_by_student.get(student.id)
-            marks = result.marks_obtained if result else None
-            percentage = result.percentage if result else None
-            grade = result.grade if result else None
-            grade_point = result.grade_point if result else None
-            position = position_map.get(student.id)
-
-            # Convert marks to float
-            marks_float = None
-            if marks is not None:
-                try:
-                    marks_float = float(marks)
-                except (TypeError, ValueError):
-                    marks_float = None
-
-            if marks_float is not None:
-                students_with_marks += 1
-                total_marks_sum += marks_float
-                marks_list.append(marks_float)
-
-                gender_stats[gender]['with_marks'] += 1
-                gender_stats[gender]['marks_sum'] += marks_float
-
-                if grade:
-                    grade_counts[grade] = grade_counts.get(grade, 0) + 1
-                    grade_gender_matrix[gender][grade] += 1
-                else:
-                    grade_gender_matrix[gender]['No Grade'] += 1
-
-            all_student_data.append({
-                'id': student.id,
-                'registration_number': student.registration_number or f"S{student.id:04d}",
-                'full_name': student.full_name,
-                'gender': gender,
-                'marks': marks_float,
-                'percentage': float(percentage) if percentage else None,
-                'grade': grade,
-                'grade_point': float(grade_point) if grade_point else None,
-                'position': position,
-                'has_marks': marks_float is not None
-            })
-
-        # Calculate gender averages
-        for gender in gender_stats:
-            if gender_stats[gender]['with_marks'] > 0:
-                gender_stats[gender]['average'] = round(
-                    gender_stats[gender]['marks_sum'] / gender_stats[gender]['with_marks'], 2
-                )
-
-        # ============================================
-        # FILTERED DATA PROCESSING
-        # ============================================
-
-        # Start with a copy of all student data with marks
-        filtered_student_data = []
-        for student in all_student_data:
-            if student['has_marks']:
-                filtered_student_data.append(student.copy())
-
-        # Apply grade filter
-        if grade_filter:
-            if grade_filter == 'No Grade':
-                filtered_student_data = [s for s in filtered_student_data if not s['grade']]
-            else:
-                filtered_student_data = [s for s in filtered_student_data if s['grade'] == grade_filter]
-
-        # Apply marks range filter
-        if marks_min is not None:
-            filtered_student_data = [s for s in filtered_student_data if s['marks'] >= marks_min]
-        if marks_max is not None:
-            filtered_student_data = [s for s in filtered_student_data if s['marks'] <= marks_max]
-
-        # Apply gender filter
-        if gender_filter:
-            filtered_student_data = [
-                s for s in filtered_student_data 
-                if s['gender'] and s['gender'].lower() == gender_filter.lower()
-            ]
-
-        # Apply rank filter
-        if rank_filter == 'top':
-            students_with_position = [s for s in filtered_student_data if s['position']]
-            students_with_position.sort(key=lambda x: x['position'])
-            filtered_student_data = students_with_position[:min(top_n, len(students_with_position))]
-        elif rank_filter == 'bottom':
-            students_with_position = [s for s in filtered_student_data if s['position']]
-            students_with_position.sort(key=lambda x: x['position'], reverse=True)
-            filtered_student_data = students_with_position[:min(bottom_n, len(students_with_position))]
-
-        # ============================================
-        # CALCULATE FILTERED STATISTICS
-        # ============================================
-
-        filtered_marks_list = [s['marks'] for s in filtered_student_data if s['marks'] is not None]
-        
-        statistics = {
-            'total_students': len(filtered_student_data),
-            'students_with_marks': len(filtered_student_data),
-            'students_without_marks': 0,
-            'percentage_completed': 100.0 if filtered_student_data else 0,
-            'average_marks': sum(filtered_marks_list) / len(filtered_marks_list) if filtered_marks_list else 0,
-            'highest_marks': max(filtered_marks_list) if filtered_marks_list else 0,
-            'lowest_marks': min(filtered_marks_list) if filtered_marks_list else 0,
-            'pass_rate': calculate_pass_rate(filtered_marks_list),
-            'median_marks': calculate_median(filtered_marks_list),
-            'std_deviation': calculate_std_deviation(filtered_marks_list),
-        }
-
-        # ============================================
-        # MATRIX DATA (FROM ALL STUDENTS - UNFILTERED)
-        # ============================================
-
-        # Calculate grade totals for matrix
-        grade_totals = {}
-        for grade in all_grades + ['No Grade']:
-            grade_totals[grade] = 0
-            for gender in grade_gender_matrix:
-                grade_totals[grade] += grade_gender_matrix[gender].get(grade, 0)
-
-        # Calculate gender totals for matrix
-        gender_totals = {}
-        for gender in grade_gender_matrix:
-            gender_totals[gender] = sum(grade_gender_matrix[gender].values())
-
-        grand_total = sum(gender_totals.values())
-
-        # Determine matrix grades (include No Grade if exists)
-        matrix_grades = all_grades.copy()
-        if any(grade_gender_matrix[g]['No Grade'] > 0 for g in grade_gender_matrix):
-            matrix_grades.append('No Grade')
+        breakdown = subject_breakdown(
+            exam_session,
+            selected_subject,
+            grade_filter=grade_filter,
+            gender_filter=gender_filter,
+            rank_filter=rank_filter,
+            top_n=top_n,
+            bottom_n=bottom_n,
+            marks_min=marks_min,
+            marks_max=marks_max,
+            grades=all_grades,
+        )
 
         # ============================================
         # PREPARE CONTEXT
@@ -7608,23 +5700,23 @@ def session_subject_matrix_analysis(request, exam_session_id):
             'subject_id': selected_subject.id,
 
             # Data
-            'filtered_student_data': filtered_student_data,
-            'all_student_data': all_student_data,
+            'filtered_student_data': breakdown['filtered_student_data'],
+            'all_student_data': breakdown['all_student_data'],
 
             # Statistics
-            'statistics': statistics,
-            'students_with_marks': students_with_marks,
-            'total_students': total_students,
+            'statistics': breakdown['filtered_statistics'],
+            'students_with_marks': breakdown['students_with_marks'],
+            'total_students': breakdown['total_students'],
 
             # Matrix data
-            'grade_gender_matrix': grade_gender_matrix,
-            'matrix_grades': matrix_grades,
-            'grade_totals': grade_totals,
-            'gender_totals': gender_totals,
-            'grand_total': grand_total,
+            'grade_gender_matrix': breakdown['grade_gender_matrix'],
+            'matrix_grades': breakdown['matrix_grades'],
+            'grade_totals': breakdown['grade_totals'],
+            'gender_totals': breakdown['gender_totals'],
+            'grand_total': breakdown['grand_total'],
 
             # Gender statistics
-            'gender_statistics': gender_stats,
+            'gender_statistics': breakdown['gender_statistics'],
 
             # Filter values
             'subject_id': subject_id,
@@ -7898,8 +5990,6 @@ def session_subject_matrix_analysis_pdf(request, exam_session_id):
 
         # Generate PDF
         html_string = render_to_string('admin/results/session_subject_matrix_analysis_pdf.html', context)
-        html = HTML(string=html_string, base_url=request.build_absolute_uri())
-        pdf_file = html.write_pdf()
 
         # Generate filename
         filename_parts = [
@@ -7921,10 +6011,11 @@ def session_subject_matrix_analysis_pdf(request, exam_session_id):
         filename_parts.append(timezone.now().strftime('%Y%m%d'))
         filename = "_".join(filename_parts) + ".pdf"
 
-        response = HttpResponse(pdf_file, content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-
-        return response
+        return pdf_job_response(
+            request, html_string, filename,
+            report_type='session_subject_matrix_analysis',
+            base_url=request.build_absolute_uri()
+        )
 
     except Exception as e:
         import logging
@@ -140,6 +140,10 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Rendered report files (core.report_cache); keep outside MEDIA_ROOT
+REPORT_CACHE_DIR = BASE_DIR / 'report_cache'
+REPORT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
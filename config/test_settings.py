@@ -0,0 +1,30 @@
+"""
+Settings for running the test suite locally against SQLite:
+
+    python manage.py test --settings=config.test_settings
+"""
+import atexit
+import shutil
+import tempfile
+from pathlib import Path
+
+from .settings import *  # noqa: F401,F403
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    }
+}
+
+# Fast hashing for the users the tests create
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+# Report files and cached reports go to a temporary directory, removed
+# when the run ends, instead of the working tree
+TEST_FILES_DIR = Path(tempfile.mkdtemp(prefix='sms-tests-'))
+atexit.register(shutil.rmtree, TEST_FILES_DIR, ignore_errors=True)
+
+MEDIA_ROOT = TEST_FILES_DIR / 'media'
+
+REPORT_CACHE_DIR = TEST_FILES_DIR / 'report_cache'
@@ -19,4 +19,5 @@ from django.urls import path, include
 urlpatterns = [    
     path('', include('public.urls')),
     path('', include('accounts.urls')),  # Dashboard URLs
+    path('reports/', include('core.urls')),  # Background report jobs
 ]
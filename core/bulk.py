@@ -0,0 +1,28 @@
+# core/bulk.py
+"""
+Helpers for set-based writes shared by the results and attendance code.
+"""
+from django.db import connections, router
+
+
+def bulk_upsert(model, objs, unique_fields, update_fields, batch_size=None):
+    """
+    Insert ``objs`` and update ``update_fields`` on rows that already exist,
+    in one INSERT ... ON CONFLICT / ON DUPLICATE KEY statement per batch.
+
+    MySQL resolves the conflict from the table's unique keys and rejects an
+    explicit conflict target, so ``unique_fields`` is only passed to
+    backends that support it (SQLite, PostgreSQL).
+    """
+    if not objs:
+        return []
+
+    connection = connections[router.db_for_write(model)]
+    kwargs = {
+        'update_conflicts': True,
+        'update_fields': update_fields,
+    }
+    if connection.features.supports_update_conflicts_with_target:
+        kwargs['unique_fields'] = unique_fields
+
+    return model.objects.bulk_create(objs, batch_size=batch_size, **kwargs)
@@ -0,0 +1,150 @@
+# core/excel_export.py
+"""
+Streaming Excel exports.
+
+Exports are written with openpyxl's write-only workbook: rows are
+appended once, in order, and flushed to a temporary file as they are
+written instead of being kept as cell objects. Formatting is done with
+named styles registered once per workbook, so each cell only carries a
+style name. Querysets should be fed with ``.iterator(chunk_size=
+EXPORT_CHUNK_SIZE)`` so the rows are never all in memory either.
+
+The finished workbook is saved to a spooled temporary file (kept in
+memory while small, moved to disk beyond SPOOL_MAX_BYTES) and sent with
+a FileResponse, which streams it in blocks.
+
+Write-only sheets take column widths and frozen panes before the first
+row is written, so they are passed to ``add_sheet``; merged ranges and
+auto-filters may be added at any time.
+"""
+import tempfile
+
+from django.http import FileResponse
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, NamedStyle, PatternFill, Side
+from openpyxl.utils import get_column_letter
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Rows fetched per database round trip when iterating export querysets
+EXPORT_CHUNK_SIZE = 2000
+
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+
+def solid_fill(color):
+    return PatternFill(start_color=color, end_color=color, fill_type='solid')
+
+
+def box_border(style='thin', color=None):
+    side = Side(style=style, color=color)
+    return Border(left=side, right=side, top=side, bottom=side)
+
+
+def centered(**kwargs):
+    return Alignment(horizontal='center', vertical='center', **kwargs)
+
+
+def left_aligned(**kwargs):
+    return Alignment(horizontal='left', vertical='center', **kwargs)
+
+
+class ExportSheet:
+    """A write-only worksheet that appends rows of values or styled cells."""
+
+    def __init__(self, worksheet):
+        self.worksheet = worksheet
+        self.row_count = 0
+
+    def append(self, values, style=None, styles=None):
+        """
+        Append one row. ``style`` names the style of every cell;
+        ``styles`` maps 1-based column numbers to a style that replaces it.
+        Cells without a style are written as plain values.
+        """
+        if style is None and not styles:
+            row = list(values)
+        else:
+            row = []
+            for column, value in enumerate(values, start=1):
+                cell_style = (styles or {}).get(column, style)
+                if cell_style is None:
+                    row.append(value)
+                    continue
+                cell = WriteOnlyCell(self.worksheet, value=value)
+                cell.style = cell_style
+                row.append(cell)
+        self.worksheet.append(row)
+        self.row_count += 1
+        return self.row_count
+
+    def append_merged(self, value, style=None, columns=1):
+        """Append a row holding one value merged across ``columns`` columns."""
+        row = self.append([value], style=style)
+        if columns > 1:
+            self.merge(row, 1, row, columns)
+        return row
+
+    def append_blank(self):
+        return self.append([])
+
+    def merge(self, first_row, first_column, last_row, last_column):
+        self.worksheet.merged_cells.add(
+            f'{get_column_letter(first_column)}{first_row}:'
+            f'{get_column_letter(last_column)}{last_row}'
+        )
+
+    def auto_filter(self, first_row, last_row, columns):
+        self.worksheet.auto_filter.ref = f'A{first_row}:{get_column_letter(columns)}{max(first_row, last_row)}'
+
+
+class StreamingExcelExport:
+    """Write-only workbook with named styles and a streamed response."""
+
+    def __init__(self):
+        self.workbook = Workbook(write_only=True)
+
+    def add_style(self, name, font=None, fill=None, border=None, alignment=None, number_format=None):
+        style = NamedStyle(name=name)
+        if font is not None:
+            style.font = font
+        if fill is not None:
+            style.fill = fill
+        if border is not None:
+            style.border = border
+        if alignment is not None:
+            style.alignment = alignment
+        if number_format is not None:
+            style.number_format = number_format
+        self.workbook.add_named_style(style)
+        return name
+
+    def add_sheet(self, title, column_widths=None, freeze_row=None, freeze_column=None):
+        """
+        Create a sheet. ``column_widths`` lists widths from column A;
+        ``freeze_row`` keeps the rows above it, and ``freeze_column`` the
+        columns left of it, visible when scrolling.
+        """
+        worksheet = self.workbook.create_sheet(title=title)
+        for column, width in enumerate(column_widths or [], start=1):
+            worksheet.column_dimensions[get_column_letter(column)].width = width
+        if freeze_row or freeze_column:
+            worksheet.freeze_panes = f'{get_column_letter(freeze_column or 1)}{freeze_row or 1}'
+        return ExportSheet(worksheet)
+
+    def save(self):
+        """Write the workbook to a spooled temporary file, rewound for reading."""
+        output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+        self.workbook.save(output)
+        output.seek(0)
+        return output
+
+    def response(self, filename, output=None):
+        return FileResponse(
+            output if output is not None else self.save(),
+            as_attachment=True,
+            filename=filename,
+            content_type=XLSX_CONTENT_TYPE
+        )
+
@@ -0,0 +1,120 @@
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.report_worker import init_worker, run_job
+from core.reports import (claim_jobs, fail_job, load_job_handlers, purge_report_jobs,
+                          requeue_stale_jobs, run_report_job)
+
+
+class Command(BaseCommand):
+    help = (
+        "Render queued report jobs (PDFs and other exports) in a pool of "
+        "worker processes. Runs continuously unless --once is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=2,
+            help='Number of worker processes, and so of reports rendered at once (default: 2).'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Process the jobs currently queued and exit.'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=1.0,
+            help='Seconds to sleep between polls when the queue is empty (default: 1).'
+        )
+        parser.add_argument(
+            '--purge-days', type=int, default=7,
+            help='Delete finished jobs and their files after this many days (default: 7).'
+        )
+        parser.add_argument(
+            '--inline', action='store_true',
+            help='Run jobs in this process instead of a pool (for debugging).'
+        )
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale_jobs()
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale job(s)")
+
+        purged = purge_report_jobs(options['purge_days'])
+        if purged:
+            self.stdout.write(f"Purged {purged} old job(s)")
+
+        if options['inline']:
+            load_job_handlers()
+            self.run_inline(options)
+            return
+
+        workers = max(1, options['workers'])
+        pool = self.create_pool(workers)
+        running = {}
+        try:
+            while True:
+                free = workers - len(running)
+                if free:
+                    for job_id in claim_jobs(free):
+                        try:
+                            future = pool.submit(run_job, job_id)
+                        except BrokenProcessPool:
+                            # A worker died since the last wait
+                            pool = self.replace_pool(pool, running, workers)
+                            future = pool.submit(run_job, job_id)
+                        running[future] = job_id
+                    # The workers have their own connections; don't hold one open here
+                    connections.close_all()
+
+                if not running:
+                    if options['once']:
+                        break
+                    time.sleep(options['interval'])
+                    continue
+
+                done, _ = wait(running, timeout=options['interval'], return_when=FIRST_COMPLETED)
+                for future in done:
+                    job_id = running.pop(future)
+                    error = future.exception()
+                    if error is not None:
+                        fail_job(job_id, error)
+                    self.report(job_id, error is None and future.result())
+
+                if any(isinstance(future.exception(), BrokenProcessPool) for future in done):
+                    # A worker died (e.g. out of memory)
+                    pool = self.replace_pool(pool, running, workers)
+        finally:
+            pool.shutdown(wait=True)
+
+    def create_pool(self, workers):
+        return ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=init_worker,
+        )
+
+    def replace_pool(self, pool, running, workers):
+        """Fail the jobs of a broken pool and start a fresh one."""
+        pool.shutdown(wait=False, cancel_futures=True)
+        for job_id in running.values():
+            fail_job(job_id, 'Report worker stopped unexpectedly')
+        running.clear()
+        return self.create_pool(workers)
+
+    def run_inline(self, options):
+        while True:
+            job_ids = claim_jobs(1)
+            for job_id in job_ids:
+                self.report(job_id, run_report_job(job_id))
+            if not job_ids:
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+
+    def report(self, job_id, succeeded):
+        self.stdout.write(f"Report job {job_id} {'completed' if succeeded else 'failed'}")
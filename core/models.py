@@ -1,4 +1,5 @@
 from django.db import models
+from django.conf import settings
 from django.core.exceptions import ValidationError
 
 
@@ -244,3 +245,59 @@ class CombinationSubject(models.Model):
 
     class Meta:
         unique_together = ('combination', 'subject')
+
+
+class ReportJob(models.Model):
+    """
+    A report rendered in the background by ``manage.py process_report_jobs``.
+
+    Views enqueue the job (for PDFs, with the HTML they have already
+    rendered) and the worker writes the finished file under MEDIA_ROOT.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_COMPLETED, 'Completed'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    job_type = models.CharField(max_length=30, default='pdf')  # handler in core.reports
+    report_type = models.CharField(max_length=60)
+    filename = models.CharField(max_length=255)
+    params = models.JSONField(default=dict, blank=True)
+    html = models.TextField(blank=True)
+    base_url = models.CharField(max_length=500, blank=True)
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    progress = models.PositiveSmallIntegerField(default=0)
+    message = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+    file = models.FileField(upload_to='reports/%Y/%m/', blank=True)
+
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='report_jobs'
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+        verbose_name = 'Report Job'
+        verbose_name_plural = 'Report Jobs'
+
+    def __str__(self):
+        return f"{self.report_type} ({self.get_status_display()})"
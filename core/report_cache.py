@@ -0,0 +1,149 @@
+# core/report_cache.py
+"""
+On-disk cache of rendered report files.
+
+A report is stored under a key hashed from its report type, its filter
+parameters and the version of the data it was built from, so a file is
+never served for data that has changed since: the caller passes a
+version that moves whenever the underlying rows do (see
+results.report_cache), and stale entries are simply never asked for
+again.
+
+Files live under REPORT_CACHE_DIR, which should not be web-served. Every
+hit refreshes the file's modification time; when the directory grows past
+REPORT_CACHE_MAX_BYTES the least recently used files are removed.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# After evicting, keep this share of the cap free so that every store
+# does not trigger another directory scan
+EVICT_TO_RATIO = 0.9
+
+
+def cache_dir():
+    return str(getattr(settings, 'REPORT_CACHE_DIR', os.path.join(settings.BASE_DIR, 'report_cache')))
+
+
+def max_cache_bytes():
+    return getattr(settings, 'REPORT_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES)
+
+
+def report_cache_key(report_type, params, version):
+    """Key of a rendered report; ``params`` must be JSON-serialisable."""
+    payload = json.dumps(
+        [report_type, params or {}, str(version)],
+        sort_keys=True, default=str, separators=(',', ':')
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _path(key):
+    return os.path.join(cache_dir(), key[:2], key)
+
+
+def get_cached_report(key):
+    """Cached bytes for ``key``, or None."""
+    path = _path(key)
+    try:
+        with open(path, 'rb') as f:
+            content = f.read()
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        logger.warning(f"Could not read cached report {key}: {str(e)}")
+        return None
+
+    try:
+        os.utime(path)  # mark as recently used
+    except OSError:
+        pass
+    return content
+
+
+def store_report(key, content):
+    """
+    Write ``content`` under ``key`` and trim the cache to its size cap.
+    ``content`` is bytes or a binary file, copied from its current position.
+    """
+    path = _path(key)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file first so readers never see half a report
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        with os.fdopen(fd, 'wb') as f:
+            if isinstance(content, bytes):
+                f.write(content)
+            else:
+                shutil.copyfileobj(content, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"Could not cache report {key}: {str(e)}")
+        return False
+
+    evict_reports()
+    return True
+
+
+def evict_reports(max_bytes=None):
+    """
+    Remove least recently used reports until the cache fits in
+    ``max_bytes``. Returns the number of files removed.
+    """
+    if max_bytes is None:
+        max_bytes = max_cache_bytes()
+
+    entries = []
+    total = 0
+    root = cache_dir()
+    if not os.path.isdir(root):
+        return 0
+
+    for bucket in os.scandir(root):
+        if not bucket.is_dir():
+            continue
+        for entry in os.scandir(bucket.path):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue  # removed by another process
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+
+    if total <= max_bytes:
+        return 0
+
+    target = max_bytes * EVICT_TO_RATIO
+    removed = 0
+    for mtime, size, path in sorted(entries):
+        if total <= target:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+    return removed
+
+
+def clear_report_cache():
+    """Remove every cached report. Returns the number of files removed."""
+    return evict_reports(max_bytes=0)
+
+
+def report_file_response(content, filename, content_type):
+    response = HttpResponse(content, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
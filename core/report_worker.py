@@ -0,0 +1,31 @@
+# core/report_worker.py
+"""
+Entry points for report worker processes.
+
+Workers are spawned rather than forked, so they never share the parent's
+database connections. This module imports nothing from Django at import
+time, which lets a fresh interpreter unpickle these functions before
+Django is set up.
+"""
+
+
+def init_worker():
+    """Process pool initializer: set Django up and register job handlers."""
+    import django
+    django.setup()
+
+    from core.reports import load_job_handlers
+    load_job_handlers()
+
+
+def run_job(job_id):
+    from core.reports import run_report_job
+    return run_report_job(job_id)
+
+
+def render_pdf(html, base_url=None):
+    """Render one HTML document to PDF bytes; used by handlers that render several."""
+    from weasyprint import HTML
+    from weasyprint.text.fonts import FontConfiguration
+
+    return HTML(string=html, base_url=base_url).write_pdf(font_config=FontConfiguration())
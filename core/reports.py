@@ -0,0 +1,240 @@
+# core/reports.py
+"""
+Background report jobs.
+
+Views render their template as usual and call ``pdf_job_response``,
+which stores the HTML in a ReportJob and answers with a page (or JSON
+for AJAX callers) that polls the job's progress. ``manage.py
+process_report_jobs`` claims pending jobs and runs them in a process
+pool; each job's handler returns the file contents, which are saved
+under MEDIA_ROOT/reports/ and served by ``report_job_download``. Jobs
+queued with a ``cache_key`` also leave their file in the report cache
+(core.report_cache) for the next identical request.
+
+Handlers are registered per ``job_type`` with ``job_handler``; the
+built-in ``pdf`` handler renders the stored HTML with WeasyPrint. Apps
+register their own handlers in a ``reports`` module, which workers
+import on start-up.
+"""
+from datetime import timedelta
+import logging
+import traceback
+
+from django.core.files.base import ContentFile
+from django.db import close_old_connections
+from django.http import JsonResponse
+from django.shortcuts import render
+from django.urls import reverse
+from django.utils.module_loading import autodiscover_modules
+from django.utils import timezone
+
+from .models import ReportJob
+from .report_cache import store_report
+
+logger = logging.getLogger(__name__)
+
+# Running jobs not finished after this long are assumed lost with their worker
+STALE_JOB_SECONDS = 30 * 60
+
+JOB_HANDLERS = {}
+
+
+def job_handler(job_type):
+    """Register ``func(job, progress)`` as the handler of a job type."""
+    def register(func):
+        JOB_HANDLERS[job_type] = func
+        return func
+    return register
+
+
+@job_handler('pdf')
+def render_pdf(job, progress):
+    from weasyprint import HTML
+    from weasyprint.text.fonts import FontConfiguration
+
+    progress(20, 'Laying out pages')
+    document = HTML(string=job.html, base_url=job.base_url or None).render(
+        font_config=FontConfiguration(),
+        presentational_hints=job.params.get('presentational_hints', False)
+    )
+    progress(70, f'Writing {len(document.pages)} page(s)')
+    return document.write_pdf()
+
+
+# ============================================
+# ENQUEUEING
+# ============================================
+
+def enqueue_report(request, report_type, filename, job_type='pdf', html='', base_url='', params=None):
+    user = getattr(request, 'user', None)
+    return ReportJob.objects.create(
+        job_type=job_type,
+        report_type=report_type,
+        filename=filename,
+        html=html,
+        base_url=base_url,
+        params=params or {},
+        requested_by=user if user is not None and user.is_authenticated else None,
+    )
+
+
+def job_payload(job):
+    payload = {
+        'id': job.id,
+        'report_type': job.report_type,
+        'filename': job.filename,
+        'status': job.status,
+        'progress': job.progress,
+        'message': job.message,
+        'status_url': reverse('report_job_status', args=[job.id]),
+        'download_url': None,
+        'error': job.error.split('\n', 1)[0] if job.status == ReportJob.STATUS_FAILED else '',
+    }
+    if job.status == ReportJob.STATUS_COMPLETED:
+        payload['download_url'] = reverse('report_job_download', args=[job.id])
+    return payload
+
+
+def wants_json(request):
+    return (
+        request.headers.get('x-requested-with') == 'XMLHttpRequest'
+        or 'application/json' in request.headers.get('accept', '')
+    )
+
+
+def report_job_response(request, job):
+    """JSON (202) for AJAX callers, otherwise the page that waits for the file."""
+    if wants_json(request):
+        return JsonResponse({'success': True, 'job': job_payload(job)}, status=202)
+    return render(request, 'core/report_job.html', {
+        'job': job,
+        'job_data': job_payload(job),
+        'back_url': request.META.get('HTTP_REFERER', ''),
+    })
+
+
+def pdf_job_response(request, html_string, filename, report_type, base_url=None, cache_key=None,
+                     presentational_hints=False):
+    """Queue ``html_string`` for PDF rendering and answer the request."""
+    params = {}
+    if cache_key:
+        params['cache_key'] = cache_key
+    if presentational_hints:
+        params['presentational_hints'] = True
+    job = enqueue_report(
+        request, report_type, filename, job_type='pdf', html=html_string,
+        base_url=base_url if base_url is not None else request.build_absolute_uri('/'),
+        params=params,
+    )
+    return report_job_response(request, job)
+
+
+# ============================================
+# WORKER SIDE
+# ============================================
+
+def load_job_handlers():
+    """Import every app's ``reports`` module so its handlers register."""
+    autodiscover_modules('reports')
+
+
+def claim_jobs(limit):
+    """Move up to ``limit`` pending jobs to running; returns their ids."""
+    claimed = []
+    candidates = ReportJob.objects.filter(
+        status=ReportJob.STATUS_PENDING
+    ).order_by('created_at').values_list('id', flat=True)[:limit]
+
+    for job_id in candidates:
+        # Only one worker wins the update for a given job
+        won = ReportJob.objects.filter(
+            id=job_id, status=ReportJob.STATUS_PENDING
+        ).update(
+            status=ReportJob.STATUS_RUNNING,
+            started_at=timezone.now(),
+            progress=5,
+            message='Starting'
+        )
+        if won:
+            claimed.append(job_id)
+    return claimed
+
+
+def requeue_stale_jobs(stale_seconds=STALE_JOB_SECONDS):
+    return ReportJob.objects.filter(
+        status=ReportJob.STATUS_RUNNING,
+        started_at__lt=timezone.now() - timedelta(seconds=stale_seconds)
+    ).update(status=ReportJob.STATUS_PENDING, progress=0, message='Requeued')
+
+
+def run_report_job(job_id):
+    """
+    Run one claimed job to completion. Executed in a worker process, so it
+    only takes the job id and reports failures through the job row.
+    """
+    close_old_connections()
+    job = ReportJob.objects.get(id=job_id)
+
+    def progress(percent, message=''):
+        ReportJob.objects.filter(id=job_id).update(progress=percent, message=message)
+
+    try:
+        handler = JOB_HANDLERS.get(job.job_type)
+        if handler is None:
+            raise ValueError(f"No handler for report job type '{job.job_type}'")
+
+        content = handler(job, progress)
+
+        progress(90, 'Saving file')
+        job.file.save(job.filename, ContentFile(content), save=False)
+        if job.params.get('cache_key'):
+            store_report(job.params['cache_key'], content)
+        ReportJob.objects.filter(id=job_id).update(
+            file=job.file.name,
+            status=ReportJob.STATUS_COMPLETED,
+            progress=100,
+            message='Ready',
+            html='',  # the rendered file replaces the source
+            finished_at=timezone.now()
+        )
+        return True
+
+    except Exception as e:
+        logger.error(f"Report job {job_id} failed: {str(e)}", exc_info=True)
+        ReportJob.objects.filter(id=job_id).update(
+            status=ReportJob.STATUS_FAILED,
+            message='Failed',
+            error=f"{e}\n{traceback.format_exc()}",
+            finished_at=timezone.now()
+        )
+        return False
+
+    finally:
+        close_old_connections()
+
+
+def fail_job(job_id, error):
+    """Mark a job failed when its worker died before it could report."""
+    ReportJob.objects.filter(
+        id=job_id, status=ReportJob.STATUS_RUNNING
+    ).update(
+        status=ReportJob.STATUS_FAILED,
+        message='Failed',
+        error=str(error) or error.__class__.__name__,
+        finished_at=timezone.now()
+    )
+
+
+def purge_report_jobs(days):
+    """Delete finished jobs (and their files) older than ``days`` days."""
+    old_jobs = ReportJob.objects.filter(
+        status__in=[ReportJob.STATUS_COMPLETED, ReportJob.STATUS_FAILED],
+        finished_at__lt=timezone.now() - timedelta(days=days)
+    )
+    count = 0
+    for job in old_jobs.iterator():
+        if job.file:
+            job.file.delete(save=False)
+        job.delete()
+        count += 1
+    return count
@@ -0,0 +1,190 @@
+"""
+Report jobs, the report file cache and the streaming exporters.
+
+Report files and cached reports are written under the temporary
+MEDIA_ROOT and REPORT_CACHE_DIR of config.test_settings:
+
+    python manage.py test core --settings=config.test_settings
+"""
+import io
+import os
+
+from django.conf import settings
+from django.test import RequestFactory, TestCase, override_settings
+from openpyxl import load_workbook
+from openpyxl.styles import Font
+
+from core.data_export import export_rows, streaming_export_response
+from core.excel_export import StreamingExcelExport
+from core.models import ReportJob
+from core.report_cache import (
+    clear_report_cache, evict_reports, get_cached_report, report_cache_key, store_report
+)
+from core.reports import enqueue_report, job_handler, run_report_job
+
+REPORT_CONTENT = b'%PDF-1.7 test report'
+
+
+@job_handler('test-report')
+def render_test_report(job, progress):
+    progress(50, 'Rendering')
+    return REPORT_CONTENT
+
+
+@job_handler('test-failure')
+def fail_test_report(job, progress):
+    raise ValueError('Broken template')
+
+
+class ReportJobTests(TestCase):
+
+    def setUp(self):
+        self.request = RequestFactory().get('/')
+        self.addCleanup(clear_report_cache)
+
+    def test_completed_job_saves_file_and_caches_it(self):
+        key = report_cache_key('test-report', {'page': 1}, 'v1')
+        job = enqueue_report(
+            self.request, 'test-report', 'report.pdf', job_type='test-report',
+            html='<p>report</p>', params={'cache_key': key}
+        )
+
+        self.assertTrue(run_report_job(job.id))
+
+        job.refresh_from_db()
+        self.addCleanup(job.file.delete, save=False)
+        self.assertEqual(job.status, ReportJob.STATUS_COMPLETED)
+        self.assertEqual(job.progress, 100)
+        self.assertEqual(job.html, '')
+        self.assertTrue(job.file.path.startswith(str(settings.MEDIA_ROOT)))
+        with job.file.open('rb') as f:
+            self.assertEqual(f.read(), REPORT_CONTENT)
+        self.assertEqual(get_cached_report(key), REPORT_CONTENT)
+
+    def test_failed_job_records_error(self):
+        job = enqueue_report(self.request, 'test-report', 'report.pdf', job_type='test-failure')
+
+        with self.assertLogs('core.reports', 'ERROR'):
+            self.assertFalse(run_report_job(job.id))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ReportJob.STATUS_FAILED)
+        self.assertTrue(job.error.startswith('Broken template'))
+        self.assertFalse(job.file)
+
+
+class ReportCacheTests(TestCase):
+
+    def setUp(self):
+        self.addCleanup(clear_report_cache)
+
+    def test_key_moves_with_data_version(self):
+        params = {'exam_session_id': 1, 'stream': 'A'}
+        self.assertEqual(
+            report_cache_key('results', params, 'v1'),
+            report_cache_key('results', dict(reversed(params.items())), 'v1')
+        )
+        self.assertNotEqual(
+            report_cache_key('results', params, 'v1'),
+            report_cache_key('results', params, 'v2')
+        )
+
+    def test_store_and_read_back(self):
+        key = report_cache_key('results', {}, 'v1')
+        self.assertIsNone(get_cached_report(key))
+
+        self.assertTrue(store_report(key, b'bytes'))
+        self.assertEqual(get_cached_report(key), b'bytes')
+
+        other = report_cache_key('results', {}, 'v2')
+        self.assertTrue(store_report(other, io.BytesIO(b'file')))
+        self.assertEqual(get_cached_report(other), b'file')
+
+    def test_eviction_removes_least_recently_used(self):
+        keys = [report_cache_key('results', {'n': n}, 'v1') for n in range(3)]
+        for n, key in enumerate(keys):
+            store_report(key, b'x' * 100)
+            path = os.path.join(settings.REPORT_CACHE_DIR, key[:2], key)
+            os.utime(path, (n, n))
+        get_cached_report(keys[0])  # now the most recently used
+
+        self.assertEqual(evict_reports(max_bytes=150), 2)
+        self.assertEqual(get_cached_report(keys[0]), b'x' * 100)
+        self.assertIsNone(get_cached_report(keys[1]))
+        self.assertIsNone(get_cached_report(keys[2]))
+
+    @override_settings(REPORT_CACHE_MAX_BYTES=150)
+    def test_store_trims_to_cap(self):
+        for n in range(3):
+            store_report(report_cache_key('results', {'n': n}, 'v1'), b'x' * 100)
+        self.assertEqual(clear_report_cache(), 1)
+
+
+class DataExportTests(TestCase):
+
+    def setUp(self):
+        self.jobs = ReportJob.objects.bulk_create([
+            ReportJob(report_type='students_list', filename=f'report-{n}.pdf')
+            for n in range(7)
+        ])
+        self.columns = [('ID', 'id'), ('Filename', 'filename')]
+
+    def test_pages_cover_every_row_once(self):
+        expected = [(job.id, job.filename) for job in ReportJob.objects.order_by('pk')]
+        for chunk_size in (1, 3, 7, 100):
+            with self.subTest(chunk_size=chunk_size):
+                rows = list(export_rows(ReportJob.objects.order_by('-id'), self.columns, chunk_size=chunk_size))
+                self.assertEqual(rows, expected)
+
+    def test_pages_query_by_primary_key(self):
+        with self.assertNumQueries(3):
+            rows = list(export_rows(ReportJob.objects.all(), self.columns, chunk_size=3))
+        self.assertEqual(len(rows), 7)
+
+    def test_response_formats(self):
+        factory = RequestFactory()
+
+        response = streaming_export_response(
+            factory.get('/', {'format': 'csv'}), ReportJob.objects.all(), self.columns, 'jobs'
+        )
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="jobs.csv"')
+        self.assertEqual(lines[0], 'ID,Filename')
+        self.assertEqual(len(lines), 8)
+
+        response = streaming_export_response(
+            factory.get('/', {'format': 'ndjson'}), ReportJob.objects.all(), self.columns, 'jobs'
+        )
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], f'{{"ID":{self.jobs[0].id},"Filename":"report-0.pdf"}}')
+
+        response = streaming_export_response(
+            factory.get('/', {'format': 'xml'}), ReportJob.objects.all(), self.columns, 'jobs'
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class StreamingExcelExportTests(TestCase):
+
+    def test_workbook_layout(self):
+        export = StreamingExcelExport()
+        export.add_style('header', font=Font(bold=True))
+        sheet = export.add_sheet('Students', column_widths=[8, 30], freeze_row=3, freeze_column=2)
+        sheet.append_merged('Students list', columns=2)
+        sheet.append(['No', 'Name'], style='header')
+        for n in range(1, 4):
+            sheet.append([n, f'Student {n}'])
+
+        response = export.response('students "all".xlsx')
+        content = b''.join(response.streaming_content)
+        self.assertIn('filename="students \\"all\\".xlsx"', response['Content-Disposition'])
+
+        worksheet = load_workbook(io.BytesIO(content))['Students']
+        self.assertEqual(worksheet['A1'].value, 'Students list')
+        self.assertIn('A1:B1', [str(cells) for cells in worksheet.merged_cells.ranges])
+        self.assertEqual(worksheet.freeze_panes, 'B3')
+        self.assertEqual(worksheet.column_dimensions['B'].width, 30)
+        self.assertTrue(worksheet['A2'].font.bold)
+        self.assertEqual([row for row in worksheet.iter_rows(min_row=3, values_only=True)], [
+            (1, 'Student 1'), (2, 'Student 2'), (3, 'Student 3'),
+        ])
@@ -0,0 +1,9 @@
+from django.urls import path
+
+from core.views import report_job_download, report_job_status
+
+
+urlpatterns = [
+    path('jobs/<int:job_id>/status/', report_job_status, name='report_job_status'),
+    path('jobs/<int:job_id>/download/', report_job_download, name='report_job_download'),
+]
@@ -1,5 +1,11 @@
-from django.shortcuts import render
+from django.contrib.auth.decorators import login_required
+from django.http import FileResponse, Http404, JsonResponse
+from django.shortcuts import get_object_or_404, render
 from django.views import View
+from django.views.decorators.http import require_GET
+
+from .models import ReportJob
+from .reports import job_payload
 
 
 class DashboardView(View):
@@ -8,3 +14,35 @@ class DashboardView(View):
     def get(self, request):
         context = {}
         return render(request, 'core/dashboard.html', context)
+
+
+def _user_report_job(request, job_id):
+    """The job, if the current user requested it (administrators see all jobs)."""
+    job = get_object_or_404(ReportJob, id=job_id)
+    if job.requested_by_id != request.user.id and not request.user.is_superuser:
+        raise Http404("Report not found")
+    return job
+
+
+@login_required
+@require_GET
+def report_job_status(request, job_id):
+    """AJAX: progress of a background report"""
+    job = _user_report_job(request, job_id)
+    return JsonResponse({'success': True, 'job': job_payload(job)})
+
+
+@login_required
+@require_GET
+def report_job_download(request, job_id):
+    """Serve a finished report from MEDIA_ROOT"""
+    job = _user_report_job(request, job_id)
+    if job.status != ReportJob.STATUS_COMPLETED or not job.file:
+        raise Http404("Report is not ready")
+
+    try:
+        report_file = job.file.open('rb')
+    except FileNotFoundError:
+        raise Http404("Report file no longer exists")
+
+    return FileResponse(report_file, as_attachment=True, filename=job.filename)
@@ -0,0 +1,611 @@
+# results/analytics.py
+"""
+Columnar analytics for the exam session analysis pages.
+
+A session (or one subject of it) is loaded once into a ``Frame``: the row
+dicts handed to templates plus NumPy arrays aligned with them (marks,
+positions and integer codes for grade, division and gender). Filters are
+boolean masks, cross-analysis matrices are bincounts and top/bottom-N are
+argsorts, so the work per request is a couple of queries and a handful of
+array operations whatever the size of the class.
+"""
+import numpy as np
+
+from students.models import GENDER_CHOICES, Student
+from .models import DivisionScale, GradingScale, StudentExamMetrics, StudentExamPosition, StudentResult
+from .snapshots import get_snapshot
+from .statistics import NO_GRADE, PASS_MARK
+
+NOT_ASSIGNED = 'Not Assigned'
+
+OTHER_GENDER = 'Other'
+
+GENDER_LABELS = dict(GENDER_CHOICES)
+
+DIVISION_LABELS = dict(DivisionScale.DIVISION_CHOICES)
+
+PRIMARY_LEVEL_CODES = ['PRIMARY', 'NURSERY']
+
+MISSING = -1
+
+
+def encode(values, labels=()):
+    """
+    Integer codes of ``values`` in ``labels``. Values that are not in
+    ``labels`` are appended to it; empty values get MISSING.
+    Returns (codes, labels).
+    """
+    labels = list(labels)
+    index = {label: code for code, label in enumerate(labels)}
+
+    uniques, inverse = np.unique(np.asarray([value or '' for value in values], dtype=str), return_inverse=True)
+    mapping = np.empty(len(uniques), dtype=np.int16)
+    for i, value in enumerate(uniques.tolist()):
+        if not value:
+            mapping[i] = MISSING
+            continue
+        if value not in index:
+            index[value] = len(labels)
+            labels.append(value)
+        mapping[i] = index[value]
+    return mapping[inverse.reshape(-1)], labels
+
+
+def to_float_array(values):
+    """Decimals/None as a float array with NaN for missing values."""
+    return np.array([np.nan if value is None else float(value) for value in values], dtype=float)
+
+
+def describe(marks):
+    """
+    Mark distribution of a float array (NaNs ignored), in the shape the
+    analysis templates expect, plus quartile percentiles.
+    """
+    marks = marks[~np.isnan(marks)]
+    if not marks.size:
+        return {
+            'average_marks': 0,
+            'highest_marks': 0,
+            'lowest_marks': 0,
+            'pass_rate': 0,
+            'median_marks': 0,
+            'std_deviation': 0,
+            'percentiles': {},
+        }
+    p25, p50, p75, p90 = np.percentile(marks, [25, 50, 75, 90]).tolist()
+    return {
+        'average_marks': float(marks.mean()),
+        'highest_marks': float(marks.max()),
+        'lowest_marks': float(marks.min()),
+        'pass_rate': float(np.count_nonzero(marks >= PASS_MARK) / marks.size * 100),
+        'median_marks': float(np.median(marks)),
+        'std_deviation': float(marks.std()) if marks.size > 1 else 0,
+        'percentiles': {25: p25, 50: p50, 75: p75, 90: p90},
+    }
+
+
+class Frame:
+    """
+    One row per student: ``records`` are the dicts rendered by the
+    templates, ``columns`` NumPy arrays aligned with them and ``labels``
+    the label list of every coded column.
+    """
+
+    def __init__(self, records, columns, labels):
+        self.records = records
+        self.columns = columns
+        self.labels = labels
+        self.size = len(records)
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def everyone(self):
+        return np.ones(self.size, dtype=bool)
+
+    def is_label(self, column, label, ignore_case=False):
+        """Mask of rows whose coded ``column`` equals ``label``."""
+        labels = self.labels[column]
+        if ignore_case:
+            label = label.lower()
+            codes = [code for code, value in enumerate(labels) if value.lower() == label]
+        else:
+            codes = [labels.index(label)] if label in labels else []
+        return np.isin(self.columns[column], codes)
+
+    def is_missing(self, column):
+        return self.columns[column] == MISSING
+
+    def rows(self, indices):
+        return [self.records[i] for i in indices]
+
+    def ranked(self, mask, column, limit=None, reverse=False):
+        """
+        Indices of the masked rows that have a position in ``column``,
+        best first (or worst first with ``reverse``), at most ``limit``.
+        """
+        positions = self.columns[column]
+        indices = np.flatnonzero(mask & (positions > 0))
+        order = np.argsort(positions[indices], kind='stable')
+        if reverse:
+            order = order[::-1]
+        return indices[order][:limit]
+
+    def counts(self, column, mask):
+        """Counts per code of ``column`` for the masked rows (missing codes excluded)."""
+        codes = self.columns[column][mask]
+        return np.bincount(codes[codes >= 0], minlength=len(self.labels[column]))
+
+    def sums(self, column, values, mask):
+        """Sum of ``values`` per code of ``column`` for the masked rows."""
+        codes = self.columns[column][mask]
+        weights = values[mask]
+        present = codes >= 0
+        return np.bincount(codes[present], weights=weights[present], minlength=len(self.labels[column]))
+
+    def crosstab(self, row_column, col_column, mask=None):
+        """
+        Counts of every (row code, column code) pair as an array of shape
+        (row labels, column labels + 1); the last column counts rows with a
+        missing column code.
+        """
+        rows = self.columns[row_column]
+        cols = self.columns[col_column]
+        if mask is not None:
+            rows, cols = rows[mask], cols[mask]
+        n_rows = len(self.labels[row_column])
+        n_cols = len(self.labels[col_column]) + 1
+        cols = np.where(cols == MISSING, n_cols - 1, cols)
+        cells = rows.astype(np.int64) * n_cols + cols
+        return np.bincount(cells, minlength=n_rows * n_cols).reshape(n_rows, n_cols)
+
+
+def _full_name(first_name, middle_name, last_name):
+    # Same as Student.full_name
+    return f'{first_name} {middle_name} {last_name}'.strip()
+
+
+def _gender_display(gender):
+    return GENDER_LABELS.get(gender, gender) or OTHER_GENDER
+
+
+def is_primary_level(exam_session):
+    return exam_session.class_level.educational_level.code in PRIMARY_LEVEL_CODES
+
+
+def grade_labels(exam_session):
+    return list(GradingScale.objects.filter(
+        education_level=exam_session.class_level.educational_level
+    ).order_by('min_mark').values_list('grade', flat=True))
+
+
+# ---------------------------------------------------------------------------
+# Whole-session analysis (StudentExamMetrics)
+# ---------------------------------------------------------------------------
+
+METRIC_VALUES = [
+    'student_id', 'student__registration_number', 'student__first_name',
+    'student__middle_name', 'student__last_name', 'student__gender',
+    'total_marks', 'average_marks', 'average_percentage', 'average_grade',
+    'total_grade_points', 'division__division',
+]
+
+
+def snapshot_metrics(snapshot):
+    """The metric rows (as load_metrics_frame reads them) and positions of a snapshot."""
+    metrics = []
+    for row in snapshot.metric_rows:
+        student = snapshot.student(row['student_id'])
+        division = snapshot.divisions.get(row['division_id'])
+        metrics.append({
+            'student_id': row['student_id'],
+            'student__registration_number': student['registration_number'],
+            'student__first_name': student['first_name'],
+            'student__middle_name': student['middle_name'],
+            'student__last_name': student['last_name'],
+            'student__gender': student['gender'],
+            'total_marks': row['total_marks'],
+            'average_marks': row['average_marks'],
+            'average_percentage': row['average_percentage'],
+            'average_grade': row['average_grade'],
+            'total_grade_points': row['total_grade_points'],
+            'division__division': division.division if division else None,
+        })
+    positions = {
+        row['student_id']: (row['class_position'], row['stream_position'])
+        for row in snapshot.position_rows
+    }
+    return metrics, positions
+
+
+def load_metrics_frame(exam_session, grades=(), divisions=()):
+    """
+    Two queries: the session's metrics (best average first) with their
+    student and division, and the session's positions. A published
+    session is read from its snapshot.
+    """
+    snapshot = get_snapshot(exam_session)
+    if snapshot is not None:
+        metrics, positions = snapshot_metrics(snapshot)
+    else:
+        metrics = list(StudentExamMetrics.objects.filter(
+            exam_session=exam_session
+        ).order_by('-average_marks').values(*METRIC_VALUES))
+        positions = {
+            student_id: (class_position, stream_position)
+            for student_id, class_position, stream_position in StudentExamPosition.objects.filter(
+                exam_session=exam_session
+            ).values_list('student_id', 'class_position', 'stream_position')
+        }
+
+    records = []
+    for metric in metrics:
+        student_id = metric['student_id']
+        class_position, stream_position = positions.get(student_id, (None, None))
+        division_code = metric['division__division']
+        records.append({
+            'id': student_id,
+            'registration_number': metric['student__registration_number'] or f"S{student_id:04d}",
+            'full_name': _full_name(
+                metric['student__first_name'], metric['student__middle_name'], metric['student__last_name']
+            ),
+            'gender': _gender_display(metric['student__gender']),
+            'total_marks': metric['total_marks'],
+            'average_marks': metric['average_marks'],
+            'average_percentage': metric['average_percentage'],
+            'average_grade': metric['average_grade'],
+            'total_grade_points': metric['total_grade_points'],
+            'division_code': division_code,
+            'division_display': DIVISION_LABELS.get(division_code, division_code) if division_code else NOT_ASSIGNED,
+            'division': division_code,
+            'class_position': class_position,
+            'stream_position': stream_position,
+            'rank': class_position,
+        })
+
+    genders, gender_labels = encode([r['gender'] for r in records], ['Male', 'Female'])
+    grade_codes, grade_list = encode([r['average_grade'] for r in records], grades)
+    division_codes, division_list = encode([r['division_display'] if r['division_code'] else '' for r in records], divisions)
+
+    return Frame(
+        records,
+        columns={
+            'gender': genders,
+            'grade': grade_codes,
+            'division': division_codes,
+            'average_marks': to_float_array([r['average_marks'] for r in records]),
+            'rank': np.array([r['rank'] or 0 for r in records], dtype=np.int64),
+        },
+        labels={'gender': gender_labels, 'grade': grade_list, 'division': division_list},
+    )
+
+
+def _matrix(frame, column, columns, missing_label):
+    """
+    Gender × ``column`` matrix over every student: dict-of-dicts counts for
+    the known ``columns`` (plus ``missing_label`` when some students have
+    none), with column, gender and grand totals.
+    """
+    table = frame.crosstab('gender', column)
+    known = len(columns)
+    counts = table[:, :known]
+    missing = table[:, -1]
+
+    matrix_columns = list(columns)
+    if missing.any():
+        matrix_columns.append(missing_label)
+        counts = np.column_stack([counts, missing])
+
+    genders = frame.labels['gender']
+    return {
+        'columns': matrix_columns,
+        'matrix': {
+            gender: dict(zip(matrix_columns, counts[i].tolist()))
+            for i, gender in enumerate(genders)
+        },
+        'column_totals': dict(zip(matrix_columns, counts.sum(axis=0).tolist())),
+        'gender_totals': dict(zip(genders, counts.sum(axis=1).tolist())),
+        'grand_total': int(counts.sum()),
+    }
+
+
+def _positive_mask(values):
+    # "if student['average_marks']" in the original loops: not null, not zero
+    return ~np.isnan(values) & (values != 0)
+
+
+def _label_counts(frame, column, mask):
+    return {
+        label: int(count)
+        for label, count in zip(frame.labels[column], frame.counts(column, mask).tolist())
+        if count
+    }
+
+
+def _label_averages(frame, column, values, mask):
+    mask = mask & _positive_mask(values)
+    counts = frame.counts(column, mask)
+    sums = frame.sums(column, values, mask)
+    return {
+        label: round(float(total / count), 2)
+        for label, total, count in zip(frame.labels[column], sums.tolist(), counts.tolist())
+        if count
+    }
+
+
+def _int_or_none(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def exam_session_breakdown(exam_session, division_filter='', grade_filter='', gender_filter='',
+                           rank_filter='', top_n='10', bottom_n='10'):
+    """
+    Everything the exam session analysis page and PDF show: filtered and
+    unfiltered student lists, distributions, gender/division averages,
+    the division (or, for primary, grade) × gender matrix and the top and
+    bottom ten.
+    """
+    is_primary_nursery = is_primary_level(exam_session)
+
+    grades = []
+    divisions = []
+    division_code_to_display = {}
+    if is_primary_nursery:
+        grades = grade_labels(exam_session)
+    else:
+        for code in DivisionScale.objects.filter(
+            education_level=exam_session.class_level.educational_level
+        ).order_by('min_points').values_list('division', flat=True):
+            display = DIVISION_LABELS.get(code, code)
+            divisions.append(display)
+            division_code_to_display[code] = display
+
+    frame = load_metrics_frame(exam_session, grades=grades, divisions=divisions)
+    everyone = frame.everyone()
+
+    # Filters
+    mask = everyone
+    if division_filter and not is_primary_nursery:
+        if division_filter == NOT_ASSIGNED:
+            mask = mask & frame.is_missing('division')
+        else:
+            display = division_code_to_display.get(division_filter, DIVISION_LABELS.get(division_filter, division_filter))
+            mask = mask & frame.is_label('division', display)
+    if grade_filter and is_primary_nursery:
+        if grade_filter == NO_GRADE:
+            mask = mask & frame.is_missing('grade')
+        else:
+            mask = mask & frame.is_label('grade', grade_filter)
+    if gender_filter:
+        mask = mask & frame.is_label('gender', gender_filter, ignore_case=True)
+
+    selected = np.flatnonzero(mask)
+    if rank_filter == 'top' and _int_or_none(top_n) is not None:
+        selected = frame.ranked(mask, 'rank', limit=_int_or_none(top_n))
+    elif rank_filter == 'bottom' and _int_or_none(bottom_n) is not None:
+        selected = frame.ranked(mask, 'rank', limit=_int_or_none(bottom_n), reverse=True)
+
+    selected_mask = np.zeros(frame.size, dtype=bool)
+    selected_mask[selected] = True
+    average_marks = frame['average_marks']
+
+    breakdown = {
+        'is_primary_nursery': is_primary_nursery,
+        'frame': frame,
+        'all_student_data': frame.records,
+        'student_data': frame.rows(selected),
+        'gender_distribution': _label_counts(frame, 'gender', selected_mask),
+        'gender_averages': _label_averages(frame, 'gender', average_marks, selected_mask),
+        'top_performers': frame.rows(frame.ranked(everyone, 'rank', limit=10)),
+        'bottom_performers': frame.rows(frame.ranked(everyone, 'rank', limit=10, reverse=True)),
+        'unique_genders': sorted({r['gender'] for r in frame.records if r['gender']}),
+        'all_possible_genders': frame.labels['gender'],
+        'all_possible_grades': grades,
+        'all_possible_divisions': divisions,
+        'division_code_to_display': division_code_to_display,
+        'division_display_to_code': {display: code for code, display in division_code_to_display.items()},
+    }
+
+    if is_primary_nursery:
+        breakdown.update({
+            'students_with_division': 0,
+            'students_without_division': 0,
+            'students_with_division_all': 0,
+            'students_without_division_all': 0,
+            'division_distribution': {},
+            'division_averages': {},
+            'grade_distribution': _label_counts(frame, 'grade', selected_mask),
+            'grade_distribution_all': _label_counts(frame, 'grade', everyone),
+            'matrix': _matrix(frame, 'grade', grades, NO_GRADE),
+        })
+    else:
+        with_division = ~frame.is_missing('division')
+        breakdown.update({
+            'students_with_division': int(np.count_nonzero(with_division & selected_mask)),
+            'students_without_division': int(np.count_nonzero(~with_division & selected_mask)),
+            'students_with_division_all': int(np.count_nonzero(with_division)),
+            'students_without_division_all': int(np.count_nonzero(~with_division)),
+            'division_distribution': _label_counts(frame, 'division', selected_mask),
+            'division_averages': _label_averages(frame, 'division', average_marks, selected_mask),
+            'grade_distribution': {},
+            'grade_distribution_all': {},
+            'matrix': _matrix(frame, 'division', divisions, NOT_ASSIGNED),
+        })
+
+    return breakdown
+
+
+# ---------------------------------------------------------------------------
+# Single-subject analysis (StudentResult)
+# ---------------------------------------------------------------------------
+
+def load_subject_frame(exam_session, subject, grades=()):
+    """
+    Two queries: the session's active students (its stream only, for a
+    stream session) and their results in ``subject`` (from the snapshot
+    of a published session). Subject positions
+    are ranked in the frame: marks descending, then registration number
+    and name.
+    """
+    students = Student.objects.filter(
+        class_level=exam_session.class_level, is_active=True
+    )
+    if exam_session.stream_class_id:
+        students = students.filter(stream_class_id=exam_session.stream_class_id)
+    students = list(students.order_by('first_name', 'last_name').values(
+        'id', 'registration_number', 'first_name', 'middle_name', 'last_name', 'gender',
+    ))
+
+    snapshot = get_snapshot(exam_session)
+    if snapshot is not None:
+        result_rows = [
+            row for row in snapshot.result_rows if row['subject_id'] == subject.id
+        ]
+    else:
+        result_rows = StudentResult.objects.filter(
+            exam_session=exam_session, subject=subject
+        ).values('student_id', 'marks_obtained', 'percentage', 'grade', 'grade_point')
+    results = {row['student_id']: row for row in result_rows}
+
+    records = []
+    for student in students:
+        result = results.get(student['id'])
+        marks = result['marks_obtained'] if result else None
+        percentage = result['percentage'] if result else None
+        grade_point = result['grade_point'] if result else None
+        records.append({
+            'id': student['id'],
+            'registration_number': student['registration_number'] or f"S{student['id']:04d}",
+            'full_name': _full_name(student['first_name'], student['middle_name'], student['last_name']),
+            'gender': _gender_display(student['gender']),
+            'marks': float(marks) if marks is not None else None,
+            'percentage': float(percentage) if percentage else None,
+            'grade': result['grade'] if result else None,
+            'grade_point': float(grade_point) if grade_point else None,
+            'position': None,
+            'has_marks': marks is not None,
+        })
+
+    marks = to_float_array([r['marks'] for r in records])
+    genders, gender_labels = encode([r['gender'] for r in records], ['Male', 'Female', OTHER_GENDER])
+    grade_codes, grade_list = encode([r['grade'] if r['has_marks'] else '' for r in records], grades)
+
+    # Positions: marks descending, ties by registration number then name
+    marked = np.flatnonzero(~np.isnan(marks))
+    order = np.lexsort((
+        np.asarray([records[i]['full_name'] for i in marked], dtype=str),
+        np.asarray([records[i]['registration_number'] for i in marked], dtype=str),
+        -marks[marked],
+    ))
+    positions = np.zeros(len(records), dtype=np.int64)
+    positions[marked[order]] = np.arange(1, len(marked) + 1)
+    for i in marked.tolist():
+        records[i]['position'] = int(positions[i])
+
+    return Frame(
+        records,
+        columns={'marks': marks, 'gender': genders, 'grade': grade_codes, 'position': positions},
+        labels={'gender': gender_labels, 'grade': grade_list},
+    )
+
+
+def _gender_statistics(frame, mask, with_marks):
+    totals = frame.counts('gender', mask)
+    marked = frame.counts('gender', mask & with_marks)
+    sums = frame.sums('gender', np.nan_to_num(frame['marks']), mask & with_marks)
+    return {
+        gender: {
+            'total': int(totals[i]),
+            'with_marks': int(marked[i]),
+            'marks_sum': float(sums[i]),
+            'average': round(float(sums[i] / marked[i]), 2) if marked[i] else 0,
+        }
+        for i, gender in enumerate(frame.labels['gender'])
+    }
+
+
+def subject_breakdown(exam_session, subject, grade_filter='', gender_filter='', rank_filter='',
+                      top_n=10, bottom_n=10, marks_min=None, marks_max=None, grades=None):
+    """
+    Everything the subject analysis pages show for one subject: every
+    student's result and position, the students left by the filters and
+    their statistics, gender statistics and the grade × gender matrix.
+    """
+    if grades is None:
+        grades = grade_labels(exam_session)
+
+    frame = load_subject_frame(exam_session, subject, grades=grades)
+    everyone = frame.everyone()
+    with_marks = ~np.isnan(frame['marks'])
+
+    mask = with_marks
+    if grade_filter:
+        if grade_filter == NO_GRADE:
+            mask = mask & frame.is_missing('grade')
+        else:
+            mask = mask & frame.is_label('grade', grade_filter)
+    if marks_min is not None:
+        mask = mask & (frame['marks'] >= marks_min)
+    if marks_max is not None:
+        mask = mask & (frame['marks'] <= marks_max)
+    if gender_filter:
+        mask = mask & frame.is_label('gender', gender_filter, ignore_case=True)
+
+    if rank_filter == 'top':
+        selected = frame.ranked(mask, 'position', limit=top_n)
+    elif rank_filter == 'bottom':
+        selected = frame.ranked(mask, 'position', limit=bottom_n, reverse=True)
+    else:
+        selected = np.flatnonzero(mask)
+
+    selected_mask = np.zeros(frame.size, dtype=bool)
+    selected_mask[selected] = True
+    filtered_count = len(selected)
+
+    # Grade × gender matrix over every student with marks
+    table = frame.crosstab('gender', 'grade', with_marks)
+    grade_columns = frame.labels['grade'] + [NO_GRADE]
+    grade_gender_matrix = {
+        gender: dict(zip(grade_columns, table[i].tolist()))
+        for i, gender in enumerate(frame.labels['gender'])
+    }
+    known = list(grades) + [NO_GRADE]
+    known_index = [grade_columns.index(grade) for grade in known]
+    grade_totals = dict(zip(known, table[:, known_index].sum(axis=0).tolist()))
+    gender_totals = dict(zip(frame.labels['gender'], table.sum(axis=1).tolist()))
+
+    grade_counts = {
+        grade: count
+        for grade, count in zip(frame.labels['grade'], frame.counts('grade', with_marks).tolist())
+        if count
+    }
+
+    return {
+        'frame': frame,
+        'all_student_data': frame.records,
+        'filtered_student_data': frame.rows(selected),
+        'total_students': frame.size,
+        'students_with_marks': int(np.count_nonzero(with_marks)),
+        'gender_statistics': _gender_statistics(frame, everyone, with_marks),
+        'filtered_gender_statistics': _gender_statistics(frame, selected_mask, with_marks),
+        'filtered_statistics': {
+            'total_students': filtered_count,
+            'students_with_marks': filtered_count,
+            'students_without_marks': 0,
+            'percentage_completed': 100.0 if filtered_count else 0,
+            **describe(frame['marks'][selected_mask]),
+        },
+        'top_performers': frame.rows(frame.ranked(selected_mask, 'position', limit=10)),
+        'bottom_performers': frame.rows(frame.ranked(selected_mask, 'position', limit=10, reverse=True)),
+        'top_performers_all': frame.rows(frame.ranked(everyone, 'position', limit=10)),
+        'bottom_performers_all': frame.rows(frame.ranked(everyone, 'position', limit=10, reverse=True)),
+        'grade_counts': grade_counts,
+        'grade_gender_matrix': grade_gender_matrix,
+        'matrix_grades': list(grades) + ([NO_GRADE] if grade_totals[NO_GRADE] else []),
+        'grade_totals': grade_totals,
+        'gender_totals': gender_totals,
+        'grand_total': int(table.sum()),
+    }
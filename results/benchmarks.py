@@ -0,0 +1,381 @@
+# results/benchmarks.py
+"""
+Synthetic data and timing helpers for benchmarking the results pipeline.
+
+Everything runs inside a transaction that is rolled back, so the
+benchmarks can be pointed at a development database without leaving
+data behind.
+"""
+from contextlib import contextmanager
+from decimal import Decimal
+import datetime
+import io
+import json
+import math
+import random
+import time
+import uuid
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.test import RequestFactory
+import openpyxl
+
+from core.models import (
+    AcademicYear, ClassLevel, Combination, CombinationSubject, EducationalLevel,
+    StreamClass, Subject, Term
+)
+from students.models import Student
+from .models import DivisionScale, ExamSession, ExamType, GradingScale, StudentResult
+from .scales import grade_marks
+
+# (grade, min_mark, max_mark, points)
+GRADING_SCALES = {
+    'PRIMARY': [
+        ('A', 81, 100, 0), ('B', 61, 80.99, 0), ('C', 41, 60.99, 0),
+        ('D', 21, 40.99, 0), ('E', 0, 20.99, 0),
+    ],
+    'O_LEVEL': [
+        ('A', 75, 100, 1), ('B', 65, 74.99, 2), ('C', 45, 64.99, 3),
+        ('D', 30, 44.99, 4), ('F', 0, 29.99, 5),
+    ],
+    'A_LEVEL': [
+        ('A', 80, 100, 1), ('B', 70, 79.99, 2), ('C', 60, 69.99, 3),
+        ('D', 50, 59.99, 4), ('E', 40, 49.99, 5), ('S', 35, 39.99, 6),
+        ('F', 0, 34.99, 7),
+    ],
+}
+
+# Subjects per student in the pipeline benchmarks
+LEVEL_SUBJECTS = {'PRIMARY': 8, 'O_LEVEL': 12, 'A_LEVEL': 14}
+
+PIPELINE_SIZES = (50, 300, 1000)
+
+# (division, min_points, max_points)
+DIVISION_SCALES = {
+    'O_LEVEL': [('I', 7, 17), ('II', 18, 21), ('III', 22, 25), ('IV', 26, 33), ('0', 34, 35)],
+    'A_LEVEL': [('I', 3, 9), ('II', 10, 12), ('III', 13, 17), ('IV', 18, 19), ('0', 20, 28)],
+}
+
+
+class Rollback(Exception):
+    """Raised to discard everything a benchmark created."""
+
+
+@contextmanager
+def rolled_back():
+    """Run the block in a transaction that is always rolled back."""
+    try:
+        with transaction.atomic():
+            yield
+            raise Rollback
+    except Rollback:
+        pass
+
+
+class QueryCounter:
+    """
+    Execute wrapper counting the queries run on the connection. Unlike
+    CaptureQueriesContext it keeps no log, so counts are not capped at
+    the 9,000 entries of connection.queries_log.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def measure(func, *args, **kwargs):
+    """Run ``func`` and return (seconds, query_count, return_value)."""
+    counter = QueryCounter()
+    with connection.execute_wrapper(counter):
+        started = time.perf_counter()
+        value = func(*args, **kwargs)
+        seconds = time.perf_counter() - started
+    return seconds, counter.count, value
+
+
+def _education_level(level_code):
+    education_level, _ = EducationalLevel.objects.get_or_create(
+        code=level_code, defaults={'name': level_code.replace('_', ' ').title()}
+    )
+    for grade, min_mark, max_mark, points in GRADING_SCALES[level_code]:
+        GradingScale.objects.get_or_create(
+            education_level=education_level, grade=grade,
+            defaults={'min_mark': min_mark, 'max_mark': max_mark, 'points': points}
+        )
+    for division, min_points, max_points in DIVISION_SCALES.get(level_code, []):
+        DivisionScale.objects.get_or_create(
+            education_level=education_level, division=division,
+            defaults={'min_points': min_points, 'max_points': max_points}
+        )
+    return education_level
+
+
+def build_exam_session(level_code='O_LEVEL', students=50, subjects=12, streams=2, seed=None):
+    """
+    Create an exam session with its students and subjects (no marks).
+    Returns a dict with the exam session, students and subjects.
+    """
+    token = uuid.uuid4().hex[:8].upper()
+    today = datetime.date.today()
+
+    education_level = _education_level(level_code)
+
+    academic_year, _ = AcademicYear.objects.get_or_create(
+        name=f"B{token[:8]}",
+        defaults={
+            'start_date': datetime.date(today.year, 1, 1),
+            'end_date': datetime.date(today.year, 12, 31),
+        }
+    )
+    term = Term.objects.create(
+        academic_year=academic_year, term_number=1,
+        start_date=datetime.date(today.year, 1, 2),
+        end_date=datetime.date(today.year, 4, 30),
+    )
+    class_level = ClassLevel.objects.create(
+        educational_level=education_level, name=f"Bench {token}",
+        code=f"B{token}", order=99
+    )
+    stream_classes = [
+        StreamClass.objects.create(class_level=class_level, stream_letter=chr(ord('A') + i))
+        for i in range(streams)
+    ]
+    exam_type = ExamType.objects.create(
+        name='Benchmark', code=f"B{token}", weight=Decimal('100')
+    )
+    exam_session = ExamSession.objects.create(
+        name=f"Benchmark {token}", exam_type=exam_type,
+        academic_year=academic_year, term=term, class_level=class_level,
+        exam_date=today,
+    )
+
+    subject_objs = Subject.objects.bulk_create([
+        Subject(educational_level=education_level, name=f"Bench Subject {i + 1} {token}", code=f"B{token}{i:02d}")
+        for i in range(subjects)
+    ])
+
+    # A-Level metrics need a combination: three core subjects and a subsidiary
+    combination = None
+    if level_code == 'A_LEVEL':
+        combination = Combination.objects.create(
+            educational_level=education_level, name=f"Bench {token}", code=f"B{token}"
+        )
+        CombinationSubject.objects.bulk_create([
+            CombinationSubject(
+                combination=combination, subject=subject, role='CORE' if i < 3 else 'SUB'
+            )
+            for i, subject in enumerate(subject_objs[:4])
+        ])
+
+    rng = random.Random(seed)
+    student_objs = Student.objects.bulk_create([
+        Student(
+            first_name=f"Bench{i:05d}", last_name=token,
+            gender=rng.choice(['male', 'female']),
+            academic_year=academic_year, class_level=class_level,
+            stream_class=stream_classes[i % streams] if streams else None,
+            combination=combination,
+            registration_number=f"B{token}/{i:05d}", admission_year=today.year,
+            serial_number=i + 1,
+        )
+        for i in range(students)
+    ])
+
+    return {
+        'exam_session': ExamSession.objects.select_related(
+            'exam_type', 'class_level__educational_level'
+        ).get(pk=exam_session.pk),
+        'students': student_objs,
+        'subjects': subject_objs,
+    }
+
+
+def random_marks(data, seed=None):
+    """One mark per student per subject, as ingest_marks() rows."""
+    rng = random.Random(seed)
+    return [
+        {'student_id': student.id, 'subject_id': subject.id, 'marks': rng.randint(0, 100)}
+        for student in data['students']
+        for subject in data['subjects']
+    ]
+
+
+def legacy_save_marks(exam_session, rows):
+    """
+    The per-row marks entry path the views used before bulk ingestion:
+    get_or_create, a scale query and a save (firing signals) per mark.
+    The StudentResult signals now only queue the recompute, so this does
+    not include the metrics and positions recompute the old signal ran on
+    every save; it is the cost of the per-row writes alone.
+    """
+    for row in rows:
+        marks = Decimal(str(row['marks']))
+        result, _ = StudentResult.objects.get_or_create(
+            exam_session=exam_session,
+            student_id=row['student_id'],
+            subject_id=row['subject_id'],
+            defaults={'marks_obtained': marks}
+        )
+        result.marks_obtained = marks
+        result.percentage = marks / Decimal(str(exam_session.exam_type.max_score)) * Decimal('100')
+        scale = GradingScale.objects.filter(
+            education_level=exam_session.class_level.educational_level,
+            min_mark__lte=marks,
+            max_mark__gte=marks
+        ).first()
+        result.grade = scale.grade if scale else None
+        result.grade_point = scale.points if scale else None
+        result.save()
+
+
+def benchmark_marks_ingest(marks=1000, subjects=12, level_code='O_LEVEL', seed=1):
+    """
+    Time a marks upload of ``marks`` results through the legacy per-row
+    writes (recompute queued, see legacy_save_marks) and through
+    ingest_marks(), each on a fresh session.
+    Returns a list of {'label', 'seconds', 'queries'} dicts.
+    """
+    from .ingest import ingest_marks
+
+    students = max(1, math.ceil(marks / subjects))
+    report = []
+
+    with rolled_back():
+        data = build_exam_session(level_code, students=students, subjects=subjects, seed=seed)
+        rows = random_marks(data, seed=seed)[:marks]
+        seconds, queries, _ = measure(legacy_save_marks, data['exam_session'], rows)
+        report.append({'label': f"per-row save, recompute queued ({len(rows)} marks)", 'seconds': seconds, 'queries': queries})
+
+    with rolled_back():
+        data = build_exam_session(level_code, students=students, subjects=subjects, seed=seed)
+        rows = random_marks(data, seed=seed)[:marks]
+        # Warm the scale cache the way a long-running process would have it
+        grade_marks(data['exam_session'], 0)
+        seconds, queries, _ = measure(ingest_marks, data['exam_session'], rows)
+        report.append({'label': f"bulk ingest ({len(rows)} marks)", 'seconds': seconds, 'queries': queries})
+
+    return report
+
+
+def benchmark_user():
+    """A superuser to call the views as."""
+    from accounts.models import CustomUser
+
+    return CustomUser.objects.create_superuser(
+        f"bench{uuid.uuid4().hex[:8]}", 'bench@example.com', 'bench'
+    )
+
+
+def call_view(user, view, *args, data=None, payload=None):
+    """
+    Call ``view`` directly as ``user``: a GET, a form POST of ``data`` or
+    a JSON POST of ``payload``. Middleware is skipped.
+    """
+    factory = RequestFactory()
+    if payload is not None:
+        request = factory.post('/', json.dumps(payload), content_type='application/json')
+    elif data is not None:
+        request = factory.post('/', data)
+    else:
+        request = factory.get('/')
+    request.user = user
+    return view(request, *args)
+
+
+def save_marks_payload(exam_session, rows):
+    """``rows`` as the JSON body the marks entry grid posts to save_student_results."""
+    return {
+        'exam_session_id': exam_session.id,
+        'results': [
+            {'student_id': row['student_id'], 'subject_id': row['subject_id'], 'marks_obtained': row['marks']}
+            for row in rows
+        ],
+    }
+
+
+def marks_workbook(data, rows):
+    """
+    The marks ``rows`` as a session marks sheet for upload_session_excel:
+    a Student ID column and one column per subject.
+    """
+    marks = {(row['student_id'], row['subject_id']): row['marks'] for row in rows}
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(['Student ID', 'Student Name'] + [subject.name for subject in data['subjects']])
+    for student in data['students']:
+        ws.append(
+            [student.id, f"{student.first_name} {student.last_name}"]
+            + [marks.get((student.id, subject.id)) for subject in data['subjects']]
+        )
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return SimpleUploadedFile(
+        'marks.xlsx', buffer.getvalue(),
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
+
+
+def analysis_views():
+    """(label, view) pairs of the session pages that read a whole session."""
+    from accounts.views import result_admin_views as views
+
+    return [
+        ('manage results page', views.manage_results),
+        ('session analysis', views.exam_session_analysis_view),
+        ('subject analysis', views.session_subject_analysis_view),
+        ('subject matrix analysis', views.session_subject_matrix_analysis),
+    ]
+
+
+def benchmark_results_pipeline(level_code='O_LEVEL', students=50, subjects=None, seed=1):
+    """
+    Time every stage of a session's results on a fresh synthetic session:
+    saving all marks and one corrected mark through the marks entry view,
+    an Excel upload, the full recompute and the analysis views.
+    Returns a list of {'label', 'seconds', 'queries', 'status'} dicts;
+    ``status`` is the response status of the view calls.
+    """
+    from accounts.views.result_admin_views import save_student_results, upload_session_excel
+    from .recompute import recompute_exam_session
+
+    if subjects is None:
+        subjects = LEVEL_SUBJECTS[level_code]
+    report = []
+
+    def run(label, func, *args, **kwargs):
+        seconds, queries, value = measure(func, *args, **kwargs)
+        report.append({
+            'label': label, 'seconds': seconds, 'queries': queries,
+            'status': getattr(value, 'status_code', None),
+        })
+        return value
+
+    with rolled_back():
+        data = build_exam_session(level_code, students=students, subjects=subjects, seed=seed)
+        exam_session = data['exam_session']
+        user = benchmark_user()
+        rows = random_marks(data, seed=seed)
+        grade_marks(exam_session, 0)
+
+        run(f"marks save ({len(rows)} marks)", call_view, user, save_student_results,
+            payload=save_marks_payload(exam_session, rows))
+        run('full recompute', recompute_exam_session, exam_session)
+
+        corrected = dict(rows[0], marks=(rows[0]['marks'] + 37) % 101)
+        run('single-mark correction', call_view, user, save_student_results,
+            payload=save_marks_payload(exam_session, [corrected]))
+
+        workbook = marks_workbook(data, random_marks(data, seed=seed + 1))
+        run('Excel upload', call_view, user, upload_session_excel,
+            data={'excel_file': workbook, 'exam_session_id': exam_session.id})
+        run('full recompute (after upload)', recompute_exam_session, exam_session)
+
+        for label, view in analysis_views():
+            run(label, call_view, user, view, exam_session.id)
+
+    return report
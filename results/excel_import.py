@@ -0,0 +1,130 @@
+# results/excel_import.py
+"""
+Streaming marks import from Excel uploads.
+
+Workbooks are opened in openpyxl's read-only mode and their rows are
+consumed once, as a generator, so memory stays flat however large the
+sheet is. Student ids are checked against the session's students and
+existing results are looked up in maps loaded once per upload; marks are
+graded and written in batches of IMPORT_BATCH_SIZE, each in its own
+transaction, and the session is flagged for recalculation once at the
+end.
+"""
+from django.db import transaction
+import openpyxl
+
+from .ingest import (grade_entries, load_existing_results, new_summary,
+                     parse_marks_payload, write_results, GRADED_FIELDS)
+from .matrix import session_students
+from .queue import mark_dirty
+from .report_cache import bump_data_version
+
+IMPORT_BATCH_SIZE = 500
+
+# How far down the sheet the header row may be
+HEADER_SCAN_ROWS = 20
+
+
+class SheetFormatError(Exception):
+    """The uploaded sheet does not have the expected layout."""
+
+
+def iter_sheet_rows(excel_file):
+    """Yield (row_number, values) for the active sheet, read-only."""
+    wb = openpyxl.load_workbook(excel_file, read_only=True, data_only=True)
+    try:
+        for row_number, row in enumerate(wb.active.iter_rows(values_only=True), start=1):
+            yield row_number, row
+    finally:
+        wb.close()
+
+
+def rows_after_header(rows, is_header, scan_rows=HEADER_SCAN_ROWS):
+    """
+    Consume ``rows`` up to the header row (which must be within the first
+    ``scan_rows``) and return (header, remaining rows). The remaining rows
+    are the same generator, so nothing is read twice.
+    """
+    for row_number, row in rows:
+        if row_number > scan_rows:
+            break
+        if row and is_header(row):
+            return row, rows
+    raise SheetFormatError('Header row not found')
+
+
+class MarksImport:
+    """
+    Batched marks upsert for one exam session.
+
+    Rows are fed one at a time; every IMPORT_BATCH_SIZE rows are graded
+    against the preloaded students and results and written together.
+    """
+
+    def __init__(self, exam_session, subject_ids, max_marks=None, allow_blank=False,
+                 batch_size=IMPORT_BATCH_SIZE):
+        self.exam_session = exam_session
+        self.max_marks = exam_session.exam_type.max_score if max_marks is None else max_marks
+        self.allow_blank = allow_blank
+        self.batch_size = batch_size
+
+        self.valid_subjects = set(subject_ids)
+        self.valid_students = set(session_students(exam_session).values_list('id', flat=True))
+        self.existing = load_existing_results(exam_session, subject_ids=self.valid_subjects)
+
+        self.summary = new_summary()
+        self.rows = 0
+        self.touched_students = set()
+        self._batch = []
+
+    def add(self, student_id, subject_id, marks, label):
+        self._batch.append({
+            'student_id': student_id,
+            'subject_id': subject_id,
+            'marks': marks,
+            'label': label,
+        })
+        self.rows += 1
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def error(self, message):
+        self.summary['errors'].append(message)
+
+    def flush(self):
+        if not self._batch:
+            return
+        entries, errors, skipped = parse_marks_payload(
+            self._batch, self.max_marks, allow_blank=self.allow_blank
+        )
+        self._batch = []
+        self.summary['errors'].extend(errors)
+        self.summary['skipped'] += skipped
+
+        to_write = grade_entries(
+            self.exam_session, entries, self.summary,
+            self.valid_students, self.valid_subjects, self.existing
+        )
+        if not to_write:
+            return
+
+        with transaction.atomic():
+            write_results(to_write)
+
+        # Later batches compare against what this one wrote
+        for result in to_write:
+            key = (result.student_id, result.subject_id)
+            current = self.existing.get(key) or {
+                'id': None, 'student_id': result.student_id, 'subject_id': result.subject_id,
+            }
+            current.update({field: getattr(result, field) for field in GRADED_FIELDS})
+            self.existing[key] = current
+            self.touched_students.add(result.student_id)
+
+    def finish(self):
+        """Write the last batch, flag the session and return the summary."""
+        self.flush()
+        if self.touched_students:
+            mark_dirty(self.exam_session.id, self.touched_students)
+            bump_data_version(self.exam_session.id)
+        return self.summary
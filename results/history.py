@@ -0,0 +1,142 @@
+# results/history.py
+"""
+Per-student exam history.
+
+StudentExamHistory rows are rebuilt by the recompute engine from the
+result rows, metrics and positions it has just worked out, so keeping
+them current costs one extra read (the subject count per student, which
+includes results without marks) and one write per session.
+
+``student_exam_history`` reads a student's sessions back in one query.
+"""
+from decimal import Decimal
+
+from django.db.models import Count
+
+from core.bulk import bulk_upsert
+from .models import StudentExamHistory, StudentResult
+
+TWO_PLACES = Decimal('0.01')
+
+HISTORY_BATCH_SIZE = 500
+
+HISTORY_FIELDS = [
+    'exam_date', 'total_subjects', 'subjects_with_marks', 'total_marks',
+    'average_marks', 'average_percentage', 'average_grade',
+    'total_grade_points', 'division', 'class_position', 'stream_position',
+    'class_size',
+]
+
+
+def _average(values):
+    if not values:
+        return None
+    return (sum(values, Decimal('0')) / len(values)).quantize(TWO_PLACES)
+
+
+def build_history_values(rows, metrics, ranks):
+    """
+    Totals and averages of one student's marked result rows (dicts with
+    ``marks_obtained`` and ``percentage``), plus the grade, points and
+    division of their metrics and their (class, stream) positions.
+    """
+    marks = [Decimal(str(row['marks_obtained'])) for row in rows]
+    percentages = [
+        Decimal(str(row['percentage'])) for row in rows
+        if row['percentage'] is not None
+    ]
+    class_position, stream_position = ranks or (None, None)
+
+    return {
+        'subjects_with_marks': len(marks),
+        'total_marks': sum(marks, Decimal('0')).quantize(TWO_PLACES) if marks else None,
+        'average_marks': _average(marks),
+        'average_percentage': _average(percentages),
+        'average_grade': metrics['average_grade'] if metrics else '',
+        'total_grade_points': metrics['total_grade_points'] if metrics else None,
+        'division': metrics['division'] if metrics else None,
+        'class_position': class_position,
+        'stream_position': stream_position,
+    }
+
+
+def subject_counts(exam_session, student_ids=None):
+    """{student_id: number of results, with or without marks} in one query."""
+    results = StudentResult.objects.filter(exam_session=exam_session)
+    if student_ids is not None:
+        results = results.filter(student_id__in=student_ids)
+    return dict(
+        results.order_by().values('student_id').annotate(
+            subjects=Count('id')
+        ).values_list('student_id', 'subjects')
+    )
+
+
+def build_history_rows(exam_session, rows_by_student, computed, ranks):
+    """
+    {student_id: StudentExamHistory field values} for every student with a
+    result in the session. ``rows_by_student`` and ``computed`` come from
+    results.recompute, ``ranks`` from
+    results.ranking.update_class_positions().
+    """
+    counts = subject_counts(exam_session)
+    class_size = len(counts)
+    return {
+        student_id: dict(
+            exam_date=exam_session.exam_date,
+            total_subjects=total_subjects,
+            class_size=class_size,
+            **build_history_values(
+                rows_by_student.get(student_id, []),
+                computed.get(student_id),
+                ranks.get(student_id),
+            )
+        )
+        for student_id, total_subjects in counts.items()
+    }
+
+
+def refresh_exam_history(exam_session, rows_by_student, computed, ranks):
+    """
+    Rebuild the StudentExamHistory rows of a session (see
+    build_history_rows()). Every student with a result in the session gets
+    a row; the rows of students without results are removed. Returns the
+    number of rows.
+    """
+    history = build_history_rows(exam_session, rows_by_student, computed, ranks)
+
+    StudentExamHistory.objects.filter(
+        exam_session=exam_session
+    ).exclude(student_id__in=list(history)).delete()
+
+    bulk_upsert(
+        StudentExamHistory,
+        [
+            StudentExamHistory(exam_session=exam_session, student_id=student_id, **values)
+            for student_id, values in history.items()
+        ],
+        unique_fields=['student', 'exam_session'],
+        update_fields=HISTORY_FIELDS + ['calculated_at'],
+        batch_size=HISTORY_BATCH_SIZE,
+    )
+    return len(history)
+
+
+def student_exam_history(student, **filters):
+    """
+    A student's history rows, latest exam first, with the session, its
+    exam type, year, term, class and stream, and the division, in one
+    query. ``filters`` are applied to the rows as given.
+    """
+    return StudentExamHistory.objects.filter(
+        student=student, **filters
+    ).select_related(
+        'exam_session',
+        'exam_session__exam_type',
+        'exam_session__academic_year',
+        'exam_session__term',
+        'exam_session__class_level',
+        'exam_session__class_level__educational_level',
+        'exam_session__stream_class',
+        'division',
+    ).order_by('-exam_date', '-exam_session__created_at')
@@ -0,0 +1,400 @@
+# results/incremental.py
+"""
+Incremental recompute for a few students of an exam session.
+
+Correcting one mark changes three things: that student's metrics, their
+place in the class and stream order, and the paper order and statistics
+of the corrected subject. ``recompute_students`` updates only those,
+instead of recomputing the whole session:
+
+- the student's metrics are rebuilt from their own result rows;
+- their new class (and stream) position is one more than the number of
+  students ranked ahead of them. This is one COUNT over the session's
+  metrics, in the order results.ranking uses. The positions between the
+  old and the new place are then shifted by one with a single UPDATE,
+  on StudentExamPosition and StudentExamHistory alike;
+- a single student's results are moved within the paper order of their
+  subjects the same way; for several students the subjects are re-ranked
+  as in the full recompute. The SubjectExamStatistics of the subjects
+  are rebuilt from one read of their marks.
+
+Shifting is correct only while every stored position matches the stored
+metrics. Both the full and the incremental recompute keep that true.
+Changes that can move many students at once (grading scales) flag the
+whole session, which always goes through the full recompute.
+
+``check_session_consistency`` compares what is stored with what a full
+recompute would write, without writing anything.
+"""
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .history import (
+    HISTORY_FIELDS, build_history_rows, build_history_values, subject_counts
+)
+from .models import (
+    StudentExamHistory, StudentExamMetrics, StudentExamPosition, StudentResult,
+    SubjectExamStatistics
+)
+from .ranking import class_and_stream_ranks, paper_ranks, update_paper_positions
+from .recompute import (
+    METRIC_FIELDS, compute_session_metrics, load_session, load_session_rows,
+    lock_session
+)
+from .report_cache import bump_data_version
+from .snapshots import is_frozen
+from .statistics import (
+    STATISTIC_FIELDS, build_subject_statistics, group_by_subject,
+    refresh_statistics_for_subjects
+)
+
+logger = logging.getLogger(__name__)
+
+# Larger batches are cheaper to recompute as a whole session
+INCREMENTAL_MAX_STUDENTS = getattr(settings, 'RESULTS_INCREMENTAL_MAX_STUDENTS', 5)
+
+
+def ranked_ahead(keys, registration_number):
+    """
+    Q matching the rows ranked before a row in the orders of
+    results.ranking: ``keys`` are the row's (field, value) pairs, compared
+    descending in turn, then the registration number (nulls first).
+    """
+    ahead = Q()
+    equal = {}
+    for field, value in keys:
+        ahead |= Q(**equal, **{f'{field}__gt': value})
+        equal[field] = value
+    if registration_number is not None:
+        ahead |= Q(**equal) & (
+            Q(student__registration_number__isnull=True)
+            | Q(student__registration_number__lt=registration_number)
+        )
+    return ahead
+
+
+def shift_positions(queryset, field, old, new):
+    """
+    Make room for one row moving from position ``old`` to ``new`` (None
+    when it enters or leaves the order) by shifting the positions in
+    between by one. ``queryset`` must exclude the moving row.
+    """
+    if old == new:
+        return 0
+    if old is None:
+        return queryset.filter(**{f'{field}__gte': new}).update(**{field: F(field) + 1})
+    if new is None:
+        return queryset.filter(**{f'{field}__gt': old}).update(**{field: F(field) - 1})
+    if new < old:
+        return queryset.filter(
+            **{f'{field}__gte': new, f'{field}__lt': old}
+        ).update(**{field: F(field) + 1})
+    return queryset.filter(
+        **{f'{field}__gt': old, f'{field}__lte': new}
+    ).update(**{field: F(field) - 1})
+
+
+def new_positions(exam_session, student_id, metrics, info):
+    """
+    (class_position, stream_position) the student takes with ``metrics``
+    among the stored metrics of the other students (one query).
+    """
+    if metrics is None:
+        return None, None
+
+    ahead = StudentExamMetrics.objects.filter(
+        exam_session=exam_session,
+        average_percentage__isnull=False
+    ).exclude(student_id=student_id).filter(ranked_ahead(
+        [('average_percentage', metrics['average_percentage']),
+         ('total_marks', metrics['total_marks'])],
+        info['registration_number']
+    ))
+
+    stream_class_id = exam_session.stream_class_id
+    if not stream_class_id or info['stream_class_id'] != stream_class_id:
+        return ahead.count() + 1, None
+
+    counts = ahead.aggregate(
+        class_ahead=Count('id'),
+        stream_ahead=Count('id', filter=Q(student__stream_class_id=stream_class_id)),
+    )
+    return counts['class_ahead'] + 1, counts['stream_ahead'] + 1
+
+
+def move_paper_position(exam_session, student_id, subject_id):
+    """
+    Give one student's result in a subject its new position_in_paper and
+    shift the results between its old and new position (see
+    results.ranking.PAPER_ORDER). The other results of the subject must be
+    ranked already.
+    """
+    result = StudentResult.objects.filter(
+        exam_session=exam_session, student_id=student_id, subject_id=subject_id
+    ).values('id', 'marks_obtained', 'position_in_paper', 'student__registration_number').first()
+    if result is None:
+        # Deleted: close the gap it left
+        update_paper_positions(exam_session, subject_id)
+        return
+
+    others = StudentResult.objects.filter(
+        exam_session=exam_session, subject_id=subject_id
+    ).exclude(id=result['id'])
+    new = None
+    if result['marks_obtained'] is not None:
+        new = others.filter(marks_obtained__isnull=False).filter(ranked_ahead(
+            [('marks_obtained', result['marks_obtained'])],
+            result['student__registration_number']
+        )).count() + 1
+
+    if new != result['position_in_paper']:
+        shift_positions(others, 'position_in_paper', result['position_in_paper'], new)
+        StudentResult.objects.filter(id=result['id']).update(position_in_paper=new)
+
+
+def _metrics_changed(existing, values):
+    for field, value in values.items():
+        current = existing.division_id if field == 'division' else getattr(existing, field)
+        new = value.pk if field == 'division' and value is not None else value
+        if current != new:
+            return True
+    return False
+
+
+def _move_student(exam_session, student_id, old, new):
+    """Shift the other students' class and stream positions around one student."""
+    for model in (StudentExamPosition, StudentExamHistory):
+        others = model.objects.filter(exam_session=exam_session).exclude(student_id=student_id)
+        shift_positions(others, 'class_position', old[0], new[0])
+        shift_positions(others, 'stream_position', old[1], new[1])
+
+
+def recompute_student(exam_session, student_id, rows, info, values, existing, position, history,
+                      total_subjects, class_size):
+    """
+    Write one student's metrics, positions and history row, moving them
+    within the class and stream order. ``values`` are their recomputed
+    metrics (None if they no longer qualify); ``existing``, ``position``
+    and ``history`` their stored rows (or None). Returns True when the
+    number of students with results in the session changed.
+    """
+    now = timezone.now()
+    old = (position.class_position, position.stream_position) if position else (None, None)
+
+    if values is None:
+        if existing is not None:
+            existing.delete()
+        new = (None, None)
+    elif existing is None or _metrics_changed(existing, values) or position is None:
+        new = new_positions(exam_session, student_id, values, info)
+        if existing is None:
+            StudentExamMetrics.objects.create(
+                exam_session=exam_session, student_id=student_id, **values
+            )
+        else:
+            StudentExamMetrics.objects.filter(pk=existing.pk).update(calculated_at=now, **values)
+    else:
+        new = old
+
+    _move_student(exam_session, student_id, old, new)
+
+    if new == (None, None):
+        if position is not None:
+            position.delete()
+    elif new != old or position is None:
+        StudentExamPosition.objects.update_or_create(
+            exam_session=exam_session, student_id=student_id,
+            defaults={'class_position': new[0], 'stream_position': new[1]},
+        )
+
+    if not total_subjects:
+        if history is not None:
+            history.delete()
+        return history is not None
+
+    StudentExamHistory.objects.update_or_create(
+        exam_session=exam_session, student_id=student_id,
+        defaults=dict(
+            exam_date=exam_session.exam_date,
+            total_subjects=total_subjects,
+            class_size=class_size + (0 if history is not None else 1),
+            calculated_at=now,
+            **build_history_values(rows, values, new)
+        ),
+    )
+    return history is None
+
+
+def recompute_students(exam_session, student_ids, subject_ids=None):
+    """
+    Recalculate the given students of a session without recomputing the
+    others (see the module docstring). ``subject_ids`` are the subjects
+    whose marks changed; their paper positions and statistics are
+    rebuilt, or those of every subject when not given.
+
+    Accepts an ExamSession or its id. Returns the number of students
+    recomputed, or None when the session is frozen.
+    """
+    exam_session = load_session(exam_session)
+    if is_frozen(exam_session):
+        logger.debug(f"Skipped incremental recompute of frozen exam session {exam_session.id}")
+        return None
+
+    student_ids = sorted(set(student_ids))
+    with transaction.atomic():
+        lock_session(exam_session.id)
+        rows_by_student, students = load_session_rows(exam_session, student_ids)
+        computed = compute_session_metrics(exam_session, rows_by_student, students)
+
+        existing = {
+            m.student_id: m for m in StudentExamMetrics.objects.filter(
+                exam_session=exam_session, student_id__in=student_ids
+            )
+        }
+        histories = {
+            h.student_id: h for h in StudentExamHistory.objects.filter(
+                exam_session=exam_session, student_id__in=student_ids
+            )
+        }
+        counts = subject_counts(exam_session, student_ids)
+        class_size = StudentExamHistory.objects.filter(exam_session=exam_session).count()
+
+        resized = False
+        for student_id in student_ids:
+            # One at a time: each move counts the others' stored metrics,
+            # which must still agree with their stored positions
+            if recompute_student(
+                exam_session, student_id,
+                rows_by_student.get(student_id, []),
+                students.get(student_id),
+                computed.get(student_id),
+                existing.get(student_id),
+                # Read now: the moves of the students before may have shifted it
+                StudentExamPosition.objects.filter(
+                    exam_session=exam_session, student_id=student_id
+                ).first(),
+                histories.get(student_id),
+                counts.get(student_id, 0),
+                class_size,
+            ):
+                resized = True
+                class_size += 1 if counts.get(student_id) else -1
+
+        if resized:
+            StudentExamHistory.objects.filter(
+                exam_session=exam_session
+            ).exclude(class_size=class_size).update(class_size=class_size)
+
+        if subject_ids is None:
+            update_paper_positions(exam_session)
+            subject_ids = list(StudentResult.objects.filter(
+                exam_session=exam_session
+            ).order_by().values_list('subject_id', flat=True).distinct())
+            subject_ids += list(SubjectExamStatistics.objects.filter(
+                exam_session=exam_session
+            ).exclude(subject_id__in=subject_ids).values_list('subject_id', flat=True))
+        elif len(student_ids) == 1:
+            for subject_id in subject_ids:
+                move_paper_position(exam_session, student_ids[0], subject_id)
+        else:
+            # Several results of a subject may have changed at once
+            for subject_id in subject_ids:
+                update_paper_positions(exam_session, subject_id)
+        refresh_statistics_for_subjects(exam_session, list(subject_ids))
+
+        bump_data_version(exam_session.id)
+
+    logger.debug(
+        f"Incrementally recomputed {len(student_ids)} student(s) of exam session {exam_session.id}"
+    )
+    return len(student_ids)
+
+
+def _field_value(obj, field):
+    return obj.division_id if field == 'division' else getattr(obj, field)
+
+
+def _expected_value(values, field):
+    value = values[field]
+    if field == 'division' and value is not None:
+        return value.pk
+    return value
+
+
+def _compare(problems, label, stored, expected, fields):
+    """Record the differences between stored model rows and expected values."""
+    for key in sorted(set(stored) | set(expected), key=str):
+        if key not in expected:
+            problems.append(f"{label} {key}: stored but not expected")
+        elif key not in stored:
+            problems.append(f"{label} {key}: missing")
+        else:
+            for field in fields:
+                current = _field_value(stored[key], field)
+                wanted = _expected_value(expected[key], field)
+                if current != wanted:
+                    problems.append(f"{label} {key}: {field} is {current!r}, expected {wanted!r}")
+
+
+def check_session_consistency(exam_session):
+    """
+    Compare the stored metrics, class/stream positions, paper positions,
+    subject statistics and history rows of a session with what a full
+    recompute would write. Nothing is written. Returns a list of messages,
+    empty when the session is consistent.
+    """
+    exam_session = load_session(exam_session)
+    rows_by_student, students = load_session_rows(exam_session)
+    computed = compute_session_metrics(exam_session, rows_by_student, students)
+
+    problems = []
+    _compare(
+        problems, 'metrics of student',
+        {m.student_id: m for m in StudentExamMetrics.objects.filter(exam_session=exam_session)},
+        computed, METRIC_FIELDS,
+    )
+
+    # Ranked from the stored metrics, as the full recompute ranks the ones it writes
+    ranks = class_and_stream_ranks(exam_session)
+    _compare(
+        problems, 'position of student',
+        {p.student_id: p for p in StudentExamPosition.objects.filter(exam_session=exam_session)},
+        {
+            student_id: {'class_position': class_position, 'stream_position': stream_position}
+            for student_id, (class_position, stream_position) in ranks.items()
+        },
+        ['class_position', 'stream_position'],
+    )
+
+    results = StudentResult.objects.filter(exam_session=exam_session)
+    for result_id, current, expected in paper_ranks(results):
+        if current != expected:
+            problems.append(
+                f"paper position of result {result_id}: is {current!r}, expected {expected!r}"
+            )
+    for result_id in results.filter(
+        marks_obtained__isnull=True, position_in_paper__isnull=False
+    ).values_list('id', flat=True):
+        problems.append(f"paper position of result {result_id}: set without marks")
+
+    _compare(
+        problems, 'statistics of subject',
+        {s.subject_id: s for s in SubjectExamStatistics.objects.filter(exam_session=exam_session)},
+        {
+            subject_id: build_subject_statistics(rows)
+            for subject_id, rows in group_by_subject(rows_by_student, students).items()
+        },
+        STATISTIC_FIELDS,
+    )
+
+    _compare(
+        problems, 'history of student',
+        {h.student_id: h for h in StudentExamHistory.objects.filter(exam_session=exam_session)},
+        build_history_rows(exam_session, rows_by_student, computed, ranks),
+        HISTORY_FIELDS,
+    )
+    return problems
@@ -0,0 +1,260 @@
+# results/ingest.py
+"""
+Bulk marks ingestion.
+
+A whole payload of marks is validated up front, existing results are
+resolved with one query and every new or changed result is written with a
+single upsert. Bulk writes do not fire the StudentResult signals, so the
+touched students are recalculated (and the session's data version, which
+keys its cached subject ranks, bumped) exactly once at the end: a few students incrementally, in the
+same transaction (see results.incremental), more by flagging the session
+for the results worker.
+"""
+from decimal import Decimal, InvalidOperation
+import logging
+
+from django.db import transaction
+
+from core.bulk import bulk_upsert
+from core.models import Subject
+from students.models import Student
+from .incremental import INCREMENTAL_MAX_STUDENTS, recompute_students
+from .models import StudentResult
+from .queue import mark_dirty
+from .report_cache import bump_data_version
+from .scales import grade_marks
+
+logger = logging.getLogger(__name__)
+
+GRADED_FIELDS = ['marks_obtained', 'percentage', 'grade', 'grade_point']
+
+UPSERT_BATCH_SIZE = 500
+
+
+def _to_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_marks_payload(rows, max_marks, allow_blank=False):
+    """
+    Validate raw marks without touching the database.
+
+    ``rows`` is an iterable of dicts with ``student_id``, ``subject_id``,
+    ``marks`` and an optional ``label`` used in error messages.
+    Returns (entries, errors, skipped) where entries maps
+    (student_id, subject_id) -> (marks, label); later rows win.
+    """
+    entries = {}
+    errors = []
+    skipped = 0
+    max_marks = Decimal(str(max_marks))
+
+    for index, row in enumerate(rows, start=1):
+        label = row.get('label') or f"Entry {index}"
+        student_id = _to_id(row.get('student_id'))
+        subject_id = _to_id(row.get('subject_id'))
+        marks = row.get('marks')
+
+        if not student_id or not subject_id:
+            skipped += 1
+            continue
+
+        if marks in ("", None):
+            if not allow_blank:
+                skipped += 1
+                continue
+            entries[(student_id, subject_id)] = (None, label)
+            continue
+
+        try:
+            marks = Decimal(str(marks))
+        except (TypeError, ValueError, InvalidOperation):
+            errors.append(f"{label}: Invalid marks format '{marks}'")
+            continue
+
+        if not marks.is_finite() or marks < 0 or marks > max_marks:
+            errors.append(f"{label}: Marks {marks} out of range (0-{max_marks})")
+            continue
+
+        entries[(student_id, subject_id)] = (marks, label)
+
+    return entries, errors, skipped
+
+
+def new_summary(skipped=0, errors=None):
+    return {
+        'created': 0,
+        'updated': 0,
+        'unchanged': 0,
+        'skipped': skipped,
+        'errors': errors if errors is not None else [],
+        'saved_results': [],
+    }
+
+
+def load_existing_results(exam_session, student_ids=None, subject_ids=None):
+    """{(student_id, subject_id): values} of the session's stored results."""
+    results = StudentResult.objects.filter(exam_session=exam_session)
+    if student_ids is not None:
+        results = results.filter(student_id__in=student_ids)
+    if subject_ids is not None:
+        results = results.filter(subject_id__in=subject_ids)
+    return {
+        (row['student_id'], row['subject_id']): row
+        for row in results.values('id', 'student_id', 'subject_id', *GRADED_FIELDS)
+    }
+
+
+def grade_entries(exam_session, entries, summary, valid_students, valid_subjects,
+                  existing, create_only=False):
+    """
+    Grade parsed entries against preloaded lookups (no queries). Errors,
+    counts and saved results are added to ``summary``; returns the
+    StudentResult objects that need writing.
+    """
+    errors = summary['errors']
+    to_write = []
+    for (student_id, subject_id), (marks, label) in entries.items():
+        if student_id not in valid_students:
+            errors.append(f"{label}: Student ID {student_id} not found")
+            continue
+        if subject_id not in valid_subjects:
+            errors.append(f"{label}: Subject ID {subject_id} not found")
+            continue
+
+        current = existing.get((student_id, subject_id))
+        if current is not None and create_only:
+            errors.append(
+                f"{label}: Result already exists for student {student_id}, subject {subject_id}"
+            )
+            continue
+
+        percentage, grade, grade_point = grade_marks(exam_session, marks)
+        values = {
+            'marks_obtained': marks,
+            'percentage': percentage,
+            'grade': grade,
+            'grade_point': grade_point,
+        }
+        summary['saved_results'].append({
+            'student_id': student_id,
+            'subject_id': subject_id,
+            'result_id': current['id'] if current else None,
+            'grade': grade,
+        })
+
+        if current is None:
+            summary['created'] += 1
+        elif all(current[field] == values[field] for field in GRADED_FIELDS):
+            summary['unchanged'] += 1
+            continue
+        else:
+            summary['updated'] += 1
+
+        to_write.append(StudentResult(
+            exam_session=exam_session,
+            student_id=student_id,
+            subject_id=subject_id,
+            **values
+        ))
+    return to_write
+
+
+def write_results(to_write):
+    """Insert or update graded results in one upsert per UPSERT_BATCH_SIZE."""
+    bulk_upsert(
+        StudentResult,
+        to_write,
+        unique_fields=['exam_session', 'student', 'subject'],
+        update_fields=GRADED_FIELDS,
+        batch_size=UPSERT_BATCH_SIZE,
+    )
+
+
+def recompute_or_queue(exam_session, student_ids, subject_ids):
+    """
+    Recompute a small batch of students straight away (a single-mark
+    correction, say) so the saved positions are current in the response.
+    Larger batches, frozen sessions and failed updates are left to the
+    results worker. Returns True when the batch was recomputed.
+    """
+    if len(student_ids) <= INCREMENTAL_MAX_STUDENTS:
+        try:
+            with transaction.atomic():
+                if recompute_students(exam_session, student_ids, subject_ids) is not None:
+                    return True
+        except Exception as e:
+            logger.error(
+                f"Incremental recompute of exam session {exam_session.id} failed: {str(e)}",
+                exc_info=True
+            )
+    mark_dirty(exam_session.id, student_ids)
+    return False
+
+
+def ingest_marks(exam_session, rows, max_marks=None, allow_blank=False, create_only=False):
+    """
+    Validate and upsert a payload of marks for one exam session.
+
+    ``max_marks`` defaults to the exam type's maximum score. With
+    ``allow_blank`` empty marks clear the stored result; with
+    ``create_only`` marks for results that already exist are rejected.
+
+    Returns a summary dict: created, updated, unchanged and skipped
+    counts, the list of error messages and the saved results.
+    """
+    if max_marks is None:
+        max_marks = exam_session.exam_type.max_score
+
+    entries, errors, skipped = parse_marks_payload(rows, max_marks, allow_blank=allow_blank)
+    summary = new_summary(skipped, errors)
+    if not entries:
+        return summary
+
+    student_ids = {student_id for student_id, _ in entries}
+    subject_ids = {subject_id for _, subject_id in entries}
+
+    valid_students = set(Student.objects.filter(
+        id__in=student_ids, is_active=True
+    ).values_list('id', flat=True))
+    valid_subjects = set(Subject.objects.filter(
+        id__in=subject_ids
+    ).values_list('id', flat=True))
+
+    existing = load_existing_results(exam_session, student_ids, subject_ids)
+
+    to_write = grade_entries(
+        exam_session, entries, summary, valid_students, valid_subjects,
+        existing, create_only=create_only
+    )
+    saved = summary['saved_results']
+
+    with transaction.atomic():
+        write_results(to_write)
+
+        if summary['created']:
+            new_keys = {(r['student_id'], r['subject_id']) for r in saved if r['result_id'] is None}
+            created_ids = {
+                (student_id, subject_id): result_id
+                for result_id, student_id, subject_id in StudentResult.objects.filter(
+                    exam_session=exam_session,
+                    student_id__in={key[0] for key in new_keys},
+                    subject_id__in={key[1] for key in new_keys},
+                ).values_list('id', 'student_id', 'subject_id')
+            }
+            for result in saved:
+                if result['result_id'] is None:
+                    result['result_id'] = created_ids.get((result['student_id'], result['subject_id']))
+
+        if to_write:
+            recompute_or_queue(
+                exam_session,
+                {result.student_id for result in to_write},
+                {result.subject_id for result in to_write},
+            )
+            bump_data_version(exam_session.id)
+
+    return summary
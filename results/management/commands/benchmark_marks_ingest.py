@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from results.benchmarks import benchmark_marks_ingest
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare query count and wall time of a marks upload through the "
+        "per-row save path (writes only; the recompute is queued, not run) "
+        "and the bulk ingestion path. All data is created in a transaction "
+        "that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--marks', type=int, default=1000, help='Number of marks to upload (default: 1000).')
+        parser.add_argument('--subjects', type=int, default=12, help='Subjects per student (default: 12).')
+        parser.add_argument(
+            '--level', default='O_LEVEL', choices=['PRIMARY', 'O_LEVEL', 'A_LEVEL'],
+            help='Education level of the synthetic session (default: O_LEVEL).'
+        )
+
+    def handle(self, *args, **options):
+        report = benchmark_marks_ingest(
+            marks=options['marks'],
+            subjects=options['subjects'],
+            level_code=options['level'],
+        )
+
+        self.stdout.write(f"{'Path':<48}{'Queries':>10}{'Seconds':>12}")
+        for row in report:
+            self.stdout.write(f"{row['label']:<48}{row['queries']:>10}{row['seconds']:>12.3f}")
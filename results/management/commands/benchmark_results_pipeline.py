@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from results.benchmarks import LEVEL_SUBJECTS, PIPELINE_SIZES, benchmark_results_pipeline
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure query count and wall time of marks save, Excel upload, full "
+        "recompute and the analysis views on synthetic O-Level, A-Level and "
+        "Primary sessions. All data is created in a transaction that is "
+        "rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--level', action='append', choices=list(LEVEL_SUBJECTS),
+            help='Education level to benchmark; repeat for several (default: all).'
+        )
+        parser.add_argument(
+            '--students', type=int, action='append',
+            help='Students per session; repeat for several (default: 50, 300 and 1000).'
+        )
+        parser.add_argument(
+            '--subjects', type=int,
+            help='Subjects per student (default: 8 Primary, 12 O-Level, 14 A-Level).'
+        )
+
+    def handle(self, *args, **options):
+        levels = options['level'] or list(LEVEL_SUBJECTS)
+        sizes = options['students'] or PIPELINE_SIZES
+
+        for level_code in levels:
+            for students in sizes:
+                subjects = options['subjects'] or LEVEL_SUBJECTS[level_code]
+                report = benchmark_results_pipeline(level_code, students=students, subjects=subjects)
+
+                self.stdout.write(f"\n{level_code}: {students} students x {subjects} subjects")
+                self.stdout.write(f"{'Path':<32}{'Queries':>10}{'Seconds':>12}")
+                for row in report:
+                    self.stdout.write(f"{row['label']:<32}{row['queries']:>10}{row['seconds']:>12.3f}")
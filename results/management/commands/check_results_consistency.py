@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+
+from results.incremental import check_session_consistency
+from results.models import ExamSession
+from results.recompute import recompute_exam_session
+from results.snapshots import is_frozen
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the stored metrics, positions, subject statistics and "
+        "history rows of exam sessions with a full recompute and report the "
+        "differences. Frozen (published) sessions are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'session_ids', nargs='*', type=int,
+            help='Exam session ids to check (default: every session with results).'
+        )
+        parser.add_argument(
+            '--fix', action='store_true',
+            help='Run a full recompute of the sessions found inconsistent.'
+        )
+        parser.add_argument(
+            '--show', type=int, default=20,
+            help='Number of differences to print per session (default: 20).'
+        )
+
+    def handle(self, *args, **options):
+        sessions = ExamSession.objects.filter(results__isnull=False).distinct()
+        if options['session_ids']:
+            sessions = ExamSession.objects.filter(id__in=options['session_ids'])
+
+        checked = inconsistent = 0
+        for exam_session in sessions.order_by('id'):
+            if is_frozen(exam_session):
+                continue
+            checked += 1
+            problems = check_session_consistency(exam_session)
+            if not problems:
+                continue
+
+            inconsistent += 1
+            self.stdout.write(self.style.WARNING(
+                f"{exam_session} (id {exam_session.id}): {len(problems)} difference(s)"
+            ))
+            for problem in problems[:options['show']]:
+                self.stdout.write(f"  {problem}")
+            if options['fix']:
+                recompute_exam_session(exam_session)
+                self.stdout.write(f"  Recomputed exam session {exam_session.id}")
+
+        self.stdout.write(
+            f"Checked {checked} exam session(s), {inconsistent} inconsistent"
+        )
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from results.models import ExamSession
+from results.queue import process_session
+from results.snapshots import take_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        "Take the snapshot of published exam sessions that do not have one "
+        "yet, e.g. sessions published before snapshots existed. Pending "
+        "recalculations are processed first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--refresh', action='store_true',
+            help='Retake the snapshot of sessions that already have one.'
+        )
+
+    def handle(self, *args, **options):
+        sessions = ExamSession.objects.filter(status='published')
+        if not options['refresh']:
+            sessions = sessions.filter(snapshot__isnull=True)
+
+        frozen = 0
+        for exam_session in sessions.order_by('id'):
+            if exam_session.pending_recalculations.exists():
+                process_session(exam_session.id)
+            take_snapshot(exam_session)
+            frozen += 1
+
+        self.stdout.write(f"Froze {frozen} published exam session(s)")
@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from results.queue import process_pending
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalculate exam metrics and positions for sessions flagged by marks "
+        "entry. Runs continuously unless --once is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Process the current queue once and exit.'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=2.0,
+            help='Seconds to sleep between polls when the queue is empty (default: 2).'
+        )
+        parser.add_argument(
+            '--settle', type=float, default=3.0,
+            help='Wait until a session has had no new marks for this many seconds '
+                 'before recomputing it (default: 3).'
+        )
+        parser.add_argument(
+            '--limit', type=int, default=None,
+            help='Maximum number of sessions to process per pass.'
+        )
+
+    def handle(self, *args, **options):
+        settle = 0 if options['once'] else options['settle']
+
+        while True:
+            processed, failed = process_pending(settle_seconds=settle, limit=options['limit'])
+
+            if processed or failed:
+                self.stdout.write(
+                    f"Recalculated {processed} exam session(s), {failed} failed"
+                )
+
+            if options['once']:
+                break
+
+            if not processed:
+                time.sleep(options['interval'])
@@ -0,0 +1,220 @@
+# results/matrix.py
+"""
+Student × subject results grid for an exam session.
+
+``build_results_matrix`` reads the session's results, metrics and
+positions with one query each and indexes them by student and subject, so
+the marks pages and the session exporters look every cell up in a dict
+instead of querying per student or per subject. Published sessions are
+read from their snapshot instead (see results.snapshots).
+"""
+from core.models import Subject
+from students.models import Student
+from .models import StudentExamMetrics, StudentExamPosition, StudentResult
+from .snapshots import get_snapshot
+
+RESULT_FIELDS = [
+    'id', 'student_id', 'subject_id', 'marks_obtained', 'percentage',
+    'grade', 'grade_point', 'position_in_paper',
+]
+
+
+def session_students(exam_session, order_by=('first_name', 'last_name')):
+    """Active students of the session's class (and stream, if it has one)."""
+    students = Student.objects.filter(
+        class_level_id=exam_session.class_level_id,
+        is_active=True
+    )
+    if exam_session.stream_class_id:
+        students = students.filter(stream_class_id=exam_session.stream_class_id)
+    return students.order_by(*order_by)
+
+
+def session_subjects(exam_session, order_by=('code',)):
+    """Active subjects of the session's education level."""
+    return Subject.objects.filter(
+        educational_level_id=exam_session.class_level.educational_level_id,
+        is_active=True
+    ).order_by(*order_by)
+
+
+def empty_cell():
+    return {
+        'marks': None,
+        'grade': '',
+        'grade_point': None,
+        'position': None,
+        'result_id': None,
+    }
+
+
+class ResultsMatrix:
+    """
+    Results of an exam session indexed as ``results[student_id][subject_id]``,
+    with the session's metrics and positions indexed by student id.
+    """
+
+    def __init__(self, exam_session, students, subjects, results, metrics, positions):
+        self.exam_session = exam_session
+        self.students = students
+        self.subjects = subjects
+        self.metrics = metrics
+        self.positions = positions
+
+        # Both indexes keep the order the results were read in
+        self.results = {}
+        self.results_by_subject = {}
+        for result in results:
+            self.results.setdefault(result.student_id, {})[result.subject_id] = result
+            self.results_by_subject.setdefault(result.subject_id, []).append(result)
+
+    def result(self, student_id, subject_id):
+        return self.results.get(student_id, {}).get(subject_id)
+
+    def student_results(self, student_id):
+        return self.results.get(student_id, {})
+
+    def subject_results(self, subject_id, marked_only=False):
+        """Every result of one subject, optionally only those with marks."""
+        subject_results = self.results_by_subject.get(subject_id, [])
+        if marked_only:
+            return [r for r in subject_results if r.marks_obtained is not None]
+        return list(subject_results)
+
+    def all_results(self):
+        for subject_results in self.results_by_subject.values():
+            yield from subject_results
+
+    def cell(self, student_id, subject_id):
+        """Template-ready dict for one grid cell."""
+        result = self.result(student_id, subject_id)
+        if result is None:
+            return empty_cell()
+        return {
+            'marks': result.marks_obtained,
+            'grade': result.grade,
+            'grade_point': result.grade_point,
+            'position': result.position_in_paper,
+            'result_id': result.id,
+        }
+
+    def ranked_positions(self, limit=None):
+        """Positions ordered by class position (unranked students first, as the database orders nulls)."""
+        positions = sorted(
+            self.positions.values(),
+            key=lambda p: (p.class_position is not None, p.class_position or 0)
+        )
+        return positions[:limit] if limit else positions
+
+    def rows(self):
+        """One dict per student: subject cells, metrics and positions."""
+        rows = []
+        for student in self.students:
+            subject_results = {}
+            total_subjects = 0
+            for subject in self.subjects:
+                cell = self.cell(student.id, subject.id)
+                subject_results[subject.id] = cell
+                if cell['marks'] is not None:
+                    total_subjects += 1
+
+            metrics = self.metrics.get(student.id)
+            position = self.positions.get(student.id)
+
+            rows.append({
+                'student': student,
+                'student_id': student.id,
+                'registration_number': student.registration_number or f"S{student.id:04d}",
+                'full_name': student.full_name,
+                'gender': student.get_gender_display(),
+
+                # Metrics (already computed elsewhere)
+                'total_marks': metrics.total_marks if metrics else None,
+                'average_marks': metrics.average_marks if metrics else None,
+                'average_percentage': metrics.average_percentage if metrics else None,
+                'average_grade': metrics.average_grade if metrics else '',
+                'average_remark': metrics.average_remark if metrics else '',
+                'total_grade_points': metrics.total_grade_points if metrics else None,
+                'division': metrics.division if metrics else '',
+
+                # Positions
+                'class_position': position.class_position if position else None,
+                'stream_position': position.stream_position if position else None,
+
+                'subject_results': subject_results,
+                'has_results': total_subjects > 0
+            })
+        return rows
+
+
+def build_results_matrix(exam_session, students=None, subjects=None, with_metrics=True):
+    """
+    Load the results grid of an exam session.
+
+    ``students`` and ``subjects`` default to the session's active students
+    and subjects; passing ``subjects`` also limits the results read. With
+    ``with_metrics`` the session's metrics (with division) and positions
+    are loaded too. Results, metrics and positions cost one query each.
+    """
+    students = list(session_students(exam_session) if students is None else students)
+    subjects_given = subjects is not None
+    subjects = list(session_subjects(exam_session) if subjects is None else subjects)
+
+    snapshot = get_snapshot(exam_session)
+    if snapshot is not None:
+        results = snapshot.results([subject.id for subject in subjects] if subjects_given else None)
+        metrics = snapshot.metrics() if with_metrics else {}
+        positions = snapshot.positions() if with_metrics else {}
+        return ResultsMatrix(exam_session, students, subjects, results, metrics, positions)
+
+    results_qs = StudentResult.objects.filter(exam_session=exam_session).only(*RESULT_FIELDS)
+    if subjects_given:
+        results_qs = results_qs.filter(subject_id__in=[subject.id for subject in subjects])
+
+    metrics = {}
+    positions = {}
+    if with_metrics:
+        metrics = {
+            m.student_id: m
+            for m in StudentExamMetrics.objects.filter(
+                exam_session=exam_session
+            ).select_related('division')
+        }
+        positions = {
+            p.student_id: p
+            for p in StudentExamPosition.objects.filter(exam_session=exam_session)
+        }
+
+    return ResultsMatrix(exam_session, students, subjects, results_qs, metrics, positions)
+
+
+def student_results_in_session(exam_session, student_id, subjects=()):
+    """
+    One student's results in a session as {subject_id: StudentResult},
+    with their metrics (division attached) and positions. ``subjects``
+    are attached to the results they belong to.
+    """
+    subjects_by_id = {subject.id: subject for subject in subjects}
+
+    snapshot = get_snapshot(exam_session)
+    if snapshot is not None:
+        results = snapshot.results(student_id=student_id)
+        metrics = snapshot.metrics().get(student_id)
+        positions = snapshot.positions().get(student_id)
+    else:
+        results = StudentResult.objects.filter(
+            exam_session=exam_session, student_id=student_id
+        ).select_related('subject')
+        metrics = StudentExamMetrics.objects.filter(
+            exam_session=exam_session, student_id=student_id
+        ).select_related('division').first()
+        positions = StudentExamPosition.objects.filter(
+            exam_session=exam_session, student_id=student_id
+        ).first()
+
+    results_dict = {}
+    for result in results:
+        if result.subject_id in subjects_by_id:
+            result.subject = subjects_by_id[result.subject_id]
+        results_dict[result.subject_id] = result
+    return results_dict, metrics, positions
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.27 on 2026-10-17 03:04
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0009_hostelpaymenttransaction_payment_method_and_more'),
+        ('results', '0005_alter_studentexammetrics_average_grade_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingRecalculation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('marked_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('exam_session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pending_recalculations', to='results.examsession')),
+                ('student', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='pending_recalculations', to='students.student')),
+            ],
+            options={
+                'verbose_name': 'Pending Recalculation',
+                'verbose_name_plural': 'Pending Recalculations',
+                'unique_together': {('exam_session', 'student')},
+            },
+        ),
+    ]
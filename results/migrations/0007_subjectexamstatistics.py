@@ -0,0 +1,40 @@
+# Generated by Django 4.2.27 on 2026-10-17 03:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_combination_combinationsubject_combination_subjects'),
+        ('results', '0006_pendingrecalculation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubjectExamStatistics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('students_count', models.PositiveIntegerField(default=0)),
+                ('total_marks', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('mean_marks', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('median_marks', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('std_deviation', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('highest_marks', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('lowest_marks', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('pass_count', models.PositiveIntegerField(default=0)),
+                ('pass_rate', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('grade_histogram', models.JSONField(blank=True, default=dict)),
+                ('gender_split', models.JSONField(blank=True, default=dict)),
+                ('calculated_at', models.DateTimeField(auto_now=True)),
+                ('exam_session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='subject_statistics', to='results.examsession')),
+                ('subject', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exam_statistics', to='core.subject')),
+            ],
+            options={
+                'verbose_name': 'Subject Exam Statistics',
+                'verbose_name_plural': 'Subject Exam Statistics',
+                'unique_together': {('exam_session', 'subject')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-17 03:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('results', '0007_subjectexamstatistics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='examsession',
+            name='data_version',
+            field=models.CharField(blank=True, default='', editable=False, max_length=32),
+        ),
+    ]
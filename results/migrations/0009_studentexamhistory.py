@@ -0,0 +1,64 @@
+# Generated by Django 4.2.27 on 2026-10-17 03:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+
+
+def queue_existing_sessions(apps, schema_editor):
+    """Flag every session with results so the results worker builds its history."""
+    ExamSession = apps.get_model('results', 'ExamSession')
+    PendingRecalculation = apps.get_model('results', 'PendingRecalculation')
+
+    queued = set(PendingRecalculation.objects.filter(
+        student__isnull=True
+    ).values_list('exam_session_id', flat=True))
+    session_ids = ExamSession.objects.filter(
+        results__isnull=False
+    ).values_list('id', flat=True).distinct()
+
+    now = timezone.now()
+    PendingRecalculation.objects.bulk_create([
+        PendingRecalculation(exam_session_id=session_id, student=None, marked_at=now)
+        for session_id in session_ids
+        if session_id not in queued
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0009_hostelpaymenttransaction_payment_method_and_more'),
+        ('results', '0008_examsession_data_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentExamHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('exam_date', models.DateField()),
+                ('total_subjects', models.PositiveIntegerField(default=0)),
+                ('subjects_with_marks', models.PositiveIntegerField(default=0)),
+                ('total_marks', models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True)),
+                ('average_marks', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('average_percentage', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('average_grade', models.CharField(blank=True, max_length=2)),
+                ('total_grade_points', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('class_position', models.PositiveIntegerField(blank=True, null=True)),
+                ('stream_position', models.PositiveIntegerField(blank=True, null=True)),
+                ('class_size', models.PositiveIntegerField(default=0)),
+                ('calculated_at', models.DateTimeField(auto_now=True)),
+                ('division', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='results.divisionscale')),
+                ('exam_session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='student_history', to='results.examsession')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exam_history', to='students.student')),
+            ],
+            options={
+                'verbose_name': 'Student Exam History',
+                'verbose_name_plural': 'Student Exam History',
+                'indexes': [models.Index(fields=['student', 'exam_date'], name='results_history_student_date')],
+                'unique_together': {('student', 'exam_session')},
+            },
+        ),
+        migrations.RunPython(queue_existing_sessions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.27 on 2026-10-17 03:55
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('results', '0009_studentexamhistory'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExamSessionSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.BinaryField()),
+                ('students_count', models.PositiveIntegerField(default=0)),
+                ('results_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('exam_session', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='snapshot', to='results.examsession')),
+            ],
+            options={
+                'verbose_name': 'Exam Session Snapshot',
+                'verbose_name_plural': 'Exam Session Snapshots',
+            },
+        ),
+    ]
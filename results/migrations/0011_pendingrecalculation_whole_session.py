@@ -0,0 +1,36 @@
+# Generated by Django 4.2.27 on 2026-10-17 04:33
+
+from django.db import migrations, models
+from django.db.models import Max, Min
+
+
+def merge_whole_session_rows(apps, schema_editor):
+    """Keep one whole-session row per exam session, with the latest mark."""
+    PendingRecalculation = apps.get_model('results', 'PendingRecalculation')
+
+    duplicates = PendingRecalculation.objects.filter(student__isnull=True).values(
+        'exam_session_id'
+    ).annotate(
+        keep_id=Min('id'), last_marked=Max('marked_at'), rows=models.Count('id')
+    ).filter(rows__gt=1)
+
+    for row in duplicates:
+        PendingRecalculation.objects.filter(
+            exam_session_id=row['exam_session_id'], student__isnull=True
+        ).exclude(id=row['keep_id']).delete()
+        PendingRecalculation.objects.filter(id=row['keep_id']).update(marked_at=row['last_marked'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('results', '0010_examsessionsnapshot'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_whole_session_rows, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='pendingrecalculation',
+            constraint=models.UniqueConstraint(condition=models.Q(('student__isnull', True)), fields=('exam_session',), name='results_pending_whole_session'),
+        ),
+    ]
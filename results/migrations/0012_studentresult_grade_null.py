@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-17 04:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('results', '0011_pendingrecalculation_whole_session'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='studentresult',
+            name='grade',
+            field=models.CharField(blank=True, max_length=2, null=True),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.27 on 2026-10-17 05:12
+
+from django.db import migrations
+
+
+def blank_grades_to_null(apps, schema_editor):
+    """Results stored with an empty grade have no grade."""
+    StudentResult = apps.get_model('results', 'StudentResult')
+    StudentResult.objects.filter(grade='').update(grade=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('results', '0012_studentresult_grade_null'),
+    ]
+
+    operations = [
+        migrations.RunPython(blank_grades_to_null, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,7 @@
 # results/models.py
 from django.db import models
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 from core.models import Term, ClassLevel, StreamClass, Subject, EducationalLevel, AcademicYear
 from django.core.validators import MinValueValidator, MaxValueValidator
 from students.models import Student
@@ -176,6 +177,9 @@ class ExamSession(models.Model):
     exam_date = models.DateField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='draft')
 
+    # Changes whenever the session's results or metrics do; keys cached reports
+    data_version = models.CharField(max_length=32, blank=True, default='', editable=False)
+
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -207,7 +211,8 @@ class StudentResult(models.Model):
         blank=True
     )
 
-    grade = models.CharField(max_length=2, blank=True)
+    # None when no grading scale covers the marks
+    grade = models.CharField(max_length=2, null=True, blank=True)
     grade_point = models.DecimalField(max_digits=3, decimal_places=1, null=True, blank=True)
 
     # New fields for student position
@@ -280,4 +285,155 @@ class StudentExamPosition(models.Model):
     def __str__(self):
         return f"{self.student.full_name} - {self.exam_session}"
 
-    
\ No newline at end of file
+    
+
+# ============== RESULTS RECALCULATION QUEUE ==============
+class PendingRecalculation(models.Model):
+    """
+    Dirty (exam session, student) pairs waiting for the results worker.
+
+    Saving or deleting a StudentResult only marks its pair dirty; the
+    ``process_results_queue`` management command coalesces all dirty
+    pairs of a session into a single recompute. A null student means the
+    whole session needs recalculating.
+    """
+
+    exam_session = models.ForeignKey(ExamSession, on_delete=models.CASCADE, related_name='pending_recalculations')
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, null=True, blank=True, related_name='pending_recalculations')
+
+    marked_at = models.DateTimeField(default=timezone.now, db_index=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        unique_together = ['exam_session', 'student']
+        constraints = [
+            # Nulls never conflict in a unique key, so the whole-session
+            # row needs its own constraint
+            models.UniqueConstraint(
+                fields=['exam_session'],
+                condition=models.Q(student__isnull=True),
+                name='results_pending_whole_session',
+            ),
+        ]
+        verbose_name = 'Pending Recalculation'
+        verbose_name_plural = 'Pending Recalculations'
+
+    def __str__(self):
+        return f"{self.exam_session} - {self.student or 'all students'}"
+
+
+# ============== SUBJECT EXAM STATISTICS ==============
+class SubjectExamStatistics(models.Model):
+    """
+    Stored summary of one subject in an exam session: how many students
+    sat it, mean/median/standard deviation of marks, pass rate, the grade
+    histogram and the same figures split by gender.
+
+    Rows are rebuilt by the results recompute (see results.statistics),
+    so analysis pages and reports read one row per subject instead of
+    aggregating marks on every request.
+    """
+
+    exam_session = models.ForeignKey(ExamSession, on_delete=models.CASCADE, related_name='subject_statistics')
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name='exam_statistics')
+
+    students_count = models.PositiveIntegerField(default=0)
+    total_marks = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    mean_marks = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    median_marks = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    std_deviation = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    highest_marks = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    lowest_marks = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    pass_count = models.PositiveIntegerField(default=0)
+    pass_rate = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+
+    # {"A": 12, "B": 30, ...}
+    grade_histogram = models.JSONField(default=dict, blank=True)
+    # {"Male": {"count": .., "mean": .., "pass_count": .., "grades": {...}}, ...}
+    gender_split = models.JSONField(default=dict, blank=True)
+
+    calculated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['exam_session', 'subject']
+        verbose_name = 'Subject Exam Statistics'
+        verbose_name_plural = 'Subject Exam Statistics'
+
+    def __str__(self):
+        return f"{self.subject} - {self.exam_session}"
+
+
+# ============== STUDENT EXAM HISTORY ==============
+class StudentExamHistory(models.Model):
+    """
+    One row per student per exam session they have results in: subject
+    count, totals, averages, division and class/stream position.
+
+    Rows are rebuilt by the results recompute (see results.history) from
+    the data it has already loaded, so a student's whole exam history is
+    read with one indexed query instead of aggregating results, metrics
+    and positions session by session. ``exam_date`` is copied from the
+    session to order that query from the index.
+    """
+
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='exam_history')
+    exam_session = models.ForeignKey(ExamSession, on_delete=models.CASCADE, related_name='student_history')
+    exam_date = models.DateField()
+
+    # Results entered for the student, with or without marks
+    total_subjects = models.PositiveIntegerField(default=0)
+    subjects_with_marks = models.PositiveIntegerField(default=0)
+
+    total_marks = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
+    average_marks = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    average_percentage = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    average_grade = models.CharField(max_length=2, blank=True)
+    total_grade_points = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    division = models.ForeignKey(DivisionScale, null=True, blank=True, on_delete=models.SET_NULL)
+
+    class_position = models.PositiveIntegerField(null=True, blank=True)
+    stream_position = models.PositiveIntegerField(null=True, blank=True)
+    # Students with results in the session
+    class_size = models.PositiveIntegerField(default=0)
+
+    calculated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['student', 'exam_session']
+        indexes = [
+            models.Index(fields=['student', 'exam_date'], name='results_history_student_date'),
+        ]
+        verbose_name = 'Student Exam History'
+        verbose_name_plural = 'Student Exam History'
+
+    def __str__(self):
+        return f"{self.student.full_name} - {self.exam_session}"
+
+
+# ============== EXAM SESSION SNAPSHOT ==============
+class ExamSessionSnapshot(models.Model):
+    """
+    Frozen copy of a published exam session: its results grid, metrics,
+    positions and subject statistics as one compressed JSON document.
+
+    The snapshot is taken when the session is published and dropped when
+    it is reopened (see results.snapshots). While it exists, reads of the
+    session are served from it and the results recompute leaves the
+    session alone.
+    """
+
+    exam_session = models.OneToOneField(ExamSession, on_delete=models.CASCADE, related_name='snapshot')
+    data = models.BinaryField()
+
+    students_count = models.PositiveIntegerField(default=0)
+    results_count = models.PositiveIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Exam Session Snapshot'
+        verbose_name_plural = 'Exam Session Snapshots'
+
+    def __str__(self):
+        return f"Snapshot of {self.exam_session}"
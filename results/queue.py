@@ -0,0 +1,177 @@
+# results/queue.py
+"""
+Deferred, coalesced recalculation of exam session metrics.
+
+Marks entry only records which (exam_session, student) pairs are dirty.
+The ``process_results_queue`` management command picks up dirty sessions
+and runs one set-based recompute per session, however many marks were
+saved in between. Sessions with only a few flagged students are updated
+incrementally (see results.incremental).
+"""
+from datetime import timedelta
+import logging
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max, Min
+from django.utils import timezone
+
+from core.bulk import bulk_upsert
+from .incremental import INCREMENTAL_MAX_STUDENTS, recompute_students
+from .models import PendingRecalculation, StudentExamMetrics
+from .recompute import recompute_exam_session
+
+logger = logging.getLogger(__name__)
+
+STATUS_PENDING = 'pending'
+STATUS_FAILED = 'failed'
+STATUS_UP_TO_DATE = 'up_to_date'
+
+# A session that keeps failing is left for an administrator to look at
+MAX_ATTEMPTS = 5
+
+
+def mark_dirty(exam_session_id, student_ids=None):
+    """
+    Flag (exam_session, student) pairs for recalculation in one write.
+    Pass no ``student_ids`` to flag the whole session.
+    """
+    now = timezone.now()
+    if student_ids is None:
+        student_ids = [None]
+    student_ids = set(student_ids)
+
+    if None in student_ids:
+        student_ids.discard(None)
+        _mark_session_dirty(exam_session_id, now)
+
+    bulk_upsert(
+        PendingRecalculation,
+        [
+            PendingRecalculation(
+                exam_session_id=exam_session_id,
+                student_id=student_id,
+                marked_at=now,
+            )
+            for student_id in student_ids
+        ],
+        unique_fields=['exam_session', 'student'],
+        update_fields=['marked_at'],
+    )
+
+
+def _mark_session_dirty(exam_session_id, now):
+    """
+    Flag the whole session. Its row has a null student, which the
+    (exam_session, student) key never matches and MySQL has no partial
+    unique index for, so the row is updated or created explicitly.
+    """
+    whole_session = PendingRecalculation.objects.filter(
+        exam_session_id=exam_session_id, student__isnull=True
+    )
+    if whole_session.update(marked_at=now):
+        return
+    try:
+        with transaction.atomic():
+            PendingRecalculation.objects.create(exam_session_id=exam_session_id, marked_at=now)
+    except IntegrityError:
+        # Created concurrently (where the partial unique constraint exists)
+        whole_session.update(marked_at=now)
+
+
+def dirty_sessions(settle_seconds=0, limit=None):
+    """
+    Ids of sessions with pending marks, oldest first. Sessions that were
+    marked within the last ``settle_seconds`` are held back so that a
+    teacher still pasting marks gets a single recompute at the end.
+    """
+    sessions = PendingRecalculation.objects.filter(
+        attempts__lt=MAX_ATTEMPTS
+    ).values('exam_session_id').annotate(
+        first_marked=Min('marked_at'),
+        last_marked=Max('marked_at'),
+    ).order_by('first_marked')
+
+    if settle_seconds:
+        sessions = sessions.filter(
+            last_marked__lte=timezone.now() - timedelta(seconds=settle_seconds)
+        )
+
+    session_ids = sessions.values_list('exam_session_id', flat=True)
+    if limit:
+        session_ids = session_ids[:limit]
+    return list(session_ids)
+
+
+def process_session(exam_session_id):
+    """
+    Recompute one dirty session and clear the marks it covered. Marks made
+    while the recompute was running are kept for the next pass.
+    Returns True on success.
+    """
+    started_at = timezone.now()
+    pending = PendingRecalculation.objects.filter(exam_session_id=exam_session_id)
+    student_ids = set(pending.values_list('student_id', flat=True))
+
+    try:
+        # A few flagged students are moved within the stored order instead
+        if None not in student_ids and len(student_ids) <= INCREMENTAL_MAX_STUDENTS:
+            recompute_students(exam_session_id, student_ids)
+        else:
+            recompute_exam_session(exam_session_id)
+    except Exception as e:
+        logger.error(
+            f"Error recalculating exam session {exam_session_id}: {str(e)}",
+            exc_info=True
+        )
+        for row in pending:
+            row.attempts += 1
+            row.last_error = str(e)
+        PendingRecalculation.objects.bulk_update(pending, ['attempts', 'last_error'])
+        return False
+
+    pending.filter(marked_at__lte=started_at).delete()
+    return True
+
+
+def process_pending(settle_seconds=0, limit=None):
+    """
+    Process every dirty session once. Returns (processed, failed) counts.
+    """
+    processed = failed = 0
+    for exam_session_id in dirty_sessions(settle_seconds=settle_seconds, limit=limit):
+        if process_session(exam_session_id):
+            processed += 1
+        else:
+            failed += 1
+    return processed, failed
+
+
+def recalculation_status(exam_session_id):
+    """
+    Polling payload describing whether a session's metrics and positions
+    reflect its latest marks.
+    """
+    pending = PendingRecalculation.objects.filter(
+        exam_session_id=exam_session_id
+    ).aggregate(
+        count=Count('id'),
+        max_attempts=Max('attempts'),
+        last_marked=Max('marked_at'),
+    )
+    last_calculated = StudentExamMetrics.objects.filter(
+        exam_session_id=exam_session_id
+    ).aggregate(last=Max('calculated_at'))['last']
+
+    if not pending['count']:
+        status = STATUS_UP_TO_DATE
+    elif pending['max_attempts'] and pending['max_attempts'] >= MAX_ATTEMPTS:
+        status = STATUS_FAILED
+    else:
+        status = STATUS_PENDING
+
+    return {
+        'status': status,
+        'pending_count': pending['count'],
+        'last_marked_at': pending['last_marked'].isoformat() if pending['last_marked'] else None,
+        'last_calculated_at': last_calculated.isoformat() if last_calculated else None,
+    }
@@ -0,0 +1,144 @@
+# results/ranking.py
+"""
+Database-side ranking for class, stream and subject (paper) positions.
+
+Positions are computed with ROW_NUMBER() window expressions, so the
+database does the sorting and each kind of position is persisted with one
+bulk write, whatever the size of the class.
+
+Positions are unique (no ties), in this order:
+- class/stream: average percentage, then total marks (both descending),
+  then registration number;
+- paper: marks (descending), then registration number.
+"""
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from core.bulk import bulk_upsert
+from .models import StudentExamMetrics, StudentExamPosition, StudentResult
+
+POSITION_BATCH_SIZE = 500
+
+METRICS_ORDER = [
+    F('average_percentage').desc(),
+    F('total_marks').desc(),
+    F('student__registration_number').asc(nulls_first=True),
+]
+
+PAPER_ORDER = [
+    F('marks_obtained').desc(),
+    F('student__registration_number').asc(nulls_first=True),
+]
+
+
+def class_and_stream_ranks(exam_session):
+    """
+    One query: {student_id: (class_position, stream_position)} for every
+    student with metrics. Stream positions are only given for single-stream
+    sessions, among the students of that stream.
+    """
+    ranked = StudentExamMetrics.objects.filter(
+        exam_session=exam_session,
+        average_percentage__isnull=False
+    ).annotate(
+        class_rank=Window(expression=RowNumber(), order_by=METRICS_ORDER),
+        stream_rank=Window(
+            expression=RowNumber(),
+            partition_by=[F('student__stream_class_id')],
+            order_by=METRICS_ORDER,
+        ),
+    ).values_list('student_id', 'student__stream_class_id', 'class_rank', 'stream_rank')
+
+    stream_class_id = exam_session.stream_class_id
+    return {
+        student_id: (
+            class_rank,
+            stream_rank if stream_class_id and student_stream_id == stream_class_id else None,
+        )
+        for student_id, student_stream_id, class_rank, stream_rank in ranked
+    }
+
+
+def update_class_positions(exam_session):
+    """
+    Rank the session's metrics and upsert every StudentExamPosition in one
+    write; positions of students without metrics are removed.
+    """
+    ranks = class_and_stream_ranks(exam_session)
+
+    StudentExamPosition.objects.filter(
+        exam_session=exam_session
+    ).exclude(student_id__in=list(ranks)).delete()
+
+    bulk_upsert(
+        StudentExamPosition,
+        [
+            StudentExamPosition(
+                exam_session=exam_session,
+                student_id=student_id,
+                class_position=class_position,
+                stream_position=stream_position,
+            )
+            for student_id, (class_position, stream_position) in ranks.items()
+        ],
+        unique_fields=['student', 'exam_session'],
+        update_fields=['class_position', 'stream_position', 'calculated_at'],
+        batch_size=POSITION_BATCH_SIZE,
+    )
+    return ranks
+
+
+def paper_ranks(results):
+    """
+    One query: (result_id, stored position_in_paper, ranked position) for
+    every marked result in ``results``, ranked within each subject.
+    """
+    return list(results.filter(
+        marks_obtained__isnull=False
+    ).annotate(
+        paper_rank=Window(
+            expression=RowNumber(),
+            partition_by=[F('subject_id')],
+            order_by=PAPER_ORDER,
+        ),
+    ).values_list('id', 'position_in_paper', 'paper_rank'))
+
+
+def update_paper_positions(exam_session, subject=None):
+    """
+    Rank every subject of the session (or just ``subject``) and write the
+    changed position_in_paper values in one bulk update. Results without
+    marks lose their position.
+    """
+    results = StudentResult.objects.filter(exam_session=exam_session)
+    if subject is not None:
+        results = results.filter(subject=subject)
+
+    ranked = paper_ranks(results)
+
+    changed = [
+        StudentResult(id=result_id, position_in_paper=new_position)
+        for result_id, current_position, new_position in ranked
+        if current_position != new_position
+    ]
+    if changed:
+        StudentResult.objects.bulk_update(
+            changed, ['position_in_paper'], batch_size=POSITION_BATCH_SIZE
+        )
+
+    results.filter(
+        marks_obtained__isnull=True,
+        position_in_paper__isnull=False
+    ).update(position_in_paper=None)
+
+    return len(changed)
+
+
+def rank_exam_session(exam_session):
+    """
+    Recalculate class, stream and paper positions for a session. Returns
+    {student_id: (class_position, stream_position)}.
+    """
+    ranks = update_class_positions(exam_session)
+    update_paper_positions(exam_session)
+    return ranks
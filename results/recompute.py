@@ -0,0 +1,354 @@
+# results/recompute.py
+"""
+Set-based recompute engine for StudentExamMetrics, StudentExamPosition
+and the StudentExamHistory rows built from them.
+
+A whole exam session is recalculated from a single read of its results.
+Totals, averages, O-Level best-7 points, A-Level core/subsidiary points
+and divisions are worked out in memory and written back with
+bulk_create / bulk_update; positions are then ranked in the database
+(see results.ranking). The number of queries does not grow with the size
+of the class.
+"""
+from decimal import Decimal, InvalidOperation
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import CombinationSubject
+from .models import (
+    ExamSession, StudentExamMetrics, StudentResult
+)
+from .history import refresh_exam_history
+from .ranking import rank_exam_session
+from .report_cache import bump_data_version
+from .scales import division_for_points
+from .snapshots import is_frozen
+from .statistics import refresh_subject_statistics
+
+logger = logging.getLogger(__name__)
+
+TWO_PLACES = Decimal('0.01')
+
+METRIC_FIELDS = [
+    'total_marks', 'average_marks', 'average_percentage', 'average_grade',
+    'average_remark', 'total_grade_points', 'division',
+]
+
+
+def calculate_average_grade(average_percentage):
+    """
+    Calculate average grade based on percentage.
+    Returns a string grade (A, B, C, etc.)
+    """
+    try:
+        if average_percentage >= 80:
+            return 'A'
+        elif average_percentage >= 70:
+            return 'B'
+        elif average_percentage >= 60:
+            return 'C'
+        elif average_percentage >= 50:
+            return 'D'
+        elif average_percentage >= 40:
+            return 'E'
+        else:
+            return 'F'
+    except Exception:
+        return ''
+
+
+def calculate_remark(average_percentage):
+    """
+    Calculate remark based on percentage.
+    Returns a string remark.
+    """
+    try:
+        if average_percentage >= 80:
+            return 'Excellent'
+        elif average_percentage >= 70:
+            return 'Very Good'
+        elif average_percentage >= 60:
+            return 'Good'
+        elif average_percentage >= 50:
+            return 'Satisfactory'
+        elif average_percentage >= 40:
+            return 'Fair'
+        else:
+            return 'Poor'
+    except Exception:
+        return ''
+
+
+def _to_decimal(value):
+    if value is None:
+        return None
+    try:
+        return Decimal(str(value))
+    except (InvalidOperation, TypeError):
+        return None
+
+
+def _o_level_points(rows):
+    """Best 7 grade points; None if fewer than 7 graded subjects."""
+    points = [gp for gp in (_to_decimal(r['grade_point']) for r in rows) if gp is not None]
+    if len(points) < 7:
+        return None
+    points.sort(reverse=True)
+    return sum(points[:7])
+
+
+def _a_level_points(rows, combination_roles):
+    """
+    Best 3 core subjects plus the best subsidiary subject, using the
+    student's combination. None if the student has no combination or
+    fewer than 3 graded core subjects.
+    """
+    if combination_roles is None:
+        return None
+
+    core_points = []
+    subsidiary_points = []
+    for row in rows:
+        role = combination_roles.get(row['subject_id'])
+        gp = _to_decimal(row['grade_point'])
+        if role is None or gp is None:
+            continue
+        if role == 'CORE':
+            core_points.append(gp)
+        elif role == 'SUB':
+            subsidiary_points.append(gp)
+
+    if len(core_points) < 3:
+        return None
+
+    core_points.sort(reverse=True)
+    total = sum(core_points[:3])
+    if subsidiary_points:
+        total += max(subsidiary_points)
+    return total
+
+
+def build_student_metrics(rows, level_code, max_score, education_level_id, combination_roles=None):
+    """
+    Compute the metrics for one student from their result rows.
+
+    ``rows`` are dicts with ``subject_id``, ``marks_obtained`` and
+    ``grade_point`` (only rows with marks). Returns a dict of
+    StudentExamMetrics field values, or None when the student does not
+    qualify for metrics under the rules of their education level.
+    """
+    if not rows:
+        return None
+
+    total_grade_points = None
+    division = None
+
+    if level_code == 'O_LEVEL':
+        total_grade_points = _o_level_points(rows)
+        if total_grade_points is None:
+            return None
+        division = division_for_points(education_level_id, total_grade_points)
+    elif level_code == 'A_LEVEL':
+        total_grade_points = _a_level_points(rows, combination_roles)
+        if total_grade_points is None:
+            return None
+        division = division_for_points(education_level_id, total_grade_points)
+
+    marks = [Decimal(str(r['marks_obtained'])) for r in rows]
+    total_marks = sum(marks, Decimal('0'))
+    average_marks = total_marks / len(marks)
+
+    max_score = Decimal(str(max_score or 0))
+    if max_score > 0:
+        average_percentage = average_marks / max_score * Decimal('100')
+    else:
+        average_percentage = Decimal('0')
+
+    average_percentage = average_percentage.quantize(TWO_PLACES)
+
+    return {
+        'total_marks': total_marks.quantize(TWO_PLACES),
+        'average_marks': average_marks.quantize(TWO_PLACES),
+        'average_percentage': average_percentage,
+        'average_grade': calculate_average_grade(float(average_percentage)),
+        'average_remark': calculate_remark(float(average_percentage)),
+        'total_grade_points': total_grade_points,
+        'division': division,
+    }
+
+
+def load_session(exam_session):
+    """The ExamSession (given as an instance or id) with its exam type and level."""
+    if isinstance(exam_session, ExamSession):
+        exam_session_id = exam_session.pk
+    else:
+        exam_session_id = exam_session
+    return ExamSession.objects.select_related(
+        'exam_type', 'class_level__educational_level'
+    ).get(pk=exam_session_id)
+
+
+def lock_session(exam_session_id):
+    """
+    Lock the session row until the current transaction ends, so that two
+    recomputes of one session (full or incremental) never interleave.
+    """
+    list(ExamSession.objects.select_for_update().filter(
+        pk=exam_session_id
+    ).values_list('pk', flat=True))
+
+
+def load_session_rows(exam_session, student_ids=None):
+    """
+    One query: every marked result of the session (or of ``student_ids``
+    only), with the student attributes the engine needs. Returns
+    {student_id: [row, ...]} and {student_id: student_info}.
+    """
+    rows = StudentResult.objects.filter(
+        exam_session=exam_session,
+        marks_obtained__isnull=False
+    )
+    if student_ids is not None:
+        rows = rows.filter(student_id__in=student_ids)
+    rows = rows.values(
+        'student_id', 'subject_id', 'marks_obtained', 'percentage', 'grade', 'grade_point',
+        'student__registration_number', 'student__stream_class_id',
+        'student__combination_id', 'student__gender',
+    )
+
+    rows_by_student = {}
+    students = {}
+    for row in rows:
+        student_id = row['student_id']
+        rows_by_student.setdefault(student_id, []).append(row)
+        if student_id not in students:
+            students[student_id] = {
+                'registration_number': row['student__registration_number'],
+                'stream_class_id': row['student__stream_class_id'],
+                'combination_id': row['student__combination_id'],
+                'gender': row['student__gender'],
+            }
+    return rows_by_student, students
+
+
+def _load_combination_roles(combination_ids):
+    """{combination_id: {subject_id: role}} in one query."""
+    roles = {combination_id: {} for combination_id in combination_ids}
+    if not combination_ids:
+        return roles
+    for combination_id, subject_id, role in CombinationSubject.objects.filter(
+        combination_id__in=combination_ids
+    ).values_list('combination_id', 'subject_id', 'role'):
+        roles[combination_id][subject_id] = role
+    return roles
+
+
+def compute_session_metrics(exam_session, rows_by_student, students):
+    """
+    Pure in-memory step: {student_id: metrics dict} for every student
+    who qualifies for metrics in this session.
+    """
+    education_level = exam_session.class_level.educational_level
+    level_code = education_level.code.upper() if education_level.code else ''
+    max_score = exam_session.exam_type.max_score
+
+    combination_roles = {}
+    if level_code == 'A_LEVEL':
+        combination_roles = _load_combination_roles(
+            {info['combination_id'] for info in students.values() if info['combination_id']}
+        )
+
+    computed = {}
+    for student_id, rows in rows_by_student.items():
+        combination_id = students[student_id]['combination_id']
+        metrics = build_student_metrics(
+            rows, level_code, max_score, education_level.id,
+            combination_roles.get(combination_id) if combination_id else None
+        )
+        if metrics is not None:
+            computed[student_id] = metrics
+    return computed
+
+
+def write_session_metrics(exam_session, computed):
+    """Upsert computed metrics and drop metrics of students who no longer qualify."""
+    existing = {
+        m.student_id: m
+        for m in StudentExamMetrics.objects.filter(exam_session=exam_session)
+    }
+
+    stale_ids = [sid for sid in existing if sid not in computed]
+    if stale_ids:
+        StudentExamMetrics.objects.filter(
+            exam_session=exam_session, student_id__in=stale_ids
+        ).delete()
+
+    # bulk_update() does not apply auto_now, so stamp changed rows here
+    now = timezone.now()
+    to_create = []
+    to_update = []
+    for student_id, values in computed.items():
+        metrics = existing.get(student_id)
+        if metrics is None:
+            to_create.append(StudentExamMetrics(
+                exam_session=exam_session, student_id=student_id, **values
+            ))
+            continue
+        changed = False
+        for field, value in values.items():
+            current = metrics.division_id if field == 'division' else getattr(metrics, field)
+            new = value.pk if field == 'division' and value is not None else value
+            if current != new:
+                setattr(metrics, field, value)
+                changed = True
+        if changed:
+            metrics.calculated_at = now
+            to_update.append(metrics)
+
+    if to_create:
+        StudentExamMetrics.objects.bulk_create(to_create)
+    if to_update:
+        StudentExamMetrics.objects.bulk_update(to_update, METRIC_FIELDS + ['calculated_at'])
+
+    return len(to_create), len(to_update), len(stale_ids)
+
+
+def recompute_exam_session(exam_session):
+    """
+    Recalculate metrics, subject statistics, class/stream positions,
+    subject (paper) positions and the students' exam history rows for a
+    whole exam session.
+
+    Accepts an ExamSession or its id. Runs in a fixed number of queries
+    regardless of how many students or subjects the session has.
+    Returns the number of students with metrics, or None when the session
+    is published and frozen (see results.snapshots); it is recomputed
+    when it is reopened.
+    """
+    exam_session = load_session(exam_session)
+    if is_frozen(exam_session):
+        logger.debug(f"Skipped recompute of frozen exam session {exam_session.id}")
+        return None
+
+    with transaction.atomic():
+        lock_session(exam_session.id)
+        rows_by_student, students = load_session_rows(exam_session)
+        computed = compute_session_metrics(exam_session, rows_by_student, students)
+
+        write_session_metrics(exam_session, computed)
+
+        refresh_subject_statistics(exam_session, rows_by_student, students)
+
+        # Class, stream and paper positions are ranked in the database
+        ranks = rank_exam_session(exam_session)
+
+        refresh_exam_history(exam_session, rows_by_student, computed, ranks)
+
+        bump_data_version(exam_session.id)
+
+    logger.debug(
+        f"Recomputed {len(computed)} student metrics for exam session {exam_session.id}"
+    )
+    return len(computed)
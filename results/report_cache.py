@@ -0,0 +1,42 @@
+# results/report_cache.py
+"""
+Data versions for cached exam session reports.
+
+Every ExamSession carries a ``data_version`` token that changes whenever
+its results, metrics or the session itself are saved (see
+results.signals, results.ingest and results.recompute). Cached report
+files are keyed by that token, so a download is served from disk until
+the session's data changes and rebuilt once afterwards.
+
+The token is random rather than a counter: an ExamSession saved from a
+stale instance writes back an old value, and a counter could then repeat
+a version that already names a different set of data.
+"""
+import uuid
+
+from core.report_cache import report_cache_key
+
+from .models import ExamSession
+
+
+def new_data_version():
+    return uuid.uuid4().hex
+
+
+def bump_data_version(exam_session_id):
+    """
+    Invalidate every cached report of the session (one UPDATE). Returns
+    the new version.
+    """
+    version = new_data_version()
+    ExamSession.objects.filter(id=exam_session_id).update(data_version=version)
+    return version
+
+
+def session_report_key(exam_session, report_type, params=None):
+    """Cache key of a report built from ``exam_session`` with ``params``."""
+    return report_cache_key(
+        report_type,
+        dict(params or {}, exam_session_id=exam_session.id),
+        exam_session.data_version
+    )
@@ -0,0 +1,145 @@
+# results/report_cards.py
+"""
+Student report cards.
+
+``report_card_context`` builds one card from data that is already loaded.
+``download_student_pdf_report`` calls it for a single student.
+``session_report_cards`` builds every card of an exam session from one
+results grid (results.matrix) and one read of the subject rank indexes,
+so the cost of a whole class does not grow with the number of students.
+"""
+import os
+
+from django.conf import settings
+from django.utils import timezone
+
+from .matrix import build_results_matrix, session_students
+from .subject_ranks import get_subject_rank_indexes
+
+
+def report_card_context(exam_session, student, subjects, results_dict, rank_indexes,
+                        metrics, positions, class_students_count):
+    """
+    Template context of one report card. ``results_dict`` maps subject id
+    to the student's StudentResult; ``rank_indexes`` maps subject id to its
+    SubjectRankIndex. No queries are made here.
+    """
+    subject_results = []
+    total_marks = 0
+    total_grade_points = 0
+    subjects_with_marks = 0
+
+    for subject in subjects:
+        result = results_dict.get(subject.id)
+
+        if result and result.marks_obtained is not None:
+            marks = float(result.marks_obtained)
+            percentage = float(result.percentage) if result.percentage else 0
+            grade_point = float(result.grade_point) if result.grade_point else 0
+
+            total_marks += marks
+            total_grade_points += grade_point
+            subjects_with_marks += 1
+
+            # Subject position from the cached rank index
+            rank_index = rank_indexes[subject.id]
+
+            subject_results.append({
+                'subject': subject,
+                'result': result,
+                'marks': marks,
+                'percentage': percentage,
+                'grade': result.grade,
+                'grade_point': grade_point,
+                'position': rank_index.position(student.id),
+                'total_students_in_subject': rank_index.total,
+                'has_result': True
+            })
+        else:
+            subject_results.append({
+                'subject': subject,
+                'result': None,
+                'marks': None,
+                'percentage': None,
+                'grade': '-',
+                'grade_point': None,
+                'position': None,
+                'total_students_in_subject': 0,
+                'has_result': False
+            })
+
+    overall_stats = {
+        'total_subjects': len(subjects),
+        'subjects_with_marks': subjects_with_marks,
+        'completion_rate': (subjects_with_marks / len(subjects) * 100) if subjects else 0,
+        'total_marks': total_marks,
+        'total_grade_points': total_grade_points,
+        'average_marks': total_marks / subjects_with_marks if subjects_with_marks else 0,
+        'average_grade_points': total_grade_points / subjects_with_marks if subjects_with_marks else 0,
+    }
+
+    class_ranking = (
+        f"{positions.class_position} of {class_students_count}"
+        if positions and positions.class_position
+        else "Not ranked"
+    )
+
+    return {
+        'student': student,
+        'exam_session': exam_session,
+        'subject_results': subject_results,
+        'metrics': metrics,
+        'positions': positions,
+        'overall_stats': overall_stats,
+        'class_ranking': class_ranking,
+        'class_students_count': class_students_count,
+        'total_students_count': class_students_count,
+    }
+
+
+def report_card_header(generated_by):
+    """School details and generation stamp shared by every card."""
+    logo_path = os.path.join(settings.MEDIA_ROOT, 'school_logo.png')
+    return {
+        'generated_date': timezone.now(),
+        'generated_by': generated_by,
+        'school_name': getattr(settings, 'SCHOOL_NAME', 'Your School Name'),
+        'school_address': getattr(settings, 'SCHOOL_ADDRESS', ''),
+        'school_logo': logo_path if os.path.exists(logo_path) else None,
+    }
+
+
+def report_card_filename(student, exam_session):
+    return (
+        f"Results_{student.registration_number or student.id}_"
+        f"{exam_session.name.replace(' ', '_')}_{timezone.now().strftime('%Y%m%d')}.pdf"
+    ).replace('/', '_')
+
+
+def session_report_cards(exam_session):
+    """
+    Report card contexts for every active student of the session who has
+    results, in name order. Runs in a fixed number of queries.
+    """
+    students = session_students(exam_session).select_related('class_level', 'stream_class')
+    matrix = build_results_matrix(exam_session, students=students)
+
+    # One cache read for the rank indexes of every subject with marks
+    marked_subject_ids = {
+        result.subject_id for result in matrix.all_results()
+        if result.marks_obtained is not None
+    }
+    rank_indexes = get_subject_rank_indexes(exam_session, sorted(marked_subject_ids))
+
+    class_students_count = len(matrix.students)
+    cards = []
+    for student in matrix.students:
+        results_dict = matrix.student_results(student.id)
+        if not results_dict:
+            continue
+        cards.append(report_card_context(
+            exam_session, student, matrix.subjects, results_dict, rank_indexes,
+            matrix.metrics.get(student.id), matrix.positions.get(student.id),
+            class_students_count
+        ))
+    return cards
@@ -0,0 +1,82 @@
+# results/reports.py
+"""
+Report job handlers of the results app (see core.reports).
+
+``report_cards`` prints every report card of an exam session. The
+session's results are loaded once in the job; the cards are then either
+laid out as one merged PDF, or rendered one PDF per student and returned
+as a ZIP.
+
+The per-student PDFs are rendered one after another inside the job.
+Jobs already run in the process_report_jobs pool, so at most --workers
+WeasyPrint layouts run at once; parallelism comes from running several
+jobs, not from fanning one job out.
+"""
+from io import BytesIO
+import zipfile
+
+from django.template.loader import render_to_string
+
+from core.report_worker import render_pdf
+from core.reports import job_handler
+from .models import ExamSession
+from .report_cards import report_card_filename, report_card_header, session_report_cards
+
+OUTPUT_PDF = 'pdf'
+OUTPUT_ZIP = 'zip'
+
+
+def render_pdfs(documents, base_url, progress):
+    """Render {name: html} to {name: pdf bytes}, one document at a time."""
+    total = len(documents)
+    rendered = {}
+    for name, html in documents.items():
+        rendered[name] = render_pdf(html, base_url)
+        done = len(rendered)
+        # Layout is the slow part: map it onto 20-90% of the job
+        if done == total or done % 10 == 0:
+            progress(20 + int(70 * done / total), f'Rendered {done} of {total} report cards')
+    return rendered
+
+
+@job_handler('report_cards')
+def render_report_cards(job, progress):
+    exam_session = ExamSession.objects.select_related(
+        'exam_type',
+        'academic_year',
+        'term',
+        'class_level',
+        'class_level__educational_level',
+        'stream_class'
+    ).get(id=job.params['exam_session_id'])
+
+    progress(10, 'Loading results')
+    cards = session_report_cards(exam_session)
+    if not cards:
+        raise ValueError(f"No results found for {exam_session.name}")
+
+    header = report_card_header(job.params.get('generated_by', ''))
+    base_url = job.base_url or None
+
+    if job.params.get('output') == OUTPUT_ZIP:
+        documents = {
+            report_card_filename(card['student'], exam_session): render_to_string(
+                'admin/results/student_pdf_report.html', dict(card, **header)
+            )
+            for card in cards
+        }
+        progress(20, f'Rendering {len(documents)} report cards')
+        pdfs = render_pdfs(documents, base_url, progress)
+
+        output = BytesIO()
+        with zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for name in documents:
+                archive.writestr(name, pdfs[name])
+        return output.getvalue()
+
+    # One document, one layout pass: cards follow each other page by page
+    html_string = render_to_string('admin/results/student_pdf_reports_bulk.html', dict(
+        header, exam_session=exam_session, cards=cards
+    ))
+    progress(20, f'Laying out {len(cards)} report cards')
+    return render_pdf(html_string, base_url)
@@ -0,0 +1,158 @@
+# results/scales.py
+"""
+In-process lookup tables for GradingScale and DivisionScale.
+
+Each education level's scales are loaded once, compiled into sorted
+boundary arrays and searched with bisect, so grading a mark or picking a
+division costs no queries. Tables are dropped by the save/delete signals
+on GradingScale and DivisionScale (see results.signals); other processes
+pick up changes when their copy expires after SCALE_CACHE_TTL seconds.
+"""
+from bisect import bisect_right
+from decimal import Decimal, InvalidOperation
+import threading
+import time
+
+from .models import DivisionScale, GradingScale
+
+SCALE_CACHE_TTL = 300
+
+TWO_PLACES = Decimal('0.01')
+
+_lock = threading.Lock()
+_grading_tables = {}
+_division_tables = {}
+
+
+class IntervalTable:
+    """
+    Closed [low, high] intervals sorted by their lower bound.
+
+    ``lookup`` returns the entry with the greatest lower bound that still
+    contains the value, which is what the scale querysets returned for
+    non-overlapping scales.
+    """
+
+    def __init__(self, entries, low, high):
+        entries = sorted(entries, key=low)
+        self.entries = entries
+        self.lows = [low(entry) for entry in entries]
+        self.highs = [high(entry) for entry in entries]
+        self.loaded_at = time.monotonic()
+
+    def lookup(self, value):
+        index = bisect_right(self.lows, value) - 1
+        while index >= 0:
+            if value <= self.highs[index]:
+                return self.entries[index]
+            index -= 1
+        return None
+
+    def is_fresh(self):
+        return time.monotonic() - self.loaded_at < SCALE_CACHE_TTL
+
+
+def _get_table(tables, education_level_id, build):
+    table = tables.get(education_level_id)
+    if table is not None and table.is_fresh():
+        return table
+
+    table = build(education_level_id)
+    with _lock:
+        tables[education_level_id] = table
+    return table
+
+
+def _build_grading_table(education_level_id):
+    return IntervalTable(
+        GradingScale.objects.filter(education_level_id=education_level_id),
+        low=lambda scale: scale.min_mark,
+        high=lambda scale: scale.max_mark,
+    )
+
+
+def _build_division_table(education_level_id):
+    return IntervalTable(
+        DivisionScale.objects.filter(education_level_id=education_level_id),
+        low=lambda scale: scale.min_points,
+        high=lambda scale: scale.max_points,
+    )
+
+
+def _level_id(education_level):
+    return getattr(education_level, 'pk', education_level)
+
+
+def get_grading_table(education_level):
+    return _get_table(_grading_tables, _level_id(education_level), _build_grading_table)
+
+
+def get_division_table(education_level):
+    return _get_table(_division_tables, _level_id(education_level), _build_division_table)
+
+
+def grade_for_mark(education_level, mark):
+    """GradingScale covering ``mark`` for the education level, or None."""
+    if mark is None:
+        return None
+    try:
+        mark = Decimal(str(mark))
+    except (InvalidOperation, TypeError, ValueError):
+        return None
+    return get_grading_table(education_level).lookup(mark)
+
+
+def division_for_points(education_level, total_points):
+    """DivisionScale covering the (integer) total points, or None."""
+    try:
+        points_int = int(total_points)
+    except (TypeError, ValueError):
+        return None
+    return get_division_table(education_level).lookup(points_int)
+
+
+def grade_marks(exam_session, marks):
+    """
+    Percentage, grade and grade point for marks obtained in an exam session.
+    Shared by marks entry, Excel import and recalculation so every path
+    grades the same way. Returns (percentage, grade, grade_point); grade
+    and grade_point are None for blank marks and when no grading scale
+    covers the marks.
+    """
+    if marks is None:
+        return None, None, None
+
+    marks = Decimal(str(marks))
+
+    percentage = None
+    max_score = exam_session.exam_type.max_score
+    if max_score and max_score > 0:
+        percentage = (marks / Decimal(str(max_score)) * Decimal('100')).quantize(TWO_PLACES)
+
+    scale = grade_for_mark(exam_session.class_level.educational_level_id, marks)
+    if scale is None:
+        return percentage, None, None
+    return percentage, scale.grade, Decimal(str(scale.points))
+
+
+def apply_grade(result, exam_session, marks):
+    """Set marks, percentage, grade and grade point on a StudentResult."""
+    result.marks_obtained = marks
+    result.percentage, result.grade, result.grade_point = grade_marks(exam_session, marks)
+    return result
+
+
+def invalidate_grading_scales(education_level_id=None):
+    with _lock:
+        if education_level_id is None:
+            _grading_tables.clear()
+        else:
+            _grading_tables.pop(education_level_id, None)
+
+
+def invalidate_division_scales(education_level_id=None):
+    with _lock:
+        if education_level_id is None:
+            _division_tables.clear()
+        else:
+            _division_tables.pop(education_level_id, None)
@@ -0,0 +1,247 @@
+# results/snapshots.py
+"""
+Frozen snapshots of published exam sessions.
+
+Publishing a session stores its result rows, metrics, positions and
+subject statistics as one zlib-compressed JSON document
+(ExamSessionSnapshot). The document is cached in Django's cache and
+decoded per request. The results grid, analysis frames, subject rank
+indexes and report cards of a published session are built from it, so
+they do not touch the StudentResult, StudentExamMetrics or
+StudentExamPosition tables. The results recompute skips frozen sessions.
+
+The cache key carries the session's data_version (see
+results.report_cache), which freezing and unfreezing change in the
+database, so every process reads the new state on its next request
+whatever the cache backend.
+
+Reopening the session (moving it back from published) drops the
+snapshot and queues a full recompute (see results.signals).
+"""
+from decimal import Decimal
+import json
+import zlib
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.dateparse import parse_datetime
+
+from students.models import Student
+from .models import (
+    DivisionScale, ExamSession, ExamSessionSnapshot, StudentExamMetrics,
+    StudentExamPosition, StudentResult, SubjectExamStatistics
+)
+from .report_cache import bump_data_version
+from .statistics import STATISTIC_FIELDS
+
+SNAPSHOT_FORMAT = 1
+
+SNAPSHOT_TTL = 3600
+
+CACHE_PREFIX = 'results:snapshot'
+
+# Cached in place of the document for sessions that have no snapshot
+NOT_FROZEN = b''
+
+RESULT_COLUMNS = [
+    'id', 'student_id', 'subject_id', 'marks_obtained', 'percentage',
+    'grade', 'grade_point', 'position_in_paper',
+]
+
+METRIC_COLUMNS = [
+    'id', 'student_id', 'total_marks', 'average_marks', 'average_percentage',
+    'average_grade', 'average_remark', 'total_grade_points', 'division_id',
+    'calculated_at',
+]
+
+POSITION_COLUMNS = ['id', 'student_id', 'class_position', 'stream_position', 'calculated_at']
+
+STUDENT_COLUMNS = ['id', 'registration_number', 'first_name', 'middle_name', 'last_name', 'gender']
+
+DIVISION_COLUMNS = ['id', 'education_level_id', 'min_points', 'max_points', 'division']
+
+STATISTIC_COLUMNS = ['id', 'subject_id'] + STATISTIC_FIELDS + ['calculated_at']
+
+DECIMAL_FIELDS = {
+    'marks_obtained', 'percentage', 'grade_point', 'total_marks',
+    'average_marks', 'average_percentage', 'total_grade_points',
+    'mean_marks', 'median_marks', 'std_deviation', 'highest_marks',
+    'lowest_marks', 'pass_rate',
+}
+
+
+def _decode_value(column, value):
+    if value is None:
+        return None
+    if column in DECIMAL_FIELDS:
+        return Decimal(value)
+    if column == 'calculated_at':
+        return parse_datetime(value)
+    return value
+
+
+def _records(columns, rows):
+    """Rows of a snapshot table as dicts with their Python values restored."""
+    return [
+        {column: _decode_value(column, value) for column, value in zip(columns, row)}
+        for row in rows
+    ]
+
+
+class SessionSnapshot:
+    """
+    Decoded snapshot of one exam session. Results, metrics, positions and
+    statistics come back as unsaved model instances (with their original
+    ids), so code written against the live tables can use them unchanged.
+    """
+
+    def __init__(self, exam_session_id, document):
+        self.exam_session_id = exam_session_id
+        self.students = {row[0]: row for row in document['students']}
+        self.divisions = {
+            row['id']: DivisionScale(**row)
+            for row in _records(DIVISION_COLUMNS, document['divisions'])
+        }
+        self.result_rows = _records(RESULT_COLUMNS, document['results'])
+        self.metric_rows = _records(METRIC_COLUMNS, document['metrics'])
+        self.position_rows = _records(POSITION_COLUMNS, document['positions'])
+        self.statistic_rows = _records(STATISTIC_COLUMNS, document['statistics'])
+
+    def results(self, subject_ids=None, student_id=None):
+        """StudentResult instances, in the order the live table reads them."""
+        rows = self.result_rows
+        if subject_ids is not None:
+            subject_ids = set(subject_ids)
+            rows = [row for row in rows if row['subject_id'] in subject_ids]
+        if student_id is not None:
+            rows = [row for row in rows if row['student_id'] == student_id]
+        return [StudentResult(exam_session_id=self.exam_session_id, **row) for row in rows]
+
+    def metrics(self):
+        """{student_id: StudentExamMetrics} with the division attached."""
+        metrics = {}
+        for row in self.metric_rows:
+            m = StudentExamMetrics(exam_session_id=self.exam_session_id, **row)
+            m.division = self.divisions.get(row['division_id'])
+            metrics[m.student_id] = m
+        return metrics
+
+    def positions(self):
+        return {
+            row['student_id']: StudentExamPosition(exam_session_id=self.exam_session_id, **row)
+            for row in self.position_rows
+        }
+
+    def statistics(self):
+        """{subject_id: SubjectExamStatistics}"""
+        return {
+            row['subject_id']: SubjectExamStatistics(exam_session_id=self.exam_session_id, **row)
+            for row in self.statistic_rows
+        }
+
+    def student(self, student_id):
+        """The student's fields as they were when the session was published."""
+        return dict(zip(STUDENT_COLUMNS, self.students[student_id]))
+
+
+def build_snapshot_document(exam_session):
+    """Read everything a published session shows (six queries)."""
+    document = {
+        'format': SNAPSHOT_FORMAT,
+        'results': list(StudentResult.objects.filter(
+            exam_session=exam_session
+        ).values_list(*RESULT_COLUMNS)),
+        'metrics': list(StudentExamMetrics.objects.filter(
+            exam_session=exam_session
+        ).order_by('-average_marks').values_list(*METRIC_COLUMNS)),
+        'positions': list(StudentExamPosition.objects.filter(
+            exam_session=exam_session
+        ).values_list(*POSITION_COLUMNS)),
+        'statistics': list(SubjectExamStatistics.objects.filter(
+            exam_session=exam_session
+        ).values_list(*STATISTIC_COLUMNS)),
+    }
+    student_ids = {row[RESULT_COLUMNS.index('student_id')] for row in document['results']}
+    student_ids.update(row[METRIC_COLUMNS.index('student_id')] for row in document['metrics'])
+    student_ids.update(row[POSITION_COLUMNS.index('student_id')] for row in document['positions'])
+
+    document['students'] = list(Student.objects.filter(
+        id__in=student_ids
+    ).values_list(*STUDENT_COLUMNS))
+    division_column = METRIC_COLUMNS.index('division_id')
+    division_ids = {row[division_column] for row in document['metrics'] if row[division_column]}
+    document['divisions'] = list(DivisionScale.objects.filter(
+        id__in=division_ids
+    ).values_list(*DIVISION_COLUMNS))
+    return document
+
+
+def encode_document(document):
+    return zlib.compress(
+        json.dumps(document, cls=DjangoJSONEncoder, separators=(',', ':')).encode('utf-8')
+    )
+
+
+def decode_document(data):
+    return json.loads(zlib.decompress(data).decode('utf-8'))
+
+
+def _cache_key(exam_session_id, data_version):
+    return f"{CACHE_PREFIX}:{exam_session_id}:{data_version}"
+
+
+def take_snapshot(exam_session):
+    """Freeze the session's current data, replacing any earlier snapshot."""
+    document = build_snapshot_document(exam_session)
+    ExamSessionSnapshot.objects.update_or_create(
+        exam_session=exam_session,
+        defaults={
+            'data': encode_document(document),
+            'students_count': len(document['students']),
+            'results_count': len(document['results']),
+        }
+    )
+    exam_session.data_version = bump_data_version(exam_session.id)
+
+
+def drop_snapshot(exam_session):
+    """Unfreeze the session. Returns True if it had a snapshot."""
+    deleted, _ = ExamSessionSnapshot.objects.filter(exam_session=exam_session).delete()
+    if deleted:
+        exam_session.data_version = bump_data_version(exam_session.id)
+    return bool(deleted)
+
+
+def is_frozen(exam_session):
+    return ExamSessionSnapshot.objects.filter(exam_session=exam_session).exists()
+
+
+def get_snapshot(exam_session):
+    """
+    SessionSnapshot of a published session, or None. Accepts an
+    ExamSession (unpublished sessions are answered without a lookup) or
+    its id, whose status and data version are read first (one query).
+    """
+    if isinstance(exam_session, ExamSession):
+        status, data_version = exam_session.status, exam_session.data_version
+        exam_session_id = exam_session.id
+    else:
+        exam_session_id = exam_session
+        status, data_version = ExamSession.objects.filter(
+            id=exam_session_id
+        ).values_list('status', 'data_version').first() or (None, None)
+    if status != 'published':
+        return None
+
+    key = _cache_key(exam_session_id, data_version)
+    data = cache.get(key)
+    if data is None:
+        data = ExamSessionSnapshot.objects.filter(
+            exam_session_id=exam_session_id
+        ).values_list('data', flat=True).first()
+        data = bytes(data) if data is not None else NOT_FROZEN
+        cache.set(key, data, SNAPSHOT_TTL)
+
+    if data == NOT_FROZEN:
+        return None
+    return SessionSnapshot(exam_session_id, decode_document(data))
@@ -0,0 +1,196 @@
+# results/statistics.py
+"""
+Per-subject statistics for an exam session.
+
+SubjectExamStatistics rows are rebuilt by the recompute engine from the
+result rows it has already loaded, so keeping them current costs no extra
+reads. The helpers below are also used by the analysis views for ad-hoc
+(filtered) sets of marks, which keeps both paths computing the same way.
+"""
+from decimal import Decimal
+
+from django.db.models import F
+
+from core.bulk import bulk_upsert
+from students.models import GENDER_CHOICES
+from .models import StudentResult, SubjectExamStatistics
+
+PASS_MARK = 40
+
+NO_GRADE = 'No Grade'
+
+TWO_PLACES = Decimal('0.01')
+
+GENDER_LABELS = dict(GENDER_CHOICES)
+
+STATISTIC_FIELDS = [
+    'students_count', 'total_marks', 'mean_marks', 'median_marks',
+    'std_deviation', 'highest_marks', 'lowest_marks', 'pass_count',
+    'pass_rate', 'grade_histogram', 'gender_split',
+]
+
+
+def _floats(marks_list):
+    values = []
+    for m in marks_list or []:
+        try:
+            values.append(float(m))
+        except (TypeError, ValueError):
+            continue
+    return values
+
+
+def pass_rate(marks_list, pass_mark=PASS_MARK):
+    """Percentage of marks at or above the pass mark."""
+    marks = _floats(marks_list)
+    if not marks:
+        return 0
+    passed = sum(1 for m in marks if m >= pass_mark)
+    return (passed / len(marks)) * 100
+
+
+def median(marks_list):
+    marks = sorted(_floats(marks_list))
+    n = len(marks)
+    if not n:
+        return 0
+    if n % 2 == 0:
+        return (marks[n // 2 - 1] + marks[n // 2]) / 2
+    return marks[n // 2]
+
+
+def std_deviation(marks_list):
+    """Population standard deviation; 0 for fewer than two marks."""
+    marks = _floats(marks_list)
+    n = len(marks)
+    if n < 2:
+        return 0
+    mean = sum(marks) / n
+    variance = sum((x - mean) ** 2 for x in marks) / n
+    return variance ** 0.5
+
+
+def _decimal(value):
+    return Decimal(str(value)).quantize(TWO_PLACES)
+
+
+def gender_label(gender):
+    return GENDER_LABELS.get(gender) or 'Other'
+
+
+def build_subject_statistics(rows):
+    """
+    Statistics for one subject from its marked result rows (dicts with
+    ``marks_obtained``, ``grade`` and ``gender``). Returns a dict of
+    SubjectExamStatistics field values.
+    """
+    marks = [float(row['marks_obtained']) for row in rows]
+    count = len(marks)
+    total = sum(marks)
+    pass_count = sum(1 for m in marks if m >= PASS_MARK)
+
+    grade_histogram = {}
+    gender_split = {}
+    for row, mark in zip(rows, marks):
+        grade = row['grade'] or NO_GRADE
+        grade_histogram[grade] = grade_histogram.get(grade, 0) + 1
+
+        split = gender_split.setdefault(gender_label(row['gender']), {
+            'count': 0, 'marks_sum': 0, 'pass_count': 0, 'grades': {},
+        })
+        split['count'] += 1
+        split['marks_sum'] += mark
+        if mark >= PASS_MARK:
+            split['pass_count'] += 1
+        split['grades'][grade] = split['grades'].get(grade, 0) + 1
+
+    for split in gender_split.values():
+        split['marks_sum'] = round(split['marks_sum'], 2)
+        split['mean'] = round(split['marks_sum'] / split['count'], 2)
+        split['pass_rate'] = round(split['pass_count'] / split['count'] * 100, 2)
+
+    return {
+        'students_count': count,
+        'total_marks': _decimal(total),
+        'mean_marks': _decimal(total / count if count else 0),
+        'median_marks': _decimal(median(marks)),
+        'std_deviation': _decimal(std_deviation(marks)),
+        'highest_marks': _decimal(max(marks) if marks else 0),
+        'lowest_marks': _decimal(min(marks) if marks else 0),
+        'pass_count': pass_count,
+        'pass_rate': _decimal(pass_count / count * 100 if count else 0),
+        'grade_histogram': grade_histogram,
+        'gender_split': gender_split,
+    }
+
+
+def group_by_subject(rows_by_student, students):
+    """
+    Regroup the rows loaded by results.recompute.load_session_rows() into
+    {subject_id: [rows for build_subject_statistics()]}.
+    """
+    rows_by_subject = {}
+    for student_id, rows in rows_by_student.items():
+        gender = students[student_id]['gender']
+        for row in rows:
+            rows_by_subject.setdefault(row['subject_id'], []).append({
+                'marks_obtained': row['marks_obtained'],
+                'grade': row['grade'],
+                'gender': gender,
+            })
+    return rows_by_subject
+
+
+def write_subject_statistics(exam_session, rows_by_subject):
+    """Upsert the statistics of every subject in ``rows_by_subject``."""
+    bulk_upsert(
+        SubjectExamStatistics,
+        [
+            SubjectExamStatistics(
+                exam_session=exam_session,
+                subject_id=subject_id,
+                **build_subject_statistics(rows)
+            )
+            for subject_id, rows in rows_by_subject.items()
+        ],
+        unique_fields=['exam_session', 'subject'],
+        update_fields=STATISTIC_FIELDS + ['calculated_at'],
+    )
+
+
+def refresh_subject_statistics(exam_session, rows_by_student, students):
+    """
+    Rebuild every SubjectExamStatistics row of the session from the rows
+    loaded by results.recompute.load_session_rows(). Subjects that no
+    longer have marks lose their row. Returns the number of subjects.
+    """
+    rows_by_subject = group_by_subject(rows_by_student, students)
+
+    SubjectExamStatistics.objects.filter(
+        exam_session=exam_session
+    ).exclude(subject_id__in=list(rows_by_subject)).delete()
+
+    write_subject_statistics(exam_session, rows_by_subject)
+    return len(rows_by_subject)
+
+
+def refresh_statistics_for_subjects(exam_session, subject_ids):
+    """
+    Rebuild the SubjectExamStatistics rows of ``subject_ids`` only, from
+    one read of their marks. Subjects without marks lose their row.
+    """
+    rows_by_subject = {}
+    for row in StudentResult.objects.filter(
+        exam_session=exam_session,
+        subject_id__in=subject_ids,
+        marks_obtained__isnull=False
+    ).values('subject_id', 'marks_obtained', 'grade', gender=F('student__gender')):
+        rows_by_subject.setdefault(row.pop('subject_id'), []).append(row)
+
+    SubjectExamStatistics.objects.filter(
+        exam_session=exam_session,
+        subject_id__in=[subject_id for subject_id in subject_ids if subject_id not in rows_by_subject]
+    ).delete()
+
+    write_subject_statistics(exam_session, rows_by_subject)
+    return len(rows_by_subject)
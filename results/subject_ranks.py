@@ -0,0 +1,147 @@
+# results/subject_ranks.py
+"""
+Cached per-(exam session, subject) rank index.
+
+A subject's results are read and sorted once, and the resulting index is
+kept in Django's cache. A report card then looks up every subject
+position in a dict, reading the cache once for the whole card.
+
+Ranking matches what the report card views have always shown: every
+result with marks, ordered by marks (descending), registration number,
+then full name; positions are unique.
+
+Indexes are keyed by the session's data_version (see
+results.report_cache), which every marks save, upload, recompute and
+freeze changes in the database, so every process builds a new index
+after a change whatever the cache backend.
+"""
+from django.core.cache import cache
+
+from .models import ExamSession, StudentResult
+from .snapshots import get_snapshot
+
+SUBJECT_RANKS_TTL = 600
+
+CACHE_PREFIX = 'results:subject-ranks'
+
+
+class SubjectRankIndex:
+    """Ranked results of one subject in one exam session."""
+
+    def __init__(self, entries):
+        # (student_id, marks, registration_number, full_name, grade, percentage),
+        # already in rank order
+        self.entries = entries
+        self.positions = {
+            entry[0]: position for position, entry in enumerate(entries, start=1)
+        }
+
+    @property
+    def total(self):
+        """Number of students with marks in the subject."""
+        return len(self.entries)
+
+    def position(self, student_id):
+        return self.positions.get(student_id)
+
+    def rankings(self, student_ids=None):
+        """
+        Ranking rows in position order. With ``student_ids`` only those
+        students are kept and renumbered among themselves.
+        """
+        rows = []
+        for student_id, marks, registration_number, full_name, grade, percentage in self.entries:
+            if student_ids is not None and student_id not in student_ids:
+                continue
+            rows.append({
+                'position': len(rows) + 1,
+                'student_id': student_id,
+                'registration_number': registration_number,
+                'full_name': full_name,
+                'marks': marks,
+                'grade': grade,
+                'percentage': percentage,
+            })
+        return rows
+
+
+def build_subject_rank_index(exam_session, subject_id):
+    """
+    Read and rank one subject's results (one query, or none for a
+    published session, which is read from its snapshot).
+    """
+    exam_session_id = exam_session.id
+    snapshot = get_snapshot(exam_session)
+    if snapshot is not None:
+        results = []
+        for row in snapshot.result_rows:
+            if row['subject_id'] != subject_id or row['marks_obtained'] is None:
+                continue
+            student = snapshot.student(row['student_id'])
+            results.append((
+                row['student_id'], row['marks_obtained'], row['grade'], row['percentage'],
+                student['registration_number'], student['first_name'],
+                student['middle_name'], student['last_name'],
+            ))
+    else:
+        results = StudentResult.objects.filter(
+            exam_session_id=exam_session_id,
+            subject_id=subject_id,
+            marks_obtained__isnull=False
+        ).values_list(
+            'student_id', 'marks_obtained', 'grade', 'percentage',
+            'student__registration_number', 'student__first_name',
+            'student__middle_name', 'student__last_name',
+        ).order_by()
+
+    entries = []
+    for student_id, marks, grade, percentage, registration_number, first, middle, last in results:
+        entries.append((
+            student_id,
+            float(marks),
+            registration_number or f"S{student_id:04d}",
+            f'{first} {middle} {last}'.strip(),
+            grade,
+            float(percentage) if percentage else None,
+        ))
+
+    entries.sort(key=lambda entry: (-entry[1], entry[2], entry[3]))
+    return SubjectRankIndex(entries)
+
+
+def _index_key(exam_session, subject_id):
+    return f"{CACHE_PREFIX}:{exam_session.id}:{subject_id}:{exam_session.data_version}"
+
+
+def get_subject_rank_indexes(exam_session, subject_ids):
+    """
+    {subject_id: SubjectRankIndex} for the given subjects of a session.
+    Accepts an ExamSession or its id (one query for its status and data
+    version). Cached indexes are read in one round trip; missing ones are
+    built and stored.
+    """
+    if not isinstance(exam_session, ExamSession):
+        exam_session = ExamSession.objects.only('status', 'data_version').get(id=exam_session)
+    subject_ids = list(subject_ids)
+    keys = {
+        subject_id: _index_key(exam_session, subject_id)
+        for subject_id in subject_ids
+    }
+    cached = cache.get_many(list(keys.values()))
+
+    indexes = {}
+    missing = {}
+    for subject_id, key in keys.items():
+        index = cached.get(key)
+        if index is None:
+            index = build_subject_rank_index(exam_session, subject_id)
+            missing[key] = index
+        indexes[subject_id] = index
+
+    if missing:
+        cache.set_many(missing, SUBJECT_RANKS_TTL)
+    return indexes
+
+
+def get_subject_rank_index(exam_session, subject_id):
+    return get_subject_rank_indexes(exam_session, [subject_id])[subject_id]
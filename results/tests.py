@@ -0,0 +1,229 @@
+"""
+Query budgets for the results pipeline.
+
+Marks save, Excel upload, full recompute, a single-mark correction and the
+analysis views are run on synthetic Primary, O-Level and A-Level sessions
+(see results.benchmarks) of 50 and 300 students. Each path has a query
+budget that grows only with the number of write batches, never with the
+number of students or marks, so a change that slips back to per-row
+queries fails here. Run locally against SQLite with:
+
+    python manage.py test results --settings=config.test_settings
+
+``manage.py benchmark_results_pipeline`` times the same paths at up to
+1,000 students.
+
+The data derived from a session's results (exam history, subject ranks,
+report cache keys, snapshots, trends and report cards) is checked
+against the stored rows after marks change and sessions are published
+and reopened.
+"""
+import io
+import math
+import zipfile
+
+from django.test import RequestFactory, TestCase
+
+from core.models import ReportJob
+from core.reports import enqueue_report, run_report_job
+from results.benchmarks import (
+    LEVEL_SUBJECTS, benchmark_results_pipeline, build_exam_session, random_marks
+)
+from results.history import student_exam_history
+from results.incremental import check_session_consistency
+from results.ingest import ingest_marks
+from results.models import (
+    ExamSession, PendingRecalculation, StudentExamMetrics, StudentExamPosition, StudentResult
+)
+from results.queue import mark_dirty
+from results.recompute import recompute_exam_session
+from results.report_cache import session_report_key
+from results.reports import OUTPUT_ZIP
+from results.snapshots import get_snapshot
+from results.subject_ranks import get_subject_rank_index
+from results.trends import get_class_trends
+
+BUDGET_SIZES = (50, 300)
+
+# Path: (queries, extra queries allowed per 1,000 marks for batched writes)
+QUERY_BUDGETS = {
+    'marks save': (14, 10),
+    'full recompute': (20, 6),
+    'single-mark correction': (50, 0),
+    'Excel upload': (14, 13),
+    'manage results page': (10, 0),
+    'session analysis': (8, 0),
+    'subject analysis': (12, 0),
+    'subject matrix analysis': (10, 0),
+}
+
+
+def query_budget(path, marks):
+    queries, per_thousand = QUERY_BUDGETS[path]
+    return queries + per_thousand * math.ceil(marks / 1000)
+
+
+class ResultsPipelineQueryBudgetTests(TestCase):
+
+    def assert_within_budgets(self, level_code):
+        for students in BUDGET_SIZES:
+            marks = students * LEVEL_SUBJECTS[level_code]
+            for row in benchmark_results_pipeline(level_code, students=students):
+                path = row['label'].split(' (')[0]
+                with self.subTest(level=level_code, students=students, path=row['label']):
+                    if row['status'] is not None:
+                        self.assertEqual(row['status'], 200)
+                    budget = query_budget(path, marks)
+                    self.assertLessEqual(
+                        row['queries'], budget,
+                        f"{row['label']} ran {row['queries']} queries for {students} students "
+                        f"({marks} marks); the budget is {budget}"
+                    )
+
+    def test_primary_session(self):
+        self.assert_within_budgets('PRIMARY')
+
+    def test_o_level_session(self):
+        self.assert_within_budgets('O_LEVEL')
+
+    def test_a_level_session(self):
+        self.assert_within_budgets('A_LEVEL')
+
+
+class IncrementalRecomputeTests(TestCase):
+
+    def test_corrections_match_full_recompute(self):
+        for level_code in LEVEL_SUBJECTS:
+            with self.subTest(level=level_code):
+                data = build_exam_session(level_code, students=60, subjects=LEVEL_SUBJECTS[level_code], seed=3)
+                exam_session = data['exam_session']
+                rows = random_marks(data, seed=3)
+                ingest_marks(exam_session, rows)
+                recompute_exam_session(exam_session)
+
+                # Raise one mark, clear one and lower one
+                for row, marks in zip(rows[::97][:3], [100, '', 0]):
+                    ingest_marks(exam_session, [dict(row, marks=marks)], allow_blank=True)
+                    self.assertEqual(check_session_consistency(exam_session), [])
+
+
+class RecalculationQueueTests(TestCase):
+
+    def test_whole_session_is_queued_once(self):
+        data = build_exam_session('PRIMARY', students=5, subjects=2, seed=1)
+        exam_session = data['exam_session']
+        PendingRecalculation.objects.filter(exam_session=exam_session).delete()
+
+        mark_dirty(exam_session.id)
+        first_marked = PendingRecalculation.objects.get(exam_session=exam_session).marked_at
+        mark_dirty(exam_session.id)
+
+        pending = PendingRecalculation.objects.filter(exam_session=exam_session)
+        self.assertEqual(pending.count(), 1)
+        self.assertIsNone(pending.get().student_id)
+        self.assertGreaterEqual(pending.get().marked_at, first_marked)
+
+
+class SessionDerivedDataTests(TestCase):
+
+    def setUp(self):
+        self.data = build_exam_session('O_LEVEL', students=12, subjects=LEVEL_SUBJECTS['O_LEVEL'], seed=5)
+        self.exam_session_id = self.data['exam_session'].id
+        ingest_marks(self.data['exam_session'], random_marks(self.data, seed=5))
+        recompute_exam_session(self.data['exam_session'])
+
+    def exam_session(self):
+        """The session as another request would read it."""
+        return ExamSession.objects.select_related('exam_type').get(id=self.exam_session_id)
+
+    def set_marks(self, student_id, subject, marks):
+        ingest_marks(self.exam_session(), [
+            {'student_id': student_id, 'subject_id': subject.id, 'marks': marks}
+        ], allow_blank=True)
+
+    def set_status(self, status):
+        exam_session = self.exam_session()
+        exam_session.status = status
+        exam_session.save()
+
+    def test_history_follows_metrics(self):
+        student = self.data['students'][0]
+        self.set_marks(student.id, self.data['subjects'][0], 100)
+
+        metrics = dict(StudentExamMetrics.objects.filter(
+            exam_session_id=self.exam_session_id
+        ).values_list('student_id', 'average_percentage'))
+        positions = dict(StudentExamPosition.objects.filter(
+            exam_session_id=self.exam_session_id
+        ).values_list('student_id', 'class_position'))
+        for student in self.data['students']:
+            history = student_exam_history(student).get(exam_session_id=self.exam_session_id)
+            with self.subTest(student=student.id):
+                self.assertEqual(history.average_percentage, metrics[student.id])
+                self.assertEqual(history.class_position, positions[student.id])
+                self.assertEqual(history.subjects_with_marks, len(self.data['subjects']))
+
+    def test_subject_rank_follows_correction(self):
+        subject = self.data['subjects'][0]
+        index = get_subject_rank_index(self.exam_session_id, subject.id)
+        self.assertEqual(index.total, 12)
+        student_id = index.entries[-1][0]
+
+        self.set_marks(student_id, subject, 100)
+        self.assertEqual(get_subject_rank_index(self.exam_session_id, subject.id).position(student_id), 1)
+
+        self.set_marks(student_id, subject, '')
+        index = get_subject_rank_index(self.exam_session(), subject.id)
+        self.assertIsNone(index.position(student_id))
+        self.assertEqual(index.total, 11)
+
+    def test_report_key_follows_data_version(self):
+        key = session_report_key(self.exam_session(), 'class_results', {'stream': None})
+        self.assertEqual(key, session_report_key(self.exam_session(), 'class_results', {'stream': None}))
+
+        self.set_marks(self.data['students'][0].id, self.data['subjects'][0], 1)
+        self.assertNotEqual(key, session_report_key(self.exam_session(), 'class_results', {'stream': None}))
+
+    def test_snapshot_follows_lifecycle(self):
+        self.assertIsNone(get_snapshot(self.exam_session_id))
+
+        self.set_status('published')
+        snapshot = get_snapshot(self.exam_session_id)
+        self.assertIsNotNone(snapshot)
+        self.assertEqual(
+            len(snapshot.results()),
+            StudentResult.objects.filter(exam_session_id=self.exam_session_id).count()
+        )
+        self.assertEqual(len(snapshot.metrics()), 12)
+        self.assertIsNotNone(get_snapshot(self.exam_session()))
+
+        self.set_status('draft')
+        self.assertIsNone(get_snapshot(self.exam_session_id))
+        self.assertIsNone(get_snapshot(self.exam_session()))
+
+    def test_trends_follow_publishing(self):
+        class_level_id = self.data['exam_session'].class_level_id
+        self.assertEqual(get_class_trends(class_level_id).sessions, [])
+
+        self.set_status('published')
+        trends = get_class_trends(class_level_id)
+        self.assertEqual(len(trends.sessions), 1)
+        self.assertEqual(len(trends.students), 12)
+
+        self.set_status('draft')
+        self.assertEqual(get_class_trends(class_level_id).sessions, [])
+
+    def test_report_cards_zip(self):
+        job = enqueue_report(
+            RequestFactory().get('/'), 'report_cards', 'report_cards.zip', job_type='report_cards',
+            params={'exam_session_id': self.exam_session_id, 'output': OUTPUT_ZIP}
+        )
+        self.assertTrue(run_report_job(job.id))
+
+        job.refresh_from_db()
+        self.addCleanup(job.file.delete, save=False)
+        self.assertEqual(job.status, ReportJob.STATUS_COMPLETED)
+        with job.file.open('rb') as f:
+            archive = zipfile.ZipFile(io.BytesIO(f.read()))
+        self.assertEqual(len(archive.namelist()), 12)
+        self.assertTrue(all(archive.read(name).startswith(b'%PDF') for name in archive.namelist()))
@@ -0,0 +1,350 @@
+# results/trends.py
+"""
+Performance trends across exam sessions.
+
+The published sessions of a class level are put in chronological order
+(academic year, term, exam date) and the students' average percentages
+from StudentExamMetrics are pivoted into one students x sessions NumPy
+array, with NaN where a student did not sit a session. Class series,
+term-over-term deltas, moving averages and the most improved/declined
+rankings are then column and row operations on that array. Subject
+series come from the stored SubjectExamStatistics rows.
+
+A class level's trends are built in three queries and kept in Django's
+cache, keyed by a digest of the ids and data versions (see
+results.report_cache) of its published sessions, read in one query.
+Publishing, reopening, deleting or recomputing a published session
+changes that digest in the database, so every process rebuilds the
+trends on its next read whatever the cache backend.
+
+``student_trends`` follows one student across every class level they have
+sat exams in; it reads only that student's rows and is not cached.
+"""
+import hashlib
+
+from django.core.cache import cache
+import numpy as np
+
+from .models import ExamSession, StudentExamMetrics, StudentResult, SubjectExamStatistics
+
+TRENDS_TTL = 3600
+
+CACHE_PREFIX = 'results:trends'
+
+DEFAULT_WINDOW = 3
+
+CHRONOLOGICAL_ORDER = ['academic_year__start_date', 'term__term_number', 'exam_date', 'id']
+
+
+def moving_average(values, window=DEFAULT_WINDOW):
+    """
+    Trailing moving average along the last axis over at most ``window``
+    sessions, ignoring NaNs; NaN where the window holds no value.
+    """
+    valid = ~np.isnan(values)
+    pad = [(0, 0)] * (values.ndim - 1) + [(1, 0)]
+    sums = np.cumsum(np.pad(np.where(valid, values, 0.0), pad), axis=-1)
+    counts = np.cumsum(np.pad(valid.astype(np.int64), pad), axis=-1)
+
+    upper = np.arange(1, values.shape[-1] + 1)
+    lower = np.maximum(upper - window, 0)
+    window_sums = sums[..., upper] - sums[..., lower]
+    window_counts = counts[..., upper] - counts[..., lower]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(window_counts > 0, window_sums / window_counts, np.nan)
+
+
+def previous_values(values):
+    """
+    For every position along the last axis, the last value before it that
+    is not NaN (NaN if there is none).
+    """
+    n = values.shape[-1]
+    if not n:
+        return values.copy()
+    positions = np.where(~np.isnan(values), np.arange(n), -1)
+    latest = np.maximum.accumulate(positions, axis=-1)
+    # Shift right by one so each position sees only earlier sessions
+    earlier = np.concatenate([np.full(latest.shape[:-1] + (1,), -1), latest[..., :-1]], axis=-1)
+    taken = np.take_along_axis(values, np.maximum(earlier, 0), axis=-1)
+    return np.where(earlier >= 0, taken, np.nan)
+
+
+def deltas(values):
+    """Change of every value from the previous session that has one."""
+    return values - previous_values(values)
+
+
+def to_list(values, places=2):
+    """Float array as a JSON-ready list with None for NaN."""
+    return [None if np.isnan(value) else round(float(value), places) for value in values]
+
+
+def _pivot(row_keys, column_index, values, n_columns):
+    """
+    Scatter (row key, column, value) triples into a float array with NaN
+    gaps. Returns (unique row keys, array).
+    """
+    keys, rows = np.unique(np.asarray(row_keys, dtype=np.int64), return_inverse=True)
+    grid = np.full((len(keys), n_columns), np.nan)
+    grid[rows.reshape(-1), np.asarray(column_index, dtype=np.int64)] = values
+    return keys, grid
+
+
+def session_point(session):
+    return {
+        'id': session.id,
+        'name': session.name,
+        'label': f"{session.academic_year.name} T{session.term.term_number} {session.exam_type.name}",
+        'academic_year': session.academic_year.name,
+        'term': session.term.term_number,
+        'exam_type': session.exam_type.name,
+        'exam_date': session.exam_date.isoformat(),
+    }
+
+
+def trend_sessions(class_level_id=None, exam_type_id=None):
+    """Published sessions in chronological order."""
+    sessions = ExamSession.objects.filter(status='published').select_related(
+        'academic_year', 'term', 'exam_type'
+    )
+    if class_level_id:
+        sessions = sessions.filter(class_level_id=class_level_id)
+    if exam_type_id:
+        sessions = sessions.filter(exam_type_id=exam_type_id)
+    return sessions.order_by(*CHRONOLOGICAL_ORDER)
+
+
+class ClassTrends:
+    """
+    Average percentages of a class level's students over its published
+    sessions: ``scores`` is students x sessions, aligned with ``students``
+    and ``sessions``; ``subject_means`` is subjects x sessions.
+    """
+
+    def __init__(self, sessions, students, scores, subjects, subject_means):
+        self.sessions = sessions
+        self.students = students
+        self.scores = scores
+        self.subjects = subjects
+        self.subject_means = subject_means
+        self.student_rows = {student['id']: row for row, student in enumerate(students)}
+
+    def class_series(self, window=DEFAULT_WINDOW):
+        """Mean, median and number of students per session, with deltas and moving average."""
+        sat = ~np.isnan(self.scores)
+        counts = sat.sum(axis=0)
+        with np.errstate(invalid='ignore'):
+            means = np.where(counts > 0, np.nansum(self.scores, axis=0) / np.maximum(counts, 1), np.nan)
+        medians = np.full(len(self.sessions), np.nan)
+        for column in np.flatnonzero(counts):
+            medians[column] = np.median(self.scores[sat[:, column], column])
+        return {
+            'mean': to_list(means),
+            'median': to_list(medians),
+            'students': counts.tolist(),
+            'delta': to_list(deltas(means)),
+            'moving_average': to_list(moving_average(means, window)),
+        }
+
+    def student_series(self, student_id, window=DEFAULT_WINDOW):
+        row = self.student_rows.get(student_id)
+        if row is None:
+            return None
+        scores = self.scores[row]
+        return dict(
+            self.students[row],
+            scores=to_list(scores),
+            delta=to_list(deltas(scores)),
+            moving_average=to_list(moving_average(scores, window)),
+        )
+
+    def subject_series(self, window=DEFAULT_WINDOW):
+        """Mean marks of every subject per session."""
+        subject_deltas = deltas(self.subject_means)
+        averages = moving_average(self.subject_means, window)
+        return [
+            dict(
+                subject,
+                mean=to_list(self.subject_means[row]),
+                delta=to_list(subject_deltas[row]),
+                moving_average=to_list(averages[row]),
+            )
+            for row, subject in enumerate(self.subjects)
+        ]
+
+    def movers(self, limit=10, declined=False):
+        """
+        Students ranked by their change from their previous session to the
+        latest one, biggest rise first (or biggest fall with ``declined``).
+        Only students who sat the latest session and an earlier one count.
+        """
+        if not self.sessions:
+            return []
+        latest = self.scores[:, -1]
+        previous = previous_values(self.scores)[:, -1]
+        change = latest - previous
+
+        rows = np.flatnonzero(~np.isnan(change))
+        if declined:
+            rows = rows[change[rows] < 0]
+            order = np.argsort(change[rows], kind='stable')
+        else:
+            rows = rows[change[rows] > 0]
+            order = np.argsort(-change[rows], kind='stable')
+
+        return [
+            dict(
+                self.students[row],
+                previous=round(float(previous[row]), 2),
+                latest=round(float(latest[row]), 2),
+                change=round(float(change[row]), 2),
+            )
+            for row in rows[order][:limit]
+        ]
+
+
+def build_class_trends(class_level_id, exam_type_id=None):
+    """Read a class level's published sessions into ClassTrends (three queries)."""
+    sessions = list(trend_sessions(class_level_id, exam_type_id))
+    column = {session.id: index for index, session in enumerate(sessions)}
+    n_sessions = len(sessions)
+
+    metrics = list(StudentExamMetrics.objects.filter(
+        exam_session_id__in=list(column),
+        average_percentage__isnull=False
+    ).values_list(
+        'student_id', 'exam_session_id', 'average_percentage',
+        'student__first_name', 'student__middle_name', 'student__last_name',
+        'student__registration_number',
+    ).order_by())
+
+    names = {}
+    for student_id, _, _, first, middle, last, registration_number in metrics:
+        names[student_id] = {
+            'id': student_id,
+            'name': ' '.join(part for part in (first, middle, last) if part),
+            'registration_number': registration_number or f"S{student_id:04d}",
+        }
+    student_ids, scores = _pivot(
+        [row[0] for row in metrics],
+        [column[row[1]] for row in metrics],
+        [float(row[2]) for row in metrics],
+        n_sessions,
+    )
+
+    statistics = list(SubjectExamStatistics.objects.filter(
+        exam_session_id__in=list(column)
+    ).values_list(
+        'subject_id', 'exam_session_id', 'mean_marks', 'subject__name', 'subject__code'
+    ).order_by())
+
+    subject_names = {
+        subject_id: {'id': subject_id, 'name': name, 'code': code}
+        for subject_id, _, _, name, code in statistics
+    }
+    subject_ids, subject_means = _pivot(
+        [row[0] for row in statistics],
+        [column[row[1]] for row in statistics],
+        [float(row[2]) for row in statistics],
+        n_sessions,
+    )
+
+    return ClassTrends(
+        [session_point(session) for session in sessions],
+        [names[student_id] for student_id in student_ids.tolist()],
+        scores,
+        [subject_names[subject_id] for subject_id in subject_ids.tolist()],
+        subject_means,
+    )
+
+
+def _trends_key(class_level_id, exam_type_id, version):
+    return f"{CACHE_PREFIX}:{class_level_id}:{exam_type_id or 'all'}:{version}"
+
+
+def _class_version(class_level_id):
+    """Digest of the ids and data versions of the class level's published sessions."""
+    sessions = ExamSession.objects.filter(
+        class_level_id=class_level_id, status='published'
+    ).order_by('id').values_list('id', 'data_version')
+    return hashlib.md5(
+        ','.join(f'{session_id}:{version}' for session_id, version in sessions).encode()
+    ).hexdigest()
+
+
+def get_class_trends(class_level_id, exam_type_id=None):
+    """Cached ClassTrends of a class level, optionally for one exam type."""
+    version = _class_version(class_level_id)
+    key = _trends_key(class_level_id, exam_type_id, version)
+    trends = cache.get(key)
+    if trends is None:
+        trends = build_class_trends(class_level_id, exam_type_id)
+        cache.set(key, trends, TRENDS_TTL)
+    return trends
+
+
+def student_trends(student, exam_type_id=None, window=DEFAULT_WINDOW):
+    """
+    One student's average percentage and subject marks over every
+    published session they have metrics in, across class levels, with
+    deltas and moving averages (two queries).
+    """
+    metrics = list(StudentExamMetrics.objects.filter(
+        student=student,
+        exam_session__status='published',
+        average_percentage__isnull=False,
+        **({'exam_session__exam_type_id': exam_type_id} if exam_type_id else {})
+    ).select_related(
+        'exam_session__academic_year', 'exam_session__term',
+        'exam_session__exam_type', 'exam_session__class_level', 'division'
+    ).order_by(*[f'exam_session__{field}' for field in CHRONOLOGICAL_ORDER]))
+
+    sessions = []
+    for m in metrics:
+        point = session_point(m.exam_session)
+        point['class_level'] = m.exam_session.class_level.name
+        point['division'] = m.division.division if m.division else None
+        sessions.append(point)
+
+    column = {m.exam_session_id: index for index, m in enumerate(metrics)}
+    scores = np.array([float(m.average_percentage) for m in metrics], dtype=float)
+    points = np.array([
+        np.nan if m.total_grade_points is None else float(m.total_grade_points) for m in metrics
+    ], dtype=float)
+
+    results = list(StudentResult.objects.filter(
+        student=student,
+        exam_session_id__in=list(column),
+        marks_obtained__isnull=False
+    ).values_list(
+        'subject_id', 'exam_session_id', 'marks_obtained', 'subject__name', 'subject__code'
+    ).order_by())
+
+    subject_names = {
+        subject_id: {'id': subject_id, 'name': name, 'code': code}
+        for subject_id, _, _, name, code in results
+    }
+    subject_ids, subject_marks = _pivot(
+        [row[0] for row in results],
+        [column[row[1]] for row in results],
+        [float(row[2]) for row in results],
+        len(metrics),
+    )
+    subject_deltas = deltas(subject_marks)
+
+    return {
+        'sessions': sessions,
+        'scores': to_list(scores),
+        'delta': to_list(deltas(scores)),
+        'moving_average': to_list(moving_average(scores, window)),
+        'grade_points': to_list(points),
+        'subjects': [
+            dict(
+                subject_names[subject_id],
+                marks=to_list(subject_marks[row]),
+                delta=to_list(subject_deltas[row]),
+            )
+            for row, subject_id in enumerate(subject_ids.tolist())
+        ],
+    }
@@ -1,7 +1,4 @@
-from django.db import transaction
-
 from core.models import CombinationSubject
-from .models import ExamSession, StudentExamMetrics, StudentExamPosition, StudentResult
 # results/utils.py
 import openpyxl
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
@@ -14,34 +11,13 @@ def recalculate_all_metrics_for_session(exam_session_id):
     Manually recalculate all metrics and positions for an exam session.
     Useful for fixing data or after major changes.
     """
-    from .signals import calculate_student_metrics, calculate_all_positions
+    from .recompute import recompute_exam_session
     
     try:
-        exam_session = ExamSession.objects.get(id=exam_session_id)
-        
-        with transaction.atomic():
-            # Clear existing metrics and positions
-            StudentExamMetrics.objects.filter(exam_session=exam_session).delete()
-            StudentExamPosition.objects.filter(exam_session=exam_session).delete()
-            
-            # Get all students with results in this session
-            student_ids = exam_session.results.values_list(
-                'student_id', flat=True
-            ).distinct()
-            
-            from students.models import Student
-            students = Student.objects.filter(id__in=student_ids)
-            
-            education_level = exam_session.class_level.educational_level
-            
-            # Calculate metrics for each student
-            for student in students:
-                calculate_student_metrics(exam_session, student, education_level)
-            
-            # Calculate positions
-            calculate_all_positions(exam_session)
-            
-            return True, f"Recalculated metrics for {students.count()} students"
+        student_count = recompute_exam_session(exam_session_id)
+        if student_count is None:
+            return False, "Exam session is published; reopen it to recalculate metrics"
+        return True, f"Recalculated metrics for {student_count} students"
             
     except Exception as e:
         return False, f"Error recalculating metrics: {str(e)}"
@@ -140,7 +116,8 @@ def export_student_sessions_to_excel(student, exam_sessions, session_metrics, fi
     # ============================================
     # 3. DATA COLLECTION AND PROCESSING
     # ============================================
-    from results.models import StudentResult, GradingScale, DivisionScale
+    from results.models import StudentResult
+    from results.scales import division_for_points, grade_for_mark
     
     # Get all results for this student across selected sessions
     results = StudentResult.objects.filter(
@@ -215,11 +192,7 @@ def export_student_sessions_to_excel(student, exam_sessions, session_metrics, fi
             # Determine overall grade based on average marks
             # Get grading scale for the student's education level
             if education_level:
-                grade_scale = GradingScale.objects.filter(
-                    education_level=education_level,
-                    min_mark__lte=subject['average_marks'],
-                    max_mark__gte=subject['average_marks']
-                ).first()
+                grade_scale = grade_for_mark(education_level, subject['average_marks'])
                 
                 if grade_scale:
                     subject['overall_grade'] = grade_scale.grade
@@ -314,17 +287,9 @@ def export_student_sessions_to_excel(student, exam_sessions, session_metrics, fi
             
             # Determine division based on total grade points
             if education_level:
-                try:
-                    points_int = int(grand_total_points)
-                    division_scale = DivisionScale.objects.filter(
-                        education_level=education_level,
-                        min_points__lte=points_int,
-                        max_points__gte=points_int
-                    ).first()
-                    if division_scale:
-                        grand_division = division_scale.division
-                except (ValueError, TypeError):
-                    pass
+                division_scale = division_for_points(education_level, grand_total_points)
+                if division_scale:
+                    grand_division = division_scale.division
     
     elif level_code == 'A_LEVEL':
         # For A-Level: Need core subjects from combination
@@ -361,17 +326,9 @@ def export_student_sessions_to_excel(student, exam_sessions, session_metrics, fi
                 
                 # Determine division
                 if education_level:
-                    try:
-                        points_int = int(grand_total_points)
-                        division_scale = DivisionScale.objects.filter(
-                            education_level=education_level,
-                            min_points__lte=points_int,
-                            max_points__gte=points_int
-                        ).first()
-                        if division_scale:
-                            grand_division = division_scale.division
-                    except (ValueError, TypeError):
-                        pass
+                    division_scale = division_for_points(education_level, grand_total_points)
+                    if division_scale:
+                        grand_division = division_scale.division
     
     else:
         # Primary/Nursery - no grade points or division
@@ -384,11 +341,7 @@ def export_student_sessions_to_excel(student, exam_sessions, session_metrics, fi
     
     # Determine grand grade based on grand average
     if education_level and grand_average:
-        grade_scale = GradingScale.objects.filter(
-            education_level=education_level,
-            min_mark__lte=grand_average,
-            max_mark__gte=grand_average
-        ).first()
+        grade_scale = grade_for_mark(education_level, grand_average)
         if grade_scale:
             grand_grade = grade_scale.grade
     
@@ -0,0 +1,312 @@
+# students/attendance_alerts.py
+"""
+Chronic absence alerts.
+
+detect_attendance_alerts rescans the students whose attendance changed
+since the watermark of the last finished run (their StudentAttendanceMonthly
+rows were refreshed after it), plus the students with active alerts, whose
+rolling window moves on even without new marks. Their marks over the
+window are read with one values() query per batch of students into a
+(students, days) array of day statuses (see students.attendance_matrix),
+and absence rates and consecutive-absence streaks are array reductions
+over it.
+
+Flagged students get an active AttendanceAlert, scanned students back
+under the thresholds have theirs resolved, and the class teachers of
+newly flagged students get one Notification per stream.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import Notification, TeachingAssignment
+from core.bulk import bulk_upsert
+from .attendance_matrix import (
+    CHRONIC_ABSENCE_PERCENT, NOT_MARKED, STATUS_CODES, absence_rates, absence_runs,
+    day_codes_from_counts
+)
+from .attendance_rollup import month_start
+from .models import AttendanceAlert, AttendanceAlertRun, Student, StudentAttendance, StudentAttendanceMonthly
+
+# Calendar days in the rolling window that ends on the as-of date
+ALERT_WINDOW_DAYS = getattr(settings, 'ATTENDANCE_ALERT_WINDOW_DAYS', 30)
+
+# Consecutive absent days, up to the last marked day, that raise an alert
+ALERT_STREAK_DAYS = getattr(settings, 'ATTENDANCE_ALERT_STREAK_DAYS', 3)
+
+# Marked days a student needs in the window before the absence rate counts
+ALERT_MIN_DAYS = getattr(settings, 'ATTENDANCE_ALERT_MIN_DAYS', 5)
+
+SCAN_BATCH_SIZE = 1000
+
+# Students named in one notification; the rest are counted
+NOTIFICATION_STUDENTS = 10
+
+ALERT_UPDATE_FIELDS = [
+    'class_level', 'stream', 'reason', 'window_start', 'window_end', 'marked_days',
+    'absent_days', 'absence_rate', 'current_streak', 'longest_streak', 'is_active',
+    'flagged_at', 'notified_at', 'resolved_at', 'updated_at',
+]
+
+
+def last_watermark():
+    """Watermark of the last finished run, None before the first one."""
+    run = AttendanceAlertRun.objects.filter(finished_at__isnull=False).order_by('-watermark').first()
+    return run.watermark if run else None
+
+
+def students_to_scan(since, window_start):
+    """
+    Ids of the students with monthly attendance rows in the window that
+    changed after ``since`` (every such student when None), and of the
+    students with active alerts.
+    """
+    months = StudentAttendanceMonthly.objects.filter(month__gte=month_start(window_start))
+    if since:
+        months = months.filter(updated_at__gt=since)
+    student_ids = set(months.values_list('student_id', flat=True).distinct())
+    student_ids.update(
+        AttendanceAlert.objects.filter(is_active=True).values_list('student_id', flat=True)
+    )
+    return sorted(student_ids)
+
+
+def load_window_days(student_ids, start, end):
+    """
+    Day statuses of ``student_ids`` from ``start`` to ``end`` (inclusive),
+    shaped (students, days) in the order of ``student_ids`` (see
+    attendance_matrix.day_codes_from_counts). One query.
+    """
+    student_ids = np.asarray(student_ids, dtype=np.int64)
+    days = (end - start).days + 1
+    counts = np.zeros((len(student_ids), days, len(STATUS_CODES)), dtype=np.int16)
+
+    rows = list(StudentAttendance.objects.filter(
+        student_id__in=student_ids.tolist(),
+        attendance_session__date__gte=start,
+        attendance_session__date__lte=end,
+        status__in=list(STATUS_CODES)
+    ).values_list('student_id', 'attendance_session__date', 'status'))
+    if rows:
+        order = np.argsort(student_ids)
+        mark_students = np.array([row[0] for row in rows], dtype=np.int64)
+        student_rows = order[np.searchsorted(student_ids, mark_students, sorter=order)]
+        day_index = np.array([(row[1] - start).days for row in rows], dtype=np.int64)
+        status_index = np.array([STATUS_CODES[row[2]] - 1 for row in rows], dtype=np.int64)
+        np.add.at(counts, (student_rows, day_index, status_index), 1)
+
+    return day_codes_from_counts(counts)
+
+
+def absence_figures(day_codes):
+    """
+    Per-student figures over a window of day statuses: marked_days,
+    absent_days, absence_rate, current_streak, longest_streak (arrays) and
+    the reason of each student's alert ('' for students not flagged).
+    Days without marks neither extend nor break a streak.
+    """
+    marked_days, absent_days, rates = absence_rates(day_codes)
+    longest, current = absence_runs(day_codes, counted=day_codes != NOT_MARKED)
+
+    by_rate = (marked_days >= ALERT_MIN_DAYS) & (rates >= CHRONIC_ABSENCE_PERCENT)
+    by_streak = current >= ALERT_STREAK_DAYS
+    reasons = np.select(
+        [by_rate & by_streak, by_rate, by_streak],
+        ['BOTH', 'RATE', 'STREAK'],
+        default=''
+    )
+    return {
+        'marked_days': marked_days,
+        'absent_days': absent_days,
+        'absence_rate': rates,
+        'current_streak': current,
+        'longest_streak': longest,
+        'reason': reasons,
+    }
+
+
+def class_teachers():
+    """
+    Users of the active class teachers: ({stream_id: [user_id]},
+    {class_level_id: [user_id]}), the second for assignments to a whole
+    class level.
+    """
+    by_stream = defaultdict(list)
+    by_class = defaultdict(list)
+    assignments = TeachingAssignment.objects.filter(
+        is_class_teacher=True,
+        is_active=True,
+        academic_year__is_active=True,
+        staff__admin__is_active=True
+    ).values_list('stream_class_id', 'class_level_id', 'staff__admin_id')
+    for stream_id, class_level_id, user_id in assignments:
+        if stream_id:
+            by_stream[stream_id].append(user_id)
+        elif class_level_id:
+            by_class[class_level_id].append(user_id)
+    return by_stream, by_class
+
+
+def _alert_line(alert):
+    line = f"{alert.student.full_name}: {alert.absence_rate}% absent over {alert.marked_days} days"
+    if alert.current_streak:
+        line += f", absent the last {alert.current_streak} days"
+    return line
+
+
+def notify_class_teachers(alerts):
+    """
+    One Notification per class teacher per stream listing the newly
+    flagged students of ``alerts``; streams without a class teacher get a
+    notification without a user, which the admin dashboard shows.
+    Returns the number of notifications created.
+    """
+    by_stream, by_class = class_teachers()
+    groups = defaultdict(list)
+    for alert in alerts:
+        groups[(alert.class_level_id, alert.stream_id)].append(alert)
+
+    notifications = []
+    for (class_level_id, stream_id), group in groups.items():
+        group.sort(key=lambda alert: (-alert.absence_rate, -alert.current_streak))
+        student = group[0].student
+        class_name = student.class_level.name if student.class_level else 'Unassigned class'
+        if student.stream_class:
+            class_name += f" {student.stream_class.stream_letter}"
+
+        lines = [_alert_line(alert) for alert in group[:NOTIFICATION_STUDENTS]]
+        if len(group) > NOTIFICATION_STUDENTS:
+            lines.append(f"and {len(group) - NOTIFICATION_STUDENTS} more")
+
+        action_url = ''
+        if class_level_id:
+            action_url = reverse('attendance_report_class', args=[class_level_id])
+            if stream_id:
+                action_url += f'?stream={stream_id}'
+
+        users = by_stream.get(stream_id) or by_class.get(class_level_id) or [None]
+        for user_id in users:
+            notifications.append(Notification(
+                title=f"Attendance alert: {len(group)} student(s) in {class_name}",
+                message='\n'.join(lines),
+                notification_type='warning',
+                icon='exclamation-triangle',
+                user_id=user_id,
+                action_url=action_url,
+            ))
+
+    Notification.objects.bulk_create(notifications)
+    return len(notifications)
+
+
+def _scan_batch(student_ids, window_start, as_of, now, run, raised):
+    day_codes = load_window_days(student_ids, window_start, as_of)
+    figures = absence_figures(day_codes)
+
+    students = {
+        student.id: student
+        for student in Student.objects.filter(
+            id__in=student_ids, is_active=True
+        ).select_related('class_level', 'stream_class')
+    }
+    existing = {
+        alert.student_id: alert
+        for alert in AttendanceAlert.objects.filter(student_id__in=student_ids)
+    }
+
+    flagged = []
+    resolved = []
+    for i, student_id in enumerate(student_ids):
+        reason = str(figures['reason'][i])
+        current = existing.get(student_id)
+        student = students.get(student_id)
+        if not reason or student is None:
+            if current and current.is_active:
+                resolved.append(student_id)
+            continue
+
+        is_new = current is None or not current.is_active
+        alert = AttendanceAlert(
+            student=student,
+            class_level_id=student.class_level_id,
+            stream_id=student.stream_class_id,
+            reason=reason,
+            window_start=window_start,
+            window_end=as_of,
+            marked_days=int(figures['marked_days'][i]),
+            absent_days=int(figures['absent_days'][i]),
+            absence_rate=round(float(figures['absence_rate'][i]), 2),
+            current_streak=int(figures['current_streak'][i]),
+            longest_streak=int(figures['longest_streak'][i]),
+            is_active=True,
+            flagged_at=now if is_new else current.flagged_at,
+            notified_at=None if is_new else current.notified_at,
+            resolved_at=None,
+        )
+        flagged.append(alert)
+        if is_new:
+            raised.append(alert)
+
+    bulk_upsert(
+        AttendanceAlert,
+        flagged,
+        unique_fields=['student'],
+        update_fields=ALERT_UPDATE_FIELDS,
+    )
+    if resolved:
+        AttendanceAlert.objects.filter(student_id__in=resolved).update(
+            is_active=False, resolved_at=now
+        )
+
+    run.students_scanned += len(student_ids)
+    run.alerts_resolved += len(resolved)
+
+
+def detect_attendance_alerts(as_of=None, full=False, notify=True):
+    """
+    Refresh the attendance alerts as of ``as_of`` (default today) and
+    record the run. With ``full`` every student with marks in the window
+    is rescanned instead of those changed since the last watermark.
+    Returns the AttendanceAlertRun.
+    """
+    now = timezone.now()
+    as_of = as_of or timezone.localdate()
+    window_start = as_of - timedelta(days=ALERT_WINDOW_DAYS - 1)
+    since = None if full else last_watermark()
+
+    run = AttendanceAlertRun(watermark=now, as_of=as_of)
+    student_ids = students_to_scan(since, window_start)
+
+    raised = []
+    with transaction.atomic():
+        for offset in range(0, len(student_ids), SCAN_BATCH_SIZE):
+            _scan_batch(student_ids[offset:offset + SCAN_BATCH_SIZE], window_start, as_of, now, run, raised)
+
+        run.alerts_raised = len(raised)
+        if notify and raised:
+            run.notifications = notify_class_teachers(raised)
+            AttendanceAlert.objects.filter(
+                student_id__in=[alert.student_id for alert in raised]
+            ).update(notified_at=timezone.now())
+
+        run.finished_at = timezone.now()
+        run.save()
+    return run
+
+
+def at_risk_students(class_level=None, stream=None, limit=None):
+    """Active attendance alerts, highest absence rate first, from the alert table."""
+    alerts = AttendanceAlert.objects.filter(is_active=True).select_related(
+        'student', 'class_level', 'stream'
+    )
+    if class_level:
+        alerts = alerts.filter(class_level=class_level)
+    if stream:
+        alerts = alerts.filter(stream=stream)
+    alerts = alerts.order_by('-absence_rate', '-current_streak')
+    return alerts[:limit] if limit else alerts
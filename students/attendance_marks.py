@@ -0,0 +1,153 @@
+# students/attendance_marks.py
+"""
+Bulk attendance writes.
+
+The attendance pages post a whole session's marks at once as
+{student_id: {'status': ..., 'remark': ...}}. write_session_attendance
+reads the session's existing marks with one query, diffs the payload
+against them and writes every new or changed mark with a single upsert
+(plus one delete when missing students are dropped), in one transaction.
+It returns a per-student change summary; the attendance views refresh
+the rollups from the session footprints around the write (see
+students.attendance_rollup).
+"""
+from django.db import transaction
+
+from core.bulk import bulk_upsert
+from .models import Student, StudentAttendance
+
+ATTENDANCE_FIELDS = ['status', 'remark']
+
+STATUS_CODES = {code for code, _ in StudentAttendance.STATUS_CHOICES}
+
+# Status of a posted mark that has none
+DEFAULT_STATUS = 'A'
+
+UPSERT_BATCH_SIZE = 500
+
+
+def _to_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_attendance_payload(student_attendance):
+    """
+    Validate posted marks without touching the database. Returns
+    (entries, errors, mentioned) where entries maps student_id ->
+    (status, remark) and ``mentioned`` holds every student id in the
+    payload, valid mark or not.
+    """
+    entries = {}
+    errors = []
+    mentioned = set()
+
+    for raw_id, mark in student_attendance.items():
+        student_id = _to_id(raw_id)
+        if not student_id:
+            errors.append(f"Invalid student ID '{raw_id}'")
+            continue
+        mentioned.add(student_id)
+
+        mark = mark if isinstance(mark, dict) else {}
+        status = mark.get('status') or DEFAULT_STATUS
+        if status not in STATUS_CODES:
+            errors.append(f"Student {student_id}: Invalid status '{status}'")
+            continue
+        entries[student_id] = (status, mark.get('remark') or '')
+
+    return entries, errors, mentioned
+
+
+def new_summary(errors=None):
+    return {
+        'created': 0,
+        'updated': 0,
+        'unchanged': 0,
+        'deleted': 0,
+        'errors': errors if errors is not None else [],
+        'changes': [],
+    }
+
+
+def write_session_attendance(session, student_attendance, replace=False):
+    """
+    Save posted marks for one attendance session. With ``replace`` the
+    marks of students missing from the payload are deleted, as the edit
+    page does; otherwise they are kept.
+
+    Returns a summary dict: created, updated, unchanged and deleted
+    counts, the list of error messages and ``changes``, one
+    {'student_id', 'action', 'old_status', 'new_status'} dict per mark
+    created, updated or deleted (old_status is None for created marks,
+    new_status None for deleted ones).
+    """
+    entries, errors, mentioned = parse_attendance_payload(student_attendance)
+    summary = new_summary(errors)
+
+    valid_students = set(Student.objects.filter(
+        id__in=list(entries)
+    ).values_list('id', flat=True))
+    existing = {
+        row['student_id']: row
+        for row in StudentAttendance.objects.filter(
+            attendance_session=session
+        ).values('student_id', *ATTENDANCE_FIELDS)
+    }
+
+    to_write = []
+    for student_id, (status, remark) in entries.items():
+        if student_id not in valid_students:
+            summary['errors'].append(f"Student ID {student_id} not found")
+            continue
+
+        current = existing.get(student_id)
+        if current is None:
+            action = 'created'
+        elif current['status'] == status and (current['remark'] or '') == remark:
+            summary['unchanged'] += 1
+            continue
+        else:
+            action = 'updated'
+
+        summary[action] += 1
+        summary['changes'].append({
+            'student_id': student_id,
+            'action': action,
+            'old_status': current['status'] if current else None,
+            'new_status': status,
+        })
+        to_write.append(StudentAttendance(
+            attendance_session=session,
+            student_id=student_id,
+            status=status,
+            remark=remark
+        ))
+
+    removed = sorted(set(existing) - mentioned) if replace else []
+    for student_id in removed:
+        summary['deleted'] += 1
+        summary['changes'].append({
+            'student_id': student_id,
+            'action': 'deleted',
+            'old_status': existing[student_id]['status'],
+            'new_status': None,
+        })
+
+    with transaction.atomic():
+        bulk_upsert(
+            StudentAttendance,
+            to_write,
+            unique_fields=['attendance_session', 'student'],
+            update_fields=ATTENDANCE_FIELDS,
+            batch_size=UPSERT_BATCH_SIZE,
+        )
+        if removed:
+            StudentAttendance.objects.filter(
+                attendance_session=session,
+                student_id__in=removed
+            ).delete()
+
+    return summary
@@ -0,0 +1,281 @@
+# students/attendance_matrix.py
+"""
+Attendance registers as NumPy arrays.
+
+load_attendance_matrix reads one class (or one stream of it) for one
+month with a single values() query over the month's sessions and their
+marks, and packs the marks into an ``AttendanceMatrix``: an int8 array of
+status codes shaped (students, days of the month, slots), where a slot is
+one of the day's sessions in period order. Student and day totals,
+absence streaks and chronic-absence flags are array reductions over that
+array, so the class registers (HTML, PDF and Excel) cost one query for
+the marks and one for the students whatever the size of the stream.
+"""
+import calendar
+from datetime import date
+
+import numpy as np
+from django.conf import settings
+
+from .models import AttendanceSession, Student
+
+NOT_MARKED = 0
+
+# Status codes in the matrix, in the order of the per-status counts
+STATUS_CODES = {'P': 1, 'A': 2, 'L': 3, 'E': 4}
+
+STATUS_FIELDS = ['present', 'absent', 'late', 'excused']
+
+STATUS_LETTERS = np.array(['', 'P', 'A', 'L', 'E'])
+
+PRESENT = STATUS_CODES['P']
+
+ABSENT = STATUS_CODES['A']
+
+# A student absent on at least this percentage of their marked days is
+# flagged as chronically absent
+CHRONIC_ABSENCE_PERCENT = getattr(settings, 'ATTENDANCE_CHRONIC_ABSENCE_PERCENT', 10)
+
+
+def month_dates(year, month):
+    """Every date of the month, in order."""
+    return [date(year, month, day) for day in range(1, calendar.monthrange(year, month)[1] + 1)]
+
+
+def _rate(numerator, denominator):
+    """numerator / denominator as a percentage, 0 where the denominator is 0."""
+    rates = np.zeros(len(denominator), dtype=float)
+    np.divide(numerator * 100, denominator, out=rates, where=denominator > 0)
+    return np.round(rates, 2)
+
+
+def day_codes_from_counts(counts):
+    """
+    One status per student and day from per-status mark counts shaped
+    (students, days, 4): the day's most frequent mark, ties going to the
+    first of present, absent, late, excused; NOT_MARKED for days without
+    marks.
+    """
+    return np.where(counts.any(axis=-1), counts.argmax(axis=-1) + 1, NOT_MARKED).astype(np.int8)
+
+
+def absence_runs(day_codes, counted=None):
+    """
+    (longest, current) runs of consecutive absent days per student in
+    (students, days) day codes; the current run is the one ending on the
+    last day. Days outside the boolean ``counted`` mask (default: every
+    day) neither extend nor break a run.
+    """
+    absent = day_codes == ABSENT
+    if counted is None:
+        counted = np.ones_like(absent)
+    if not absent.shape[1]:
+        empty = np.zeros(absent.shape[0], dtype=np.int32)
+        return empty, empty
+
+    absent_days = np.cumsum(absent & counted, axis=1, dtype=np.int32)
+    last_reset = np.maximum.accumulate(np.where(counted & ~absent, absent_days, 0), axis=1)
+    runs = absent_days - last_reset
+    return runs.max(axis=1), runs[:, -1]
+
+
+def absence_rates(day_codes):
+    """(marked days, absent days, absence rate over marked days) per student."""
+    marked_days = np.count_nonzero(day_codes != NOT_MARKED, axis=1)
+    absent_days = np.count_nonzero(day_codes == ABSENT, axis=1)
+    return marked_days, absent_days, _rate(absent_days, marked_days)
+
+
+class AttendanceMatrix:
+    """
+    Status codes of a month's register. ``codes[s, d, k]`` is the mark of
+    ``students[s]`` in the k-th session of ``dates[d]`` (NOT_MARKED when
+    there is none); ``sessions[d, k]`` is the id of that session, 0 when
+    the day has fewer than k + 1 sessions, and ``periods[d, k]`` its period
+    (0 when it has none).
+    """
+
+    def __init__(self, students, dates, sessions, periods, codes):
+        self.students = students
+        self.dates = dates
+        self.sessions = sessions
+        self.periods = periods
+        self.codes = codes
+
+    @property
+    def school_days(self):
+        """Boolean mask of the days that have at least one session."""
+        return (self.sessions != 0).any(axis=1)
+
+    def status_counts(self, axis):
+        """Marks per status summed over ``axis``; the last axis is present, absent, late, excused."""
+        return np.stack(
+            [np.count_nonzero(self.codes == code, axis=axis) for code in STATUS_CODES.values()],
+            axis=-1
+        )
+
+    def day_codes(self):
+        """
+        One status per student and day (students, days): the day's most
+        frequent mark, ties going to the first of present, absent, late,
+        excused; NOT_MARKED for days without marks.
+        """
+        return day_codes_from_counts(self.status_counts(axis=2))
+
+    def absence_streaks(self, day_codes=None):
+        """
+        (longest, current) runs of consecutive school days each student
+        was absent; the current run is the one ending on the last school
+        day of the month. Days without sessions don't break a run.
+        """
+        if day_codes is None:
+            day_codes = self.day_codes()
+        return absence_runs(day_codes[:, self.school_days])
+
+    def chronic_absence(self, day_codes=None, percent=CHRONIC_ABSENCE_PERCENT):
+        """(absence rate over marked days, chronically absent mask) per student."""
+        if day_codes is None:
+            day_codes = self.day_codes()
+        marked_days, _, rates = absence_rates(day_codes)
+        return rates, (marked_days > 0) & (rates >= percent)
+
+    def student_rows(self):
+        """
+        One dict per student, in row order: student, days (with marks),
+        sessions (marks), present, absent, late, excused, attendance_rate,
+        absence_rate, longest_absence_streak, current_absence_streak,
+        chronic_absence and ``register``, the day letters of day_codes.
+        """
+        counts = self.status_counts(axis=(1, 2))
+        sessions = counts.sum(axis=1)
+        days = np.count_nonzero((self.codes != NOT_MARKED).any(axis=2), axis=1)
+        attendance_rates = _rate(counts[:, 0], sessions)
+
+        day_codes = self.day_codes()
+        longest, current = self.absence_streaks(day_codes)
+        absent_rates, chronic = self.chronic_absence(day_codes)
+        registers = STATUS_LETTERS[day_codes].tolist()
+
+        rows = []
+        for i, student in enumerate(self.students):
+            row = {
+                'student': student,
+                'days': int(days[i]),
+                'sessions': int(sessions[i]),
+            }
+            row.update(zip(STATUS_FIELDS, counts[i].tolist()))
+            row.update({
+                'attendance_rate': float(attendance_rates[i]),
+                'absence_rate': float(absent_rates[i]),
+                'longest_absence_streak': int(longest[i]),
+                'current_absence_streak': int(current[i]),
+                'chronic_absence': bool(chronic[i]),
+                'register': registers[i],
+            })
+            rows.append(row)
+        return rows
+
+    def day_rows(self):
+        """
+        One dict per day of the month: date, day_name, is_school_day,
+        sessions, marks, present, absent, late, excused and attendance_rate
+        (present over marks).
+        """
+        counts = self.status_counts(axis=(0, 2))
+        marks = counts.sum(axis=1)
+        rates = _rate(counts[:, 0], marks)
+        sessions = np.count_nonzero(self.sessions, axis=1)
+
+        rows = []
+        for i, day in enumerate(self.dates):
+            row = {
+                'date': day,
+                'day_name': day.strftime('%A'),
+                'is_school_day': bool(sessions[i]),
+                'sessions': int(sessions[i]),
+                'marks': int(marks[i]),
+            }
+            row.update(zip(STATUS_FIELDS, counts[i].tolist()))
+            row['attendance_rate'] = float(rates[i])
+            rows.append(row)
+        return rows
+
+    def totals(self):
+        """Month totals: school_days, sessions, marks, per-status counts and attendance_rate."""
+        counts = self.status_counts(axis=(0, 1, 2))
+        marks = int(counts.sum())
+        totals = {
+            'school_days': int(np.count_nonzero(self.school_days)),
+            'sessions': int(np.count_nonzero(self.sessions)),
+            'marks': marks,
+        }
+        totals.update(zip(STATUS_FIELDS, counts.tolist()))
+        totals['attendance_rate'] = round(totals['present'] / marks * 100, 2) if marks else 0
+        return totals
+
+
+def register_students(class_level_id, stream_id=None):
+    """Active students of a class (or stream) in register order."""
+    students = Student.objects.filter(class_level_id=class_level_id, is_active=True)
+    if stream_id:
+        students = students.filter(stream_class_id=stream_id)
+    return students.order_by('last_name', 'first_name', 'registration_number')
+
+
+def load_attendance_matrix(class_level_id, year, month, stream_id=None, attendance_type=None, students=None):
+    """
+    The register of a class (or stream) for one month. ``students``
+    defaults to register_students; marks of other students are left out.
+    ``attendance_type`` limits the sessions to one type ('ALL' or None for
+    every type).
+    """
+    if students is None:
+        students = register_students(class_level_id, stream_id)
+    students = list(students)
+    dates = month_dates(year, month)
+
+    attendance_sessions = AttendanceSession.objects.filter(
+        class_level_id=class_level_id,
+        date__gte=dates[0],
+        date__lte=dates[-1]
+    )
+    if stream_id:
+        attendance_sessions = attendance_sessions.filter(stream_id=stream_id)
+    if attendance_type and attendance_type != 'ALL':
+        attendance_sessions = attendance_sessions.filter(attendance_type=attendance_type)
+
+    # Sessions left-joined to their marks, so days whose sessions have no
+    # marks yet still get their slots
+    rows = list(attendance_sessions.order_by('date', 'period', 'id').values_list(
+        'id', 'date', 'period', 'attendances__student_id', 'attendances__status'
+    ))
+
+    slots = {}
+    day_slots = [0] * len(dates)
+    for session_id, day, period, _, _ in rows:
+        if session_id not in slots:
+            slots[session_id] = (day.day - 1, day_slots[day.day - 1], period or 0)
+            day_slots[day.day - 1] += 1
+
+    width = max(day_slots, default=0)
+    sessions = np.zeros((len(dates), width), dtype=np.int64)
+    periods = np.zeros((len(dates), width), dtype=np.int16)
+    for session_id, (day, slot, period) in slots.items():
+        sessions[day, slot] = session_id
+        periods[day, slot] = period
+
+    codes = np.zeros((len(students), len(dates), width), dtype=np.int8)
+    student_ids = np.array([student.id for student in students], dtype=np.int64)
+    order = np.argsort(student_ids)
+    marks = [row for row in rows if row[3] is not None and row[4] in STATUS_CODES]
+    if marks and len(students):
+        mark_students = np.array([row[3] for row in marks], dtype=np.int64)
+        found = np.searchsorted(student_ids, mark_students, sorter=order).clip(max=len(students) - 1)
+        student_rows = order[found]
+        known = student_ids[student_rows] == mark_students
+
+        positions = np.array([slots[row[0]][:2] for row in marks], dtype=np.int64).reshape(-1, 2)
+        statuses = np.array([STATUS_CODES[row[4]] for row in marks], dtype=np.int8)
+        codes[student_rows[known], positions[known, 0], positions[known, 1]] = statuses[known]
+
+    return AttendanceMatrix(students, dates, sessions, periods, codes)
@@ -0,0 +1,260 @@
+# students/attendance_rollup.py
+"""
+Attendance rollups.
+
+AttendanceDailyRollup keeps one row per (date, class level, stream,
+attendance type, subject) with the number of sessions and the
+present/absent/late/excused counts of their marks. StudentAttendanceMonthly
+keeps the same counts per student, month and attendance type.
+
+The attendance APIs take a footprint of each session they write (its
+rollup key and the students it has marks for) before and after the
+write and pass both to refresh_attendance. Rows are refreshed by
+re-aggregating their sessions and marks, so a refresh is exact whatever
+was changed, and an edit that moves a session to another date, class or
+subject refreshes both the old and the new rows. rebuild_rollup recounts
+a whole date range (see the rebuild_attendance_rollup command).
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Min, Q
+
+from .models import (
+    AttendanceDailyRollup, AttendanceSession, StudentAttendance, StudentAttendanceMonthly
+)
+
+ROLLUP_KEY_FIELDS = ['date', 'class_level_id', 'stream_id', 'attendance_type', 'subject_id']
+
+STATUS_FIELDS = {'P': 'present', 'A': 'absent', 'L': 'late', 'E': 'excused'}
+
+COUNT_FIELDS = ['total', 'present', 'absent', 'late', 'excused']
+
+
+def month_start(date):
+    return date.replace(day=1)
+
+
+def next_month(date):
+    return (date.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def rollup_key(session):
+    """
+    Rollup key of an AttendanceSession. The views assign request values
+    (date strings, string ids) to sessions, so the values are converted
+    the way the database returns them.
+    """
+    return tuple(
+        AttendanceSession._meta.get_field(name).to_python(getattr(session, name))
+        for name in ROLLUP_KEY_FIELDS
+    )
+
+
+def session_footprint(session):
+    """The rollup key of a session and the ids of the students it has marks for."""
+    student_ids = StudentAttendance.objects.filter(
+        attendance_session=session
+    ).values_list('student_id', flat=True)
+    return rollup_key(session), frozenset(student_ids)
+
+
+def refresh_attendance(*footprints):
+    """
+    Refresh the daily rollup and the students' monthly rows touched by
+    sessions with these footprints (see session_footprint).
+    """
+    refresh_rollup(key for key, _ in footprints)
+    refresh_student_months(
+        (student_id, month_start(key[0]))
+        for key, student_ids in footprints
+        for student_id in student_ids
+    )
+
+
+def _keys_filter(keys):
+    condition = Q()
+    for key in keys:
+        condition |= Q(**dict(zip(ROLLUP_KEY_FIELDS, key)))
+    return condition
+
+
+def _status_counts(prefix=''):
+    counts = {
+        field: Count(f'{prefix}id', filter=Q(**{f'{prefix}status': status}))
+        for status, field in STATUS_FIELDS.items()
+    }
+    counts['total'] = Count(f'{prefix}id')
+    return counts
+
+
+def aggregate_sessions(attendance_sessions):
+    """Rollup values of ``attendance_sessions``, one dict per key (one query)."""
+    return attendance_sessions.values(*ROLLUP_KEY_FIELDS).annotate(
+        sessions=Count('id', distinct=True),
+        **_status_counts('attendances__')
+    ).order_by()
+
+
+def _replace_rows(existing, attendance_sessions):
+    with transaction.atomic():
+        rows = [AttendanceDailyRollup(**row) for row in aggregate_sessions(attendance_sessions)]
+        existing.delete()
+        AttendanceDailyRollup.objects.bulk_create(rows)
+    return len(rows)
+
+
+def refresh_rollup(keys):
+    """Recount the rollup rows of ``keys`` (see rollup_key); keys left without sessions are removed."""
+    keys = set(keys)
+    if not keys:
+        return 0
+    condition = _keys_filter(keys)
+    return _replace_rows(
+        AttendanceDailyRollup.objects.filter(condition),
+        AttendanceSession.objects.filter(condition)
+    )
+
+
+def aggregate_student_months(student_attendances):
+    """
+    Unsaved StudentAttendanceMonthly rows for ``student_attendances``,
+    from one query grouped by student, attendance type and date.
+    """
+    rows = student_attendances.values(
+        'student_id', 'attendance_session__attendance_type', 'attendance_session__date'
+    ).annotate(**_status_counts()).order_by()
+
+    months = {}
+    for row in rows.iterator():
+        date = row['attendance_session__date']
+        key = (row['student_id'], month_start(date), row['attendance_session__attendance_type'])
+        if key not in months:
+            months[key] = StudentAttendanceMonthly(
+                student_id=key[0], month=key[1], attendance_type=key[2]
+            )
+        summary = months[key]
+        for field in COUNT_FIELDS:
+            setattr(summary, field, getattr(summary, field) + row[field])
+        summary.days_mask |= 1 << (date.day - 1)
+    return list(months.values())
+
+
+def refresh_student_months(student_months):
+    """Recount the monthly rows of these (student_id, first day of month) pairs."""
+    students_by_month = defaultdict(set)
+    for student_id, month in student_months:
+        students_by_month[month].add(student_id)
+
+    with transaction.atomic():
+        for month, student_ids in students_by_month.items():
+            rows = aggregate_student_months(StudentAttendance.objects.filter(
+                student_id__in=student_ids,
+                attendance_session__date__gte=month,
+                attendance_session__date__lt=next_month(month)
+            ))
+            StudentAttendanceMonthly.objects.filter(
+                student_id__in=student_ids, month=month
+            ).delete()
+            StudentAttendanceMonthly.objects.bulk_create(rows)
+
+
+def rebuild_rollup(start_date=None, end_date=None):
+    """
+    Recount every daily rollup row between the two dates (inclusive,
+    open-ended when None) and the student monthly rows of the months
+    they fall in. Returns the number of daily rows.
+    """
+    dates = {}
+    months = {}
+    if start_date:
+        dates['date__gte'] = start_date
+        months['month__gte'] = month_start(start_date)
+    if end_date:
+        dates['date__lte'] = end_date
+        months['month__lte'] = month_start(end_date)
+
+    daily_rows = _replace_rows(
+        AttendanceDailyRollup.objects.filter(**dates),
+        AttendanceSession.objects.filter(**dates)
+    )
+
+    marks = StudentAttendance.objects.all()
+    if start_date:
+        marks = marks.filter(attendance_session__date__gte=month_start(start_date))
+    if end_date:
+        marks = marks.filter(attendance_session__date__lt=next_month(end_date))
+    with transaction.atomic():
+        rows = aggregate_student_months(marks)
+        StudentAttendanceMonthly.objects.filter(**months).delete()
+        StudentAttendanceMonthly.objects.bulk_create(rows, batch_size=1000)
+    return daily_rows
+
+
+def student_attendance_months(student, start_month, end_month, attendance_type=None):
+    """
+    A student's attendance counts per month, from ``start_month`` to
+    ``end_month``: {first day of month: {'total', 'present', 'absent',
+    'late', 'excused', 'days'}}, for the months with marks. One query.
+    """
+    rows = StudentAttendanceMonthly.objects.filter(
+        student=student,
+        month__gte=month_start(start_month),
+        month__lte=month_start(end_month)
+    ).order_by('month')
+    if attendance_type:
+        rows = rows.filter(attendance_type=attendance_type)
+
+    months = {}
+    for row in rows:
+        summary = months.setdefault(row.month, dict.fromkeys(COUNT_FIELDS + ['days_mask'], 0))
+        for field in COUNT_FIELDS:
+            summary[field] += getattr(row, field)
+        summary['days_mask'] |= row.days_mask
+    for summary in months.values():
+        summary['days'] = summary.pop('days_mask').bit_count()
+    return months
+
+
+def student_attendance_summary(student, start_month, end_month, attendance_type=None):
+    """
+    A student's attendance over the whole months from ``start_month`` to
+    ``end_month``: the counts of student_attendance_months summed, with
+    the attendance rate.
+    """
+    summary = dict.fromkeys(COUNT_FIELDS + ['days'], 0)
+    for month in student_attendance_months(student, start_month, end_month, attendance_type).values():
+        for field in summary:
+            summary[field] += month[field]
+    summary['attendance_rate'] = 0
+    if summary['total'] > 0:
+        summary['attendance_rate'] = round((summary['present'] / summary['total']) * 100, 2)
+    return summary
+
+
+def student_attendance_counts(attendance_sessions):
+    """
+    Per-student counts over the marks of ``attendance_sessions``:
+    {student_id: {'days', 'sessions', 'present', 'absent', 'late', 'excused'}},
+    in the order the students first appear by date. One grouped query.
+    """
+    rows = StudentAttendance.objects.filter(
+        attendance_session__in=attendance_sessions
+    ).values('student_id').annotate(
+        days=Count('attendance_session__date', distinct=True),
+        first_date=Min('attendance_session__date'),
+        **_status_counts()
+    ).order_by('first_date', 'student_id')
+
+    counts = {}
+    for row in rows:
+        counts[row['student_id']] = {
+            'days': row['days'],
+            'sessions': row['total'],
+            'present': row['present'],
+            'absent': row['absent'],
+            'late': row['late'],
+            'excused': row['excused'],
+        }
+    return counts
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from students.attendance_alerts import ALERT_STREAK_DAYS, ALERT_WINDOW_DAYS, detect_attendance_alerts
+from students.attendance_matrix import CHRONIC_ABSENCE_PERCENT
+from students.management.commands.rebuild_attendance_rollup import parse_date
+
+
+class Command(BaseCommand):
+    help = (
+        "Flag students absent on at least ATTENDANCE_CHRONIC_ABSENCE_PERCENT of "
+        "their days over the last ATTENDANCE_ALERT_WINDOW_DAYS days, or absent "
+        "ATTENDANCE_ALERT_STREAK_DAYS days in a row, in the attendance alert "
+        "table and notify their class teachers. Only students whose attendance "
+        "changed since the last run and students with active alerts are "
+        "rescanned; meant to run daily from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--as-of', help='Last day of the rolling window, YYYY-MM-DD (default: today).')
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Rescan every student with attendance in the window, ignoring the watermark.'
+        )
+        parser.add_argument(
+            '--no-notify', action='store_true',
+            help='Update the alerts without notifying class teachers.'
+        )
+
+    def handle(self, *args, **options):
+        as_of = parse_date(options['as_of']) if options['as_of'] else None
+
+        run = detect_attendance_alerts(as_of=as_of, full=options['full'], notify=not options['no_notify'])
+        self.stdout.write(
+            f"As of {run.as_of} ({ALERT_WINDOW_DAYS} day window, >= {CHRONIC_ABSENCE_PERCENT}% absent "
+            f"or {ALERT_STREAK_DAYS} days in a row): scanned {run.students_scanned} student(s), "
+            f"raised {run.alerts_raised} alert(s), resolved {run.alerts_resolved}, "
+            f"sent {run.notifications} notification(s)"
+        )
@@ -0,0 +1,32 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from students.attendance_rollup import rebuild_rollup
+
+
+def parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f"Invalid date '{value}', expected YYYY-MM-DD")
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount the daily attendance rollup and the student monthly "
+        "attendance summaries from the attendance sessions, for attendance "
+        "written outside the attendance APIs (admin, shell, imports). "
+        "Monthly summaries are rebuilt for the whole months the range touches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='First date to rebuild, YYYY-MM-DD (default: the earliest).')
+        parser.add_argument('--end', help='Last date to rebuild, YYYY-MM-DD (default: the latest).')
+
+    def handle(self, *args, **options):
+        start_date = parse_date(options['start']) if options['start'] else None
+        end_date = parse_date(options['end']) if options['end'] else None
+
+        rows = rebuild_rollup(start_date, end_date)
+        self.stdout.write(f"Rebuilt {rows} attendance rollup row(s)")
@@ -0,0 +1,60 @@
+# Generated by Django 4.2.27 on 2026-10-17 04:09
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+import django.db.models.deletion
+
+
+def fill_rollup(apps, schema_editor):
+    AttendanceSession = apps.get_model('students', 'AttendanceSession')
+    AttendanceDailyRollup = apps.get_model('students', 'AttendanceDailyRollup')
+
+    rows = AttendanceSession.objects.values(
+        'date', 'class_level_id', 'stream_id', 'attendance_type', 'subject_id'
+    ).annotate(
+        sessions=Count('id', distinct=True),
+        total=Count('attendances__id'),
+        present=Count('attendances__id', filter=Q(attendances__status='P')),
+        absent=Count('attendances__id', filter=Q(attendances__status='A')),
+        late=Count('attendances__id', filter=Q(attendances__status='L')),
+        excused=Count('attendances__id', filter=Q(attendances__status='E')),
+    ).order_by()
+    AttendanceDailyRollup.objects.bulk_create(
+        [AttendanceDailyRollup(**row) for row in rows], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_reportjob'),
+        ('students', '0009_hostelpaymenttransaction_payment_method_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('attendance_type', models.CharField(choices=[('CLASS', 'Class Wise'), ('SUBJECT', 'Subject Wise')], max_length=10)),
+                ('sessions', models.PositiveIntegerField(default=0)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('present', models.PositiveIntegerField(default=0)),
+                ('absent', models.PositiveIntegerField(default=0)),
+                ('late', models.PositiveIntegerField(default=0)),
+                ('excused', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('class_level', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.classlevel')),
+                ('stream', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.streamclass')),
+                ('subject', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='core.subject')),
+            ],
+            options={
+                'verbose_name': 'Attendance Daily Rollup',
+                'verbose_name_plural': 'Attendance Daily Rollups',
+                'indexes': [models.Index(fields=['date', 'class_level'], name='students_rollup_date_class')],
+                'unique_together': {('date', 'class_level', 'stream', 'attendance_type', 'subject')},
+            },
+        ),
+        migrations.RunPython(fill_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 4.2.27 on 2026-10-17 04:13
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+import django.db.models.deletion
+
+
+def fill_student_months(apps, schema_editor):
+    StudentAttendance = apps.get_model('students', 'StudentAttendance')
+    StudentAttendanceMonthly = apps.get_model('students', 'StudentAttendanceMonthly')
+
+    rows = StudentAttendance.objects.values(
+        'student_id', 'attendance_session__attendance_type', 'attendance_session__date'
+    ).annotate(
+        total=Count('id'),
+        present=Count('id', filter=Q(status='P')),
+        absent=Count('id', filter=Q(status='A')),
+        late=Count('id', filter=Q(status='L')),
+        excused=Count('id', filter=Q(status='E')),
+    ).order_by()
+
+    months = {}
+    for row in rows.iterator():
+        date = row['attendance_session__date']
+        key = (row['student_id'], date.replace(day=1), row['attendance_session__attendance_type'])
+        if key not in months:
+            months[key] = StudentAttendanceMonthly(
+                student_id=key[0], month=key[1], attendance_type=key[2]
+            )
+        summary = months[key]
+        for field in ('total', 'present', 'absent', 'late', 'excused'):
+            setattr(summary, field, getattr(summary, field) + row[field])
+        summary.days_mask |= 1 << (date.day - 1)
+    StudentAttendanceMonthly.objects.bulk_create(months.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0010_attendancedailyrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentAttendanceMonthly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('attendance_type', models.CharField(choices=[('CLASS', 'Class Wise'), ('SUBJECT', 'Subject Wise')], max_length=10)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('present', models.PositiveIntegerField(default=0)),
+                ('absent', models.PositiveIntegerField(default=0)),
+                ('late', models.PositiveIntegerField(default=0)),
+                ('excused', models.PositiveIntegerField(default=0)),
+                ('days_mask', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_months', to='students.student')),
+            ],
+            options={
+                'verbose_name': 'Student Monthly Attendance',
+                'verbose_name_plural': 'Student Monthly Attendance',
+                'unique_together': {('student', 'month', 'attendance_type')},
+            },
+        ),
+        migrations.RunPython(fill_student_months, migrations.RunPython.noop),
+    ]
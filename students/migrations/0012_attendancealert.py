@@ -0,0 +1,61 @@
+# Generated by Django 4.2.27 on 2026-10-17 04:23
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_reportjob'),
+        ('students', '0011_studentattendancemonthly'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceAlertRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('watermark', models.DateTimeField()),
+                ('as_of', models.DateField()),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('students_scanned', models.PositiveIntegerField(default=0)),
+                ('alerts_raised', models.PositiveIntegerField(default=0)),
+                ('alerts_resolved', models.PositiveIntegerField(default=0)),
+                ('notifications', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Attendance Alert Run',
+                'verbose_name_plural': 'Attendance Alert Runs',
+                'ordering': ['-watermark'],
+            },
+        ),
+        migrations.CreateModel(
+            name='AttendanceAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reason', models.CharField(choices=[('RATE', 'Absence Rate'), ('STREAK', 'Consecutive Absences'), ('BOTH', 'Absence Rate and Consecutive Absences')], max_length=10)),
+                ('window_start', models.DateField()),
+                ('window_end', models.DateField()),
+                ('marked_days', models.PositiveIntegerField(default=0)),
+                ('absent_days', models.PositiveIntegerField(default=0)),
+                ('absence_rate', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('current_streak', models.PositiveIntegerField(default=0)),
+                ('longest_streak', models.PositiveIntegerField(default=0)),
+                ('is_active', models.BooleanField(default=True)),
+                ('flagged_at', models.DateTimeField()),
+                ('notified_at', models.DateTimeField(blank=True, null=True)),
+                ('resolved_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('class_level', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='core.classlevel')),
+                ('stream', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='core.streamclass')),
+                ('student', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_alert', to='students.student')),
+            ],
+            options={
+                'verbose_name': 'Attendance Alert',
+                'verbose_name_plural': 'Attendance Alerts',
+                'ordering': ['-absence_rate', '-current_streak'],
+                'indexes': [models.Index(fields=['is_active', '-absence_rate'], name='students_alert_active_rate'), models.Index(fields=['is_active', 'class_level', 'stream'], name='students_alert_active_class')],
+            },
+        ),
+    ]
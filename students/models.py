@@ -263,6 +263,164 @@ class StudentAttendance(models.Model):
         unique_together = ('attendance_session', 'student')
 
 
+class AttendanceDailyRollup(models.Model):
+    """
+    Attendance counts of one day for one class, stream, attendance type
+    and subject, summed over that day's sessions.
+
+    Rows are refreshed by the attendance APIs whenever they write marks
+    (see students.attendance_rollup), so the monthly, weekly and class
+    reports sum a handful of rollup rows instead of aggregating
+    StudentAttendance session by session.
+    """
+
+    date = models.DateField()
+    class_level = models.ForeignKey(ClassLevel, on_delete=models.CASCADE)
+    stream = models.ForeignKey(StreamClass, on_delete=models.CASCADE)
+    attendance_type = models.CharField(
+        max_length=10,
+        choices=AttendanceSession.ATTENDANCE_TYPE_CHOICES
+    )
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, null=True, blank=True)
+
+    sessions = models.PositiveIntegerField(default=0)
+    # Attendance marks across the sessions
+    total = models.PositiveIntegerField(default=0)
+    present = models.PositiveIntegerField(default=0)
+    absent = models.PositiveIntegerField(default=0)
+    late = models.PositiveIntegerField(default=0)
+    excused = models.PositiveIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['date', 'class_level', 'stream', 'attendance_type', 'subject']
+        indexes = [
+            models.Index(fields=['date', 'class_level'], name='students_rollup_date_class'),
+        ]
+        verbose_name = 'Attendance Daily Rollup'
+        verbose_name_plural = 'Attendance Daily Rollups'
+
+    def __str__(self):
+        return f"{self.class_level}-{self.stream} {self.attendance_type} {self.date}"
+
+
+class StudentAttendanceMonthly(models.Model):
+    """
+    A student's attendance marks of one attendance type in one month,
+    counted per status.
+
+    Refreshed with the daily rollup when attendance is taken or edited
+    (see students.attendance_rollup), so attendance rates over a term or
+    a year are summed from about a dozen rows per student. ``days_mask``
+    has bit n-1 set when the student has a mark on day n of the month;
+    OR-ing the masks of both types gives the days attended in the month.
+    """
+
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='attendance_months')
+    # First day of the month
+    month = models.DateField()
+    attendance_type = models.CharField(
+        max_length=10,
+        choices=AttendanceSession.ATTENDANCE_TYPE_CHOICES
+    )
+
+    total = models.PositiveIntegerField(default=0)
+    present = models.PositiveIntegerField(default=0)
+    absent = models.PositiveIntegerField(default=0)
+    late = models.PositiveIntegerField(default=0)
+    excused = models.PositiveIntegerField(default=0)
+    days_mask = models.PositiveIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['student', 'month', 'attendance_type']
+        verbose_name = 'Student Monthly Attendance'
+        verbose_name_plural = 'Student Monthly Attendance'
+
+    def __str__(self):
+        return f"{self.student.full_name} {self.month:%B %Y} {self.attendance_type}"
+
+    @property
+    def days(self):
+        return self.days_mask.bit_count()
+
+
+class AttendanceAlert(models.Model):
+    """
+    A student flagged for chronic absence or a run of consecutive absent
+    days, as of the last run of the detect_chronic_absence command.
+
+    There is one row per student ever flagged; ``is_active`` is cleared
+    when a later run finds the student back under the thresholds, so the
+    dashboard lists at-risk students from the active rows alone (see
+    students.attendance_alerts).
+    """
+
+    REASON_CHOICES = (
+        ('RATE', 'Absence Rate'),
+        ('STREAK', 'Consecutive Absences'),
+        ('BOTH', 'Absence Rate and Consecutive Absences'),
+    )
+
+    student = models.OneToOneField(Student, on_delete=models.CASCADE, related_name='attendance_alert')
+    class_level = models.ForeignKey(ClassLevel, on_delete=models.SET_NULL, null=True, blank=True)
+    stream = models.ForeignKey(StreamClass, on_delete=models.SET_NULL, null=True, blank=True)
+
+    reason = models.CharField(max_length=10, choices=REASON_CHOICES)
+    # Rolling window the figures were computed over
+    window_start = models.DateField()
+    window_end = models.DateField()
+    marked_days = models.PositiveIntegerField(default=0)
+    absent_days = models.PositiveIntegerField(default=0)
+    absence_rate = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    current_streak = models.PositiveIntegerField(default=0)
+    longest_streak = models.PositiveIntegerField(default=0)
+
+    is_active = models.BooleanField(default=True)
+    flagged_at = models.DateTimeField()
+    notified_at = models.DateTimeField(null=True, blank=True)
+    resolved_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-absence_rate', '-current_streak']
+        indexes = [
+            models.Index(fields=['is_active', '-absence_rate'], name='students_alert_active_rate'),
+            models.Index(fields=['is_active', 'class_level', 'stream'], name='students_alert_active_class'),
+        ]
+        verbose_name = 'Attendance Alert'
+        verbose_name_plural = 'Attendance Alerts'
+
+    def __str__(self):
+        return f"{self.student.full_name} - {self.get_reason_display()}"
+
+
+class AttendanceAlertRun(models.Model):
+    """
+    One run of the detect_chronic_absence command. ``watermark`` is the
+    time the run started; the next run rescans the students whose monthly
+    attendance rows changed after the watermark of the last finished run.
+    """
+
+    watermark = models.DateTimeField()
+    as_of = models.DateField()
+    finished_at = models.DateTimeField(null=True, blank=True)
+    students_scanned = models.PositiveIntegerField(default=0)
+    alerts_raised = models.PositiveIntegerField(default=0)
+    alerts_resolved = models.PositiveIntegerField(default=0)
+    notifications = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-watermark']
+        verbose_name = 'Attendance Alert Run'
+        verbose_name_plural = 'Attendance Alert Runs'
+
+    def __str__(self):
+        return f"Attendance alerts as of {self.as_of} ({self.watermark:%Y-%m-%d %H:%M})"
+
+
 class Hostel(models.Model):
     HOSTEL_TYPES = [
         ('boys', 'Boys'),
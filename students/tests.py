@@ -0,0 +1,233 @@
+"""
+Attendance writes, rollups, registers and absence alerts.
+
+Each test writes marks the way the attendance views do (a bulk write
+between two session footprints, see students.attendance_rollup) on a
+small class built by results.benchmarks:
+
+    python manage.py test students --settings=config.test_settings
+"""
+from datetime import date
+
+from django.test import TestCase
+
+from results.benchmarks import build_exam_session
+from students.attendance_alerts import at_risk_students, detect_attendance_alerts
+from students.attendance_marks import write_session_attendance
+from students.attendance_matrix import load_attendance_matrix
+from students.attendance_rollup import (
+    COUNT_FIELDS, ROLLUP_KEY_FIELDS, rebuild_rollup, refresh_attendance, session_footprint,
+    student_attendance_summary
+)
+from students.models import (
+    AttendanceAlert, AttendanceDailyRollup, AttendanceSession, StreamClass, StudentAttendance,
+    StudentAttendanceMonthly
+)
+
+
+class AttendanceTestCase(TestCase):
+
+    def setUp(self):
+        data = build_exam_session('PRIMARY', students=8, subjects=1, streams=2, seed=1)
+        self.class_level = data['exam_session'].class_level
+        self.subject = data['subjects'][0]
+        self.streams = list(StreamClass.objects.filter(class_level=self.class_level).order_by('stream_letter'))
+        self.students = {
+            stream.id: [student for student in data['students'] if student.stream_class_id == stream.id]
+            for stream in self.streams
+        }
+
+    def take_attendance(self, day, stream, statuses, attendance_type='CLASS', subject=None, period=None):
+        """A new session with ``statuses`` for the stream's students, in register order."""
+        session = AttendanceSession.objects.create(
+            class_level=self.class_level, stream=stream, attendance_type=attendance_type,
+            subject=subject, date=day, period=period
+        )
+        summary = write_session_attendance(session, self.payload(stream, statuses))
+        refresh_attendance(session_footprint(session))
+        return session, summary
+
+    def edit_attendance(self, session, payload=None, replace=False, **changes):
+        before = session_footprint(session)
+        for field, value in changes.items():
+            setattr(session, field, value)
+        session.save()
+        summary = None
+        if payload is not None:
+            summary = write_session_attendance(session, payload, replace=replace)
+        refresh_attendance(before, session_footprint(session))
+        return summary
+
+    def payload(self, stream, statuses):
+        return {
+            str(student.id): {'status': status, 'remark': ''}
+            for student, status in zip(self.students[stream.id], statuses)
+        }
+
+
+class AttendanceRollupTests(AttendanceTestCase):
+
+    def rollup_rows(self):
+        daily = list(AttendanceDailyRollup.objects.order_by(*ROLLUP_KEY_FIELDS).values_list(
+            *ROLLUP_KEY_FIELDS, 'sessions', *COUNT_FIELDS
+        ))
+        monthly = list(StudentAttendanceMonthly.objects.order_by(
+            'student_id', 'month', 'attendance_type'
+        ).values_list('student_id', 'month', 'attendance_type', *COUNT_FIELDS, 'days_mask'))
+        return daily, monthly
+
+    def test_edits_match_rebuild(self):
+        stream_a, stream_b = self.streams
+        first, _ = self.take_attendance(date(2026, 3, 2), stream_a, 'PPAL')
+        second, _ = self.take_attendance(date(2026, 3, 3), stream_a, 'PAAE')
+        self.take_attendance(date(2026, 3, 3), stream_b, 'PPPP')
+        lesson, _ = self.take_attendance(
+            date(2026, 3, 3), stream_b, 'APLP', attendance_type='SUBJECT', subject=self.subject, period=1
+        )
+        last, _ = self.take_attendance(date(2026, 3, 31), stream_a, 'AAAA')
+
+        # Change marks, then drop a student from the session
+        self.edit_attendance(first, self.payload(stream_a, 'PPPP'))
+        self.edit_attendance(second, self.payload(stream_a, 'PA'), replace=True)
+        # Move sessions to another month and stream, with request values
+        self.edit_attendance(last, date='2026-04-01')
+        self.edit_attendance(lesson, stream_id=str(stream_a.id))
+        # Delete a session
+        before = session_footprint(first)
+        first.delete()
+        refresh_attendance(before)
+
+        daily, monthly = self.rollup_rows()
+        self.assertEqual(len(daily), 4)
+        self.assertIn(date(2026, 4, 1), [row[0] for row in daily])
+
+        rebuild_rollup()
+        self.assertEqual(self.rollup_rows(), (daily, monthly))
+
+    def test_student_summary_counts_marks(self):
+        stream = self.streams[0]
+        for day, statuses in [(2, 'PA'), (3, 'AL'), (4, 'PE')]:
+            self.take_attendance(date(2026, 3, day), stream, statuses)
+        self.take_attendance(date(2026, 4, 1), stream, 'LP')
+        self.take_attendance(
+            date(2026, 4, 1), stream, 'AP', attendance_type='SUBJECT', subject=self.subject, period=2
+        )
+
+        for student in self.students[stream.id][:2]:
+            marks = StudentAttendance.objects.filter(student=student)
+            summary = student_attendance_summary(student, date(2026, 3, 1), date(2026, 4, 30))
+            with self.subTest(student=student.id):
+                self.assertEqual(summary['total'], marks.count())
+                self.assertEqual(summary['present'], marks.filter(status='P').count())
+                self.assertEqual(summary['absent'], marks.filter(status='A').count())
+                self.assertEqual(summary['days'], marks.values('attendance_session__date').distinct().count())
+                self.assertEqual(
+                    summary['attendance_rate'],
+                    round(summary['present'] / summary['total'] * 100, 2)
+                )
+
+        march = student_attendance_summary(self.students[stream.id][0], date(2026, 3, 1), date(2026, 3, 1))
+        self.assertEqual((march['total'], march['present'], march['days']), (3, 2, 3))
+
+
+class AttendanceMarksTests(AttendanceTestCase):
+
+    def test_write_summary(self):
+        stream = self.streams[0]
+        session, summary = self.take_attendance(date(2026, 3, 2), stream, 'PPAA')
+        self.assertEqual(summary['created'], 4)
+
+        students = self.students[stream.id]
+        payload = self.payload(stream, 'PLA')
+        payload[str(students[0].id)]['remark'] = 'Late bus'
+        payload['999999'] = {'status': 'P'}
+        payload['x'] = {'status': 'P'}
+        payload[str(students[2].id)] = {'status': 'Z'}
+
+        summary = self.edit_attendance(session, payload, replace=True)
+        self.assertEqual(
+            [summary[field] for field in ('created', 'updated', 'unchanged', 'deleted')],
+            [0, 2, 0, 1]
+        )
+        self.assertEqual(len(summary['errors']), 3)
+        self.assertEqual(
+            {(change['student_id'], change['action']) for change in summary['changes']},
+            {(students[0].id, 'updated'), (students[1].id, 'updated'), (students[3].id, 'deleted')}
+        )
+        self.assertEqual(
+            dict(StudentAttendance.objects.filter(attendance_session=session).values_list('student_id', 'status')),
+            {students[0].id: 'P', students[1].id: 'L', students[2].id: 'A'}
+        )
+
+    def test_write_queries_do_not_grow_with_students(self):
+        stream = self.streams[0]
+        session = AttendanceSession.objects.create(
+            class_level=self.class_level, stream=stream, attendance_type='CLASS', date=date(2026, 3, 2)
+        )
+        with self.assertNumQueries(5):
+            write_session_attendance(session, self.payload(stream, 'PA'))
+        with self.assertNumQueries(5):
+            write_session_attendance(session, self.payload(stream, 'APLE'))
+
+
+class AttendanceMatrixTests(AttendanceTestCase):
+
+    def test_register_counts(self):
+        stream = self.streams[0]
+        for day, statuses in [(2, 'PAPL'), (3, 'PAAP'), (4, 'PAPP')]:
+            self.take_attendance(date(2026, 3, day), stream, statuses)
+        # A second session on the 4th, whose marks tie with the first's
+        self.take_attendance(
+            date(2026, 3, 4), stream, 'PPAA', attendance_type='SUBJECT', subject=self.subject, period=3
+        )
+
+        matrix = load_attendance_matrix(self.class_level.id, 2026, 3, stream_id=stream.id)
+        self.assertEqual(matrix.codes.shape, (4, 31, 2))
+
+        totals = matrix.totals()
+        self.assertEqual((totals['school_days'], totals['sessions'], totals['marks']), (3, 4, 16))
+
+        rows = {row['student'].id: row for row in matrix.student_rows()}
+        for student in self.students[stream.id]:
+            marks = StudentAttendance.objects.filter(student=student)
+            with self.subTest(student=student.id):
+                self.assertEqual(rows[student.id]['sessions'], marks.count())
+                self.assertEqual(rows[student.id]['present'], marks.filter(status='P').count())
+                self.assertEqual(rows[student.id]['absent'], marks.filter(status='A').count())
+
+        absent_student = rows[self.students[stream.id][1].id]
+        self.assertEqual(absent_student['register'][1:4], ['A', 'A', 'P'])
+        self.assertEqual(absent_student['longest_absence_streak'], 2)
+        self.assertEqual(absent_student['current_absence_streak'], 0)
+        self.assertTrue(absent_student['chronic_absence'])
+
+        day_rows = matrix.day_rows()
+        self.assertFalse(day_rows[0]['is_school_day'])
+        self.assertEqual((day_rows[3]['sessions'], day_rows[3]['marks']), (2, 8))
+
+
+class AttendanceAlertTests(AttendanceTestCase):
+
+    def test_alerts_follow_absences(self):
+        stream = self.streams[0]
+        absent, present = self.students[stream.id][:2]
+        for day in (2, 3, 4):
+            self.take_attendance(date(2026, 3, day), stream, 'AP')
+
+        run = detect_attendance_alerts(as_of=date(2026, 3, 4), full=True, notify=False)
+        self.assertEqual((run.students_scanned, run.alerts_raised), (2, 1))
+        alert = AttendanceAlert.objects.get(student=absent)
+        self.assertTrue(alert.is_active)
+        self.assertEqual(alert.reason, 'STREAK')
+        self.assertEqual((alert.marked_days, alert.absent_days, alert.current_streak), (3, 3, 3))
+        self.assertEqual([alert.student for alert in at_risk_students(class_level=self.class_level)], [absent])
+        self.assertFalse(AttendanceAlert.objects.filter(student=present).exists())
+
+        # Present again: the next run rescans the student and resolves the alert
+        self.take_attendance(date(2026, 3, 5), stream, 'PP')
+        run = detect_attendance_alerts(as_of=date(2026, 3, 5), notify=False)
+        self.assertEqual((run.alerts_raised, run.alerts_resolved), (0, 1))
+        alert.refresh_from_db()
+        self.assertFalse(alert.is_active)
+        self.assertIsNotNone(alert.resolved_at)
+        self.assertFalse(at_risk_students().exists())